@@ -0,0 +1,285 @@
+"""
+Expense Anomaly Scoring
+
+Scores each expense against the rolling statistics of its business and
+category: an exponentially weighted mean and variance of log amounts
+(ANOMALY_EWMA_ALPHA is the weight of the newest expense), so recent
+spending counts most and a category's typical size can drift. The score is
+how many standard deviations an expense sits above that mean, measured
+before the expense itself is folded in.
+
+Statistics are kept in ``ExpenseStatistic`` rows and updated in O(1) per
+expense as transactions are posted (``observe``). ``score_history``
+recomputes them from an organization's whole history with NumPy instead,
+scoring every past expense in one pass; ``rebuild_statistics`` stores the
+result, e.g. after history was edited or deleted, which the incremental
+updates never unwind.
+"""
+import math
+import uuid
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal
+from functools import cached_property
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import CharField, FloatField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from transactions.models import Transaction
+from .models import ExpenseStatistic
+
+
+# Floor on the standard deviation, in log amount: a category whose past
+# expenses were all the same size would otherwise flag any change at all.
+# 0.25 means a score of 3 needs an expense about twice the typical size.
+MIN_STD = 0.25
+
+Score = namedtuple('Score', ['z', 'mean', 'std', 'count'])
+
+
+def score(statistic, value):
+    """The Score of log amount ``value`` against ``statistic`` (None without history)."""
+    if not statistic.count:
+        return None
+    std = math.sqrt(statistic.variance)
+    return Score((value - statistic.mean) / max(std, MIN_STD), statistic.mean, std, statistic.count)
+
+
+def update(statistic, value, alpha):
+    """Fold log amount ``value`` into ``statistic``'s EWMA mean and variance."""
+    if not statistic.count:
+        statistic.mean, statistic.variance = value, 0.0
+    else:
+        diff = value - statistic.mean
+        increment = alpha * diff
+        statistic.mean += increment
+        statistic.variance = (1 - alpha) * (statistic.variance + diff * increment)
+    statistic.count += 1
+
+
+def observe(posted):
+    """
+    Score posted expenses and fold them into their statistics, in order.
+    Returns {id(state): Score} for the expenses that had history.
+    """
+    expenses = [
+        state for state in posted
+        if state.transaction_type == 'expense' and state.amount_ngn and state.amount_ngn > 0
+    ]
+    if not expenses:
+        return {}
+    alpha = settings.ANOMALY_EWMA_ALPHA
+    keys = {(state.business_id, state.category) for state in expenses}
+
+    scores = {}
+    with transaction.atomic():
+        # Create missing rows first, so that every key has a row to lock: a
+        # concurrent writer of the same new key then waits for this one
+        # instead of overwriting its update
+        ExpenseStatistic.objects.bulk_create(
+            [ExpenseStatistic(business_id=business_id, category=category) for business_id, category in keys],
+            ignore_conflicts=True,
+        )
+        statistics = {
+            (statistic.business_id, statistic.category): statistic
+            for statistic in ExpenseStatistic.objects.select_for_update().filter(
+                business_id__in={business_id for business_id, _ in keys},
+                category__in={category for _, category in keys}
+            )
+        }
+        for state in expenses:
+            statistic = statistics[(state.business_id, state.category)]
+            value = math.log(state.amount_ngn)
+            result = score(statistic, value)
+            if result is not None:
+                scores[id(state)] = result
+            update(statistic, value, alpha)
+            if statistic.last_date is None or state.transaction_date > statistic.last_date:
+                statistic.last_date = state.transaction_date
+
+        now = timezone.now()
+        changed = [statistics[key] for key in keys]
+        for statistic in changed:
+            statistic.updated_at = now
+        ExpenseStatistic.objects.bulk_update(changed, ['count', 'mean', 'variance', 'last_date', 'updated_at'])
+    return scores
+
+
+# Batch scoring
+
+def _ewm(values, first, start_of_row, alpha):
+    """
+    EWMA of ``values`` within each group, after each row; ``first`` marks the
+    rows starting a group and ``start_of_row`` is each row's group start.
+
+    The recursion m = (1 - alpha) * m + alpha * x unrolls to a weighted sum,
+    computed as a cumulative sum over fixed-width blocks of rows scaled by
+    powers of (1 - alpha) relative to the block start. Blocks are narrow
+    enough for the scaling not to overflow and wide enough that everything
+    older than the previous block weighs under 1e-17, so each row only adds
+    the previous block's last value to its own block's sum.
+    """
+    n = len(values)
+    decay = 1.0 - alpha
+    width = max(1, math.ceil(40 / -math.log(decay)))
+
+    index = np.arange(n)
+    offset = index % width
+    block_start = index - offset
+    weights = np.where(first, 1.0, alpha)
+
+    padded = np.zeros(-(-n // width) * width)
+    padded[:n] = weights * values * decay ** -offset.astype(float)
+    prefix = padded.reshape(-1, width).cumsum(axis=1).ravel()[:n]
+
+    # Restart the sum where a group starts inside the block
+    segment_start = np.maximum(start_of_row, block_start)
+    restarted = segment_start > block_start
+    before = np.zeros(n)
+    before[restarted] = prefix[segment_start[restarted] - 1]
+    result = decay ** offset.astype(float) * (prefix - before)
+
+    carried = np.flatnonzero(start_of_row < block_start)
+    result[carried] += decay ** (offset[carried] + 1.0) * result[block_start[carried] - 1]
+    return result
+
+
+def rolling_statistics(groups, values, alpha):
+    """
+    Each row's group EWMA mean and variance as they stood before the row,
+    and how many earlier rows of the group they cover, for rows ordered by
+    group then time. Also returns the statistics after each group's last row
+    as {group: (count, mean, variance)}.
+    """
+    groups = np.asarray(groups)
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if not n:
+        return np.zeros(0, dtype=np.intp), np.zeros(0), np.zeros(0), {}
+
+    first = np.ones(n, dtype=bool)
+    first[1:] = groups[1:] != groups[:-1]
+    starts = np.flatnonzero(first)
+    start_of_row = starts[np.cumsum(first) - 1]
+    counts = np.arange(n) - start_of_row
+
+    mean = _ewm(values, first, start_of_row, alpha)
+    variance = np.maximum(_ewm(values * values, first, start_of_row, alpha) - mean * mean, 0.0)
+
+    mean_before = np.full(n, np.nan)
+    variance_before = np.full(n, np.nan)
+    mean_before[1:], variance_before[1:] = mean[:-1], variance[:-1]
+    mean_before[first] = variance_before[first] = np.nan
+
+    ends = np.append(starts[1:], n) - 1
+    final = {
+        group: (int(count), float(m), float(v))
+        for group, count, m, v in zip(groups[ends].tolist(), counts[ends] + 1, mean[ends], variance[ends])
+    }
+    return counts, mean_before, variance_before, final
+
+
+def z_scores(values, mean_before, variance_before):
+    """Scores of log amounts against their prior statistics (NaN without history)."""
+    std = np.sqrt(variance_before)
+    return (np.asarray(values, dtype=float) - mean_before) / np.maximum(std, MIN_STD)
+
+
+class History:
+    """
+    An organization's confirmed expenses, scored in date order per (business,
+    category). Kept as columns; ``rows`` builds typed tuples only when read.
+    """
+
+    def __init__(self, rows, alpha):
+        # rows: (id, business_id, category, transaction_date, amount_ngn), by
+        # date; IDs and dates may be text and amounts floats, as read by
+        # score_history
+        columns = list(zip(*rows)) or [()] * 5
+        amounts = np.array(columns[4], dtype=float)
+        keys = {}
+        codes = np.fromiter(
+            (keys.setdefault(key, len(keys)) for key in zip(columns[1], columns[2])), dtype=np.intp, count=len(amounts)
+        )
+        # Missing amounts are NaN and fail the comparison too
+        keep = np.flatnonzero(amounts > 0)
+        order = keep[np.argsort(codes[keep], kind='stable')]
+
+        self.keys = [(_as_uuid(business_id), category) for business_id, category in keys]
+        self.codes = codes[order]
+        self.columns = [np.array(column, dtype=object)[order] for column in columns[:4]]
+        self.amounts = amounts[order]
+        self.values = np.log(self.amounts)
+        self.counts, self.mean, self.variance, final = rolling_statistics(self.codes, self.values, alpha)
+        self.z = z_scores(self.values, self.mean, self.variance)
+        self.final = {self.keys[code]: stats for code, stats in final.items()}
+
+        ends = np.flatnonzero(np.append(self.codes[1:] != self.codes[:-1], True)) if len(order) else []
+        dates = self.columns[3]
+        self.last_dates = {self.keys[self.codes[i]]: _as_date(dates[i]) for i in ends}
+
+    def __len__(self):
+        return len(self.amounts)
+
+    @cached_property
+    def rows(self):
+        """(id, business_id, category, transaction_date, amount_ngn) of each expense, in scoring order."""
+        ids, _, categories, dates = self.columns
+        return [
+            (_as_uuid(ids[i]), self.keys[self.codes[i]][0], categories[i], _as_date(dates[i]), _money(self.amounts[i]))
+            for i in range(len(self))
+        ]
+
+    def score(self, i):
+        if not self.counts[i]:
+            return None
+        return Score(float(self.z[i]), float(self.mean[i]), math.sqrt(self.variance[i]), int(self.counts[i]))
+
+
+def score_history(organization_id, business_id=None):
+    """Score every confirmed expense of the organization (or one business)."""
+    rows = Transaction.objects.filter(
+        organization_id=organization_id,
+        transaction_type='expense',
+        status='confirmed'
+    )
+    if business_id is not None:
+        rows = rows.filter(business_id=business_id)
+    # Read as text and floats: converting each row's UUIDs, date and Decimal
+    # costs more than scoring it
+    rows = rows.order_by('transaction_date', 'created_at').values_list(
+        Cast('id', CharField()), Cast('business_id', CharField()), 'category',
+        Cast('transaction_date', CharField()), Cast('amount_ngn', FloatField())
+    )
+    return History(list(rows), settings.ANOMALY_EWMA_ALPHA)
+
+
+def rebuild_statistics(organization_id):
+    """Replace the organization's statistics with ones computed from history; returns the History."""
+    history = score_history(organization_id)
+    with transaction.atomic():
+        ExpenseStatistic.objects.filter(business__organization_id=organization_id).delete()
+        ExpenseStatistic.objects.bulk_create([
+            ExpenseStatistic(
+                business_id=business_id, category=category, count=count, mean=mean, variance=variance,
+                last_date=history.last_dates[(business_id, category)]
+            )
+            for (business_id, category), (count, mean, variance) in history.final.items()
+        ], batch_size=1000)
+    return history
+
+
+def _as_uuid(value):
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(value)
+
+
+def _as_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def _money(value):
+    return Decimal(str(value)).quantize(Decimal('0.01'))
@@ -0,0 +1,451 @@
+"""
+Alert Engine
+
+Evaluates alert rules as money moves instead of scanning every rule. Each
+active rule's ``conditions`` are compiled once into a predicate, and an
+organization's compiled rules are indexed by (business, alert_type), with
+business None for organization-wide rules, so a change only looks at the
+rules of its own business and kind:
+
+- posted transactions: ``large_transaction``, ``unusual_expense`` (from
+  the expense's anomaly score, see ``anomaly.py``) and ``goal_achieved``;
+- balance changes: ``low_cash``, which fires when a balance crosses below
+  its threshold, not on every change while it stays there.
+
+Changes arrive through the ledger's ``ledger_changed`` signal (see
+``signals.py``) with the balances the write left, and are handed over once
+the writing transaction commits. With ALERTS_ASYNC on they are queued as a
+Celery task, so imports and bank syncs never wait on them and a process
+exit loses none; otherwise they are evaluated in the request. Compiled indexes are cached per
+organization and rebuilt when the rules' count or latest ``updated_at``
+changes; trigger bookkeeping uses ``update()`` and leaves ``updated_at``
+alone.
+"""
+import logging
+import math
+import threading
+import uuid
+from collections import Counter
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+from django.utils import timezone
+
+from businesses.models import Business
+from organizations.models import Organization
+from transactions.ledger import LedgerState
+from transactions.models import TransactionDailyRollup
+from . import anomaly
+from .models import Alert, AlertRule
+
+logger = logging.getLogger(__name__)
+
+
+TRANSACTION_ALERTS = ('large_transaction', 'unusual_expense', 'goal_achieved')
+BALANCE_ALERTS = ('low_cash',)
+
+SEVERITY = {
+    'low_cash': 'high',
+    'unusual_expense': 'medium',
+    'large_transaction': 'medium',
+    'goal_achieved': 'low',
+}
+
+PERIOD_STARTS = {
+    'week': lambda day: day - timedelta(days=day.weekday()),
+    'month': lambda day: day.replace(day=1),
+    'year': lambda day: day.replace(month=1, day=1),
+}
+
+DIRECTIONS = {
+    'in': ('income',),
+    'out': ('expense',),
+    'any': ('income', 'expense'),
+}
+
+
+class ConditionError(ValueError):
+    """A rule's ``conditions`` can't be compiled."""
+
+
+# Compiling conditions
+#
+# A compiler turns a rule's conditions into a predicate. Transaction
+# predicates take (rule, LedgerState, context), balance predicates take
+# (rule, BalanceChange, context); both return the alert's context data
+# when the rule fires, else None.
+
+COMPILERS = {}
+
+
+def compiles(alert_type):
+    def register(func):
+        COMPILERS[alert_type] = func
+        return func
+    return register
+
+
+def _number(conditions, key, default=None):
+    value = conditions.get(key, default)
+    if value is None:
+        raise ConditionError(f'{key} is required')
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        raise ConditionError(f'{key} must be a number')
+    if not number.is_finite() or number < 0:
+        raise ConditionError(f'{key} must be a non-negative number')
+    return number
+
+
+def _choice(conditions, key, choices, default):
+    value = conditions.get(key, default)
+    if value not in choices:
+        raise ConditionError(f"{key} must be one of {', '.join(choices)}")
+    return value
+
+
+@compiles('large_transaction')
+def compile_large_transaction(conditions):
+    threshold = _number(conditions, 'amount')
+    types = DIRECTIONS[_choice(conditions, 'direction', list(DIRECTIONS), 'any')]
+
+    def predicate(rule, state, context):
+        if state.transaction_type in types and state.amount_ngn >= threshold:
+            return {'amount': float(state.amount_ngn), 'threshold': float(threshold)}
+    return predicate
+
+
+@compiles('unusual_expense')
+def compile_unusual_expense(conditions):
+    threshold = _number(conditions, 'z_score', 3)
+    min_history = int(_number(conditions, 'min_history', settings.ANOMALY_MIN_HISTORY))
+    category = conditions.get('category')
+
+    def predicate(rule, state, context):
+        if state.transaction_type != 'expense' or (category and state.category != category):
+            return None
+        score = context.scores.get(id(state))
+        if score is not None and score.count >= min_history and score.z >= threshold:
+            return {
+                'amount': float(state.amount_ngn),
+                'category': state.category,
+                'z_score': round(score.z, 2),
+                'typical_amount': round(math.exp(score.mean), 2),
+                'log_mean': score.mean,
+                'log_std': score.std,
+                'observations': score.count,
+                'threshold': float(threshold),
+            }
+    return predicate
+
+
+@compiles('goal_achieved')
+def compile_goal_achieved(conditions):
+    target = _number(conditions, 'target')
+    period = _choice(conditions, 'period', list(PERIOD_STARTS), 'month')
+    transaction_type = _choice(conditions, 'type', ['income', 'expense'], 'income')
+
+    def predicate(rule, state, context):
+        if state.transaction_type != transaction_type:
+            return None
+        start = PERIOD_STARTS[period](state.transaction_date)
+        total = context.period_total(state.organization_id, rule.business_id, transaction_type, start)
+        # Once per period
+        if total >= target and context.claim_period(rule.id, start):
+            return {'total': float(total), 'target': float(target), 'period_start': start.isoformat()}
+    return predicate
+
+
+@compiles('low_cash')
+def compile_low_cash(conditions):
+    threshold = _number(conditions, 'threshold')
+    inclusive = _choice(conditions, 'operator', ['<', '<='], '<') == '<='
+
+    def below(balance):
+        return balance <= threshold if inclusive else balance < threshold
+
+    def predicate(rule, change, context):
+        if below(change.balance) and not below(change.balance - change.delta):
+            return {'current_balance': float(change.balance), 'threshold': float(threshold)}
+    return predicate
+
+
+def validate_conditions(alert_type, conditions):
+    """Raise ConditionError unless the conditions compile."""
+    if not isinstance(conditions, dict):
+        raise ConditionError('conditions must be an object')
+    # Other types (sync_failed, daily_summary) aren't driven by ledger changes
+    if alert_type in COMPILERS:
+        COMPILERS[alert_type](conditions)
+
+
+# Rule index
+
+class CompiledRule:
+    __slots__ = ('id', 'business_id', 'alert_type', 'name', 'predicate')
+
+    def __init__(self, rule, predicate):
+        self.id = rule.pk
+        self.business_id = rule.business_id
+        self.alert_type = rule.alert_type
+        self.name = rule.name
+        self.predicate = predicate
+
+
+class RuleIndex:
+    """An organization's active, compiled rules keyed by (business_id, alert_type)."""
+
+    def __init__(self, rules):
+        self.rules = {}
+        self.size = 0
+        for rule in rules:
+            try:
+                conditions = rule.conditions if isinstance(rule.conditions, dict) else {}
+                predicate = COMPILERS[rule.alert_type](conditions)
+            except ConditionError as exc:
+                logger.warning('Skipping alert rule %s: %s', rule.pk, exc)
+                continue
+            self.rules.setdefault((rule.business_id, rule.alert_type), []).append(CompiledRule(rule, predicate))
+            self.size += 1
+
+    def lookup(self, business_id, alert_types):
+        for alert_type in alert_types:
+            yield from self.rules.get((business_id, alert_type), ())
+            yield from self.rules.get((None, alert_type), ())
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def fingerprint(organization_id):
+    summary = AlertRule.objects.filter(organization_id=organization_id).aggregate(
+        count=Count('id'), latest=Max('updated_at')
+    )
+    return summary['count'], summary['latest']
+
+
+def index_for(organization_id):
+    """The organization's RuleIndex, rebuilt if its rules changed."""
+    current = fingerprint(organization_id)
+    with _indexes_lock:
+        cached = _indexes.get(organization_id)
+    if cached is not None and cached[0] == current:
+        return cached[1]
+
+    index = RuleIndex(AlertRule.objects.filter(
+        organization_id=organization_id,
+        is_active=True,
+        alert_type__in=list(COMPILERS)
+    ))
+    with _indexes_lock:
+        _indexes[organization_id] = (current, index)
+    return index
+
+
+def clear_cache():
+    with _indexes_lock:
+        _indexes.clear()
+
+
+# Evaluation
+
+class BalanceChange:
+    __slots__ = ('business_id', 'organization_id', 'balance', 'delta')
+
+    def __init__(self, business_id, organization_id, balance, delta):
+        self.business_id = business_id
+        self.organization_id = organization_id
+        self.balance = balance
+        self.delta = delta
+
+
+class EvaluationContext:
+    """
+    Figures predicates need: anomaly scores of the posted expenses, keyed by
+    id(state), and rollup totals queried once per pass.
+    """
+
+    def __init__(self, scores=None):
+        self.scores = scores or {}
+        self._totals = {}
+        self._periods = set()
+
+    def period_total(self, organization_id, business_id, transaction_type, start):
+        key = (organization_id, business_id, transaction_type, start)
+        if key not in self._totals:
+            rows = TransactionDailyRollup.objects.filter(
+                organization_id=organization_id,
+                transaction_type=transaction_type,
+                status='confirmed',
+                date__gte=start
+            )
+            if business_id is not None:
+                rows = rows.filter(business_id=business_id)
+            total = rows.aggregate(total=Sum('total_amount_ngn'))['total']
+            self._totals[key] = Decimal(str(total or 0))
+        return self._totals[key]
+
+    def claim_period(self, rule_id, start):
+        """True the first time a rule fires for the period starting ``start``."""
+        key = (rule_id, start)
+        if key in self._periods:
+            return False
+        self._periods.add(key)
+        return not Alert.objects.filter(alert_rule_id=rule_id, context_data__period_start=start.isoformat()).exists()
+
+
+def _businesses(business_ids):
+    return {
+        row['id']: row
+        for row in Business.objects.filter(pk__in=business_ids).values(
+            'id', 'organization_id', 'name', 'current_balance'
+        )
+    }
+
+
+def evaluate(posted=(), balance_deltas=None, balances=None):
+    """
+    Score posted expenses, evaluate the rules concerned by posted
+    transactions and balance deltas, create their alerts and return how
+    many fired. ``balances`` holds each moved business's balance right
+    after its delta, as the ledger wrote it.
+    """
+    balance_deltas = balance_deltas or {}
+    balances = balances or {}
+    businesses = _businesses({state.business_id for state in posted} | set(balance_deltas))
+
+    events = []
+    for state in posted:
+        if state.amount_ngn is not None:
+            events.append((state.organization_id, state.business_id, TRANSACTION_ALERTS, state))
+    for business_id, delta in balance_deltas.items():
+        business = businesses.get(business_id)
+        if business is not None and balances.get(business_id) is not None:
+            change = BalanceChange(business_id, business['organization_id'], balances[business_id], delta)
+            events.append((change.organization_id, business_id, BALANCE_ALERTS, change))
+
+    return _fire(events, businesses, EvaluationContext(anomaly.observe(posted)))
+
+
+def evaluate_anomalies(states, scores):
+    """
+    Evaluate ``unusual_expense`` rules alone for expenses scored elsewhere,
+    such as history re-scored in batch; ``scores`` maps id(state) to Score.
+    """
+    businesses = _businesses({state.business_id for state in states})
+    events = [
+        (state.organization_id, state.business_id, ('unusual_expense',), state)
+        for state in states if state.business_id in businesses
+    ]
+    return _fire(events, businesses, EvaluationContext(scores))
+
+
+def _fire(events, businesses, context):
+    indexes = {}
+    now = timezone.now()
+    alerts = []
+    fired = Counter()
+    for organization_id, business_id, alert_types, event in events:
+        if organization_id not in indexes:
+            indexes[organization_id] = index_for(organization_id)
+        for rule in indexes[organization_id].lookup(business_id, alert_types):
+            data = rule.predicate(rule, event, context)
+            if data is None:
+                continue
+            fired[rule.id] += 1
+            alerts.append(build_alert(rule, businesses[business_id], event, data))
+
+    if alerts:
+        with transaction.atomic():
+            Alert.objects.bulk_create(alerts, batch_size=500)
+            for rule_id, count in fired.items():
+                AlertRule.objects.filter(pk=rule_id).update(
+                    last_triggered_at=now, trigger_count=F('trigger_count') + count
+                )
+            Organization.bump_data_version({alert.organization_id for alert in alerts})
+    return len(alerts)
+
+
+def build_alert(rule, business, event, data):
+    name = business['name']
+    amount = data.get('amount')
+    if rule.alert_type == 'low_cash':
+        title = f'Low cash in {name}'
+        message = f"Balance is ₦{data['current_balance']:,.2f}, below ₦{data['threshold']:,.2f}."
+    elif rule.alert_type == 'large_transaction':
+        kind = 'income' if event.transaction_type == 'income' else 'expense'
+        title = f'Large {kind} in {name}'
+        message = f"A ₦{amount:,.2f} {kind} was recorded on {event.transaction_date:%d %b %Y}."
+    elif rule.alert_type == 'unusual_expense':
+        title = f'Unusual expense in {name}'
+        message = (
+            f"A ₦{amount:,.2f} {event.category} expense is {amount / data['typical_amount']:.1f}x "
+            f"the usual ₦{data['typical_amount']:,.2f} ({data['z_score']:g} standard deviations above)."
+        )
+    else:
+        title = f"{rule.name or 'Goal'} achieved"
+        message = f"Reached ₦{data['total']:,.2f} against a target of ₦{data['target']:,.2f}."
+
+    if hasattr(event, 'transaction_date'):
+        data['transaction_date'] = event.transaction_date.isoformat()
+    return Alert(
+        organization_id=business['organization_id'],
+        alert_rule_id=rule.id,
+        business_id=business['id'],
+        alert_type=rule.alert_type,
+        severity=SEVERITY[rule.alert_type],
+        title=title[:255],
+        message=message,
+        context_data=data,
+    )
+
+
+# Dispatch
+
+def dispatch(posted, balance_deltas, balances):
+    """Evaluate committed ledger changes, in a Celery worker with ALERTS_ASYNC."""
+    if settings.ALERTS_ASYNC:
+        from .tasks import evaluate_ledger_changes
+
+        try:
+            evaluate_ledger_changes.delay(encode_changes(posted, balance_deltas, balances))
+            return
+        except Exception:
+            # Without a broker the changes are still evaluated, in the request
+            logger.exception('Could not queue alert evaluation')
+    evaluate(posted, balance_deltas, balances)
+
+
+def encode_changes(posted, balance_deltas, balances):
+    """Ledger changes as JSON-safe values for a task message."""
+    return {
+        'posted': [[None if value is None else str(value) for value in state] for state in posted],
+        'balances': [
+            [str(business_id), str(delta), str(balances[business_id])]
+            for business_id, delta in balance_deltas.items() if balances.get(business_id) is not None
+        ],
+    }
+
+
+def decode_changes(payload):
+    """The (posted, balance_deltas, balances) of ``encode_changes``."""
+    posted = []
+    for values in payload['posted']:
+        state = LedgerState(*values)
+        posted.append(state._replace(
+            business_id=uuid.UUID(state.business_id),
+            organization_id=uuid.UUID(state.organization_id),
+            transaction_date=date.fromisoformat(state.transaction_date[:10]),
+            amount=Decimal(state.amount),
+            amount_ngn=Decimal(state.amount_ngn),
+        ))
+    balance_deltas, balances = {}, {}
+    for business_id, delta, balance in payload['balances']:
+        balance_deltas[uuid.UUID(business_id)] = Decimal(delta)
+        balances[uuid.UUID(business_id)] = Decimal(balance)
+    return posted, balance_deltas, balances
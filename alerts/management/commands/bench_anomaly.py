@@ -0,0 +1,122 @@
+"""
+Benchmark batch expense anomaly scoring.
+
+Inserts ``--rows`` confirmed expenses over ``--businesses`` businesses and
+``--categories`` categories per business, with log-normal amounts and a
+sprinkling of outliers, inside a transaction that is rolled back at the
+end. Then times ``score_history`` (loading the rows, grouping and scoring
+them) and ``rebuild_statistics``, and checks the scores against the
+incremental updates on a sample of series:
+
+    python manage.py bench_anomaly --rows 1000000
+"""
+import math
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+
+from alerts import anomaly
+from businesses.models import Business
+from organizations.models import Organization
+from transactions.models import Transaction
+
+
+class Command(BaseCommand):
+    help = 'Measure batch anomaly scoring of expense history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--businesses', type=int, default=50)
+        parser.add_argument('--categories', type=int, default=100, help='Categories per business.')
+        parser.add_argument('--check', type=int, default=20, help='Series to check against incremental updates.')
+
+    def handle(self, *args, **options):
+        with db_transaction.atomic():
+            started = time.perf_counter()
+            organization_id, outliers = self.seed(options)
+            self.stdout.write(f"seeded {options['rows']} expenses in {time.perf_counter() - started:.1f}s")
+
+            started = time.perf_counter()
+            history = anomaly.score_history(organization_id)
+            elapsed = time.perf_counter() - started
+
+            flagged = {
+                uuid.UUID(history.columns[0][i])
+                for i in np.flatnonzero((history.counts >= settings.ANOMALY_MIN_HISTORY) & (history.z >= 3))
+            }
+            self.stdout.write(
+                f"score_history: {len(history)} expenses in {len(history.final)} series in {elapsed:.3f}s "
+                f"({len(history) / elapsed:,.0f} rows/s); {len(flagged)} flagged, "
+                f"{len(flagged & outliers)} of {len(outliers)} outliers"
+            )
+
+            started = time.perf_counter()
+            anomaly.rebuild_statistics(organization_id)
+            self.stdout.write(f"rebuild_statistics: {time.perf_counter() - started:.3f}s")
+
+            self.check_against_incremental(history, options['check'])
+            db_transaction.set_rollback(True)
+
+    def seed(self, options, batch_size=5000):
+        rng = np.random.default_rng(7)
+        user = get_user_model().objects.create(email=f'bench-{time.time_ns()}@example.com')
+        org = Organization.objects.create(owner=user, name='Anomaly Benchmark')
+        businesses = Business.objects.bulk_create([
+            Business(organization=org, name=f'Benchmark Business {i}') for i in range(options['businesses'])
+        ])
+
+        rows, series = options['rows'], options['businesses'] * options['categories']
+        groups = rng.integers(0, series, rows)
+        typical = rng.normal(9, 1.5, series)
+        values = typical[groups] + rng.normal(0, 0.4, rows)
+        is_outlier = rng.random(rows) < 0.001
+        values[is_outlier] += rng.uniform(1.5, 3, int(is_outlier.sum()))
+        days = np.sort(rng.integers(0, 2000, rows))
+
+        start = date(2020, 1, 1)
+        outliers, batch = set(), []
+        for i in range(rows):
+            group = int(groups[i])
+            amount = Decimal(str(round(math.exp(values[i]), 2)))
+            expense = Transaction(
+                organization=org,
+                business=businesses[group % len(businesses)],
+                transaction_date=start + timedelta(days=int(days[i])),
+                transaction_type='expense',
+                status='confirmed',
+                amount=amount,
+                amount_ngn=amount,
+                category=f'category-{group // len(businesses)}',
+                description='Benchmark expense',
+            )
+            batch.append(expense)
+            if is_outlier[i]:
+                outliers.add(expense.id)
+            if len(batch) == batch_size:
+                Transaction.objects.bulk_create(batch)
+                batch = []
+        Transaction.objects.bulk_create(batch)
+        return org.pk, outliers
+
+    def check_against_incremental(self, history, sample):
+        alpha = settings.ANOMALY_EWMA_ALPHA
+        codes = np.unique(history.codes)
+        rng = np.random.default_rng(11)
+        error = 0.0
+        for code in rng.choice(codes, min(sample, len(codes)), replace=False):
+            statistic = SimpleNamespace(count=0, mean=0.0, variance=0.0)
+            for i in np.flatnonzero(history.codes == code):
+                if statistic.count:
+                    error = max(error, abs(statistic.mean - history.mean[i]), abs(statistic.variance - history.variance[i]))
+                anomaly.update(statistic, history.values[i], alpha)
+        self.stdout.write(f"largest difference from incremental updates: {error:.2e}")
+        if not math.isfinite(error) or error > 1e-9:
+            self.stderr.write('batch and incremental statistics disagree')
@@ -0,0 +1,84 @@
+"""
+Recompute expense anomaly statistics from history.
+
+Scores every confirmed expense of each organization in one NumPy pass and
+replaces the stored rolling statistics with the result, which is needed
+after history is edited or deleted, or when anomaly scoring is introduced
+on existing books. With --alert-since, expenses dated from then on are
+also run through the ``unusual_expense`` rules; expenses that already
+have an unusual_expense alert (same business, category, date and amount)
+are skipped, so re-runs raise no duplicates:
+
+    python manage.py rebuild_expense_statistics --organization <id> --alert-since 2026-01-01
+"""
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from alerts import anomaly, engine
+from alerts.models import Alert
+from organizations.models import Organization
+from transactions.ledger import LedgerState
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-category expense statistics and optionally alert on past anomalies.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organization', help='Organization id (default: all).')
+        parser.add_argument('--alert-since', help='Raise unusual_expense alerts for expenses from this date (YYYY-MM-DD).')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['alert_since']:
+            try:
+                since = date.fromisoformat(options['alert_since'])
+            except ValueError:
+                raise CommandError('--alert-since must be a YYYY-MM-DD date')
+
+        organizations = Organization.objects.order_by('created_at').values_list('id', flat=True)
+        if options['organization']:
+            organizations = organizations.filter(pk=options['organization'])
+
+        for organization_id in organizations:
+            started = time.perf_counter()
+            history = anomaly.rebuild_statistics(organization_id)
+            line = (
+                f"{organization_id}: {len(history)} expenses in {len(history.final)} categories "
+                f"scored in {time.perf_counter() - started:.2f}s"
+            )
+            if since is not None:
+                line += f", {self.alert(organization_id, history, since)} alerts"
+            self.stdout.write(line)
+
+    def alert(self, organization_id, history, since):
+        alerted = {
+            (business_id, data.get('category'), data.get('transaction_date'), data.get('amount'))
+            for business_id, data in Alert.objects.filter(
+                organization_id=organization_id, alert_type='unusual_expense'
+            ).values_list('business_id', 'context_data')
+            if isinstance(data, dict)
+        }
+        states, scores = [], {}
+        for i, (_, business_id, category, transaction_date, amount_ngn) in enumerate(history.rows):
+            score = history.score(i)
+            if transaction_date < since or score is None:
+                continue
+            if (business_id, category, transaction_date.isoformat(), float(amount_ngn)) in alerted:
+                continue
+            state = LedgerState(
+                business_id=business_id,
+                organization_id=organization_id,
+                transaction_date=transaction_date,
+                transaction_type='expense',
+                category=category,
+                subcategory=None,
+                currency='NGN',
+                status='confirmed',
+                amount=amount_ngn,
+                amount_ngn=amount_ngn,
+            )
+            states.append(state)
+            scores[id(state)] = score
+        return engine.evaluate_anomalies(states, scores)
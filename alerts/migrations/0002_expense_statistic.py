@@ -0,0 +1,35 @@
+# Generated by Django 4.2.27 on 2026-10-18 12:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0003_bankaccount_sync_failures'),
+        ('alerts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExpenseStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=100)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('mean', models.FloatField(default=0)),
+                ('variance', models.FloatField(default=0)),
+                ('last_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='expense_statistics', to='businesses.business')),
+            ],
+            options={
+                'db_table': 'expense_statistics',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='expensestatistic',
+            constraint=models.UniqueConstraint(fields=('business', 'category'), name='unique_expense_statistic'),
+        ),
+    ]
@@ -2,7 +2,7 @@
 Alert Models
 """
 import uuid
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from organizations.models import Organization
 from businesses.models import Business
@@ -160,3 +160,44 @@ class Alert(models.Model):
     
     def __str__(self):
         return f"[{self.severity}] {self.title}"
+    
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Organization.bump_data_version([self.organization_id])
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            Organization.bump_data_version([self.organization_id])
+        return result
+
+
+class ExpenseStatistic(models.Model):
+    """
+    Rolling statistics of a business's expenses in one category, kept in
+    log naira by the anomaly scorer (see ``anomaly.py``).
+    """
+    
+    business = models.ForeignKey(
+        Business,
+        on_delete=models.CASCADE,
+        related_name='expense_statistics'
+    )
+    category = models.CharField(max_length=100)
+    
+    count = models.PositiveIntegerField(default=0)
+    mean = models.FloatField(default=0)
+    variance = models.FloatField(default=0)
+    last_date = models.DateField(null=True, blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'expense_statistics'
+        constraints = [
+            models.UniqueConstraint(fields=['business', 'category'], name='unique_expense_statistic'),
+        ]
+    
+    def __str__(self):
+        return f"{self.category}: {self.count} expenses"
@@ -0,0 +1,49 @@
+"""
+Alert Serializers
+"""
+from rest_framework import serializers
+
+from .engine import ConditionError, validate_conditions
+from .models import Alert, AlertRule
+
+
+class AlertRuleSerializer(serializers.ModelSerializer):
+    """Serializer for alert rules."""
+    
+    class Meta:
+        model = AlertRule
+        fields = [
+            'id', 'organization', 'business', 'alert_type', 'name', 'description',
+            'conditions', 'notify_email', 'notify_sms', 'notify_push', 'notify_whatsapp',
+            'recipients', 'schedule', 'is_active', 'last_triggered_at', 'trigger_count',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'last_triggered_at', 'trigger_count', 'created_at', 'updated_at']
+    
+    def validate(self, attrs):
+        def value(name):
+            return attrs.get(name, getattr(self.instance, name, None))
+        
+        try:
+            validate_conditions(value('alert_type'), value('conditions'))
+        except ConditionError as exc:
+            raise serializers.ValidationError({'conditions': str(exc)})
+        
+        business = value('business')
+        if business is not None and business.organization_id != value('organization').pk:
+            raise serializers.ValidationError({'business': 'Business belongs to another organization'})
+        return attrs
+
+
+class AlertSerializer(serializers.ModelSerializer):
+    """Serializer for generated alerts."""
+    
+    business_name = serializers.CharField(source='business.name', read_only=True, default=None)
+    
+    class Meta:
+        model = Alert
+        fields = [
+            'id', 'alert_rule', 'business', 'business_name', 'alert_type', 'severity',
+            'title', 'message', 'context_data', 'action_url', 'status',
+            'read_at', 'dismissed_at', 'created_at'
+        ]
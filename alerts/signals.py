@@ -0,0 +1,17 @@
+"""
+Alert Signals
+
+Hand ledger changes to the alert engine (see ``engine.py``) once the
+transaction that wrote them commits; a rolled back write raises no alerts.
+"""
+from django.db import transaction
+from django.dispatch import receiver
+
+from transactions.ledger import ledger_changed
+from . import engine
+
+
+@receiver(ledger_changed)
+def ledger_changed_handler(sender, posted, balance_deltas, balances, **kwargs):
+    posted, balance_deltas, balances = list(posted), dict(balance_deltas), dict(balances)
+    transaction.on_commit(lambda: engine.dispatch(posted, balance_deltas, balances))
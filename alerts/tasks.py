@@ -0,0 +1,12 @@
+"""
+Alert Tasks
+"""
+from celery import shared_task
+
+from . import engine
+
+
+@shared_task(ignore_result=True)
+def evaluate_ledger_changes(payload):
+    """Evaluate committed ledger changes queued by ``engine.dispatch``."""
+    engine.evaluate(*engine.decode_changes(payload))
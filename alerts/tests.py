@@ -1,3 +1,245 @@
-from django.test import TestCase
+"""
+Alert Tests
+"""
+import math
+from io import StringIO
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from businesses.models import Business
+from config.celery import app as celery_app
+from organizations.models import Organization, TeamMember
+from transactions.models import Transaction
+from . import anomaly, engine
+from .models import Alert, AlertRule, ExpenseStatistic
+
+User = get_user_model()
+
+
+@override_settings(ALERTS_ASYNC=False)
+class AlertEngineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='Str0ng-pass!')
+        cls.org = Organization.objects.create(owner=cls.user, name='Ada Holdings')
+        TeamMember.objects.create(organization=cls.org, user=cls.user, role='owner', status='active')
+        cls.shop = Business.objects.create(organization=cls.org, name='Shop', opening_balance=Decimal('1000.00'))
+        cls.farm = Business.objects.create(organization=cls.org, name='Farm', opening_balance=Decimal('1000.00'))
+
+    def setUp(self):
+        engine.clear_cache()
+        self.addCleanup(engine.clear_cache)
+
+    def rule(self, alert_type, conditions, business=None):
+        return AlertRule.objects.create(
+            organization=self.org, business=business, alert_type=alert_type, conditions=conditions
+        )
+
+    def post(self, business, amount, transaction_type='expense', day=date(2026, 3, 10), category='supplies'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Transaction.objects.create(
+                organization=self.org, business=business, transaction_type=transaction_type,
+                transaction_date=day, amount=Decimal(amount), category=category, description='Entry'
+            )
+
+    def test_large_transaction_respects_direction_and_business(self):
+        rule = self.rule('large_transaction', {'amount': 500, 'direction': 'out'}, business=self.shop)
+
+        self.post(self.shop, '600.00')
+        self.post(self.shop, '900.00', transaction_type='income')
+        self.post(self.farm, '700.00')
+        self.post(self.shop, '100.00')
+
+        alert, = Alert.objects.all()
+        self.assertEqual((alert.business, alert.alert_type, alert.context_data['amount']), (self.shop, 'large_transaction', 600.0))
+        rule.refresh_from_db()
+        self.assertEqual(rule.trigger_count, 1)
+        self.assertIsNotNone(rule.last_triggered_at)
+
+    def test_low_cash_fires_when_balance_crosses_threshold(self):
+        self.rule('low_cash', {'threshold': 500})
+
+        self.post(self.shop, '400.00')
+        self.post(self.shop, '300.00')
+        self.post(self.shop, '50.00')
+        self.post(self.shop, '900.00', transaction_type='income')
+        self.post(self.shop, '800.00')
+
+        alerts = list(Alert.objects.order_by('created_at').values_list('context_data', flat=True))
+        self.assertEqual([a['current_balance'] for a in alerts], [300.0, 350.0])
+
+    def test_low_cash_uses_the_balance_the_write_left(self):
+        self.rule('low_cash', {'threshold': 500})
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            Transaction.objects.create(
+                organization=self.org, business=self.shop, transaction_type='expense',
+                transaction_date=date(2026, 3, 10), amount=Decimal('700.00'), category='supplies', description='Entry'
+            )
+        # A later write lands before the first one is evaluated
+        self.post(self.shop, '900.00', transaction_type='income')
+        for callback in callbacks:
+            callback()
+
+        alert, = Alert.objects.all()
+        self.assertEqual(alert.context_data['current_balance'], 300.0)
+
+    @override_settings(ALERTS_ASYNC=True)
+    def test_async_evaluation_is_queued_as_a_task(self):
+        eager = celery_app.conf.CELERY_TASK_ALWAYS_EAGER
+        celery_app.conf.CELERY_TASK_ALWAYS_EAGER = True
+        self.addCleanup(setattr, celery_app.conf, 'CELERY_TASK_ALWAYS_EAGER', eager)
+        self.rule('large_transaction', {'amount': 500})
+        self.rule('low_cash', {'threshold': 500})
+
+        self.post(self.shop, '600.00')
+
+        self.assertEqual(
+            sorted(Alert.objects.values_list('alert_type', flat=True)), ['large_transaction', 'low_cash']
+        )
+        self.assertEqual(ExpenseStatistic.objects.get(business=self.shop, category='supplies').count, 1)
+
+    def test_unusual_expense_scores_against_category_history(self):
+        self.rule('unusual_expense', {'z_score': 3, 'min_history': 10})
+        for offset, amount in enumerate(['9.00', '11.00', '10.00', '10.50', '9.50'] * 2, start=1):
+            self.post(self.farm, amount, day=date(2026, 3, 10) - timedelta(days=offset), category='fuel')
+
+        self.post(self.farm, '12.00', category='fuel')
+        self.post(self.farm, '5000.00', category='rent')
+        self.post(self.farm, '100.00', category='fuel')
+
+        alert, = Alert.objects.all()
+        self.assertEqual(alert.context_data['amount'], 100.0)
+        self.assertEqual(alert.context_data['observations'], 11)
+        self.assertAlmostEqual(alert.context_data['typical_amount'], 10.0, delta=0.5)
+        self.assertGreater(alert.context_data['z_score'], 3)
+        statistic = ExpenseStatistic.objects.get(business=self.farm, category='fuel')
+        self.assertEqual(statistic.count, 12)
+
+    def test_alerting_on_history_skips_expenses_already_alerted(self):
+        for offset, amount in enumerate(['9.00', '11.00', '10.00', '10.50', '9.50'] * 2, start=2):
+            self.post(self.farm, amount, day=date(2026, 3, 10) - timedelta(days=offset), category='fuel')
+        self.post(self.farm, '100.00', day=date(2026, 3, 9), category='fuel')
+        self.rule('unusual_expense', {'z_score': 3, 'min_history': 10})
+
+        for _ in range(2):
+            call_command('rebuild_expense_statistics', organization=str(self.org.pk), alert_since='2026-03-01', stdout=StringIO())
+
+        alert, = Alert.objects.all()
+        self.assertEqual((alert.context_data['amount'], alert.context_data['transaction_date']), (100.0, '2026-03-09'))
+
+    def test_history_scoring_matches_incremental_statistics(self):
+        for offset in range(30):
+            self.post(self.shop, str(10 + offset % 7), day=date(2026, 1, 1) + timedelta(days=offset), category='fuel')
+            self.post(self.farm, str(200 + offset % 3), day=date(2026, 1, 1) + timedelta(days=offset), category='fuel')
+        incremental = {s.business_id: s for s in ExpenseStatistic.objects.all()}
+
+        history = anomaly.rebuild_statistics(self.org.pk)
+
+        self.assertEqual(len(history), 60)
+        for statistic in ExpenseStatistic.objects.all():
+            self.assertEqual(statistic.count, incremental[statistic.business_id].count)
+            self.assertAlmostEqual(statistic.mean, incremental[statistic.business_id].mean)
+            self.assertAlmostEqual(statistic.variance, incremental[statistic.business_id].variance)
+
+    def test_rolling_statistics_match_incremental_updates_across_blocks(self):
+        # alpha 0.3 makes the NumPy blocks 113 rows wide
+        groups = [0] * 3 + [1] * 300 + [2] + [3] * 250
+        values = [math.sin(i) * 2 + 8 for i in range(len(groups))]
+        counts, mean, variance, final = anomaly.rolling_statistics(groups, values, 0.3)
+
+        states = {}
+        for i, (group, value) in enumerate(zip(groups, values)):
+            statistic = states.setdefault(group, ExpenseStatistic())
+            self.assertEqual(counts[i], statistic.count)
+            if statistic.count:
+                self.assertAlmostEqual(mean[i], statistic.mean)
+                self.assertAlmostEqual(variance[i], statistic.variance)
+            anomaly.update(statistic, value, 0.3)
+        self.assertEqual(final[3][0], 250)
+        self.assertAlmostEqual(final[3][1], states[3].mean)
+
+    def test_goal_fires_once_per_period(self):
+        self.rule('goal_achieved', {'target': 1000, 'period': 'month', 'type': 'income'})
+
+        self.post(self.shop, '600.00', transaction_type='income')
+        self.post(self.farm, '600.00', transaction_type='income')
+        self.post(self.shop, '600.00', transaction_type='income')
+
+        self.assertEqual(Alert.objects.filter(alert_type='goal_achieved').count(), 1)
+
+    def test_rules_are_compiled_once_and_rebuilt_on_change(self):
+        rule = self.rule('large_transaction', {'amount': 500})
+        self.post(self.shop, '10.00')
+
+        with CaptureQueriesContext(connection) as queries:
+            engine.evaluate(posted=[Transaction.objects.first().ledger_state()])
+        self.assertFalse(any('FROM "alert_rules"' in q['sql'] and 'COUNT' not in q['sql'] for q in queries))
+
+        rule.conditions = {'amount': 5}
+        rule.save()
+        self.post(self.shop, '10.00')
+        self.assertEqual(Alert.objects.count(), 1)
+
+    def test_evaluation_waits_for_commit(self):
+        self.rule('large_transaction', {'amount': 1})
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            Transaction.objects.create(
+                organization=self.org, business=self.shop, transaction_type='expense',
+                transaction_date=date(2026, 3, 10), amount=Decimal('50.00'), category='supplies', description='Entry'
+            )
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(Alert.objects.exists())
+
+
+class AlertApiTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='owner@example.com', password='Str0ng-pass!')
+        self.org = Organization.objects.create(owner=self.user, name='Ada Holdings')
+        TeamMember.objects.create(organization=self.org, user=self.user, role='owner', status='active')
+        self.shop = Business.objects.create(organization=self.org, name='Shop')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_rule_conditions_are_validated(self):
+        response = self.client.post('/api/v1/alert-rules/', {
+            'organization': str(self.org.id), 'alert_type': 'low_cash', 'conditions': {'operator': '<'}
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/api/v1/alert-rules/', {
+            'organization': str(self.org.id), 'alert_type': 'low_cash', 'conditions': {'threshold': 500000}
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_alerts_can_be_read_and_dismissed(self):
+        alert = Alert.objects.create(organization=self.org, business=self.shop, alert_type='low_cash', title='Low', message='Low')
+
+        unread = self.client.get('/api/v1/alerts/', {'status': 'unread'}).json()['data']['alerts']
+        self.assertEqual([a['id'] for a in unread], [str(alert.id)])
+
+        self.client.post(f'/api/v1/alerts/{alert.id}/read/')
+        self.assertEqual(self.client.get('/api/v1/alerts/', {'status': 'unread'}).json()['data']['alerts'], [])
+        dismissed = self.client.post(f'/api/v1/alerts/{alert.id}/dismiss/').json()['data']
+        self.assertEqual(dismissed['status'], 'dismissed')
+
+    def test_viewers_cannot_manage_rules(self):
+        viewer = User.objects.create_user(email='viewer@example.com', password='Str0ng-pass!')
+        TeamMember.objects.create(organization=self.org, user=viewer, role='viewer', status='active')
+        self.client.force_authenticate(viewer)
+
+        response = self.client.post('/api/v1/alert-rules/', {
+            'organization': str(self.org.id), 'alert_type': 'low_cash', 'conditions': {'threshold': 1}
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
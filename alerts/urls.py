@@ -0,0 +1,14 @@
+"""
+Alert URL Configuration
+"""
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from .views import AlertViewSet, AlertRuleViewSet
+
+router = DefaultRouter()
+router.register('alerts', AlertViewSet, basename='alerts')
+router.register('alert-rules', AlertRuleViewSet, basename='alert-rules')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
@@ -1,3 +1,162 @@
-from django.shortcuts import render
+"""
+Alert Views
+"""
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
 
-# Create your views here.
+from organizations.access import AccessScopeMixin
+from .models import Alert, AlertRule
+from .serializers import AlertSerializer, AlertRuleSerializer
+
+
+class ScopedAlertMixin(AccessScopeMixin):
+    """Rows of the user's organizations, organization-wide or of accessible businesses."""
+
+    def scoped(self, queryset):
+        scope = self.get_scope()
+        queryset = queryset.filter(
+            Q(business__isnull=True) | Q(business_id__in=scope.businesses().values('id')),
+            organization_id__in=scope.organization_ids
+        )
+        if self.request.query_params.get('business'):
+            queryset = queryset.filter(business_id=self.request.query_params['business'])
+        return queryset
+
+    def paginated(self, key, queryset):
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page if page is not None else queryset, many=True)
+        data = {key: serializer.data}
+        if page is not None:
+            data['pagination'] = {
+                'count': self.paginator.page.paginator.count,
+                'next': self.paginator.get_next_link(),
+                'previous': self.paginator.get_previous_link()
+            }
+        return Response({
+            'success': True,
+            'data': data
+        })
+
+
+class AlertRuleViewSet(ScopedAlertMixin, viewsets.ModelViewSet):
+    """
+    Alert rules of the user's organizations (?business=). Changing rules
+    needs manage_businesses.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = AlertRuleSerializer
+
+    def get_queryset(self):
+        return self.scoped(AlertRule.objects.all()).order_by('alert_type', 'created_at')
+
+    def can_manage(self, organization_id, business=None):
+        scope = self.get_scope()
+        if not scope.has_permission(organization_id, 'manage_businesses'):
+            return False
+        return business is None or scope.can_access_business(business)
+
+    def forbidden(self):
+        return Response({
+            'success': False,
+            'error': {'code': 'FORBIDDEN', 'message': 'No permission to manage alert rules'}
+        }, status=status.HTTP_403_FORBIDDEN)
+
+    def list(self, request, *args, **kwargs):
+        return self.paginated('rules', self.get_queryset())
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response({
+            'success': True,
+            'data': self.get_serializer(self.get_object()).data
+        })
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if not self.can_manage(data['organization'].pk, data.get('business')):
+            return self.forbidden()
+
+        serializer.save(created_by=request.user)
+        return Response({
+            'success': True,
+            'data': serializer.data
+        }, status=status.HTTP_201_CREATED)
+
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', True)
+        instance = self.get_object()
+
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        organization = data.get('organization', instance.organization)
+        if not self.can_manage(instance.organization_id) or not self.can_manage(organization.pk, data.get('business', instance.business)):
+            return self.forbidden()
+
+        serializer.save()
+        return Response({
+            'success': True,
+            'data': serializer.data
+        })
+
+    def destroy(self, request, *args, **kwargs):
+        instance = self.get_object()
+        if not self.can_manage(instance.organization_id):
+            return self.forbidden()
+
+        instance.delete()
+        return Response({
+            'success': True,
+            'data': {'message': 'Alert rule has been deleted'}
+        })
+
+
+class AlertViewSet(ScopedAlertMixin, viewsets.ReadOnlyModelViewSet):
+    """Alerts of the user's organizations (?business=, ?status=), newest first."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = AlertSerializer
+
+    def get_queryset(self):
+        queryset = self.scoped(Alert.objects.select_related('business'))
+        if self.request.query_params.get('status'):
+            queryset = queryset.filter(status=self.request.query_params['status'])
+        return queryset.order_by('-created_at')
+
+    def list(self, request, *args, **kwargs):
+        return self.paginated('alerts', self.get_queryset())
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response({
+            'success': True,
+            'data': self.get_serializer(self.get_object()).data
+        })
+
+    @action(detail=True, methods=['post'])
+    def read(self, request, pk=None):
+        alert = self.get_object()
+        if alert.status == 'unread':
+            alert.status = 'read'
+            alert.read_at = timezone.now()
+            alert.read_by = request.user
+            alert.save(update_fields=['status', 'read_at', 'read_by'])
+        return Response({
+            'success': True,
+            'data': self.get_serializer(alert).data
+        })
+
+    @action(detail=True, methods=['post'])
+    def dismiss(self, request, pk=None):
+        alert = self.get_object()
+        alert.status = 'dismissed'
+        alert.dismissed_at = timezone.now()
+        alert.dismissed_by = request.user
+        alert.save(update_fields=['status', 'dismissed_at', 'dismissed_by'])
+        return Response({
+            'success': True,
+            'data': self.get_serializer(alert).data
+        })
@@ -0,0 +1,188 @@
+"""
+Balance History
+
+A business's balance on any date, without re-summing its history: the
+opening balance, plus the BalanceSnapshot of the last month end before the
+date (confirmed income less expense up to then), plus the daily rollups of
+the days since, at most a month of them. Series over a range start from the
+balance on the day before and carry it through one grouped rollup query as
+a running (prefix) sum.
+
+Snapshots of month ends already over are created by ``manage.py
+balance_snapshots`` (run it after each month end), or else on demand by
+the first read that needs them, from the rollups in one query per
+business. Creating them locks the business row, so reads only do so when
+a snapshot is missing. From then on the ledger keeps them
+current: a change to a transaction dated D shifts the snapshots of month
+ends on or after D by its balance effect, so backdated edits touch only the
+affected suffix. Rebuilding the rollups or recalculating a balance drops
+the snapshots, which are then created again.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Sum, When
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from transactions.models import TransactionDailyRollup
+from .models import BalanceSnapshot, Business
+
+
+INTERVALS = ('day', 'week', 'month')
+
+NET = Sum(Case(
+    When(transaction_type='income', then=F('total_amount_ngn')),
+    When(transaction_type='expense', then=-F('total_amount_ngn')),
+    default=0,
+    output_field=DecimalField()
+))
+
+
+def month_end(day):
+    """Last day of ``day``'s month."""
+    following = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return following - timedelta(days=1)
+
+
+def last_month_end(day):
+    """The latest month end on or before ``day``."""
+    return day if month_end(day) == day else day.replace(day=1) - timedelta(days=1)
+
+
+def _net_rollups(business_id):
+    return TransactionDailyRollup.objects.filter(
+        business_id=business_id, status='confirmed', transaction_type__in=('income', 'expense')
+    )
+
+
+def net_between(business_id, after, through):
+    """Confirmed income less expense dated in (after, through]; ``after`` None for no lower bound."""
+    rows = _net_rollups(business_id).filter(date__lte=through)
+    if after is not None:
+        rows = rows.filter(date__gt=after)
+    return _money(rows.aggregate(net=NET)['net'])
+
+
+def ensure_snapshots(business_id, through):
+    """Create the business's missing snapshots of month ends up to ``through``."""
+    # Nothing to create, so no lock to take: the usual case for reads
+    snapshots = BalanceSnapshot.objects.filter(business_id=business_id)
+    if snapshots.filter(date__gte=through).exists():
+        return
+    if not snapshots.exists() and not _net_rollups(business_id).filter(date__lte=through).exists():
+        return
+    with transaction.atomic():
+        # Ledger writes update the business row before shifting its snapshots;
+        # holding the row keeps a concurrent write from missing the rows made here
+        list(Business.objects.select_for_update().filter(pk=business_id).values_list('pk', flat=True))
+
+        latest = BalanceSnapshot.objects.filter(business_id=business_id).order_by('-date').first()
+        if latest is not None and latest.date >= through:
+            return
+
+        rows = _net_rollups(business_id).filter(date__lte=through)
+        if latest is not None:
+            rows = rows.filter(date__gt=latest.date)
+        by_month = {
+            row['month']: _money(row['net'])
+            for row in rows.annotate(month=TruncMonth('date')).values('month').annotate(net=NET).order_by()
+        }
+        if latest is not None:
+            total, day = latest.net_total, month_end(latest.date + timedelta(days=1))
+        elif by_month:
+            total, day = Decimal('0'), month_end(min(by_month))
+        else:
+            return
+
+        snapshots = []
+        while day <= through:
+            total += by_month.get(day.replace(day=1), Decimal('0'))
+            snapshots.append(BalanceSnapshot(business_id=business_id, date=day, net_total=total))
+            day = month_end(day + timedelta(days=1))
+        BalanceSnapshot.objects.bulk_create(snapshots, ignore_conflicts=True)
+
+
+def balance_as_of(business, day, today=None):
+    """The business's balance at the end of ``day``."""
+    today = today or timezone.localdate()
+    # Snapshots only for months already over
+    anchor = min(last_month_end(day), last_month_end(today.replace(day=1) - timedelta(days=1)))
+    ensure_snapshots(business.pk, anchor)
+    snapshot = BalanceSnapshot.objects.filter(
+        business_id=business.pk, date__lte=anchor
+    ).order_by('-date').values_list('date', 'net_total').first()
+    after, net_total = snapshot or (None, Decimal('0'))
+    return Decimal(business.opening_balance) + net_total + net_between(business.pk, after, day)
+
+
+def bucket_ends(date_from, date_to, interval):
+    """Last day of each day, week (to Sunday) or month of the range, clamped to it."""
+    ends = []
+    day = date_from
+    while day <= date_to:
+        if interval == 'week':
+            end = day + timedelta(days=6 - day.weekday())
+        elif interval == 'month':
+            end = month_end(day)
+        else:
+            end = day
+        ends.append(min(end, date_to))
+        day = end + timedelta(days=1)
+    return ends
+
+
+def balance_series(business, date_from, date_to, interval='day', today=None):
+    """The business's balance at the end of each bucket of [date_from, date_to]."""
+    opening = balance_as_of(business, date_from - timedelta(days=1), today)
+    daily = dict(
+        _net_rollups(business.pk).filter(date__gte=date_from, date__lte=date_to)
+        .values('date').annotate(net=NET).order_by().values_list('date', 'net')
+    )
+
+    points = []
+    balance = opening
+    day = date_from
+    for end in bucket_ends(date_from, date_to, interval):
+        while day <= end:
+            balance += _money(daily.get(day))
+            day += timedelta(days=1)
+        points.append({'date': end.isoformat(), 'balance': float(balance)})
+    return {
+        'business_id': str(business.pk),
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'interval': interval,
+        'currency': 'NGN',
+        'opening_balance': float(opening),
+        'points': points,
+    }
+
+
+def apply_snapshot_deltas(deltas):
+    """
+    Shift snapshots by balance effects: ``deltas`` maps (business_id,
+    transaction_date) to the change in that day's confirmed net. One UPDATE
+    per business and month.
+    """
+    by_month = defaultdict(Decimal)
+    for (business_id, day), delta in deltas.items():
+        if delta:
+            by_month[(business_id, month_end(_as_date(day)))] += delta
+    for (business_id, end), delta in by_month.items():
+        if delta:
+            BalanceSnapshot.objects.filter(business_id=business_id, date__gte=end).update(
+                net_total=F('net_total') + delta
+            )
+
+
+def _as_date(value):
+    # Unsaved instances may still hold the date as given
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def _money(value):
+    # SQLite returns decimal sums as floats
+    return Decimal(str(value or 0)).quantize(Decimal('0.01'))
@@ -0,0 +1,235 @@
+"""
+Cash-Flow Forecasting
+
+Projects a business's balance from its confirmed history, read from the
+daily rollups in one aggregate query:
+
+- recurring flows: categories that come back weekly or monthly for about
+  the same amount (rent, salaries, subscriptions) are taken out of the
+  history and scheduled forward on their own dates;
+- the rest is fitted with NumPy as a weekday profile (mean net flow per
+  weekday) plus a linear trend over the recent past, damped so it levels
+  off over the horizon instead of running away;
+- bands widen with the square root of the horizon, from the spread of the
+  daily residuals around the fit.
+
+Forecasts are cached per (business, data version, day): any write to the
+business's transactions bumps its data version, so a forecast is only
+recomputed after new transactions land (or when the day rolls over).
+"""
+import calendar
+from collections import defaultdict
+from datetime import date, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from transactions.models import TransactionDailyRollup
+
+
+HORIZONS = (30, 60, 90)
+
+# Days of history fitted; the trend only looks at the most recent TREND_DAYS
+HISTORY_DAYS = 365
+TREND_DAYS = 90
+
+# Per-day damping of the trend: its effect adds up to about 1 / (1 - 0.97) days
+TREND_DAMPING = 0.97
+
+# z of the 80% band
+BAND_Z = 1.2816
+
+# Recurring flows: at least MIN_OCCURRENCES, gaps within the period's range,
+# amounts within MAX_AMOUNT_SPREAD (coefficient of variation) of each other
+MIN_OCCURRENCES = 3
+MAX_AMOUNT_SPREAD = 0.15
+PERIODS = {
+    'weekly': (6, 8),
+    'monthly': (26, 35),
+}
+
+SIGNS = {'income': 1.0, 'expense': -1.0}
+
+
+def _add_month(day, day_of_month):
+    """``day_of_month`` of the month after ``day``'s, clamped to its length."""
+    year, month = divmod(day.year * 12 + day.month, 12)
+    month += 1
+    return date(year, month, min(day_of_month, calendar.monthrange(year, month)[1]))
+
+
+def detect_recurring(rows, today):
+    """
+    Recurring flows among ``rows`` of (date, type, category, total, count).
+    Returns dicts with the category, type, period, typical amount, the dates
+    it occurred on and the next date it's due.
+    """
+    by_category = defaultdict(list)
+    for day, transaction_type, category, total, _ in rows:
+        by_category[(transaction_type, category)].append((day, total))
+
+    flows = []
+    for (transaction_type, category), occurrences in by_category.items():
+        if len(occurrences) < MIN_OCCURRENCES:
+            continue
+        occurrences.sort()
+        days = np.array([day.toordinal() for day, _ in occurrences])
+        amounts = np.array([total for _, total in occurrences])
+        gaps = np.diff(days)
+        mean = amounts.mean()
+        if mean <= 0 or amounts.std() / mean > MAX_AMOUNT_SPREAD:
+            continue
+        for period, (low, high) in PERIODS.items():
+            if not ((gaps >= low) & (gaps <= high)).all():
+                continue
+            last = occurrences[-1][0]
+            # Lapsed if it missed more than one due date
+            if (today - last).days > 2 * high:
+                break
+            flows.append({
+                'category': category,
+                'type': transaction_type,
+                'period': period,
+                'amount': float(np.median(amounts)),
+                'dates': [day for day, _ in occurrences],
+                'next_date': next_due(period, last, today),
+            })
+            break
+    return flows
+
+
+def next_due(period, last, today):
+    """First due date after ``today`` of a flow last seen on ``last``."""
+    day = last
+    while day <= today:
+        day = day + timedelta(days=7) if period == 'weekly' else _add_month(day, last.day)
+    return day
+
+
+def schedule(flows, start, days):
+    """Signed daily amounts of recurring flows over ``days`` days from ``start``."""
+    scheduled = np.zeros(days)
+    end = start + timedelta(days=days)
+    for flow in flows:
+        day, anchor = flow['next_date'], flow['dates'][-1]
+        while day < end:
+            scheduled[(day - start).days] += SIGNS[flow['type']] * flow['amount']
+            day = day + timedelta(days=7) if flow['period'] == 'weekly' else _add_month(day, anchor.day)
+    return scheduled
+
+
+def fit(net, first_day):
+    """
+    Weekday profile and damped linear trend of the daily ``net`` series
+    starting on ``first_day``. Returns (profile, level, slope, residual_std),
+    level being the trend's value on the day after the series.
+    """
+    n = len(net)
+    if not n:
+        return np.zeros(7), 0.0, 0.0, 0.0
+    weekdays = (np.arange(n) + first_day.weekday()) % 7
+    counts = np.bincount(weekdays, minlength=7)
+    sums = np.bincount(weekdays, weights=net, minlength=7)
+    profile = np.divide(sums, counts, out=np.zeros(7), where=counts > 0) - net.mean()
+    profile[counts == 0] = 0.0
+
+    deseasoned = (net - profile[weekdays])[-TREND_DAYS:]
+    t = np.arange(len(deseasoned))
+    if len(deseasoned) >= 14:
+        slope, intercept = np.polyfit(t, deseasoned, 1)
+    else:
+        slope, intercept = 0.0, deseasoned.mean()
+    residuals = deseasoned - (intercept + slope * t)
+    residual_std = float(residuals.std(ddof=1)) if len(residuals) > 2 else float(np.abs(residuals).max())
+    return profile, float(intercept + slope * len(deseasoned)), float(slope), residual_std
+
+
+def forecast(business, today=None):
+    """The business's forecast as of ``today``, for the API."""
+    today = today or timezone.localdate()
+    horizon = max(HORIZONS)
+    rows = list(
+        TransactionDailyRollup.objects.filter(
+            business_id=business.pk,
+            status='confirmed',
+            transaction_type__in=list(SIGNS),
+            date__gte=today - timedelta(days=HISTORY_DAYS),
+            date__lt=today
+        ).values('date', 'transaction_type', 'category').annotate(
+            total=Sum('total_amount_ngn'), count=Count('id')
+        ).values_list('date', 'transaction_type', 'category', 'total', 'count')
+    )
+    rows = [(day, kind, category, float(total or 0), count) for day, kind, category, total, count in rows]
+
+    recurring = detect_recurring(rows, today)
+    recurring_days = {
+        (flow['type'], flow['category'], day) for flow in recurring for day in flow['dates']
+    }
+
+    first_day = min((row[0] for row in rows), default=today)
+    net = np.zeros((today - first_day).days)
+    for day, transaction_type, category, total, _ in rows:
+        if (transaction_type, category, day) not in recurring_days:
+            net[(day - first_day).days] += SIGNS[transaction_type] * total
+    profile, level, slope, residual_std = fit(net, first_day)
+
+    start = today + timedelta(days=1)
+    steps = np.arange(1, horizon + 1)
+    weekdays = (np.arange(horizon) + start.weekday()) % 7
+    damped = np.cumsum(TREND_DAMPING ** steps)
+    daily = level + slope * damped + profile[weekdays] + schedule(recurring, start, horizon)
+
+    balance = float(business.current_balance) + np.cumsum(daily)
+    spread = BAND_Z * residual_std * np.sqrt(steps)
+
+    def point(i):
+        return {
+            'date': (start + timedelta(days=i)).isoformat(),
+            'balance': round(float(balance[i]), 2),
+            'low': round(float(balance[i] - spread[i]), 2),
+            'high': round(float(balance[i] + spread[i]), 2),
+        }
+
+    return {
+        'business_id': str(business.pk),
+        'as_of': today.isoformat(),
+        'currency': 'NGN',
+        'current_balance': float(business.current_balance),
+        'history_days': len(net),
+        'horizons': [{'days': days, **point(days - 1)} for days in HORIZONS],
+        'daily': [point(i) for i in range(horizon)],
+        'recurring': [
+            {
+                'category': flow['category'],
+                'type': flow['type'],
+                'period': flow['period'],
+                'amount': round(flow['amount'], 2),
+                'next_date': flow['next_date'].isoformat(),
+            }
+            for flow in recurring
+        ],
+        'model': {
+            'daily_trend': round(slope, 2),
+            'daily_level': round(level, 2),
+            'weekday_profile': [round(float(value), 2) for value in profile],
+            'residual_std': round(residual_std, 2),
+        },
+    }
+
+
+def cache_key(business, today):
+    return f'forecast:{business.pk}:{business.data_version}:{today.isoformat()}'
+
+
+def get_forecast(business, today=None):
+    """The business's forecast, from the cache unless its data version moved."""
+    today = today or timezone.localdate()
+    key = cache_key(business, today)
+    result = cache.get(key)
+    if result is None:
+        result = forecast(business, today)
+        cache.set(key, result, settings.FORECAST_CACHE_TIMEOUT)
+    return result
@@ -0,0 +1,38 @@
+"""
+Create the month-end balance snapshots of every business up to the last
+month end, so balance reads find them instead of building them (and
+locking the business row) on request. Run it after each month end:
+
+    python manage.py balance_snapshots [--organization ID]
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from businesses import balances
+from businesses.models import Business
+
+
+class Command(BaseCommand):
+    help = 'Create missing month-end balance snapshots up to the last month end.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organization', help='Organization id (default: all).')
+
+    def handle(self, *args, **options):
+        # The end of the last month that is over
+        through = timezone.localdate().replace(day=1) - timedelta(days=1)
+        businesses = Business.objects.filter(archived_at__isnull=True).order_by('created_at')
+        if options['organization']:
+            businesses = businesses.filter(organization_id=options['organization'])
+
+        started = time.perf_counter()
+        count = 0
+        for business_id in businesses.values_list('id', flat=True).iterator():
+            balances.ensure_snapshots(business_id, through)
+            count += 1
+        self.stdout.write(
+            f"Snapshots of {count} businesses brought up to {through.isoformat()} in {time.perf_counter() - started:.2f}s"
+        )
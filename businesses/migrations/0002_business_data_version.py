@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-18 11:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='business',
+            name='data_version',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
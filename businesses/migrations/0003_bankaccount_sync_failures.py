@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-18 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0002_business_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bankaccount',
+            name='sync_failures',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.27 on 2026-10-18 12:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0003_bankaccount_sync_failures'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('net_total', models.DecimalField(decimal_places=2, default=0, max_digits=17)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='businesses.business')),
+            ],
+            options={
+                'db_table': 'balance_snapshots',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='balancesnapshot',
+            constraint=models.UniqueConstraint(fields=('business', 'date'), name='unique_balance_snapshot'),
+        ),
+    ]
@@ -2,11 +2,57 @@
 Business Model
 """
 import uuid
-from django.db import models
+from decimal import Decimal
+from django.db import models, transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value, DecimalField
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from organizations.models import Organization
 
 
+class BusinessQuerySet(models.QuerySet):
+    
+    def with_stats(self, today=None):
+        """
+        Annotate confirmed transaction count, last transaction date and
+        month-to-date income/expense (NGN), read from the daily rollups.
+        
+        Each figure is a correlated subquery on the rollups' (business, date)
+        index, which stays cheap however many businesses are listed and avoids
+        grouping by every business column.
+        """
+        from django.utils import timezone
+        from transactions.models import TransactionDailyRollup
+        
+        today = today or timezone.localdate()
+        rollups = TransactionDailyRollup.objects.filter(business_id=OuterRef('pk')).order_by()
+        
+        def total(field, **filters):
+            grouped = rollups.filter(**filters).values('business_id').annotate(total=Sum(field))
+            return Subquery(grouped.values('total'))
+        
+        def month_to_date(transaction_type):
+            return total(
+                'total_amount_ngn',
+                status='confirmed',
+                transaction_type=transaction_type,
+                date__gte=today.replace(day=1),
+                date__lte=today
+            )
+        
+        zero = Value(Decimal('0'), output_field=DecimalField(max_digits=20, decimal_places=2))
+        
+        return self.annotate(
+            transaction_count=Coalesce(total('transaction_count', status='confirmed'), 0),
+            last_transaction_date=Subquery(
+                rollups.filter(transaction_count__gt=0).exclude(status='voided')
+                .order_by('-date').values('date')[:1]
+            ),
+            mtd_income=Coalesce(month_to_date('income'), zero),
+            mtd_expense=Coalesce(month_to_date('expense'), zero),
+        )
+
+
 class Business(models.Model):
     """
     Business entity belonging to an organization.
@@ -88,6 +134,9 @@ class Business(models.Model):
     # Metadata
     metadata = models.JSONField(default=dict, blank=True)
     
+    # Bumped on every write to the business or its transactions; ETags are built from it
+    data_version = models.BigIntegerField(default=0)
+    
     # Audit
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -99,6 +148,8 @@ class Business(models.Model):
         related_name='created_businesses'
     )
     
+    objects = BusinessQuerySet.as_manager()
+    
     class Meta:
         db_table = 'businesses'
         verbose_name_plural = 'Businesses'
@@ -112,10 +163,82 @@ class Business(models.Model):
     def __str__(self):
         return f"{self.name} ({self.organization.name})"
     
-    def recalculate_balance(self):
-        """Recalculate current balance from all transactions."""
+    # Cached balance columns are maintained by atomic deltas, never by a full save
+    BALANCE_FIELDS = ('current_balance', 'balance_updated_at')
+    
+    # Columns a full save leaves alone
+    DERIVED_FIELDS = BALANCE_FIELDS + ('data_version',)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'opening_balance' in field_names:
+            instance._loaded_opening_balance = instance.opening_balance
+        if 'archived_at' in field_names:
+            instance._loaded_archived_at = instance.archived_at
+        return instance
+    
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            # No transactions yet, so the balance is the opening balance
+            self.current_balance = self.opening_balance
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                Organization.bump_data_version([self.organization_id])
+            self._loaded_opening_balance = self.opening_balance
+            self._loaded_archived_at = self.archived_at
+            return
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            # Don't overwrite deltas applied concurrently with a stale in-memory balance
+            update_fields = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.DERIVED_FIELDS
+            ]
+            kwargs['update_fields'] = update_fields
+        
+        opening_delta = Decimal('0')
+        loaded = getattr(self, '_loaded_opening_balance', None)
+        if loaded is not None and 'opening_balance' in update_fields:
+            opening_delta = Decimal(self.opening_balance) - loaded
+        
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if opening_delta:
+                Business.apply_balance_delta(self.pk, opening_delta)
+                self.current_balance += opening_delta
+            Business.bump_data_version([self.pk], [self.organization_id])
+        
+        self._loaded_opening_balance = self.opening_balance
+        self._loaded_archived_at = self.archived_at
+    
+    @classmethod
+    def apply_balance_delta(cls, business_id, delta):
+        """
+        Shift the cached balance by ``delta`` with an atomic F() update and
+        return the balance it left.
+        """
+        from django.utils import timezone
+        
+        cls.objects.filter(pk=business_id).update(
+            current_balance=F('current_balance') + delta,
+            balance_updated_at=timezone.now(),
+            data_version=F('data_version') + 1
+        )
+        # The UPDATE holds the row until commit, so this is our own write's result
+        return cls.objects.filter(pk=business_id).values_list('current_balance', flat=True).first()
+    
+    @classmethod
+    def bump_data_version(cls, business_ids, organization_ids=()):
+        """Increment the data version of the given businesses and organizations."""
+        cls.objects.filter(pk__in=business_ids).update(data_version=F('data_version') + 1)
+        Organization.bump_data_version(organization_ids)
+    
+    def compute_balance(self):
+        """Full balance from opening balance plus every confirmed transaction."""
         from transactions.models import Transaction
-        from django.db.models import Sum, Case, When, F, DecimalField
+        from django.db.models import Sum, Case, When, DecimalField
         
         result = Transaction.objects.filter(
             business=self,
@@ -131,10 +254,23 @@ class Business(models.Model):
             )
         )
         
+        # SQLite sums decimals as floats; the column holds two decimal places
+        total = Decimal(str(result['total'] or 0)).quantize(Decimal('0.01'))
+        return total + self.opening_balance
+    
+    def recalculate_balance(self):
+        """
+        Recalculate current balance from all transactions.
+        
+        Writes keep the balance current through deltas; this is the repair path
+        for drift (e.g. rows changed with queryset.update()).
+        """
         from django.utils import timezone
-        self.current_balance = (result['total'] or 0) + self.opening_balance
+        self.current_balance = self.compute_balance()
         self.balance_updated_at = timezone.now()
         self.save(update_fields=['current_balance', 'balance_updated_at'])
+        # Snapshots drifted along with the balance; they are rebuilt on demand
+        BalanceSnapshot.objects.filter(business=self).delete()
         
         return self.current_balance
 
@@ -195,6 +331,7 @@ class BankAccount(models.Model):
     last_synced_at = models.DateTimeField(null=True, blank=True)
     last_sync_error = models.TextField(blank=True, null=True)
     next_sync_at = models.DateTimeField(null=True, blank=True)
+    sync_failures = models.PositiveIntegerField(default=0)
     
     # Balance
     current_balance = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
@@ -237,3 +374,34 @@ class BankAccount(models.Model):
     def __str__(self):
         masked = f"****{self.account_number[-4:]}" if len(self.account_number) >= 4 else self.account_number
         return f"{self.bank_name} - {masked}"
+    
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Business.bump_data_version([self.business_id], [self.organization_id])
+
+
+class BalanceSnapshot(models.Model):
+    """
+    A business's confirmed income less expense up to and including a month
+    end, kept current by the ledger (see ``businesses.balances``). The
+    opening balance is not included, so changing it leaves snapshots valid.
+    """
+    
+    business = models.ForeignKey(
+        Business,
+        on_delete=models.CASCADE,
+        related_name='balance_snapshots'
+    )
+    date = models.DateField()
+    net_total = models.DecimalField(max_digits=17, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'balance_snapshots'
+        constraints = [
+            models.UniqueConstraint(fields=['business', 'date'], name='unique_balance_snapshot'),
+        ]
+    
+    def __str__(self):
+        return f"{self.business_id} @ {self.date}: {self.net_total}"
@@ -1,14 +1,75 @@
 """
 Business Serializers
 """
+from datetime import timedelta
+
+from django.utils import timezone
 from rest_framework import serializers
+
+from .balances import INTERVALS
 from .models import Business, BankAccount
 
 
-class BusinessSerializer(serializers.ModelSerializer):
+class OptionalFieldsMixin:
+    """
+    Drops optional field groups unless the view asked for them with
+    ``context['include']`` (from ``?include=stats,bank_accounts``).
+    """
+    
+    optional_fields = {}
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        include = self.context.get('include', ())
+        for group, names in self.optional_fields.items():
+            if group not in include:
+                for name in names:
+                    self.fields.pop(name, None)
+
+
+class BankAccountSerializer(serializers.ModelSerializer):
+    """Serializer for bank account details."""
+    
+    masked_account_number = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = BankAccount
+        fields = [
+            'id', 'bank_name', 'bank_code', 'account_name',
+            'masked_account_number', 'account_type', 'currency',
+            'provider', 'sync_status', 'last_synced_at',
+            'current_balance', 'available_balance', 'balance_updated_at',
+            'is_primary', 'auto_sync_enabled',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'provider', 'sync_status', 'last_synced_at', 
+                          'current_balance', 'available_balance', 'balance_updated_at',
+                          'created_at', 'updated_at']
+    
+    def get_masked_account_number(self, obj):
+        if len(obj.account_number) >= 4:
+            return f"****{obj.account_number[-4:]}"
+        return obj.account_number
+
+
+class BusinessStatsFields(serializers.Serializer):
+    """Fields filled from ``Business.objects.with_stats()`` annotations."""
+    
+    transaction_count = serializers.IntegerField(read_only=True)
+    last_transaction_date = serializers.DateField(read_only=True)
+    mtd_income = serializers.DecimalField(max_digits=20, decimal_places=2, read_only=True)
+    mtd_expense = serializers.DecimalField(max_digits=20, decimal_places=2, read_only=True)
+
+
+STATS_FIELDS = ['transaction_count', 'last_transaction_date', 'mtd_income', 'mtd_expense']
+
+
+class BusinessSerializer(OptionalFieldsMixin, BusinessStatsFields, serializers.ModelSerializer):
     """Serializer for business details."""
     
-    transaction_count = serializers.SerializerMethodField()
+    bank_accounts = BankAccountSerializer(many=True, read_only=True)
+    
+    optional_fields = {'bank_accounts': ['bank_accounts']}
     
     class Meta:
         model = Business
@@ -19,14 +80,11 @@ class BusinessSerializer(serializers.ModelSerializer):
             'primary_currency', 'fiscal_year_start',
             'opening_balance', 'opening_balance_date',
             'current_balance', 'balance_updated_at',
-            'is_active', 'transaction_count',
+            'is_active', *STATS_FIELDS, 'bank_accounts',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'current_balance', 'balance_updated_at', 'created_at', 'updated_at']
     
-    def get_transaction_count(self, obj):
-        return obj.transactions.filter(status='confirmed').count()
-    
     def create(self, validated_data):
         organization = self.context.get('organization')
         user = self.context['request'].user
@@ -38,37 +96,19 @@ class BusinessSerializer(serializers.ModelSerializer):
         )
 
 
-class BusinessSummarySerializer(serializers.ModelSerializer):
+class BusinessSummarySerializer(OptionalFieldsMixin, BusinessStatsFields, serializers.ModelSerializer):
     """Light serializer for list views."""
     
-    class Meta:
-        model = Business
-        fields = ['id', 'name', 'short_name', 'industry', 'color', 'icon', 'current_balance', 'is_active']
-
-
-class BankAccountSerializer(serializers.ModelSerializer):
-    """Serializer for bank account details."""
+    bank_accounts = BankAccountSerializer(many=True, read_only=True)
     
-    masked_account_number = serializers.SerializerMethodField()
+    optional_fields = {'stats': STATS_FIELDS, 'bank_accounts': ['bank_accounts']}
     
     class Meta:
-        model = BankAccount
+        model = Business
         fields = [
-            'id', 'bank_name', 'bank_code', 'account_name',
-            'masked_account_number', 'account_type', 'currency',
-            'provider', 'sync_status', 'last_synced_at',
-            'current_balance', 'available_balance', 'balance_updated_at',
-            'is_primary', 'auto_sync_enabled',
-            'created_at', 'updated_at'
+            'id', 'name', 'short_name', 'industry', 'color', 'icon', 'current_balance', 'is_active',
+            *STATS_FIELDS, 'bank_accounts'
         ]
-        read_only_fields = ['id', 'provider', 'sync_status', 'last_synced_at', 
-                          'current_balance', 'available_balance', 'balance_updated_at',
-                          'created_at', 'updated_at']
-    
-    def get_masked_account_number(self, obj):
-        if len(obj.account_number) >= 4:
-            return f"****{obj.account_number[-4:]}"
-        return obj.account_number
 
 
 class BankAccountCreateSerializer(serializers.Serializer):
@@ -81,3 +121,41 @@ class BankAccountCreateSerializer(serializers.Serializer):
     bank_name = serializers.CharField(required=False)
     account_number = serializers.CharField(required=False)
     account_name = serializers.CharField(required=False)
+    
+    def validate(self, attrs):
+        if attrs['provider'] != 'manual' and not attrs.get('access_code'):
+            raise serializers.ValidationError({'access_code': 'Required to link a bank account.'})
+        return attrs
+
+
+class BalanceHistoryQuerySerializer(serializers.Serializer):
+    """Query parameters of a balance series; the last 90 days by default."""
+    
+    # Longest range per interval, to bound the number of points
+    MAX_DAYS = {'day': 2 * 366, 'week': 10 * 366, 'month': 30 * 366}
+    
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    interval = serializers.ChoiceField(choices=INTERVALS, default='day')
+    
+    def validate(self, attrs):
+        date_to = attrs.setdefault('date_to', timezone.localdate())
+        date_from = attrs.setdefault('date_from', date_to - timedelta(days=89))
+        if date_from > date_to:
+            raise serializers.ValidationError({'date_to': 'date_to must not be before date_from'})
+        if (date_to - date_from).days >= self.MAX_DAYS[attrs['interval']]:
+            raise serializers.ValidationError({'date_to': f"Range too long for interval={attrs['interval']}"})
+        return attrs
+
+
+class StatementQuerySerializer(serializers.Serializer):
+    """Query parameters of an account statement; paging is the cursor's."""
+    
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    bank_account = serializers.UUIDField(required=False)
+    
+    def validate(self, attrs):
+        if attrs.get('date_from') and attrs.get('date_to') and attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError({'date_to': 'date_to must not be before date_from'})
+        return attrs
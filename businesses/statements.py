@@ -0,0 +1,145 @@
+"""
+Account Statements
+
+A business's (or one of its bank accounts') confirmed income and expense in
+date order, each with the balance after it, like a bank statement.
+
+Pages are keyset-paginated on (transaction_date, created_at, id). The
+running balance of a page is computed in SQL with ``SUM() OVER (ORDER BY
+...)`` over the page's rows only, and seeded with the balance just before
+the page: for a business, the snapshot-backed balance as of the day before
+(see ``balances``) plus that day's rows up to the cursor; for a bank
+account, one aggregate of its earlier rows. Python never sums more than a
+page.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, F, Q, Sum, Value, When, Window
+from django.db.models.expressions import RowRange
+
+from transactions.models import Transaction
+from transactions.pagination import KeysetPagination
+from .balances import balance_as_of
+
+
+SIGNED = Case(
+    When(transaction_type='income', then=F('amount_ngn')),
+    When(transaction_type='expense', then=-F('amount_ngn')),
+    default=Value(0),
+    output_field=DecimalField(max_digits=17, decimal_places=2)
+)
+
+
+class StatementPagination(KeysetPagination):
+    """Keyset pagination in statement order, annotating each row's running sum within the page."""
+    ordering = ('transaction_date', 'created_at', 'id')
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        _, reverse = self.decode_cursor(request, queryset.model)
+        ordering = self.reversed_ordering() if reverse else self.ordering
+        # Window ordered like the page, over the rows the seek leaves
+        running = Window(
+            expression=Sum(SIGNED),
+            order_by=[F(f.lstrip('-')).desc() if f.startswith('-') else F(f).asc() for f in ordering],
+            frame=RowRange(start=None, end=0),
+        )
+        return super().paginate_queryset(queryset.annotate(running=running), request, view)
+
+
+class Statement:
+    """Statement of ``business``, or of one of its bank accounts, over an optional date range."""
+
+    def __init__(self, business, bank_account=None, date_from=None, date_to=None):
+        self.business = business
+        self.bank_account = bank_account
+        self.date_from = date_from
+        self.date_to = date_to
+
+    def ledger(self):
+        """Every row that moves the balance, regardless of the range."""
+        rows = Transaction.objects.filter(
+            business_id=self.business.pk,
+            status='confirmed',
+            transaction_type__in=('income', 'expense'),
+            amount_ngn__isnull=False,
+        )
+        if self.bank_account is not None:
+            rows = rows.filter(bank_account_id=self.bank_account.pk)
+        return rows
+
+    def queryset(self):
+        rows = self.ledger()
+        if self.date_from:
+            rows = rows.filter(transaction_date__gte=self.date_from)
+        if self.date_to:
+            rows = rows.filter(transaction_date__lte=self.date_to)
+        return rows
+
+    def balance_before(self, position=None, inclusive=False):
+        """
+        Balance after every row before ``position`` (a sort key), and the row
+        itself if ``inclusive``; without one, before the range.
+        """
+        if position is None:
+            if self.date_from is None:
+                return Decimal('0') if self.bank_account is not None else Decimal(self.business.opening_balance)
+            day, earlier = self.date_from, Q(pk__in=[])
+        else:
+            day, created_at, pk = position
+            id_lookup = 'id__lte' if inclusive else 'id__lt'
+            earlier = Q(transaction_date=day) & (Q(created_at__lt=created_at) | Q(created_at=created_at, **{id_lookup: pk}))
+
+        if self.bank_account is not None:
+            rows = self.ledger().filter(Q(transaction_date__lt=day) | earlier)
+            return _money(rows.aggregate(total=Sum(SIGNED))['total'])
+        same_day = _money(self.ledger().filter(earlier).aggregate(total=Sum(SIGNED))['total'])
+        return balance_as_of(self.business, day - timedelta(days=1)) + same_day
+
+    def page(self, request):
+        paginator = StatementPagination()
+        rows = paginator.paginate_queryset(self.queryset(), request)
+        if paginator.reverse:
+            # Rows before the cursor, summed backwards from it
+            seed = self.balance_before(paginator.position)
+        else:
+            seed = self.balance_before(paginator.position, inclusive=True) if paginator.position else self.balance_before()
+
+        entries = []
+        brought_forward = None
+        for row in rows:
+            amount = _money(row.amount_ngn)
+            effect = amount if row.transaction_type == 'income' else -amount
+            running = _money(row.running)
+            balance = seed - running + effect if paginator.reverse else seed + running
+            if brought_forward is None:
+                brought_forward = balance - effect
+            entries.append({
+                'id': str(row.pk),
+                'transaction_date': row.transaction_date.isoformat(),
+                'description': row.description,
+                'category': row.category,
+                'payment_method': row.payment_method,
+                'reference_number': row.reference_number,
+                'bank_account_id': str(row.bank_account_id) if row.bank_account_id else None,
+                'money_in': float(amount) if effect > 0 else None,
+                'money_out': float(amount) if effect < 0 else None,
+                'balance': float(balance),
+            })
+
+        return {
+            'business_id': str(self.business.pk),
+            'bank_account_id': str(self.bank_account.pk) if self.bank_account else None,
+            'date_from': self.date_from.isoformat() if self.date_from else None,
+            'date_to': self.date_to.isoformat() if self.date_to else None,
+            'currency': 'NGN',
+            'balance_brought_forward': float(brought_forward) if brought_forward is not None else None,
+            'transactions': entries,
+            'pagination': paginator.get_pagination_info(),
+        }
+
+
+def _money(value):
+    # SQLite returns decimal sums as floats
+    return Decimal(str(value or 0)).quantize(Decimal('0.01'))
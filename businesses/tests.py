@@ -1,3 +1,380 @@
+"""
+Business Tests
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from organizations.models import Organization, TeamMember
+from transactions.models import Transaction
+from . import balances, forecasting
+from .models import BalanceSnapshot, Business, BankAccount
+
+User = get_user_model()
+
+
+class BusinessEndpointQueryTests(TestCase):
+    """Business list and detail cost a fixed number of queries, whatever the org size."""
+
+    def setUp(self):
+        cache.clear()
+
+    def make_org(self, business_count):
+        owner = User.objects.create_user(email=f'owner-{business_count}@example.com', password='Str0ng-pass!')
+        org = Organization.objects.create(owner=owner, name=f'Org of {business_count}')
+        TeamMember.objects.create(organization=org, user=owner, role='owner', status='active')
+
+        today = timezone.localdate()
+        for i in range(business_count):
+            business = Business.objects.create(organization=org, name=f'Business {i:03}', opening_balance=100)
+            BankAccount.objects.create(
+                business=business, organization=org, bank_name='GTBank', account_number=f'01234567{i:02}'
+            )
+            for transaction_type in ('income', 'expense'):
+                Transaction.objects.create(
+                    organization=org, business=business, transaction_date=today,
+                    transaction_type=transaction_type, amount='10.00', category='sales', description='Entry'
+                )
+        return owner, org
+
+    def test_list_and_detail_queries_are_constant(self):
+        counts = {}
+        for size in (1, 10, 200):
+            owner, org = self.make_org(size)
+            business = org.businesses.first()
+            counts[size] = (
+                self._query_count(owner, '/api/v1/businesses/?include=stats,bank_accounts'),
+                self._query_count(owner, f'/api/v1/businesses/{business.id}/?include=bank_accounts'),
+            )
+
+        self.assertEqual(counts[1], counts[10])
+        self.assertEqual(counts[1], counts[200])
+
+    def test_list_includes_stats_and_totals(self):
+        owner, org = self.make_org(3)
+        client = APIClient()
+        client.force_authenticate(owner)
+
+        data = client.get('/api/v1/businesses/?include=stats,bank_accounts').data['data']
+
+        self.assertEqual(data['summary']['count'], 3)
+        self.assertEqual(data['summary']['total_balance'], 300.0)
+        first = data['businesses'][0]
+        self.assertEqual(first['transaction_count'], 2)
+        self.assertEqual(first['last_transaction_date'], timezone.localdate().isoformat())
+        self.assertEqual(first['mtd_income'], '10.00')
+        self.assertEqual(first['mtd_expense'], '10.00')
+        self.assertEqual(len(first['bank_accounts']), 1)
+
+        plain = client.get('/api/v1/businesses/').data['data']['businesses'][0]
+        self.assertNotIn('transaction_count', plain)
+        self.assertNotIn('bank_accounts', plain)
+
+    def test_stats_exclude_other_months_and_unconfirmed_rows(self):
+        owner, org = self.make_org(1)
+        business = org.businesses.get()
+        today = date(2026, 3, 15)
+        for transaction_date, status in [(date(2026, 2, 28), 'confirmed'), (today, 'pending'), (today, 'voided')]:
+            Transaction.objects.create(
+                organization=org, business=business, transaction_date=transaction_date, status=status,
+                transaction_type='income', amount='5.00', category='sales', description='Entry'
+            )
+
+        stats = Business.objects.with_stats(today=today).get(pk=business.pk)
+
+        self.assertEqual(stats.transaction_count, 3)
+        self.assertEqual(Decimal(str(stats.mtd_income)), Decimal('0'))
+
+    def _query_count(self, user, url):
+        client = APIClient()
+        client.force_authenticate(user)
+        # Count the steady state, with the user's scope already cached
+        client.get(url)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+
+class ForecastTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(email='owner@example.com', password='Str0ng-pass!')
+        self.org = Organization.objects.create(owner=self.owner, name='Ada Holdings')
+        TeamMember.objects.create(organization=self.org, user=self.owner, role='owner', status='active')
+        self.business = Business.objects.create(organization=self.org, name='Shop', opening_balance=10000)
+
+    def add(self, day, transaction_type, amount, category):
+        Transaction.objects.create(
+            organization=self.org, business=self.business, transaction_date=day,
+            transaction_type=transaction_type, amount=amount, category=category, description='Entry'
+        )
+
+    def make_history(self, today, days=120):
+        for offset in range(days, 0, -1):
+            day = today - timedelta(days=offset)
+            if day.weekday() < 5:
+                self.add(day, 'income', ['90.00', '100.00', '110.00'][offset % 3], 'sales')
+            self.add(day, 'expense', '30.00', 'supplies')
+            if day.day == 5:
+                self.add(day, 'expense', '500.00', 'rent')
+
+    def test_projects_weekday_profile_and_recurring_flows(self):
+        today = date(2026, 3, 20)
+        self.make_history(today)
+        self.business.refresh_from_db()
+
+        result = forecasting.forecast(self.business, today)
+
+        rent, = result['recurring']
+        self.assertEqual((rent['category'], rent['period'], rent['amount'], rent['next_date']), ('rent', 'monthly', 500.0, '2026-04-05'))
+        # 20 weekdays of sales, 30 days of supplies and one rent payment
+        expected = float(self.business.current_balance) + 20 * 100 - 30 * 30 - 500
+        thirty = result['horizons'][0]
+        self.assertEqual((thirty['days'], thirty['date']), (30, '2026-04-19'))
+        self.assertAlmostEqual(thirty['balance'], expected, delta=50)
+        widths = [horizon['high'] - horizon['low'] for horizon in result['horizons']]
+        self.assertTrue(0 < widths[0] < widths[1] < widths[2])
+        self.assertEqual(len(result['daily']), 90)
+
+    def test_endpoint_answers_from_cache_until_data_version_moves(self):
+        today = timezone.localdate()
+        self.make_history(today, days=30)
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        url = f'/api/v1/businesses/{self.business.id}/forecast/'
+
+        first = client.get(url).json()['data']
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(client.get(url).json()['data'], first)
+        self.assertFalse(any('transaction_daily_rollups' in q['sql'] for q in ctx.captured_queries))
+
+        self.add(today - timedelta(days=1), 'income', '5000.00', 'sales')
+        second = client.get(url).json()['data']
+        self.assertEqual(second['current_balance'], first['current_balance'] + 5000)
+
+
+class BalanceHistoryTests(TestCase):
+
+    today = date(2026, 4, 15)
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email='owner@example.com', password='Str0ng-pass!')
+        self.org = Organization.objects.create(owner=self.owner, name='Ada Holdings')
+        TeamMember.objects.create(organization=self.org, user=self.owner, role='owner', status='active')
+        self.business = Business.objects.create(organization=self.org, name='Restaurant', opening_balance=5000)
+        self.entries = []
+        day = date(2025, 1, 3)
+        while day < date(2026, 4, 10):
+            self.entries.append(self.add(day, 'income', Decimal(100 + day.day)))
+            if day.day % 3 == 0:
+                self.add(day, 'expense', Decimal('45.50'))
+            day += timedelta(days=4)
+
+    def add(self, day, transaction_type, amount, status='confirmed'):
+        return Transaction.objects.create(
+            organization=self.org, business=self.business, transaction_date=day, transaction_type=transaction_type,
+            amount=amount, category='sales', status=status, description='Entry'
+        )
+
+    def resummed(self, day):
+        total = Decimal('5000')
+        for transaction in Transaction.objects.filter(business=self.business, status='confirmed', transaction_date__lte=day):
+            total += transaction.amount_ngn if transaction.transaction_type == 'income' else -transaction.amount_ngn
+        return total
+
+    def assert_balances_match(self):
+        self.business.refresh_from_db()
+        for day in [date(2024, 12, 31), date(2025, 1, 31), date(2025, 3, 14), date(2025, 12, 31), date(2026, 4, 12)]:
+            self.assertEqual(balances.balance_as_of(self.business, day, self.today), self.resummed(day), day)
+
+    def test_snapshot_plus_tail_matches_full_history(self):
+        self.assert_balances_match()
+        # Month ends January 2025 to March 2026
+        self.assertEqual(BalanceSnapshot.objects.filter(business=self.business).count(), 15)
+
+        with CaptureQueriesContext(connection) as ctx:
+            balances.balance_as_of(self.business, date(2025, 9, 17), self.today)
+        sql = [q['sql'] for q in ctx.captured_queries]
+        self.assertFalse(any('FROM "transactions"' in q for q in sql))
+        self.assertFalse(any('INSERT' in q for q in sql))
+
+    def test_backdated_edits_shift_only_later_snapshots(self):
+        self.assert_balances_match()
+        before = dict(BalanceSnapshot.objects.filter(business=self.business).values_list('date', 'net_total'))
+
+        edited = self.entries[20]  # 2025-03-24
+        edited.amount = edited.amount + 1000
+        edited.save()
+        after = dict(BalanceSnapshot.objects.filter(business=self.business).values_list('date', 'net_total'))
+        self.assertEqual(after[date(2025, 2, 28)], before[date(2025, 2, 28)])
+        self.assertEqual(after[date(2025, 3, 31)], before[date(2025, 3, 31)] + 1000)
+        self.assert_balances_match()
+
+        moved = self.entries[3]
+        moved.transaction_date = date(2025, 11, 2)
+        moved.save()
+        self.entries[40].delete()
+        self.add(date(2025, 6, 30), 'expense', Decimal('700.00'))
+        self.add(date(2025, 7, 1), 'expense', Decimal('700.00'), status='pending')
+        self.assert_balances_match()
+
+    def test_series_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        url = f'/api/v1/businesses/{self.business.id}/balance-history/'
+
+        data = client.get(url, {'date_from': '2025-03-01', 'date_to': '2025-05-31', 'interval': 'month'}).json()['data']
+        self.assertEqual([point['date'] for point in data['points']], ['2025-03-31', '2025-04-30', '2025-05-31'])
+        self.assertEqual(data['opening_balance'], float(self.resummed(date(2025, 2, 28))))
+        self.assertEqual(data['points'][-1]['balance'], float(self.resummed(date(2025, 5, 31))))
+
+        weekly = client.get(url, {'date_from': '2025-03-01', 'date_to': '2025-03-31', 'interval': 'week'}).json()['data']
+        self.assertEqual([point['date'] for point in weekly['points']][:2], ['2025-03-02', '2025-03-09'])
+
+        as_of = client.get(url, {'as_of': '2025-03-14'}).json()['data']
+        self.assertEqual(as_of['balance'], float(self.resummed(date(2025, 3, 14))))
+        self.assertEqual(client.get(url, {'as_of': 'yesterday'}).status_code, 400)
+        self.assertEqual(client.get(url, {'date_from': '2020-01-01', 'date_to': '2025-01-01'}).status_code, 400)
+
+
+    def test_reads_after_snapshots_exist_take_no_lock(self):
+        call_command('balance_snapshots', stdout=StringIO())
+        last = timezone.localdate().replace(day=1) - timedelta(days=1)
+        self.assertTrue(BalanceSnapshot.objects.filter(business=self.business, date=last).exists())
+
+        with CaptureQueriesContext(connection) as ctx:
+            balances.balance_as_of(self.business, date(2025, 9, 17))
+        # The business row is only read, under lock, to create snapshots
+        self.assertFalse(any('FROM "businesses"' in q['sql'] for q in ctx.captured_queries))
+
+    def test_requires_view_reports(self):
+        viewer = User.objects.create_user(email='viewer@example.com', password='Str0ng-pass!')
+        TeamMember.objects.create(
+            organization=self.org, user=viewer, role='viewer', status='active',
+            business_access=[str(self.business.id)], permissions_override={'view_reports': False}
+        )
+        client = APIClient()
+        client.force_authenticate(viewer)
+        url = f'/api/v1/businesses/{self.business.id}/balance-history/'
+
+        self.assertEqual(client.get(url, {'as_of': '2025-03-14'}).status_code, 403)
+        self.assertEqual(client.get(url).status_code, 403)
+
+
+class StatementTests(TestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(email='owner@example.com', password='Str0ng-pass!')
+        self.org = Organization.objects.create(owner=self.owner, name='Ada Holdings')
+        TeamMember.objects.create(organization=self.org, user=self.owner, role='owner', status='active')
+        self.business = Business.objects.create(organization=self.org, name='Restaurant', opening_balance=5000)
+        self.account = BankAccount.objects.create(
+            business=self.business, organization=self.org, bank_name='GTBank', account_number='0123456789'
+        )
+        day = date(2025, 1, 3)
+        while day < date(2025, 9, 1):
+            self.add(day, 'income', Decimal(100 + day.day), bank_account=self.account if day.day % 2 else None)
+            # Same-day rows exercise the created_at/id tie-break
+            self.add(day, 'expense', Decimal('45.50'), bank_account=self.account)
+            if day.day % 5 == 0:
+                self.add(day, 'expense', Decimal('999.00'), status='pending')
+                self.add(day, 'transfer', Decimal('300.00'))
+            day += timedelta(days=3)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.url = f'/api/v1/businesses/{self.business.id}/statement/'
+
+    def add(self, day, transaction_type, amount, status='confirmed', bank_account=None):
+        return Transaction.objects.create(
+            organization=self.org, business=self.business, bank_account=bank_account, transaction_date=day,
+            transaction_type=transaction_type, amount=amount, category='sales', status=status, description='Entry'
+        )
+
+    def expected(self, opening=Decimal('5000'), **filters):
+        """Balance after each row, re-summed in Python over the whole history."""
+        rows = Transaction.objects.filter(
+            business=self.business, status='confirmed', transaction_type__in=('income', 'expense'), **filters
+        ).order_by('transaction_date', 'created_at', 'id')
+        balance, result = opening, {}
+        for row in rows:
+            balance += row.amount_ngn if row.transaction_type == 'income' else -row.amount_ngn
+            result[str(row.pk)] = (row.transaction_date, float(balance))
+        return result
+
+    def walk(self, params, link='next'):
+        pages, response = [], self.client.get(self.url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.json()['data'])
+            following = pages[-1]['pagination'][link]
+            if not following:
+                return pages
+            response = self.client.get(following)
+
+    def test_running_balances_across_pages(self):
+        expected = self.expected()
+        pages = self.walk({'page_size': 7})
+        rows = [row for page in pages for row in page['transactions']]
+        self.assertEqual([row['id'] for row in rows], list(expected))
+        self.assertEqual({row['id']: row['balance'] for row in rows}, {k: v[1] for k, v in expected.items()})
+        self.assertEqual(pages[0]['balance_brought_forward'], 5000.0)
+        self.assertEqual(pages[1]['balance_brought_forward'], pages[0]['transactions'][-1]['balance'])
+
+        # Back from the last page through the previous links
+        back = [pages[-1]]
+        while back[0]['pagination']['previous']:
+            back.insert(0, self.client.get(back[0]['pagination']['previous']).json()['data'])
+        self.assertEqual([page['transactions'] for page in back], [page['transactions'] for page in pages])
+
+    def test_range_is_seeded_from_snapshots(self):
+        params = {'date_from': '2025-03-15', 'date_to': '2025-06-30', 'page_size': 10}
+        expected = {
+            pk: balance for pk, (day, balance) in self.expected().items()
+            if date(2025, 3, 15) <= day <= date(2025, 6, 30)
+        }
+        pages = self.walk(params)
+        self.assertEqual({row['id']: row['balance'] for page in pages for row in page['transactions']}, expected)
+        self.assertTrue(BalanceSnapshot.objects.filter(business=self.business, date=date(2025, 2, 28)).exists())
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(pages[2]['pagination']['next'])
+        sql = [q['sql'] for q in ctx.captured_queries]
+        self.assertTrue(any('OVER' in q for q in sql))
+        # Only the page and same-day rows are read, never the history before them
+        for query in sql:
+            if 'FROM "transactions"' in query and 'OVER' not in query and 'SUM' in query:
+                self.assertIn('"transaction_date" =', query)
+
+    def test_bank_account_statement(self):
+        expected = {pk: balance for pk, (_, balance) in self.expected(Decimal('0'), bank_account=self.account).items()}
+        pages = self.walk({'bank_account': str(self.account.pk), 'page_size': 9})
+        self.assertEqual({row['id']: row['balance'] for page in pages for row in page['transactions']}, expected)
+        self.assertEqual(len(pages[0]['transactions']), 9)
+
+        other = Business.objects.create(organization=self.org, name='Shop')
+        foreign = BankAccount.objects.create(business=other, organization=self.org, bank_name='UBA', account_number='1')
+        self.assertEqual(self.client.get(self.url, {'bank_account': str(foreign.pk)}).status_code, 404)
+
+    def test_requires_view_reports(self):
+        viewer = User.objects.create_user(email='viewer@example.com', password='Str0ng-pass!')
+        TeamMember.objects.create(
+            organization=self.org, user=viewer, role='viewer', status='active',
+            business_access=[str(self.business.id)], permissions_override={'view_reports': False}
+        )
+        self.client.force_authenticate(viewer)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
 
-# Create your tests here.
+    def test_invalid_query(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'nonsense'}).status_code, 404)
+        self.assertEqual(self.client.get(self.url, {'date_from': '2025-05-01', 'date_to': '2025-04-01'}).status_code, 400)
@@ -1,77 +1,91 @@
 """
 Business Views
 """
-from rest_framework import viewsets, status
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Sum
+from rest_framework import serializers, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
-from organizations.models import Organization, TeamMember
+from config.etags import DataVersionETagMixin
+from organizations.access import AccessScope, AccessScopeMixin
+from organizations.models import Organization
+from . import balances, forecasting
+from .statements import Statement
 from .models import Business, BankAccount
 from .serializers import (
     BusinessSerializer, BusinessSummarySerializer,
-    BankAccountSerializer, BankAccountCreateSerializer
+    BankAccountSerializer, BankAccountCreateSerializer, BalanceHistoryQuerySerializer, StatementQuerySerializer
 )
 
 
-class BusinessViewSet(viewsets.ModelViewSet):
+class BusinessViewSet(DataVersionETagMixin, AccessScopeMixin, viewsets.ModelViewSet):
     """
     ViewSet for Business CRUD operations.
     """
     permission_classes = [IsAuthenticated]
     serializer_class = BusinessSerializer
     
+    # Optional parts of the response, requested with ?include=stats,bank_accounts
+    INCLUDE_OPTIONS = {'stats', 'bank_accounts'}
+    
     def get_queryset(self):
-        user = self.request.user
-        org_id = self.request.query_params.get('organization_id')
-        
-        if not org_id:
-            # Return businesses from all accessible orgs
-            orgs = Organization.objects.filter(
-                team_members__user=user,
-                team_members__status='active'
-            ).values_list('id', flat=True)
-            
-            return Business.objects.filter(
-                organization_id__in=orgs,
-                archived_at__isnull=True
-            )
-        
-        # Check org access
-        membership = TeamMember.objects.filter(
-            organization_id=org_id,
-            user=user,
-            status='active'
-        ).first()
-        
-        if not membership:
-            return Business.objects.none()
-        
-        # Filter by business access if not admin/owner
-        qs = Business.objects.filter(
-            organization_id=org_id,
-            archived_at__isnull=True
-        )
-        
-        if membership.role not in ['owner', 'admin'] and membership.business_access:
-            qs = qs.filter(id__in=membership.business_access)
-        
-        return qs
+        queryset = self.get_scope().businesses()
+        if self.action in ('retrieve', 'update', 'partial_update'):
+            queryset = queryset.with_stats()
+        return self.with_includes(queryset)
+    
+    def get_etag_versions(self, scope):
+        if self.action != 'retrieve':
+            return super().get_etag_versions(scope)
+        # One business's figures only move with its own version; a business
+        # that is missing or out of scope gets no ETag and the view's 404
+        try:
+            pk = Business._meta.pk.to_python(self.kwargs['pk'])
+        except ValidationError:
+            return None
+        version = scope.businesses().filter(pk=pk).values_list('data_version', flat=True).first()
+        return None if version is None else [(self.kwargs['pk'], version)]
+    
+    def get_includes(self):
+        raw = self.request.query_params.get('include', '')
+        return {part.strip() for part in raw.split(',')} & self.INCLUDE_OPTIONS
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['include'] = self.get_includes()
+        return context
+    
+    def with_includes(self, queryset):
+        if 'bank_accounts' in self.get_includes():
+            queryset = queryset.prefetch_related('bank_accounts')
+        return queryset
     
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset().order_by('name')
-        serializer = BusinessSummarySerializer(queryset, many=True)
+        queryset = self.get_queryset()
+        
+        # Totals in SQL, over the same rows as the list
+        totals = queryset.aggregate(count=Count('id'), total_balance=Sum('current_balance'))
+        
+        if 'stats' in self.get_includes():
+            queryset = queryset.with_stats()
+        serializer = BusinessSummarySerializer(
+            queryset.order_by('name'), many=True, context=self.get_serializer_context()
+        )
         
-        # Calculate totals
-        total_balance = sum(float(b.current_balance or 0) for b in queryset)
+        # SQLite sums decimals as floats; balances hold two decimal places
+        total_balance = Decimal(str(totals['total_balance'] or 0)).quantize(Decimal('0.01'))
         
         return Response({
             'success': True,
             'data': {
                 'businesses': serializer.data,
                 'summary': {
-                    'count': len(serializer.data),
-                    'total_balance': total_balance,
+                    'count': totals['count'],
+                    'total_balance': float(total_balance),
                     'currency': 'NGN'
                 }
             }
@@ -95,13 +109,7 @@ class BusinessViewSet(viewsets.ModelViewSet):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Check permission
-        membership = TeamMember.objects.filter(
-            organization_id=org_id,
-            user=request.user,
-            status='active'
-        ).first()
-        
-        if not membership or not membership.has_permission('manage_businesses'):
+        if not AccessScope.for_request(request).has_permission(org_id, 'manage_businesses'):
             return Response({
                 'success': False,
                 'error': {'code': 'FORBIDDEN', 'message': 'No permission to create businesses'}
@@ -127,6 +135,7 @@ class BusinessViewSet(viewsets.ModelViewSet):
         )
         serializer.is_valid(raise_exception=True)
         business = serializer.save()
+        business = self.with_includes(Business.objects.with_stats()).get(pk=business.pk)
         
         return Response({
             'success': True,
@@ -192,17 +201,147 @@ class BusinessViewSet(viewsets.ModelViewSet):
                     connected_by=request.user
                 )
             else:
-                # TODO: Exchange access_code with Mono/Okra for account details
-                return Response({
-                    'success': False,
-                    'error': {'code': 'NOT_IMPLEMENTED', 'message': 'Bank integration coming soon'}
-                }, status=status.HTTP_501_NOT_IMPLEMENTED)
+                account = self.link_bank_account(business, data)
+                if isinstance(account, Response):
+                    return account
             
             return Response({
                 'success': True,
                 'data': BankAccountSerializer(account).data
             }, status=status.HTTP_201_CREATED)
     
+    def link_bank_account(self, business, data):
+        """Exchange a provider widget's access code for a synced BankAccount."""
+        from asgiref.sync import async_to_sync
+        from django.utils import timezone
+        from integrations.providers import ProviderError, get_provider
+        
+        provider = get_provider(data['provider'])
+        if provider is None:
+            return Response({
+                'success': False,
+                'error': {'code': 'NOT_IMPLEMENTED', 'message': f"{data['provider']} sync is not configured"}
+            }, status=status.HTTP_501_NOT_IMPLEMENTED)
+        
+        try:
+            linked = async_to_sync(provider.link_account)(data['access_code'])
+        except ProviderError as exc:
+            return Response({
+                'success': False,
+                'error': {'code': 'PROVIDER_ERROR', 'message': str(exc)}
+            }, status=status.HTTP_502_BAD_GATEWAY)
+        
+        if BankAccount.objects.filter(provider=provider.name, provider_account_id=linked.provider_account_id).exists():
+            return Response({
+                'success': False,
+                'error': {'code': 'ALREADY_LINKED', 'message': 'This bank account is already linked'}
+            }, status=status.HTTP_409_CONFLICT)
+        
+        return BankAccount.objects.create(
+            business=business,
+            organization=business.organization,
+            bank_name=linked.bank_name,
+            bank_code=linked.bank_code,
+            account_name=linked.account_name,
+            account_number=linked.account_number,
+            account_type=linked.account_type,
+            currency=linked.currency,
+            provider=provider.name,
+            provider_account_id=linked.provider_account_id,
+            provider_access_token=linked.access_token,
+            sync_status='active',
+            # Due immediately, so the next worker batch does the first sync
+            next_sync_at=timezone.now(),
+            connected_by=self.request.user
+        )
+    
+    def reports_forbidden(self, business):
+        """403 response when the user can't view the business's reports, else None."""
+        if self.get_scope().has_permission(business.organization_id, 'view_reports'):
+            return None
+        return Response({
+            'success': False,
+            'error': {'code': 'FORBIDDEN', 'message': 'No permission to view reports'}
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    @action(detail=True, methods=['get'])
+    def forecast(self, request, pk=None):
+        """Projected balances over the next 30/60/90 days, with bands."""
+        business = self.get_object()
+        forbidden = self.reports_forbidden(business)
+        if forbidden:
+            return forbidden
+        
+        return Response({
+            'success': True,
+            'data': forecasting.get_forecast(business)
+        })
+    
+    @action(detail=True, methods=['get'], url_path='balance-history')
+    def balance_history(self, request, pk=None):
+        """
+        Balance at the end of each day, week or month of a range
+        (?date_from=, ?date_to=, ?interval=day|week|month), or on one date
+        (?as_of=).
+        
+        Month-end snapshots are normally built by ``manage.py
+        balance_snapshots``; the first request for a month end without one
+        builds it, briefly locking the business row against ledger writes.
+        """
+        business = self.get_object()
+        forbidden = self.reports_forbidden(business)
+        if forbidden:
+            return forbidden
+        
+        if 'as_of' in request.query_params:
+            as_of = serializers.DateField().run_validation(request.query_params['as_of'])
+            return Response({
+                'success': True,
+                'data': {
+                    'business_id': str(business.pk),
+                    'as_of': as_of.isoformat(),
+                    'currency': 'NGN',
+                    'balance': float(balances.balance_as_of(business, as_of)),
+                }
+            })
+        
+        query = BalanceHistoryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return Response({
+            'success': True,
+            'data': balances.balance_series(business, **query.validated_data)
+        })
+    
+    @action(detail=True, methods=['get'])
+    def statement(self, request, pk=None):
+        """
+        Confirmed income and expense in date order with the balance after
+        each (?date_from=, ?date_to=, ?bank_account=, ?cursor=, ?page_size=).
+        """
+        business = self.get_object()
+        forbidden = self.reports_forbidden(business)
+        if forbidden:
+            return forbidden
+        
+        query = StatementQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        data = query.validated_data
+        
+        bank_account = None
+        if data.get('bank_account'):
+            bank_account = business.bank_accounts.filter(pk=data['bank_account']).first()
+            if bank_account is None:
+                return Response({
+                    'success': False,
+                    'error': {'code': 'NOT_FOUND', 'message': 'Bank account not found'}
+                }, status=status.HTTP_404_NOT_FOUND)
+        
+        statement = Statement(business, bank_account, data.get('date_from'), data.get('date_to'))
+        return Response({
+            'success': True,
+            'data': statement.page(request)
+        })
+    
     @action(detail=True, methods=['post'])
     def recalculate_balance(self, request, pk=None):
         """Force recalculate business balance."""
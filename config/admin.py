@@ -6,8 +6,9 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from accounts.models import User, OTPCode
 from organizations.models import Organization, TeamMember
 from businesses.models import Business, BankAccount
-from transactions.models import Transaction, Category, Receipt
+from transactions.models import Transaction, Category, CategoryRule, Receipt, ReconciliationMatch
 from alerts.models import AlertRule, Alert
+from reports.models import ReportJob
 
 
 @admin.register(User)
@@ -74,6 +75,21 @@ class TransactionAdmin(admin.ModelAdmin):
     raw_id_fields = ['organization', 'business', 'created_by']
 
 
+@admin.register(ReconciliationMatch)
+class ReconciliationMatchAdmin(admin.ModelAdmin):
+    list_display = ['business', 'transaction', 'bank_transaction', 'score', 'status', 'auto_confirmed', 'created_at']
+    list_filter = ['status', 'auto_confirmed']
+    raw_id_fields = ['organization', 'business', 'transaction', 'bank_transaction', 'decided_by']
+
+
+@admin.register(CategoryRule)
+class CategoryRuleAdmin(admin.ModelAdmin):
+    list_display = ['name', 'organization', 'business', 'text_contains', 'category', 'priority', 'is_active']
+    list_filter = ['is_active', 'match_field']
+    search_fields = ['name', 'text_contains', 'category']
+    raw_id_fields = ['organization', 'business', 'created_by']
+
+
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'category_type', 'is_system', 'is_active', 'sort_order']
@@ -103,6 +119,13 @@ class AlertAdmin(admin.ModelAdmin):
     raw_id_fields = ['organization', 'business', 'alert_rule']
 
 
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ['report', 'file_format', 'requested_by', 'status', 'progress', 'created_at']
+    list_filter = ['report', 'file_format', 'status']
+    raw_id_fields = ['requested_by']
+
+
 # Register remaining models
 admin.site.register(OTPCode)
 
@@ -0,0 +1,16 @@
+"""
+Celery Application
+
+Workers start with ``celery -A config worker``. Configuration comes from
+the ``CELERY_*`` Django settings; tasks are discovered in each app's
+``tasks`` module.
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+app = Celery('config')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
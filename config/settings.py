@@ -94,6 +94,24 @@ if os.getenv('USE_SQLITE', 'false').lower() == 'true':
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 
+# Cache (set REDIS_CACHE_URL to share it between processes)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'disbursify-dash',
+    }
+}
+
+if os.getenv('REDIS_CACHE_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_CACHE_URL'),
+        'KEY_PREFIX': 'dash',
+    }
+
+# Seconds a user's resolved memberships stay cached (signals invalidate earlier)
+ACCESS_SCOPE_CACHE_TIMEOUT = int(os.getenv('ACCESS_SCOPE_CACHE_TIMEOUT', 300))
+
 # Custom User Model
 AUTH_USER_MODEL = 'accounts.User'
 
@@ -147,6 +165,61 @@ REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'config.exceptions.custom_exception_handler',
 }
 
+# Dashboard: run its sections on separate threads/connections (off in tests)
+DASHBOARD_PARALLEL_QUERIES = os.getenv('DASHBOARD_PARALLEL_QUERIES', 'true').lower() == 'true'
+
+# Alerts: evaluate rules in a Celery task after each ledger commit (in the request when off)
+ALERTS_ASYNC = os.getenv('ALERTS_ASYNC', 'true').lower() == 'true'
+
+# Unusual expense scoring: weight of each new expense in its (business,
+# category) rolling statistics, and expenses needed before scoring
+ANOMALY_EWMA_ALPHA = float(os.getenv('ANOMALY_EWMA_ALPHA', 0.05))
+ANOMALY_MIN_HISTORY = int(os.getenv('ANOMALY_MIN_HISTORY', 10))
+
+# Seconds a business's cash-flow forecast stays cached; the key carries the
+# business's data version, so new transactions invalidate it earlier
+FORECAST_CACHE_TIMEOUT = int(os.getenv('FORECAST_CACHE_TIMEOUT', 86400))
+
+# Seconds a computed report stays cached (keys carry the organizations' data
+# versions), and the longest a request waits on another one computing it
+REPORT_CACHE_TIMEOUT = int(os.getenv('REPORT_CACHE_TIMEOUT', 3600))
+REPORT_CACHE_LOCK_TIMEOUT = int(os.getenv('REPORT_CACHE_LOCK_TIMEOUT', 60))
+
+# Transaction import
+TRANSACTION_IMPORT_BATCH_SIZE = int(os.getenv('TRANSACTION_IMPORT_BATCH_SIZE', 500))
+TRANSACTION_IMPORT_MAX_BATCH_SIZE = 5000
+TRANSACTION_IMPORT_MAX_ERRORS = 1000
+
+# Transaction export
+TRANSACTION_EXPORT_CHUNK_SIZE = int(os.getenv('TRANSACTION_EXPORT_CHUNK_SIZE', 2000))
+
+# Reconciliation: bank lines may post this many days either side of the entry
+RECONCILIATION_DATE_WINDOW_DAYS = int(os.getenv('RECONCILIATION_DATE_WINDOW_DAYS', 3))
+RECONCILIATION_SUGGEST_SCORE = float(os.getenv('RECONCILIATION_SUGGEST_SCORE', 0.45))
+RECONCILIATION_AUTO_CONFIRM_SCORE = float(os.getenv('RECONCILIATION_AUTO_CONFIRM_SCORE', 0.85))
+
+# Auto-categorization: one in-memory model per organization, least recently used evicted
+CATEGORIZER_CACHE_SIZE = int(os.getenv('CATEGORIZER_CACHE_SIZE', 64))
+CATEGORIZER_REFRESH_SECONDS = int(os.getenv('CATEGORIZER_REFRESH_SECONDS', 60))
+CATEGORIZER_MIN_TRAINING_ROWS = int(os.getenv('CATEGORIZER_MIN_TRAINING_ROWS', 20))
+CATEGORIZER_AUTO_APPLY_CONFIDENCE = float(os.getenv('CATEGORIZER_AUTO_APPLY_CONFIDENCE', 0.8))
+
+# Bank sync: provider name -> {'CLASS', 'CONCURRENCY', 'OPTIONS'}. Unconfigured
+# providers are never synced. BANK_SYNC_FAKE_PROVIDER serves both from the
+# in-process fake, for development and load tests.
+BANK_SYNC_PROVIDERS = {}
+if os.getenv('BANK_SYNC_FAKE_PROVIDER', 'false').lower() == 'true':
+    BANK_SYNC_PROVIDERS = {
+        name: {'CLASS': 'integrations.providers.fake.FakeProvider', 'CONCURRENCY': 16}
+        for name in ('mono', 'okra')
+    }
+BANK_SYNC_BATCH_SIZE = int(os.getenv('BANK_SYNC_BATCH_SIZE', 200))
+BANK_SYNC_INGEST_BATCH_SIZE = int(os.getenv('BANK_SYNC_INGEST_BATCH_SIZE', 1000))
+BANK_SYNC_LEASE_SECONDS = int(os.getenv('BANK_SYNC_LEASE_SECONDS', 600))
+BANK_SYNC_MAX_ATTEMPTS = int(os.getenv('BANK_SYNC_MAX_ATTEMPTS', 4))
+BANK_SYNC_BACKOFF_BASE = float(os.getenv('BANK_SYNC_BACKOFF_BASE', 0.5))
+BANK_SYNC_BACKOFF_MAX = float(os.getenv('BANK_SYNC_BACKOFF_MAX', 30))
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
@@ -179,6 +252,8 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Run tasks inline instead of through the broker (development without Redis)
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'false').lower() == 'true'
 
 # Email
 EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
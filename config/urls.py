@@ -41,6 +41,14 @@ def api_root(request):
                 'businesses': '/api/v1/businesses/',
                 'transactions': '/api/v1/transactions/',
                 'categories': '/api/v1/categories/',
+                'category_rules': '/api/v1/category-rules/',
+                'reconciliation_matches': '/api/v1/reconciliation-matches/',
+                'alerts': '/api/v1/alerts/',
+                'alert_rules': '/api/v1/alert-rules/',
+                'dashboard': '/api/v1/dashboard',
+                'profit_and_loss': '/api/v1/reports/profit-and-loss',
+                'cash_flow': '/api/v1/reports/cash-flow',
+                'report_jobs': '/api/v1/reports/jobs/',
                 'docs': '/api/docs/',
                 'health': '/health'
             }
@@ -64,6 +72,8 @@ urlpatterns = [
     path('api/v1/organizations/', include('organizations.urls')),
     path('api/v1/businesses/', include('businesses.urls')),
     path('api/v1/', include('transactions.urls')),  # transactions and categories
+    path('api/v1/', include('reports.urls')),  # dashboard and reports
+    path('api/v1/', include('alerts.urls')),  # alerts and alert rules
     
     # API Documentation
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
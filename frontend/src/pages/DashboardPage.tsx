@@ -1,21 +1,26 @@
 import React, { useEffect } from 'react';
 import { TrendingUp, TrendingDown, Building2, Receipt, AlertCircle, ArrowUpRight } from 'lucide-react';
 import { Card, CardHeader, CardTitle, CardContent, Button } from '../components/ui';
-import { useBusinessStore } from '../stores/businessStore';
+import { useDashboardStore } from '../stores/dashboardStore';
 import { useAuthStore } from '../stores/authStore';
 import { formatCurrency, formatNumber } from '../utils/format';
-import type { Business } from '../types';
+import type { Business, Transaction } from '../types';
 import './Dashboard.css';
 
 export const DashboardPage: React.FC = () => {
-    const { businesses, summary, fetchBusinesses, isLoading } = useBusinessStore();
+    const { dashboard, fetchDashboard, isLoading } = useDashboardStore();
     const { currentOrganizationId } = useAuthStore();
 
+    // One request loads every widget on the page
     useEffect(() => {
         if (currentOrganizationId) {
-            fetchBusinesses(currentOrganizationId);
+            fetchDashboard(currentOrganizationId);
         }
-    }, [currentOrganizationId, fetchBusinesses]);
+    }, [currentOrganizationId, fetchDashboard]);
+
+    const businesses = dashboard?.businesses || [];
+    const monthToDate = dashboard?.month_to_date;
+    const confirmedTransactions = businesses.reduce((count, b) => count + (b.transaction_count || 0), 0);
 
     return (
         <div className="dashboard">
@@ -36,11 +41,10 @@ export const DashboardPage: React.FC = () => {
                         </div>
                         <div className="stat-content">
                             <span className="stat-label">Total Balance</span>
-                            <span className="stat-value">{formatCurrency(summary?.total_balance || 0)}</span>
-                            <div className="stat-change positive">
-                                <TrendingUp />
-                                <span>+12.5% from last month</span>
-                            </div>
+                            <span className="stat-value">{formatCurrency(dashboard?.balance.total || 0)}</span>
+                            <span className="stat-subtext">
+                                Across {dashboard?.balance.business_count || 0} businesses
+                            </span>
                         </div>
                     </CardContent>
                 </Card>
@@ -52,7 +56,7 @@ export const DashboardPage: React.FC = () => {
                         </div>
                         <div className="stat-content">
                             <span className="stat-label">Total Income</span>
-                            <span className="stat-value">{formatCurrency(2450000)}</span>
+                            <span className="stat-value">{formatCurrency(monthToDate?.income || 0)}</span>
                             <span className="stat-subtext">This month</span>
                         </div>
                     </CardContent>
@@ -65,7 +69,7 @@ export const DashboardPage: React.FC = () => {
                         </div>
                         <div className="stat-content">
                             <span className="stat-label">Total Expenses</span>
-                            <span className="stat-value">{formatCurrency(890000)}</span>
+                            <span className="stat-value">{formatCurrency(monthToDate?.expense || 0)}</span>
                             <span className="stat-subtext">This month</span>
                         </div>
                     </CardContent>
@@ -78,8 +82,8 @@ export const DashboardPage: React.FC = () => {
                         </div>
                         <div className="stat-content">
                             <span className="stat-label">Transactions</span>
-                            <span className="stat-value">{formatNumber(156)}</span>
-                            <span className="stat-subtext">This month</span>
+                            <span className="stat-value">{formatNumber(confirmedTransactions)}</span>
+                            <span className="stat-subtext">Confirmed, all time</span>
                         </div>
                     </CardContent>
                 </Card>
@@ -122,7 +126,7 @@ export const DashboardPage: React.FC = () => {
                                         </div>
                                         <div className="business-balance">
                                             <span className="balance-amount">
-                                                {formatCurrency(business.current_balance)}
+                                                {formatCurrency(Number(business.current_balance))}
                                             </span>
                                             <span className="balance-label">Balance</span>
                                         </div>
@@ -139,28 +143,21 @@ export const DashboardPage: React.FC = () => {
                 {/* Recent Transactions */}
                 <Card className="dashboard-transactions">
                     <CardHeader action={<Button variant="ghost" size="sm">View All</Button>}>
-                        <CardTitle subtitle="Last 7 days">Recent Transactions</CardTitle>
+                        <CardTitle subtitle="Latest activity">Recent Transactions</CardTitle>
                     </CardHeader>
                     <CardContent>
                         <div className="transaction-list">
-                            {/* Placeholder transactions */}
-                            {[
-                                { description: 'Payment from Client A', amount: 150000, type: 'income', date: 'Today' },
-                                { description: 'Office Supplies', amount: -25000, type: 'expense', date: 'Today' },
-                                { description: 'Sales Revenue', amount: 320000, type: 'income', date: 'Yesterday' },
-                                { description: 'Utility Bills', amount: -45000, type: 'expense', date: 'Yesterday' },
-                                { description: 'Consulting Fee', amount: 200000, type: 'income', date: '2 days ago' },
-                            ].map((tx, i) => (
-                                <div key={i} className="transaction-item">
-                                    <div className={`transaction-icon ${tx.type}`}>
-                                        {tx.type === 'income' ? <TrendingUp /> : <TrendingDown />}
+                            {(dashboard?.recent_transactions || []).map((tx: Transaction) => (
+                                <div key={tx.id} className="transaction-item">
+                                    <div className={`transaction-icon ${tx.transaction_type}`}>
+                                        {tx.transaction_type === 'income' ? <TrendingUp /> : <TrendingDown />}
                                     </div>
                                     <div className="transaction-info">
                                         <span className="transaction-desc">{tx.description}</span>
-                                        <span className="transaction-date">{tx.date}</span>
+                                        <span className="transaction-date">{tx.business_name} · {tx.transaction_date}</span>
                                     </div>
-                                    <span className={`transaction-amount ${tx.type}`}>
-                                        {tx.type === 'income' ? '+' : ''}{formatCurrency(tx.amount)}
+                                    <span className={`transaction-amount ${tx.transaction_type}`}>
+                                        {tx.transaction_type === 'income' ? '+' : '-'}{formatCurrency(Number(tx.amount_ngn))}
                                     </span>
                                 </div>
                             ))}
@@ -171,7 +168,7 @@ export const DashboardPage: React.FC = () => {
                 {/* Alerts */}
                 <Card className="dashboard-alerts">
                     <CardHeader>
-                        <CardTitle subtitle="Action needed">Alerts</CardTitle>
+                        <CardTitle subtitle={`${dashboard?.unread_alerts || 0} unread`}>Alerts</CardTitle>
                     </CardHeader>
                     <CardContent>
                         <div className="alert-list">
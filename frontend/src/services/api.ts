@@ -126,11 +126,17 @@ export const organizationsApi = {
 };
 
 // Businesses API
+// Optional parts of the business responses, fetched in the same request
+export type BusinessInclude = 'stats' | 'bank_accounts';
+
 export const businessesApi = {
-    list: (organizationId?: string) =>
-        api.get('/businesses/', { params: { organization_id: organizationId } }),
+    list: (organizationId?: string, include: BusinessInclude[] = []) =>
+        api.get('/businesses/', {
+            params: { organization_id: organizationId, include: include.join(',') || undefined },
+        }),
 
-    get: (id: string) => api.get(`/businesses/${id}/`),
+    get: (id: string, include: BusinessInclude[] = []) =>
+        api.get(`/businesses/${id}/`, { params: { include: include.join(',') || undefined } }),
 
     create: (data: {
         organization_id: string;
@@ -219,3 +225,9 @@ export const categoriesApi = {
     list: (organizationId?: string) =>
         api.get('/categories/', { params: { organization_id: organizationId } }),
 };
+
+// Dashboard API
+export const dashboardApi = {
+    get: (organizationId?: string) =>
+        api.get('/dashboard', { params: { organization_id: organizationId } }),
+};
@@ -34,7 +34,7 @@ export const useBusinessStore = create<BusinessState>((set) => ({
     fetchBusinesses: async (organizationId) => {
         set({ isLoading: true, error: null });
         try {
-            const response = await businessesApi.list(organizationId);
+            const response = await businessesApi.list(organizationId, ['stats']);
             const { businesses, summary } = response.data.data;
             set({ businesses, summary, isLoading: false });
         } catch (error: any) {
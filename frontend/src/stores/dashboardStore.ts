@@ -0,0 +1,31 @@
+import { create } from 'zustand';
+import type { DashboardData } from '../types';
+import { dashboardApi } from '../services/api';
+
+interface DashboardState {
+    dashboard: DashboardData | null;
+    isLoading: boolean;
+    error: string | null;
+
+    // Actions
+    fetchDashboard: (organizationId?: string) => Promise<void>;
+}
+
+export const useDashboardStore = create<DashboardState>((set) => ({
+    dashboard: null,
+    isLoading: false,
+    error: null,
+
+    fetchDashboard: async (organizationId) => {
+        set({ isLoading: true, error: null });
+        try {
+            const response = await dashboardApi.get(organizationId);
+            set({ dashboard: response.data.data, isLoading: false });
+        } catch (error: any) {
+            set({
+                error: error.response?.data?.error?.message || 'Failed to load dashboard',
+                isLoading: false
+            });
+        }
+    },
+}));
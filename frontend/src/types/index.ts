@@ -58,7 +58,33 @@ export interface Business {
     current_balance: number;
     balance_updated_at: string | null;
     is_active: boolean;
-    transaction_count: number;
+    // Present on detail responses, and on list responses with ?include=stats
+    transaction_count?: number;
+    last_transaction_date?: string | null;
+    mtd_income?: string;
+    mtd_expense?: string;
+    // Present with ?include=bank_accounts
+    bank_accounts?: BankAccount[];
+    created_at: string;
+    updated_at: string;
+}
+
+export interface BankAccount {
+    id: string;
+    bank_name: string;
+    bank_code: string | null;
+    account_name: string | null;
+    masked_account_number: string;
+    account_type: string | null;
+    currency: string;
+    provider: 'mono' | 'okra' | 'manual';
+    sync_status: 'active' | 'paused' | 'failed' | 'disconnected';
+    last_synced_at: string | null;
+    current_balance: string | null;
+    available_balance: string | null;
+    balance_updated_at: string | null;
+    is_primary: boolean;
+    auto_sync_enabled: boolean;
     created_at: string;
     updated_at: string;
 }
@@ -181,3 +207,24 @@ export interface BusinessSummary {
     total_balance: number;
     currency: string;
 }
+
+export interface PeriodTotals {
+    income: number;
+    expense: number;
+    net: number;
+}
+
+export interface DashboardData {
+    as_of: string;
+    currency: string;
+    balance: {
+        total: number;
+        business_count: number;
+    };
+    businesses: Business[];
+    month_to_date: PeriodTotals;
+    year_to_date: PeriodTotals;
+    recent_transactions: Transaction[];
+    unread_alerts: number;
+    trend: { date: string; income: number; expense: number }[];
+}
@@ -0,0 +1,152 @@
+"""
+Statement Ingest
+
+Turns fetched statement lines into transactions, idempotently. Providers
+re-deliver lines from overlapping fetch windows, and occasionally correct
+a line they already sent, so each batch is upserted against the unique
+(bank_account, bank_transaction_id) constraint:
+
+- lines not stored yet are inserted;
+- stored lines whose bank-side details changed are updated in place;
+- stored lines that are unchanged are skipped.
+
+Inserts and updates go out in one ``bulk_create(update_conflicts=True)``
+per batch, and cached balances and rollups move once per batch through a
+ledger ChangeSet. New lines are categorized by the organization's rules,
+then the auto-categorizer, before the insert. Only bank-side fields are
+overwritten on update; the category, description and status a user may
+have edited are kept.
+"""
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+
+from transactions import categorizer, ledger, rules
+from transactions.models import Transaction
+
+
+TRANSACTION_TYPES = {'credit': 'income', 'debit': 'expense'}
+
+# Fields a re-delivered line may change
+BANK_FIELDS = ['transaction_date', 'transaction_type', 'amount', 'currency', 'bank_narration']
+UPDATE_FIELDS = BANK_FIELDS + ['amount_ngn', 'updated_at']
+UNIQUE_FIELDS = ['bank_account', 'bank_transaction_id']
+
+# Stored values needed to compare a line and to build its ledger delta
+STORED_FIELDS = list(dict.fromkeys(BANK_FIELDS + list(ledger.LEDGER_FIELDS)))
+
+
+class StatementIngest:
+    """Upserts statement lines for one account (a scheduler SyncJob)."""
+
+    def __init__(self, job, batch_size=None):
+        self.job = job
+        self.batch_size = batch_size or settings.BANK_SYNC_INGEST_BATCH_SIZE
+
+        self.lines = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+
+    def run(self, lines):
+        started = time.perf_counter()
+        for start in range(0, len(lines), self.batch_size):
+            batch = lines[start:start + self.batch_size]
+            self.lines += len(batch)
+            self._ingest_batch(batch)
+        return self.report(time.perf_counter() - started)
+
+    def report(self, duration):
+        return {
+            'lines': self.lines,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'skipped': self.skipped,
+            'duration_seconds': round(duration, 3),
+            'lines_per_second': round(self.lines / duration, 1) if duration > 0 else None,
+        }
+
+    def _ingest_batch(self, lines):
+        # A line repeated within the batch counts once; the last copy wins
+        incoming = {}
+        for line in lines:
+            incoming[line.bank_transaction_id] = line
+        self.skipped += len(lines) - len(incoming)
+
+        with db_transaction.atomic():
+            stored = {
+                row['bank_transaction_id']: row
+                for row in Transaction.objects.filter(
+                    bank_account_id=self.job.account_id,
+                    bank_transaction_id__in=list(incoming)
+                ).values('bank_transaction_id', *STORED_FIELDS)
+            }
+
+            rows = []
+            inserts = []
+            changes = ledger.ChangeSet()
+            for bank_id, line in incoming.items():
+                txn = transaction_for_line(self.job, line)
+                row = stored.get(bank_id)
+                if row is None:
+                    inserts.append(txn)
+                elif _changed(row, txn):
+                    self.updated += 1
+                    before = ledger.LedgerState(**{name: row[name] for name in ledger.LEDGER_FIELDS})
+                    changes.add(before, before._replace(
+                        transaction_date=txn.transaction_date,
+                        transaction_type=txn.transaction_type,
+                        currency=txn.currency,
+                        amount=txn.amount,
+                        amount_ngn=txn.amount_ngn,
+                    ))
+                else:
+                    self.skipped += 1
+                    continue
+                rows.append(txn)
+
+            # The category is part of the rollup key, so categorize before the ledger states
+            rules.apply(inserts)
+            categorizer.categorize(inserts)
+            self.inserted += len(inserts)
+            changes.extend((None, txn.ledger_state()) for txn in inserts)
+
+            if rows:
+                Transaction.objects.bulk_create(
+                    rows,
+                    update_conflicts=True,
+                    unique_fields=UNIQUE_FIELDS,
+                    update_fields=UPDATE_FIELDS,
+                )
+            changes.apply()
+
+
+def ingest_statement(job, lines, batch_size=None):
+    """Upsert ``job``'s statement lines; returns the StatementIngest report."""
+    return StatementIngest(job, batch_size).run(list(lines))
+
+
+def transaction_for_line(job, line):
+    txn = Transaction(
+        organization_id=job.organization_id,
+        business_id=job.business_id,
+        bank_account_id=job.account_id,
+        bank_transaction_id=line.bank_transaction_id,
+        bank_narration=line.narration,
+        transaction_date=line.date,
+        transaction_type=TRANSACTION_TYPES[line.direction],
+        amount=Decimal(line.amount).quantize(Decimal('0.01')),
+        currency=line.currency or job.currency,
+        category='uncategorized',
+        description=line.narration or 'Bank transaction',
+        payment_method='bank_transfer',
+        status='confirmed',
+    )
+    txn.amount_ngn = txn.compute_amount_ngn()
+    return txn
+
+
+def _changed(row, txn):
+    return any(row[name] != getattr(txn, name) for name in BANK_FIELDS)
@@ -0,0 +1,121 @@
+"""
+Benchmark idempotent statement ingest.
+
+Loads a statement into a fresh bank account, then replays a larger window
+that overlaps it (with a few corrected amounts), the way bank feeds
+re-deliver lines, and reports inserted/updated/skipped counts and
+throughput. A row-by-row sample shows what the same replay costs without
+batching. Point this at a scratch database:
+
+    python manage.py bench_bank_ingest --lines 100000 --overlap 0.5
+"""
+import random
+import time
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from businesses.models import BankAccount, Business
+from integrations.ingest import ingest_statement, transaction_for_line
+from integrations.providers import StatementLine
+from integrations.scheduler import SyncJob
+from organizations.models import Organization, TeamMember
+from transactions.models import Transaction
+
+
+BENCH_EMAIL = 'bank-ingest-bench@example.com'
+
+
+class Command(BaseCommand):
+    help = 'Measure idempotent bank line ingest on a replay with overlapping lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=100000, help='Lines in the replayed statement.')
+        parser.add_argument('--overlap', type=float, default=0.5, help='Share of replayed lines already stored.')
+        parser.add_argument('--changed', type=float, default=0.05, help='Share of overlapping lines with a new amount.')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--naive-sample', type=int, default=2000, help='Lines to ingest one row at a time.')
+
+    def handle(self, *args, **options):
+        job = self.make_job()
+        rng = random.Random(7)
+        total = options['lines']
+        stored = int(total * options['overlap'])
+        lines = [self.make_line(job, i, rng) for i in range(total)]
+
+        first = ingest_statement(job, lines[:stored], options['batch_size'])
+        self.stdout.write(f"initial load: {first['inserted']} lines in {first['duration_seconds']}s")
+
+        replay = list(lines)
+        for i in rng.sample(range(stored), int(stored * options['changed'])):
+            replay[i] = replay[i]._replace(amount=replay[i].amount + Decimal('1.00'))
+        rng.shuffle(replay)
+
+        report = ingest_statement(job, replay, options['batch_size'])
+        self.stdout.write(
+            f"replay: lines={report['lines']} inserted={report['inserted']} updated={report['updated']} "
+            f"skipped={report['skipped']} in {report['duration_seconds']}s "
+            f"({report['lines_per_second']} lines/s)"
+        )
+
+        again = ingest_statement(job, replay, options['batch_size'])
+        self.stdout.write(
+            f"identical replay: skipped={again['skipped']} in {again['duration_seconds']}s "
+            f"({again['lines_per_second']} lines/s)"
+        )
+
+        if options['naive_sample']:
+            rate = self.naive_rate(self.make_job(), lines[:options['naive_sample']])
+            self.stdout.write(f'row-by-row sample: {rate:.1f} lines/s')
+
+    def naive_rate(self, job, lines):
+        """Lines/s of the per-row approach: look up each line, then save it on its own."""
+        # Half the sample is already stored, matching the default overlap
+        for line in lines[:len(lines) // 2]:
+            transaction_for_line(job, line).save()
+        started = time.perf_counter()
+        for line in lines:
+            existing = Transaction.objects.filter(
+                bank_account_id=job.account_id, bank_transaction_id=line.bank_transaction_id
+            ).first()
+            if existing is None:
+                transaction_for_line(job, line).save()
+            elif existing.amount != line.amount:
+                existing.amount = line.amount
+                existing.save()
+        return len(lines) / (time.perf_counter() - started)
+
+    def make_job(self):
+        User = get_user_model()
+        user = User.objects.filter(email=BENCH_EMAIL).first()
+        if user is None:
+            user = User.objects.create_user(email=BENCH_EMAIL, password='Bench-pass-123')
+        org = Organization.objects.filter(owner=user).first()
+        if org is None:
+            org = Organization.objects.create(owner=user, name='Bank Ingest Benchmark')
+            TeamMember.objects.create(organization=org, user=user, role='owner', status='active')
+        business = Business.objects.filter(organization=org).first()
+        if business is None:
+            business = Business.objects.create(organization=org, name='Ingest Business')
+
+        # A new account per run, so every run starts from an empty statement
+        account = BankAccount.objects.create(
+            business=business, organization=org, bank_name='Fake Bank', account_number='0000000000',
+            provider='mono', provider_account_id=f'ingest-{uuid.uuid4().hex}'
+        )
+        return SyncJob(account.pk, business.pk, org.pk, 'mono', account.provider_account_id, '', 'NGN', None, 60, 0)
+
+    def make_line(self, job, i, rng):
+        direction = rng.choice(['credit', 'debit'])
+        return StatementLine(
+            bank_transaction_id=f'{job.provider_account_id}-{i}',
+            date=timezone.localdate() - timedelta(days=rng.randint(0, 365)),
+            direction=direction,
+            amount=Decimal(rng.randint(100, 1_000_000)) / 100,
+            currency='NGN',
+            narration=f'{direction.upper()} REF{rng.randint(10 ** 8, 10 ** 9)}',
+        )
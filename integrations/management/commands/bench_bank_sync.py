@@ -0,0 +1,105 @@
+"""
+Benchmark the bank sync worker against the fake provider.
+
+Creates (or reuses) an organization with many fake-provider accounts, marks
+them all due, and syncs them batch by batch, reporting throughput and the
+peak number of provider calls in flight. Point this at a scratch database:
+
+    python manage.py bench_bank_sync --accounts 2000 --concurrency 32 --latency 0.2
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from businesses.models import BankAccount, Business
+from integrations.providers import get_provider
+from integrations.worker import SyncWorker
+from organizations.models import Organization, TeamMember
+
+
+BENCH_EMAIL = 'bank-sync-bench@example.com'
+
+
+class Command(BaseCommand):
+    help = 'Measure bank sync throughput with the in-process fake provider.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--accounts', type=int, default=2000)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--latency', type=float, default=0.2, help='Mean provider latency in seconds.')
+        parser.add_argument('--error-rate', type=float, default=0.02)
+        parser.add_argument('--rate-limit-rate', type=float, default=0.02)
+
+    def handle(self, *args, **options):
+        org = self.seed(options['accounts'])
+        latency = options['latency']
+        providers = {
+            'mono': {
+                'CLASS': 'integrations.providers.fake.FakeProvider',
+                'CONCURRENCY': options['concurrency'],
+                'OPTIONS': {
+                    'latency': (latency / 2, latency * 1.5),
+                    'error_rate': options['error_rate'],
+                    'rate_limit_rate': options['rate_limit_rate'],
+                    'seed': 1,
+                },
+            },
+        }
+
+        # Every account is due, and the first sync fetches the full initial window
+        BankAccount.objects.filter(organization=org).update(
+            next_sync_at=None, last_synced_at=None, sync_status='active', sync_failures=0
+        )
+
+        with override_settings(BANK_SYNC_PROVIDERS=providers):
+            worker = SyncWorker(batch_size=options['batch_size'], backoff_base=latency / 2)
+            totals = SyncWorker.new_stats(0)
+            started = time.perf_counter()
+            while True:
+                stats = worker.run_once()
+                if not stats['accounts']:
+                    break
+                for key in totals:
+                    totals[key] += stats[key]
+            elapsed = time.perf_counter() - started
+            provider = get_provider('mono')
+
+        self.stdout.write(
+            f"accounts={totals['accounts']} synced={totals['synced']} failed={totals['failed']} "
+            f"retries={totals['retries']}"
+        )
+        self.stdout.write(
+            f"lines={totals['lines']} inserted={totals['inserted']} updated={totals['updated']} "
+            f"skipped={totals['skipped']} elapsed={elapsed:.2f}s"
+        )
+        self.stdout.write(
+            f"accounts/s={totals['accounts'] / elapsed:.1f} lines/s={totals['lines'] / elapsed:.1f} "
+            f"max in flight={provider.max_in_flight} (limit {options['concurrency']})"
+        )
+
+    def seed(self, account_count):
+        User = get_user_model()
+        user = User.objects.filter(email=BENCH_EMAIL).first()
+        if user is None:
+            user = User.objects.create_user(email=BENCH_EMAIL, password='Bench-pass-123')
+        org = Organization.objects.filter(owner=user).first()
+        if org is None:
+            org = Organization.objects.create(owner=user, name='Bank Sync Benchmark')
+            TeamMember.objects.create(organization=org, user=user, role='owner', status='active')
+        business = Business.objects.filter(organization=org).first()
+        if business is None:
+            business = Business.objects.create(organization=org, name='Synced Business')
+
+        existing = BankAccount.objects.filter(organization=org).count()
+        BankAccount.objects.bulk_create([
+            BankAccount(
+                business=business, organization=org, bank_name='Fake Bank',
+                account_number=f'{i:010}', provider='mono', provider_account_id=f'bench-{i}',
+                provider_access_token='token', sync_frequency_minutes=60,
+            )
+            for i in range(existing, account_count)
+        ])
+        return org
@@ -0,0 +1,38 @@
+"""
+Run the bank sync worker.
+
+Claims due accounts in batches and syncs them until stopped, sleeping
+between polls when nothing is due:
+
+    python manage.py run_bank_sync
+    python manage.py run_bank_sync --once
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from integrations.worker import SyncWorker
+
+
+class Command(BaseCommand):
+    help = 'Sync due bank accounts from their providers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Sync one batch and exit.')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--interval', type=float, default=30, help='Seconds to wait when nothing is due.')
+
+    def handle(self, *args, **options):
+        worker = SyncWorker(batch_size=options['batch_size'])
+        while True:
+            stats = worker.run_once()
+            if stats['accounts']:
+                self.stdout.write(
+                    f"Synced {stats['synced']}/{stats['accounts']} accounts, {stats['inserted']} new and "
+                    f"{stats['updated']} updated transactions, {stats['failed']} failed, {stats['retries']} retries "
+                    f"in {stats['duration_seconds']}s"
+                )
+            if options['once']:
+                return
+            if not stats['accounts']:
+                time.sleep(options['interval'])
@@ -0,0 +1,43 @@
+"""
+Bank Data Providers
+
+A provider fetches statements for linked bank accounts. Providers are
+configured per ``BankAccount.provider`` value in ``BANK_SYNC_PROVIDERS``:
+
+    BANK_SYNC_PROVIDERS = {
+        'mono': {'CLASS': 'integrations.providers.fake.FakeProvider', 'CONCURRENCY': 8},
+    }
+
+An account whose provider isn't configured is never synced, and linking
+one through the API answers 501.
+"""
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .base import (  # noqa: F401
+    AuthExpired, BankProvider, LinkedAccount, ProviderError, RateLimited,
+    Statement, StatementLine,
+)
+
+
+_instances = {}
+
+
+def get_provider(name):
+    """The configured provider instance for ``name``, or None."""
+    config = settings.BANK_SYNC_PROVIDERS.get(name)
+    if config is None:
+        return None
+    key = (name, repr(sorted(config.items())))
+    if key not in _instances:
+        provider_class = import_string(config['CLASS'])
+        _instances[key] = provider_class(
+            name=name,
+            concurrency=config.get('CONCURRENCY'),
+            **config.get('OPTIONS', {})
+        )
+    return _instances[key]
+
+
+def is_configured(name):
+    return name in settings.BANK_SYNC_PROVIDERS
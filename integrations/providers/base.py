@@ -0,0 +1,60 @@
+"""
+Provider Interface
+"""
+from collections import namedtuple
+
+
+# One statement line as delivered by the bank. ``amount`` is a positive
+# Decimal; ``direction`` says which way the money moved.
+StatementLine = namedtuple('StatementLine', [
+    'bank_transaction_id', 'date', 'direction', 'amount', 'currency', 'narration',
+])
+
+# A fetched statement: lines plus the balances reported alongside them
+Statement = namedtuple('Statement', ['lines', 'current_balance', 'available_balance'])
+
+# Account details returned when a user links an account
+LinkedAccount = namedtuple('LinkedAccount', [
+    'provider_account_id', 'access_token', 'bank_name', 'bank_code',
+    'account_name', 'account_number', 'account_type', 'currency',
+])
+
+
+class ProviderError(Exception):
+    """A failed provider call. Retryable unless the subclass says otherwise."""
+    retryable = True
+
+
+class RateLimited(ProviderError):
+
+    def __init__(self, message='Rate limited', retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AuthExpired(ProviderError):
+    """The account's access was revoked; the user has to re-link it."""
+    retryable = False
+
+
+class BankProvider:
+    """
+    Base class for bank data providers.
+
+    Methods are coroutines so many accounts can be fetched concurrently;
+    ``concurrency`` caps how many calls the worker makes at once.
+    """
+
+    default_concurrency = 4
+
+    def __init__(self, name, concurrency=None):
+        self.name = name
+        self.concurrency = concurrency or self.default_concurrency
+
+    async def link_account(self, access_code):
+        """Exchange the code from the provider's widget for a LinkedAccount."""
+        raise NotImplementedError
+
+    async def fetch_statement(self, provider_account_id, access_token, since):
+        """Statement lines dated on or after ``since``."""
+        raise NotImplementedError
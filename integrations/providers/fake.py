@@ -0,0 +1,99 @@
+"""
+Fake Provider
+
+An in-process provider for development, tests and offline load tests.
+Statements are generated deterministically from the account ID and date,
+so overlapping fetch windows re-deliver the same lines, as real feeds do.
+Latency, errors and rate limiting are simulated with asyncio sleeps and
+random failures.
+"""
+import asyncio
+import hashlib
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from .base import BankProvider, LinkedAccount, ProviderError, RateLimited, Statement, StatementLine
+
+
+NARRATIONS = {
+    'credit': ['POS SETTLEMENT', 'TRF FROM CUSTOMER', 'NIP TRANSFER IN', 'CASH DEPOSIT'],
+    'debit': ['NIP TRANSFER OUT', 'DIESEL PURCHASE', 'SALARY PAYMENT', 'RENT PAYMENT', 'SMS ALERT CHARGES'],
+}
+
+
+class FakeProvider(BankProvider):
+
+    default_concurrency = 16
+
+    def __init__(self, name, concurrency=None, latency=(0.05, 0.2), lines_per_day=(0, 6),
+                 error_rate=0.0, rate_limit_rate=0.0, seed=None):
+        super().__init__(name, concurrency)
+        self.latency = latency
+        self.lines_per_day = lines_per_day
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rng = random.Random(seed)
+
+        # Load-test counters
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def link_account(self, access_code):
+        digest = hashlib.sha1(access_code.encode()).hexdigest()
+        await asyncio.sleep(self.rng.uniform(*self.latency))
+        return LinkedAccount(
+            provider_account_id=f'fake-{digest[:20]}',
+            access_token=f'token-{digest[20:]}',
+            bank_name='Fake Bank',
+            bank_code='999',
+            account_name='Fake Account',
+            account_number=str(int(digest[:12], 16))[-10:].zfill(10),
+            account_type='current',
+            currency='NGN',
+        )
+
+    async def fetch_statement(self, provider_account_id, access_token, since):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.rng.uniform(*self.latency))
+            roll = self.rng.random()
+            if roll < self.rate_limit_rate:
+                raise RateLimited(retry_after=self.latency[0])
+            if roll < self.rate_limit_rate + self.error_rate:
+                raise ProviderError('Upstream timeout')
+            return self.statement(provider_account_id, since)
+        finally:
+            self.in_flight -= 1
+
+    def statement(self, provider_account_id, since):
+        lines = []
+        day = since
+        today = timezone.localdate()
+        while day <= today:
+            lines.extend(self.lines_for_day(provider_account_id, day))
+            day += timedelta(days=1)
+
+        balance = sum(
+            (line.amount if line.direction == 'credit' else -line.amount for line in lines),
+            Decimal('0')
+        )
+        return Statement(lines=lines, current_balance=balance, available_balance=balance)
+
+    def lines_for_day(self, provider_account_id, day):
+        rng = random.Random(f'{provider_account_id}:{day.isoformat()}')
+        for i in range(rng.randint(*self.lines_per_day)):
+            direction = rng.choice(['credit', 'debit'])
+            yield StatementLine(
+                bank_transaction_id=f'{provider_account_id}-{day:%Y%m%d}-{i}',
+                date=day,
+                direction=direction,
+                amount=Decimal(rng.randint(500, 5_000_000)) / 100,
+                currency='NGN',
+                narration=f'{rng.choice(NARRATIONS[direction])} REF{rng.randint(10 ** 8, 10 ** 9)}',
+            )
@@ -0,0 +1,64 @@
+"""
+Bank Sync Scheduler
+
+Claims bank accounts that are due for a sync. Claiming pushes an account's
+``next_sync_at`` forward by a lease, inside the same transaction that
+selected it with ``SELECT ... FOR UPDATE SKIP LOCKED``, so concurrent
+schedulers never hand the same account to two workers. If a worker dies
+mid-sync the lease simply expires and the account becomes due again.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from businesses.models import BankAccount
+
+
+SyncJob = namedtuple('SyncJob', [
+    'account_id', 'business_id', 'organization_id', 'provider', 'provider_account_id',
+    'access_token', 'currency', 'last_synced_at', 'sync_frequency_minutes', 'sync_failures',
+])
+
+
+def due_accounts(now=None):
+    """Active, auto-synced accounts of configured providers whose sync is due."""
+    now = now or timezone.now()
+    return BankAccount.objects.filter(
+        Q(next_sync_at__lte=now) | Q(next_sync_at__isnull=True),
+        sync_status='active',
+        auto_sync_enabled=True,
+        provider__in=list(settings.BANK_SYNC_PROVIDERS),
+        provider_account_id__isnull=False,
+    )
+
+
+def claim_due_accounts(limit=None, lease_seconds=None):
+    """Lease up to ``limit`` due accounts and return them as SyncJob tuples."""
+    limit = limit or settings.BANK_SYNC_BATCH_SIZE
+    lease_seconds = lease_seconds or settings.BANK_SYNC_LEASE_SECONDS
+    now = timezone.now()
+
+    with transaction.atomic():
+        accounts = list(
+            due_accounts(now)
+            .select_for_update(skip_locked=True)
+            .order_by(F('next_sync_at').asc(nulls_first=True))
+            .values_list(*_JOB_COLUMNS)[:limit]
+        )
+        if not accounts:
+            return []
+        BankAccount.objects.filter(pk__in=[row[0] for row in accounts]).update(
+            next_sync_at=now + timedelta(seconds=lease_seconds)
+        )
+
+    return [SyncJob(*row) for row in accounts]
+
+
+_JOB_COLUMNS = (
+    'id', 'business_id', 'organization_id', 'provider', 'provider_account_id',
+    'provider_access_token', 'currency', 'last_synced_at', 'sync_frequency_minutes', 'sync_failures',
+)
@@ -1,3 +1,276 @@
-from django.test import TestCase
+"""
+Integration Tests
+"""
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from businesses.models import BankAccount, Business
+from organizations.models import Organization, TeamMember
+from transactions.models import Transaction
+from . import providers
+from .ingest import ingest_statement
+from .providers import AuthExpired, RateLimited, StatementLine
+from .providers.fake import FakeProvider
+from .scheduler import SyncJob, claim_due_accounts
+from .worker import SyncWorker
+
+User = get_user_model()
+
+
+def fake_config(concurrency=4, provider_class='integrations.providers.fake.FakeProvider', **options):
+    options.setdefault('latency', (0, 0))
+    options.setdefault('lines_per_day', (1, 3))
+    return {'mono': {'CLASS': provider_class, 'CONCURRENCY': concurrency, 'OPTIONS': options}}
+
+
+class FlakyProvider(FakeProvider):
+    """Fails each account's first ``failures`` calls with the given error."""
+
+    def __init__(self, *args, failures=1, error='rate_limited', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.failures = failures
+        self.error = error
+        self.attempts = {}
+
+    async def fetch_statement(self, provider_account_id, access_token, since):
+        attempt = self.attempts[provider_account_id] = self.attempts.get(provider_account_id, 0) + 1
+        if attempt <= self.failures:
+            raise AuthExpired('Re-link required') if self.error == 'auth' else RateLimited(retry_after=0)
+        return await super().fetch_statement(provider_account_id, access_token, since)
+
+
+class BrokenProvider(FakeProvider):
+    """Raises an unexpected error for the first account."""
+
+    async def fetch_statement(self, provider_account_id, access_token, since):
+        if provider_account_id == 'acct-0':
+            raise RuntimeError('Unexpected response')
+        return await super().fetch_statement(provider_account_id, access_token, since)
+
+
+class BankSyncTestMixin:
+
+    def make_accounts(self, count, provider='mono'):
+        providers._instances.clear()
+        self.owner = User.objects.create_user(email='owner@example.com', password='Str0ng-pass!')
+        self.org = Organization.objects.create(owner=self.owner, name='Adebayo Holdings')
+        TeamMember.objects.create(organization=self.org, user=self.owner, role='owner', status='active')
+        self.business = Business.objects.create(organization=self.org, name='Shop')
+        return [
+            BankAccount.objects.create(
+                business=self.business, organization=self.org, bank_name='GTBank',
+                account_number=f'{i:010}', provider=provider, provider_account_id=f'acct-{i}',
+                provider_access_token='token'
+            )
+            for i in range(count)
+        ]
+
+
+@override_settings(BANK_SYNC_PROVIDERS=fake_config())
+class SchedulerTests(BankSyncTestMixin, TestCase):
+
+    def test_claims_due_accounts_once(self):
+        accounts = self.make_accounts(3)
+        BankAccount.objects.filter(pk=accounts[0].pk).update(next_sync_at=timezone.now() + timedelta(hours=1))
+        BankAccount.objects.filter(pk=accounts[1].pk).update(sync_status='paused')
+
+        jobs = claim_due_accounts(limit=10, lease_seconds=60)
+
+        self.assertEqual([job.account_id for job in jobs], [accounts[2].pk])
+        # The lease keeps the account from being claimed again
+        self.assertEqual(claim_due_accounts(limit=10), [])
+        accounts[2].refresh_from_db()
+        self.assertGreater(accounts[2].next_sync_at, timezone.now())
+
+    def test_skips_unconfigured_providers_and_respects_limit(self):
+        self.make_accounts(3)
+        BankAccount.objects.create(
+            business=self.business, organization=self.org, bank_name='Access',
+            account_number='9999999999', provider='okra', provider_account_id='okra-1'
+        )
+
+        self.assertEqual(len(claim_due_accounts(limit=2)), 2)
+        self.assertEqual(len(claim_due_accounts(limit=10)), 1)
+        self.assertEqual(claim_due_accounts(limit=10), [])
+
+
+class SyncWorkerTests(BankSyncTestMixin, TestCase):
+
+    @override_settings(BANK_SYNC_PROVIDERS=fake_config())
+    def test_sync_creates_transactions_and_updates_account(self):
+        account, = self.make_accounts(1)
+
+        stats = SyncWorker(batch_size=10).run_once()
+
+        self.assertEqual((stats['accounts'], stats['synced'], stats['failed']), (1, 1, 0))
+        transactions = Transaction.objects.filter(bank_account=account)
+        self.assertEqual(transactions.count(), stats['inserted'])
+        self.assertGreater(stats['inserted'], 0)
+
+        account.refresh_from_db()
+        self.assertEqual(account.sync_failures, 0)
+        self.assertIsNotNone(account.last_synced_at)
+        self.assertAlmostEqual(
+            (account.next_sync_at - account.last_synced_at).total_seconds(), 60 * 60, delta=1
+        )
+
+        # The business balance moves with the synced lines
+        self.business.refresh_from_db()
+        self.assertEqual(self.business.current_balance, account.current_balance)
+
+    @override_settings(BANK_SYNC_PROVIDERS=fake_config())
+    def test_overlapping_window_adds_no_duplicates(self):
+        account, = self.make_accounts(1)
+        SyncWorker().run_once()
+        count = Transaction.objects.filter(bank_account=account).count()
+
+        BankAccount.objects.filter(pk=account.pk).update(next_sync_at=None)
+        stats = SyncWorker().run_once()
+
+        self.assertGreater(stats['lines'], 0)
+        self.assertEqual(stats['inserted'], 0)
+        self.assertEqual(Transaction.objects.filter(bank_account=account).count(), count)
+
+    @override_settings(BANK_SYNC_PROVIDERS=fake_config(concurrency=3, latency=(0.005, 0.01)))
+    def test_provider_concurrency_is_bounded(self):
+        self.make_accounts(12)
+
+        stats = SyncWorker(batch_size=50).run_once()
+
+        self.assertEqual(stats['synced'], 12)
+        self.assertEqual(providers.get_provider('mono').max_in_flight, 3)
+
+    @override_settings(BANK_SYNC_PROVIDERS=fake_config(provider_class='integrations.tests.FlakyProvider'))
+    def test_rate_limited_calls_are_retried(self):
+        self.make_accounts(2)
+
+        stats = SyncWorker(backoff_base=0).run_once()
+
+        self.assertEqual((stats['synced'], stats['failed'], stats['retries']), (2, 0, 2))
+
+    @override_settings(BANK_SYNC_PROVIDERS=fake_config(provider_class='integrations.tests.FlakyProvider', failures=5))
+    def test_exhausted_retries_reschedule_with_backoff(self):
+        account, = self.make_accounts(1)
+
+        stats = SyncWorker(max_attempts=2, backoff_base=0).run_once()
+
+        self.assertEqual((stats['synced'], stats['failed']), (0, 1))
+        account.refresh_from_db()
+        self.assertEqual(account.sync_failures, 1)
+        self.assertEqual(account.sync_status, 'active')
+        self.assertGreater(account.next_sync_at, timezone.now() + timedelta(minutes=59))
+
+    @override_settings(BANK_SYNC_PROVIDERS=fake_config(provider_class='integrations.tests.BrokenProvider'))
+    def test_unexpected_error_fails_only_its_account(self):
+        broken, *others = self.make_accounts(3)
+
+        stats = SyncWorker().run_once()
+
+        self.assertEqual((stats['synced'], stats['failed']), (2, 1))
+        broken.refresh_from_db()
+        self.assertEqual(broken.sync_failures, 1)
+        self.assertEqual(broken.last_sync_error, 'Unexpected response')
+        for account in others:
+            account.refresh_from_db()
+            self.assertIsNotNone(account.last_synced_at)
+
+    @override_settings(BANK_SYNC_PROVIDERS=fake_config(provider_class='integrations.tests.FlakyProvider', error='auth'))
+    def test_expired_authorization_marks_account_failed(self):
+        account, = self.make_accounts(1)
+
+        stats = SyncWorker().run_once()
+
+        self.assertEqual(stats['retries'], 0)
+        account.refresh_from_db()
+        self.assertEqual(account.sync_status, 'failed')
+        self.assertIsNone(account.next_sync_at)
+
+
+class StatementIngestTests(BankSyncTestMixin, TestCase):
+
+    def setUp(self):
+        self.account, = self.make_accounts(1)
+        self.job = SyncJob(
+            self.account.pk, self.business.pk, self.org.pk, 'mono', 'acct-0', 'token', 'NGN', None, 60, 0
+        )
+        self.today = timezone.localdate()
+
+    def line(self, bank_id, amount, direction='credit', narration='POS SETTLEMENT'):
+        return StatementLine(bank_id, self.today, direction, Decimal(amount), 'NGN', narration)
+
+    def balance(self):
+        self.business.refresh_from_db()
+        return self.business.current_balance
+
+    def test_replay_inserts_updates_and_skips(self):
+        first = ingest_statement(self.job, [self.line('a', '100.00'), self.line('b', '50.00', 'debit')])
+        self.assertEqual((first['inserted'], first['updated'], first['skipped']), (2, 0, 0))
+        self.assertEqual(self.balance(), Decimal('50.00'))
+
+        # The user recategorizes a line; a later correction must not undo that
+        Transaction.objects.filter(bank_transaction_id='a').update(category='sales')
+
+        replay = ingest_statement(self.job, [
+            self.line('a', '120.00'), self.line('b', '50.00', 'debit'), self.line('c', '10.00'),
+        ])
+
+        self.assertEqual((replay['inserted'], replay['updated'], replay['skipped']), (1, 1, 1))
+        self.assertEqual(Transaction.objects.filter(bank_account=self.account).count(), 3)
+        corrected = Transaction.objects.get(bank_transaction_id='a')
+        self.assertEqual((corrected.amount, corrected.category), (Decimal('120.00'), 'sales'))
+        self.assertEqual(self.balance(), Decimal('80.00'))
+
+    def test_repeats_within_a_batch_count_once(self):
+        report = ingest_statement(
+            self.job, [self.line('a', '10.00'), self.line('a', '10.00'), self.line('b', '5.00')], batch_size=2
+        )
+
+        self.assertEqual((report['lines'], report['inserted'], report['skipped']), (3, 2, 1))
+        self.assertEqual(self.balance(), Decimal('15.00'))
+
+    def test_database_rejects_duplicate_bank_lines(self):
+        ingest_statement(self.job, [self.line('a', '10.00')])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Transaction.objects.create(
+                organization=self.org, business=self.business, bank_account=self.account,
+                bank_transaction_id='a', transaction_date=self.today, transaction_type='income',
+                amount='10.00', category='uncategorized', description='Copy'
+            )
+
+
+class LinkBankAccountTests(BankSyncTestMixin, TestCase):
+
+    def setUp(self):
+        self.make_accounts(0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.url = f'/api/v1/businesses/{self.business.id}/bank_accounts/'
+
+    @override_settings(BANK_SYNC_PROVIDERS={})
+    def test_unconfigured_provider_is_not_implemented(self):
+        response = self.client.post(self.url, {'provider': 'mono', 'access_code': 'code'}, format='json')
+        self.assertEqual(response.status_code, 501)
+
+    @override_settings(BANK_SYNC_PROVIDERS=fake_config())
+    def test_links_account_due_for_sync(self):
+        response = self.client.post(self.url, {'provider': 'mono', 'access_code': 'code'}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        account = BankAccount.objects.get(business=self.business)
+        self.assertEqual(account.provider, 'mono')
+        self.assertEqual(account.sync_status, 'active')
+        self.assertEqual([job.account_id for job in claim_due_accounts()], [account.pk])
+
+        again = self.client.post(self.url, {'provider': 'mono', 'access_code': 'code'}, format='json')
+        self.assertEqual(again.status_code, 409)
+
+    @override_settings(BANK_SYNC_PROVIDERS=fake_config())
+    def test_access_code_is_required(self):
+        response = self.client.post(self.url, {'provider': 'mono'}, format='json')
+        self.assertEqual(response.status_code, 400)
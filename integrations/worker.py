@@ -0,0 +1,165 @@
+"""
+Bank Sync Worker
+
+Syncs a batch of claimed accounts concurrently on one asyncio event loop.
+Provider calls are capped per provider by a semaphore (``CONCURRENCY`` in
+``BANK_SYNC_PROVIDERS``) and retried with exponential backoff and full
+jitter; database writes run through ``sync_to_async`` on the worker's
+single database thread.
+
+An account that still fails after the last attempt keeps its status and is
+rescheduled further out each time (``sync_failures`` counts the streak);
+an expired authorization marks it ``failed`` until the user re-links it.
+Unexpected errors, such as a failed ingest, are logged and count as a
+failure of that account alone; the rest of the batch carries on.
+"""
+import asyncio
+import logging
+import random
+import time
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from businesses.models import BankAccount, Business
+from .ingest import ingest_statement
+from .providers import AuthExpired, ProviderError, RateLimited, get_provider
+from .scheduler import claim_due_accounts
+
+logger = logging.getLogger(__name__)
+
+
+# Statement window: re-fetch a little before the last sync to catch late
+# postings, or this far back the first time an account syncs
+SYNC_OVERLAP_DAYS = 2
+INITIAL_SYNC_DAYS = 90
+
+# Longest gap between attempts for an account that keeps failing
+MAX_FAILURE_DELAY = timedelta(hours=24)
+
+
+class SyncWorker:
+    """Claims due accounts and syncs them, one batch per ``run_once`` call."""
+
+    def __init__(self, batch_size=None, max_attempts=None, backoff_base=None, backoff_max=None):
+        self.batch_size = batch_size or settings.BANK_SYNC_BATCH_SIZE
+        self.max_attempts = max_attempts or settings.BANK_SYNC_MAX_ATTEMPTS
+        self.backoff_base = settings.BANK_SYNC_BACKOFF_BASE if backoff_base is None else backoff_base
+        self.backoff_max = settings.BANK_SYNC_BACKOFF_MAX if backoff_max is None else backoff_max
+        self._semaphores = {}
+
+    def run_once(self):
+        """Sync one batch of due accounts and return its stats."""
+        started = time.perf_counter()
+        jobs = claim_due_accounts(limit=self.batch_size)
+        stats = self.new_stats(len(jobs))
+        if jobs:
+            async_to_sync(self.sync_batch)(jobs, stats)
+        stats['duration_seconds'] = round(time.perf_counter() - started, 3)
+        return stats
+
+    @staticmethod
+    def new_stats(accounts):
+        return {
+            'accounts': accounts, 'synced': 0, 'failed': 0, 'retries': 0,
+            'lines': 0, 'inserted': 0, 'updated': 0, 'skipped': 0,
+        }
+
+    async def sync_batch(self, jobs, stats):
+        # Semaphores belong to the event loop of this batch
+        self._semaphores = {}
+        await asyncio.gather(*(self.sync_account(job, stats) for job in jobs))
+
+    async def sync_account(self, job, stats):
+        try:
+            provider = get_provider(job.provider)
+            statement = await self.fetch(provider, job, self.statement_start(job), stats)
+            report = await sync_to_async(record_success)(job, statement)
+        except Exception as exc:
+            stats['failed'] += 1
+            if isinstance(exc, ProviderError):
+                logger.warning('Bank sync failed for account %s: %s', job.account_id, exc)
+            else:
+                logger.exception('Bank sync failed for account %s', job.account_id)
+            try:
+                await sync_to_async(record_failure)(job, exc)
+            except Exception:
+                logger.exception('Could not record the bank sync failure of account %s', job.account_id)
+            return
+
+        stats['synced'] += 1
+        for key in ('lines', 'inserted', 'updated', 'skipped'):
+            stats[key] += report[key]
+
+    async def fetch(self, provider, job, since, stats):
+        """Fetch a statement, retrying retryable errors with backoff."""
+        semaphore = self.semaphore(provider)
+        for attempt in range(self.max_attempts):
+            try:
+                # Only the call holds a slot; backoff sleeps don't
+                async with semaphore:
+                    return await provider.fetch_statement(job.provider_account_id, job.access_token, since)
+            except ProviderError as exc:
+                if not exc.retryable or attempt == self.max_attempts - 1:
+                    raise
+                stats['retries'] += 1
+                await asyncio.sleep(self.backoff_delay(attempt, exc))
+
+    def backoff_delay(self, attempt, exc=None):
+        """Full jitter: uniform over [0, min(max, base * 2^attempt)], honouring Retry-After."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if isinstance(exc, RateLimited) and exc.retry_after:
+            delay = max(delay, exc.retry_after)
+        return delay
+
+    def semaphore(self, provider):
+        if provider.name not in self._semaphores:
+            self._semaphores[provider.name] = asyncio.Semaphore(provider.concurrency)
+        return self._semaphores[provider.name]
+
+    @staticmethod
+    def statement_start(job):
+        if job.last_synced_at is None:
+            return timezone.localdate() - timedelta(days=INITIAL_SYNC_DAYS)
+        return timezone.localdate(job.last_synced_at) - timedelta(days=SYNC_OVERLAP_DAYS)
+
+
+def record_success(job, statement):
+    now = timezone.now()
+    with transaction.atomic():
+        report = ingest_statement(job, statement.lines)
+        BankAccount.objects.filter(pk=job.account_id).update(
+            sync_status='active',
+            sync_failures=0,
+            last_sync_error=None,
+            last_synced_at=now,
+            next_sync_at=now + timedelta(minutes=job.sync_frequency_minutes),
+            current_balance=statement.current_balance,
+            available_balance=statement.available_balance,
+            balance_updated_at=now,
+        )
+        Business.bump_data_version([job.business_id], [job.organization_id])
+    return report
+
+
+def record_failure(job, exc):
+    if isinstance(exc, AuthExpired):
+        changes = {'sync_status': 'failed', 'next_sync_at': None}
+    else:
+        changes = {'next_sync_at': timezone.now() + failure_delay(job)}
+
+    BankAccount.objects.filter(pk=job.account_id).update(
+        sync_failures=F('sync_failures') + 1,
+        last_sync_error=str(exc)[:1000],
+        **changes
+    )
+
+
+def failure_delay(job):
+    """Next attempt after the sync frequency, doubled per consecutive failure."""
+    delay = timedelta(minutes=job.sync_frequency_minutes) * 2 ** min(job.sync_failures, 10)
+    return min(delay, MAX_FAILURE_DELAY)
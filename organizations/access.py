@@ -0,0 +1,318 @@
+"""
+Access Scope
+
+Resolves what a user can see — organizations, roles and business access —
+from their active team memberships, and exposes it as query filters
+(organization IDs and subqueries) rather than materialized lists of every
+business ID.
+
+The resolved memberships are kept in the Django cache between requests,
+one entry per user and generation. The signal handlers in ``signals.py``
+bump a user's generation whenever a membership, a business's archive state
+or an organization changes, so an entry resolved before the change is
+cached under a key nobody reads any more, however late it is written.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .models import TeamMember
+
+
+FULL_ACCESS_ROLES = ('owner', 'admin')
+
+
+class ScopeEntry(namedtuple('ScopeEntry', ['role', 'granted', 'denied', 'business_ids'])):
+    """
+    One membership reduced to what access checks need.
+
+    ``granted`` and ``denied`` are the role permissions with overrides
+    applied; ``business_ids`` holds the accessible business IDs as strings
+    (possibly none), or None when the member's role sees every business of
+    the organization.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_member(cls, member, business_ids=None):
+        granted = set(TeamMember.ROLE_PERMISSIONS.get(member.role, ()))
+        denied = set()
+        for permission, allowed in member.permissions_override.items():
+            (granted if allowed else denied).add(permission)
+        return cls(member.role, frozenset(granted), frozenset(denied), business_ids)
+
+    @property
+    def has_full_access(self):
+        return self.business_ids is None
+
+    def has_permission(self, permission):
+        if permission in self.denied:
+            return False
+        return '*' in self.granted or permission in self.granted
+
+
+class AccessScope:
+    """
+    A user's active memberships as ScopeEntry objects, keyed by organization ID.
+
+    Owners and admins see every non-archived business of their organization.
+    Other roles see only the businesses listed in ``business_access``; an
+    empty list means none.
+    """
+
+    FULL_ACCESS_ROLES = FULL_ACCESS_ROLES
+
+    def __init__(self, user, memberships):
+        self.user = user
+        self.memberships = dict(memberships)
+
+    @classmethod
+    def for_user(cls, user):
+        """The user's scope, from the cache when possible."""
+        # The generation is read before resolving: an invalidation after this
+        # point moves readers to a new key, away from what we cache below
+        key = cache_key(user.pk, generation(user.pk))
+        memberships = cache.get(key)
+        if memberships is None:
+            _count('misses')
+            memberships = resolve_memberships(user)
+            cache.set(key, memberships, settings.ACCESS_SCOPE_CACHE_TIMEOUT)
+        else:
+            _count('hits')
+        return cls(user, memberships)
+
+    @classmethod
+    def for_request(cls, request):
+        """The request user's scope, resolved on first use and reused after."""
+        scope = getattr(request, '_access_scope', None)
+        if scope is None or scope.user != request.user:
+            scope = cls.for_user(request.user)
+            request._access_scope = scope
+        return scope
+
+    # Organizations
+
+    @property
+    def organization_ids(self):
+        return list(self.memberships)
+
+    def membership(self, organization_id):
+        return self.memberships.get(_as_uuid(organization_id))
+
+    def has_permission(self, organization_id, permission):
+        membership = self.membership(organization_id)
+        return bool(membership and membership.has_permission(permission))
+
+    def organizations_with_permission(self, permission):
+        return [org_id for org_id, m in self.memberships.items() if m.has_permission(permission)]
+
+    def fingerprint(self):
+        """Stable digest of the memberships, for ETags and cache keys."""
+        parts = sorted(
+            (
+                str(org_id), m.role, sorted(m.granted), sorted(m.denied),
+                None if m.business_ids is None else sorted(m.business_ids),
+            )
+            for org_id, m in self.memberships.items()
+        )
+        return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+    def restrict(self, organization_id):
+        """A scope limited to one organization (empty if not a member)."""
+        membership = self.membership(organization_id)
+        return AccessScope(self.user, [(_as_uuid(organization_id), membership)] if membership else [])
+
+    # Businesses
+
+    def business_filter(self, prefix=''):
+        """Q matching the accessible businesses, relative to ``prefix``."""
+        full_orgs = []
+        condition = Q()
+        for org_id, m in self.memberships.items():
+            if m.has_full_access:
+                full_orgs.append(org_id)
+            elif m.business_ids:
+                condition |= Q(**{
+                    f'{prefix}organization_id': org_id,
+                    f'{prefix}id__in': m.business_ids,
+                })
+
+        condition |= Q(**{f'{prefix}organization_id__in': full_orgs})
+        return condition & Q(**{f'{prefix}archived_at__isnull': True})
+
+    def businesses(self):
+        from businesses.models import Business
+
+        if not self.memberships:
+            return Business.objects.none()
+        return Business.objects.filter(self.business_filter())
+
+    def can_access_business(self, business):
+        """Whether a Business instance is within this scope, without a query."""
+        membership = self.memberships.get(business.organization_id)
+        if membership is None or business.archived_at is not None:
+            return False
+        return membership.has_full_access or str(business.pk) in membership.business_ids
+
+    # Transactions
+
+    def transactions(self):
+        """Transactions of the accessible businesses, filtered by subquery."""
+        from transactions.models import Transaction
+
+        if not self.memberships:
+            return Transaction.objects.none()
+        return Transaction.objects.filter(
+            organization_id__in=self.organization_ids,
+            business_id__in=self.businesses().values('id')
+        )
+
+
+class AccessScopeMixin:
+    """ViewSet mixin exposing the request user's scope, narrowed by ?organization_id=."""
+
+    def get_scope(self):
+        scope = AccessScope.for_request(self.request)
+        org_id = self.request.query_params.get('organization_id')
+        if org_id:
+            scope = scope.restrict(org_id)
+        return scope
+
+
+# Cache
+
+CACHE_KEY_PREFIX = 'access-scope:v2'
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def cache_key(user_id, generation):
+    return f'{CACHE_KEY_PREFIX}:{user_id}:{generation}'
+
+
+def generation_key(user_id):
+    return f'{CACHE_KEY_PREFIX}:generation:{user_id}'
+
+
+def generation(user_id):
+    """The user's current cache generation, started if there is none."""
+    key = generation_key(user_id)
+    value = cache.get(key)
+    if value is None:
+        # Started from the clock, so a counter lost to eviction never comes
+        # back to a generation that already has entries
+        cache.add(key, time.time_ns(), None)
+        value = cache.get(key)
+    return value
+
+
+def resolve_memberships(user):
+    """
+    Build the user's ScopeEntry list from the database.
+
+    Restricted members' ``business_access`` lists are resolved against the
+    live, non-archived businesses of their organization, so IDs of archived
+    or deleted businesses never reach the cache.
+    """
+    from businesses.models import Business
+
+    members = list(TeamMember.objects.filter(
+        user=user,
+        status='active',
+        organization__deleted_at__isnull=True
+    ).only('organization_id', 'role', 'business_access', 'permissions_override'))
+
+    restricted = Q()
+    for m in members:
+        if m.role not in FULL_ACCESS_ROLES and m.business_access:
+            restricted |= Q(organization_id=m.organization_id, id__in=m.business_access)
+
+    granted = {}
+    if restricted:
+        rows = Business.objects.filter(restricted, archived_at__isnull=True).values_list('organization_id', 'id')
+        for org_id, business_id in rows:
+            granted.setdefault(org_id, set()).add(str(business_id))
+
+    entries = []
+    for m in members:
+        business_ids = None
+        if m.role not in FULL_ACCESS_ROLES:
+            business_ids = frozenset(granted.get(m.organization_id, ()))
+        entries.append((m.organization_id, ScopeEntry.from_member(m, business_ids)))
+    return entries
+
+
+def invalidate_user(user_id):
+    _bump_generations([user_id])
+
+
+def invalidate_organization(organization_id):
+    """Drop the cached scope of every member of an organization."""
+    from .models import Organization
+
+    user_ids = set(TeamMember.objects.filter(
+        organization_id=organization_id,
+        user__isnull=False
+    ).values_list('user_id', flat=True))
+    user_ids.update(Organization.objects.filter(pk=organization_id).values_list('owner_id', flat=True))
+    _bump_generations(user_ids)
+
+
+def _bump_generations(user_ids):
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    _count('invalidations', len(user_ids))
+    _bump(user_ids)
+    # A request that starts before this transaction commits reads the new
+    # generation but the old rows; bumping again after commit retires it.
+    transaction.on_commit(lambda: _bump(user_ids))
+
+
+def _bump(user_ids):
+    for user_id in user_ids:
+        key = generation_key(user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), None)
+
+
+def cache_stats():
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+        invalidations = _stats['invalidations']
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'invalidations': invalidations,
+        'hit_rate': round(hits / lookups, 4) if lookups else None,
+    }
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def _as_uuid(value):
+    if isinstance(value, uuid.UUID):
+        return value
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
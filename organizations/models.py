@@ -2,7 +2,8 @@
 Organization and Team Member Models
 """
 import uuid
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.conf import settings
 
 
@@ -58,6 +59,9 @@ class Organization(models.Model):
     # Settings
     settings = models.JSONField(default=dict, blank=True)
     
+    # Bumped on every write to the organization's data; ETags are built from it
+    data_version = models.BigIntegerField(default=0)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -74,6 +78,25 @@ class Organization(models.Model):
     def __str__(self):
         return self.name
     
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            return super().save(*args, **kwargs)
+        
+        if kwargs.get('update_fields') is None:
+            # Never write back a stale in-memory data_version
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != 'data_version'
+            ]
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Organization.bump_data_version([self.pk])
+    
+    @classmethod
+    def bump_data_version(cls, organization_ids):
+        """Increment the data version of the given organizations."""
+        cls.objects.filter(pk__in=organization_ids).update(data_version=F('data_version') + 1)
+    
     @property
     def is_active(self):
         return self.subscription_status in ['trialing', 'active']
@@ -109,6 +132,15 @@ class TeamMember(models.Model):
         ('removed', 'Removed'),
     ]
     
+    ROLE_PERMISSIONS = {
+        'owner': frozenset(['*']),  # All permissions
+        'admin': frozenset(['manage_team', 'manage_businesses', 'add_transactions',
+                            'edit_transactions', 'delete_transactions', 'view_reports', 'export']),
+        'accountant': frozenset(['add_transactions', 'edit_transactions', 'view_reports', 'export']),
+        'manager': frozenset(['view_reports', 'add_transactions']),
+        'viewer': frozenset(['view_reports']),
+    }
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     organization = models.ForeignKey(
         Organization,
@@ -165,19 +197,10 @@ class TeamMember(models.Model):
     
     def has_permission(self, permission):
         """Check if team member has a specific permission."""
-        role_permissions = {
-            'owner': ['*'],  # All permissions
-            'admin': ['manage_team', 'manage_businesses', 'add_transactions', 
-                     'edit_transactions', 'delete_transactions', 'view_reports', 'export'],
-            'accountant': ['add_transactions', 'edit_transactions', 'view_reports', 'export'],
-            'manager': ['view_reports', 'add_transactions'],
-            'viewer': ['view_reports'],
-        }
-        
         # Check override first
         if permission in self.permissions_override:
             return self.permissions_override[permission]
         
         # Check role permissions
-        perms = role_permissions.get(self.role, [])
+        perms = self.ROLE_PERMISSIONS.get(self.role, frozenset())
         return '*' in perms or permission in perms
@@ -27,9 +27,13 @@ class OrganizationSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'owner', 'subscription_tier', 'subscription_status', 'created_at', 'updated_at']
     
     def get_business_count(self, obj):
+        if hasattr(obj, 'active_business_count'):
+            return obj.active_business_count
         return obj.businesses.filter(is_active=True).count()
     
     def get_member_count(self, obj):
+        if hasattr(obj, 'active_member_count'):
+            return obj.active_member_count
         return obj.team_members.filter(status='active').count()
     
     def get_tier_limits(self, obj):
@@ -0,0 +1,46 @@
+"""
+Organization Signals
+
+Keep the cached access scopes (see ``access.py``) in step with the rows
+they are derived from.
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import access
+from .models import Organization, TeamMember
+
+
+@receiver(post_save, sender=TeamMember)
+@receiver(post_delete, sender=TeamMember)
+def team_member_changed(sender, instance, **kwargs):
+    if instance.user_id:
+        access.invalidate_user(instance.user_id)
+    # Team listings and member counts are part of the organization's data
+    Organization.bump_data_version([instance.organization_id])
+
+
+@receiver(post_save, sender='businesses.Business')
+def business_saved(sender, instance, created, **kwargs):
+    # New businesses can't be in anyone's business_access list yet
+    if created:
+        return
+    if getattr(instance, '_loaded_archived_at', ...) != instance.archived_at:
+        access.invalidate_organization(instance.organization_id)
+
+
+@receiver(post_delete, sender='businesses.Business')
+def business_deleted(sender, instance, **kwargs):
+    access.invalidate_organization(instance.organization_id)
+
+
+@receiver(post_save, sender=Organization)
+def organization_saved(sender, instance, created, **kwargs):
+    if not created:
+        access.invalidate_organization(instance.pk)
+
+
+@receiver(pre_delete, sender=Organization)
+def organization_deleted(sender, instance, **kwargs):
+    # Before the cascade removes the team members we need to find
+    access.invalidate_organization(instance.pk)
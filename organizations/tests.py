@@ -1,3 +1,294 @@
+"""
+Organization Tests
+"""
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from alerts.models import Alert
+from businesses.models import Business
+from transactions.models import Transaction
+from . import access
+from .access import AccessScope
+from .models import Organization, TeamMember
+
+User = get_user_model()
+
+
+class AccessScopeQueryCountTests(TestCase):
+    """Scope resolution costs the same number of queries however much a user can see."""
+
+    def setUp(self):
+        cache.clear()
+
+    ENDPOINTS = ['/api/v1/transactions/', '/api/v1/businesses/', '/api/v1/organizations/']
+
+    def make_user(self, email, org_count, businesses_per_org, role='owner'):
+        user = User.objects.create_user(email=email, password='Str0ng-pass!')
+        for i in range(org_count):
+            owner = user if role == 'owner' else User.objects.create_user(email=f'{i}-{email}', password='Str0ng-pass!')
+            org = Organization.objects.create(owner=owner, name=f'Org {i}')
+            businesses = [
+                Business.objects.create(organization=org, name=f'Business {i}.{j}')
+                for j in range(businesses_per_org)
+            ]
+            TeamMember.objects.create(
+                organization=org, user=user, role=role, status='active',
+                business_access=[str(b.id) for b in businesses[::2]] if role == 'manager' else []
+            )
+            for business in businesses:
+                Transaction.objects.create(
+                    organization=org, business=business, transaction_date='2026-01-05',
+                    transaction_type='income', amount='10.00', category='sales', description='Sale'
+                )
+        return user
+
+    def test_constant_queries_regardless_of_memberships_and_businesses(self):
+        small = self.make_user('small@example.com', org_count=1, businesses_per_org=1)
+        owner = self.make_user('owner@example.com', org_count=5, businesses_per_org=12)
+        manager = self.make_user('manager@example.com', org_count=4, businesses_per_org=10, role='manager')
+
+        for url in self.ENDPOINTS:
+            with self.subTest(url=url):
+                baseline = self._query_count(small, url)
+                self.assertEqual(self._query_count(owner, url), baseline)
+                self.assertEqual(self._query_count(manager, url), baseline)
+
+    def test_restricted_members_only_see_granted_businesses(self):
+        manager = self.make_user('manager@example.com', org_count=2, businesses_per_org=4, role='manager')
+        scope = AccessScope.for_user(manager)
+
+        self.assertEqual(scope.businesses().count(), 4)
+        self.assertEqual(scope.transactions().count(), 4)
+        self.assertEqual(scope.restrict(scope.organization_ids[0]).businesses().count(), 2)
+
+    def test_restricted_members_without_business_access_see_nothing(self):
+        viewer = self.make_user('viewer@example.com', org_count=1, businesses_per_org=3, role='viewer')
+        scope = AccessScope.for_user(viewer)
+
+        self.assertEqual(scope.businesses().count(), 0)
+        self.assertEqual(scope.transactions().count(), 0)
+        self.assertFalse(scope.can_access_business(Business.objects.first()))
+
+    def _query_count(self, user, url):
+        client = APIClient()
+        client.force_authenticate(user)
+        # Count the steady state, with the user's scope already cached
+        client.get(url)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+
+class AccessScopeCacheTests(TestCase):
+    """Cached scopes are reused across requests and never outlive the rows they came from."""
+
+    def setUp(self):
+        cache.clear()
+        access.reset_cache_stats()
+        owner = User.objects.create_user(email='owner@example.com', password='Str0ng-pass!')
+        self.org = Organization.objects.create(owner=owner, name='Acme Holdings')
+        self.shop = Business.objects.create(organization=self.org, name='Shop')
+        self.kiosk = Business.objects.create(organization=self.org, name='Kiosk')
+
+        self.user = User.objects.create_user(email='staff@example.com', password='Str0ng-pass!')
+        self.member = TeamMember.objects.create(
+            organization=self.org, user=self.user, role='accountant', status='active'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_repeat_lookups_are_served_from_cache(self):
+        AccessScope.for_user(self.user)
+        with self.assertNumQueries(0):
+            scope = AccessScope.for_user(self.user)
+
+        self.assertTrue(scope.has_permission(self.org.id, 'export'))
+        self.assertEqual(access.cache_stats()['hits'], 1)
+        self.assertEqual(access.cache_stats()['misses'], 1)
+
+    def test_role_change_is_never_served_stale(self):
+        self.member.business_access = [str(self.shop.id)]
+        self.member.save()
+        self.assertEqual(self.create_transaction().status_code, 201)
+
+        self.member.role = 'viewer'
+        self.member.save()
+
+        self.assertFalse(AccessScope.for_user(self.user).has_permission(self.org.id, 'add_transactions'))
+        self.assertEqual(self.create_transaction().status_code, 403)
+
+    def test_scope_resolved_before_an_invalidation_is_not_served_after_it(self):
+        resolve = access.resolve_memberships
+
+        def resolve_then_change_role(user):
+            # The membership changes after the old rows were read but before they are cached
+            memberships = resolve(user)
+            self.member.role = 'viewer'
+            self.member.save()
+            return memberships
+
+        with mock.patch.object(access, 'resolve_memberships', side_effect=resolve_then_change_role):
+            stale = AccessScope.for_user(self.user)
+        self.assertTrue(stale.has_permission(self.org.id, 'add_transactions'))
+
+        self.assertFalse(AccessScope.for_user(self.user).has_permission(self.org.id, 'add_transactions'))
+
+    def test_permission_override_and_removal_take_effect_immediately(self):
+        AccessScope.for_user(self.user)
+        self.member.permissions_override = {'export': False}
+        self.member.save()
+        self.assertFalse(AccessScope.for_user(self.user).has_permission(self.org.id, 'export'))
+
+        self.member.status = 'removed'
+        self.member.save()
+        self.assertEqual(AccessScope.for_user(self.user).organization_ids, [])
+
+        response = self.client.get('/api/v1/businesses/')
+        self.assertEqual(response.data['data']['businesses'], [])
+
+    def test_business_access_and_archive_changes_invalidate(self):
+        self.member.business_access = [str(self.shop.id)]
+        self.member.save()
+        self.assertEqual(self.business_names(), ['Shop'])
+
+        self.member.business_access = [str(self.shop.id), str(self.kiosk.id)]
+        self.member.save()
+        self.assertEqual(self.business_names(), ['Kiosk', 'Shop'])
+
+        invalidations = access.cache_stats()['invalidations']
+        self.kiosk.name = 'Corner Kiosk'
+        self.kiosk.save()
+        self.assertEqual(access.cache_stats()['invalidations'], invalidations)
+
+        self.kiosk.archived_at = timezone.now()
+        self.kiosk.save()
+        scope = AccessScope.for_user(self.user)
+        self.assertFalse(scope.can_access_business(Business.objects.get(pk=self.kiosk.pk)))
+        self.assertEqual(scope.membership(self.org.id).business_ids, frozenset([str(self.shop.id)]))
+
+    def test_deleting_organization_drops_scope(self):
+        AccessScope.for_user(self.user)
+        self.org.deleted_at = '2026-01-01T00:00:00Z'
+        self.org.save()
+        self.assertEqual(AccessScope.for_user(self.user).organization_ids, [])
+
+    def create_transaction(self):
+        return self.client.post('/api/v1/transactions/', {
+            'business': str(self.shop.id),
+            'transaction_date': '2026-02-01',
+            'transaction_type': 'income',
+            'amount': '100.00',
+            'category': 'sales',
+            'description': 'Sale',
+        }, format='json')
+
+    def business_names(self):
+        return sorted(b.name for b in AccessScope.for_user(self.user).businesses())
+
+
+class DataVersionETagTests(TestCase):
+    """Polls are answered with 304 until a write bumps a data version."""
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(email='owner@example.com', password='Str0ng-pass!')
+        self.org = Organization.objects.create(owner=self.owner, name='Acme Holdings')
+        TeamMember.objects.create(organization=self.org, user=self.owner, role='owner', status='active')
+        self.shop = Business.objects.create(organization=self.org, name='Shop')
+        self.kiosk = Business.objects.create(organization=self.org, name='Kiosk')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_unchanged_poll_is_not_modified_without_running_the_list(self):
+        for url in ['/api/v1/transactions/', '/api/v1/businesses/', '/api/v1/organizations/']:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(1):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+
+    def test_writes_change_the_etag(self):
+        url = '/api/v1/transactions/'
+        etag = self.client.get(url)['ETag']
+
+        txn = self.make_transaction(self.shop)
+        etag = self.assert_changed(url, etag)
+
+        # Edits without a balance effect still count
+        txn.description = 'Renamed'
+        txn.save()
+        etag = self.assert_changed(url, etag)
+
+        Alert.objects.create(organization=self.org, alert_type='low_cash', title='Low', message='Low')
+        etag = self.assert_changed(url, etag)
+
+        self.kiosk.name = 'Corner Kiosk'
+        self.kiosk.save()
+        self.assert_changed(url, etag)
+
+    def test_business_detail_only_follows_its_own_version(self):
+        url = f'/api/v1/businesses/{self.shop.id}/'
+        etag = self.client.get(url)['ETag']
+
+        self.make_transaction(self.kiosk)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.make_transaction(self.shop)
+        self.assert_changed(url, etag)
+
+    def test_business_detail_outside_scope_is_not_found(self):
+        stranger = User.objects.create_user(email='stranger@example.com', password='Str0ng-pass!')
+        self.client.force_authenticate(stranger)
+        response = self.client.get(f'/api/v1/businesses/{self.shop.id}/')
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
+        self.assertEqual(self.client.get('/api/v1/businesses/not-a-uuid/').status_code, 404)
+
+    def test_scope_change_changes_the_etag(self):
+        manager = User.objects.create_user(email='manager@example.com', password='Str0ng-pass!')
+        member = TeamMember.objects.create(
+            organization=self.org, user=manager, role='manager', status='active',
+            business_access=[str(self.shop.id)]
+        )
+        self.client.force_authenticate(manager)
+        etag = self.client.get('/api/v1/businesses/')['ETag']
+
+        # Bypass the organization bump to check the scope alone moves the ETag
+        TeamMember.objects.filter(pk=member.pk).update(business_access=[str(self.shop.id), str(self.kiosk.id)])
+        access.invalidate_user(manager.id)
+
+        self.assert_changed('/api/v1/businesses/', etag)
+
+    def test_dashboard_supports_conditional_get(self):
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        auth = f'Bearer {RefreshToken.for_user(self.owner).access_token}'
+        with self.settings(DASHBOARD_PARALLEL_QUERIES=False):
+            etag = self.client.get('/api/v1/dashboard', HTTP_AUTHORIZATION=auth)['ETag']
+            response = self.client.get('/api/v1/dashboard', HTTP_AUTHORIZATION=auth, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+            self.make_transaction(self.shop)
+            response = self.client.get('/api/v1/dashboard', HTTP_AUTHORIZATION=auth, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+
+    def make_transaction(self, business):
+        return Transaction.objects.create(
+            organization=self.org, business=business, transaction_date='2026-01-05',
+            transaction_type='income', amount='10.00', category='sales', description='Sale'
+        )
 
-# Create your tests here.
+    def assert_changed(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response['ETag']
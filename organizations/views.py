@@ -5,11 +5,16 @@ import secrets
 from datetime import timedelta
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from django.db.models import Q, Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
+from businesses.models import Business
+from config.etags import DataVersionETagMixin
+from .access import AccessScope
 from .models import Organization, TeamMember
 from .serializers import (
     OrganizationSerializer, OrganizationCreateSerializer,
@@ -19,11 +24,12 @@ from .serializers import (
 User = get_user_model()
 
 
-class OrganizationViewSet(viewsets.ModelViewSet):
+class OrganizationViewSet(DataVersionETagMixin, viewsets.ModelViewSet):
     """
     ViewSet for Organization CRUD operations.
     """
     permission_classes = [IsAuthenticated]
+    etag_actions = ('list', 'retrieve', 'team')
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -32,16 +38,22 @@ class OrganizationViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         user = self.request.user
+        scope = AccessScope.for_request(self.request)
         
         # Get organizations where user is owner or team member
-        owned = Organization.objects.filter(owner=user, deleted_at__isnull=True)
-        member_of = Organization.objects.filter(
-            team_members__user=user,
-            team_members__status='active',
+        return Organization.objects.filter(
+            Q(owner=user) | Q(id__in=scope.organization_ids),
             deleted_at__isnull=True
-        )
-        
-        return (owned | member_of).distinct()
+        ).annotate(
+            active_business_count=Coalesce(Subquery(
+                Business.objects.filter(organization=OuterRef('pk'), is_active=True)
+                .values('organization').annotate(n=Count('id')).values('n')
+            ), 0),
+            active_member_count=Coalesce(Subquery(
+                TeamMember.objects.filter(organization=OuterRef('pk'), status='active')
+                .values('organization').annotate(n=Count('id')).values('n')
+            ), 0)
+        ).select_related('owner')
     
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
@@ -107,13 +119,7 @@ class OrganizationViewSet(viewsets.ModelViewSet):
         
         elif request.method == 'POST':
             # Check permission
-            membership = TeamMember.objects.filter(
-                organization=org,
-                user=request.user,
-                status='active'
-            ).first()
-            
-            if not membership or not membership.has_permission('manage_team'):
+            if not AccessScope.for_request(request).has_permission(org.id, 'manage_team'):
                 return Response({
                     'success': False,
                     'error': {'code': 'FORBIDDEN', 'message': 'No permission to manage team'}
@@ -178,13 +184,7 @@ class OrganizationViewSet(viewsets.ModelViewSet):
         org = self.get_object()
         
         # Check permission
-        membership = TeamMember.objects.filter(
-            organization=org,
-            user=request.user,
-            status='active'
-        ).first()
-        
-        if not membership or not membership.has_permission('manage_team'):
+        if not AccessScope.for_request(request).has_permission(org.id, 'manage_team'):
             return Response({
                 'success': False,
                 'error': {'code': 'FORBIDDEN', 'message': 'No permission to manage team'}
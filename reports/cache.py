@@ -0,0 +1,195 @@
+"""
+Report Cache
+
+Computed reports, cached under (report, organizations' data versions,
+normalized parameters). Any write to an organization's books bumps its
+data version, so a cached report is never served stale: entries of older
+versions are simply no longer looked up and age out.
+
+Results are stored as zlib-compressed JSON in the Django cache with a TTL
+(REPORT_CACHE_TIMEOUT); eviction under memory pressure is the backend's,
+least-recently-used for the local-memory cache and for Redis with an LRU
+``maxmemory-policy``.
+
+Concurrent requests for the same report compute it once. Within a
+process, followers wait on the leader's computation; across processes,
+the leader holds a short lock in the cache and the others poll for the
+result. A follower that waits longer than REPORT_CACHE_LOCK_TIMEOUT
+computes the report itself. The lock holds a token of its holder, which
+releases it only while it is still its own; a lock that outlived its
+timeout is left to the process that took it over.
+
+Hit, miss and compute-time counters are kept per process; see
+``cache_stats()``.
+"""
+import hashlib
+import json
+import threading
+import time
+import uuid
+import zlib
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+CACHE_KEY_PREFIX = 'report:v2'
+
+# Seconds between polls for a result another process is computing
+POLL_INTERVAL = 0.05
+
+# A lock this close to expiring is left to expire rather than released
+LOCK_RELEASE_MARGIN = 1
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+class _Flight:
+    """One in-process computation of a report, awaited by followers."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+def normalize(params):
+    """Parameters in a canonical JSON form: sorted keys and lists, no empty values."""
+    cleaned = {
+        name: sorted(str(item) for item in value) if isinstance(value, (list, tuple, set)) else value
+        for name, value in params.items()
+        if value is not None and value != []
+    }
+    return json.dumps(cleaned, sort_keys=True, separators=(',', ':'), cls=DjangoJSONEncoder)
+
+
+def cache_key(report, organization_versions, params):
+    versions = ','.join(f'{pk}.{version}' for pk, version in sorted((str(pk), v) for pk, v in organization_versions))
+    digest = hashlib.sha1(f'{versions}\n{normalize(params)}'.encode()).hexdigest()
+    return f'{CACHE_KEY_PREFIX}:{report}:{digest}'
+
+
+def get_or_compute(report, organization_versions, params, compute):
+    """
+    The cached result of ``report`` for ``params`` over organizations at
+    ``organization_versions`` ([(id, data_version)]), else ``compute()``'s,
+    computed once however many callers ask concurrently.
+    """
+    key = cache_key(report, organization_versions, params)
+    result = _load(key)
+    if result is not None:
+        _count(report, 'hits')
+        return result
+
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        flight.done.wait(settings.REPORT_CACHE_LOCK_TIMEOUT)
+        if flight.result is not None:
+            _count(report, 'coalesced')
+            return flight.result
+        return _compute(report, key, compute)
+
+    try:
+        flight.result = _compute_once(report, key, compute)
+        return flight.result
+    finally:
+        flight.done.set()
+        with _flights_lock:
+            _flights.pop(key, None)
+
+
+def _compute_once(report, key, compute):
+    """Compute under the cross-process lock, or wait for the process holding it."""
+    lock_key = f'{key}:lock'
+    timeout = settings.REPORT_CACHE_LOCK_TIMEOUT
+    token = uuid.uuid4().hex
+    expires = time.monotonic() + timeout
+    if not cache.add(lock_key, token, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            result = _load(key)
+            if result is not None:
+                _count(report, 'coalesced')
+                return result
+            if cache.get(lock_key) is None:
+                break
+        return _compute(report, key, compute)
+
+    try:
+        # Stored by another process between our lookup and taking the lock
+        result = _load(key)
+        if result is not None:
+            _count(report, 'hits')
+            return result
+        return _compute(report, key, compute)
+    finally:
+        _release(lock_key, token, expires)
+
+
+def _release(lock_key, token, expires):
+    """Delete our lock, but never one another process took once ours expired."""
+    if time.monotonic() < expires - LOCK_RELEASE_MARGIN and cache.get(lock_key) == token:
+        cache.delete(lock_key)
+
+
+def _compute(report, key, compute):
+    started = time.perf_counter()
+    result = compute()
+    elapsed = time.perf_counter() - started
+    payload = zlib.compress(json.dumps(result, cls=DjangoJSONEncoder).encode())
+    cache.set(key, payload, settings.REPORT_CACHE_TIMEOUT)
+    with _stats_lock:
+        _stats[(report, 'misses')] += 1
+        _stats[(report, 'compute_seconds')] += elapsed
+        _stats[(report, 'stored_bytes')] += len(payload)
+        _stats[(report, 'compute_seconds_max')] = max(_stats[(report, 'compute_seconds_max')], elapsed)
+    return result
+
+
+def _load(key):
+    payload = cache.get(key)
+    if payload is None:
+        return None
+    return json.loads(zlib.decompress(payload))
+
+
+def cache_stats():
+    """Per-report hits, misses, coalesced waits and compute times of this process."""
+    with _stats_lock:
+        stats = dict(_stats)
+    reports = {}
+    for report in sorted({report for report, _ in stats}):
+        hits, coalesced, misses = (stats.get((report, name), 0) for name in ('hits', 'coalesced', 'misses'))
+        lookups = hits + coalesced + misses
+        compute_seconds = stats.get((report, 'compute_seconds'), 0.0)
+        reports[report] = {
+            'hits': hits,
+            'coalesced': coalesced,
+            'misses': misses,
+            'hit_rate': round((hits + coalesced) / lookups, 4) if lookups else None,
+            'compute_ms_avg': round(compute_seconds / misses * 1000, 1) if misses else None,
+            'compute_ms_max': round(stats.get((report, 'compute_seconds_max'), 0.0) * 1000, 1),
+            'stored_bytes_avg': stats.get((report, 'stored_bytes'), 0) // misses if misses else None,
+        }
+    return reports
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def _count(report, name):
+    with _stats_lock:
+        _stats[(report, name)] += 1
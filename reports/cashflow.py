@@ -0,0 +1,275 @@
+"""
+Cash-Flow Statement
+
+Opening balance, inflows and outflows by category and payment method,
+transfers between businesses, and closing balance, per business and
+consolidated, for every day, week or month of a date range.
+
+Figures come from one grouped query over confirmed transactions (rollups
+carry neither the payment method nor the transfer destination), bucketed
+in SQL by truncating the transaction date. Running balances are then
+carried through the buckets in a single pass.
+
+Balances follow the ledger's one definition, the same as
+``current_balance``, ``balances.balance_as_of`` and account statements: the
+opening balance plus every confirmed income less expense. Transfers are
+shown as lines of their own and are not part of the running balance, so a
+range's closing balance is the business's ``balance_as_of`` its last day.
+``opening_balance_date`` is informational there too and is only reported.
+
+The opening balance is worked back from the delta-maintained
+``current_balance`` rather than summed over the whole history: income and
+expense dated from the start of the range onwards is taken off. So
+nothing is read from before the range.
+
+A transfer is the leg recorded on the sending business with
+``transfer_to_business`` set to another business: money out of the sender
+and into the receiver. Legs without a destination (the receiving side of
+a ``transfer_pair``) are not counted again. In the consolidated statement
+transfers between the reported businesses cancel out; only transfers
+crossing its boundary are shown.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Case, CharField, DateField, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from transactions.models import Transaction
+
+from .pnl import add_months
+
+
+INTERVALS = ('day', 'week', 'month')
+
+# Position of a transaction relative to the range
+WITHIN, AFTER = 0, 1
+
+ZERO = Decimal('0')
+
+
+def default_range(today=None):
+    """The current month and the eleven before it, up to ``today``."""
+    today = today or timezone.localdate()
+    return add_months(today.replace(day=1), -11), today
+
+
+def bucket_start(day, interval):
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def buckets(date_from, date_to, interval):
+    """(key, start, end) of each bucket of the range, clamped to it."""
+    result = []
+    key = bucket_start(date_from, interval)
+    while key <= date_to:
+        if interval == 'day':
+            following = key + timedelta(days=1)
+        elif interval == 'week':
+            following = key + timedelta(days=7)
+        else:
+            following = add_months(key, 1)
+        result.append((key, max(key, date_from), min(following - timedelta(days=1), date_to)))
+        key = following
+    return result
+
+
+class CashFlowStatement:
+    """Cash-flow statement of ``businesses`` over [date_from, date_to]."""
+
+    def __init__(self, businesses, date_from=None, date_to=None, interval='month', today=None):
+        self.businesses = list(businesses)
+        default_from, default_to = default_range(today)
+        self.date_from = date_from or default_from
+        self.date_to = date_to or default_to
+        self.interval = interval
+        self.buckets = buckets(self.date_from, self.date_to, interval)
+
+    def rows(self):
+        """
+        One grouped query: confirmed income, expense and outgoing transfers
+        per business, counterpart, bucket, type, category and payment method.
+        Income and expense after the range is collapsed to one row per
+        business and type.
+        """
+        ids = [business.pk for business in self.businesses]
+        if not ids:
+            return []
+        position = Case(
+            When(transaction_date__gt=self.date_to, then=Value(AFTER)),
+            default=Value(WITHIN),
+            output_field=IntegerField(),
+        )
+        within = Q(transaction_date__gte=self.date_from, transaction_date__lte=self.date_to)
+
+        def only_within(expression, output_field):
+            return Case(When(within, then=expression), default=None, output_field=output_field)
+
+        transfers = (
+            Q(transaction_type='transfer', transfer_to_business__isnull=False)
+            & ~Q(transfer_to_business=F('business'))
+        )
+        return (
+            Transaction.objects.filter(
+                (Q(business_id__in=ids) | Q(transfer_to_business_id__in=ids)),
+                # After the range, only income and expense are needed
+                Q(transaction_type__in=('income', 'expense'), business_id__in=ids) | (transfers & within),
+                transaction_date__gte=self.date_from,
+                status='confirmed',
+                amount_ngn__isnull=False,
+            )
+            .annotate(
+                position=position,
+                bucket=only_within(Trunc('transaction_date', self.interval, output_field=DateField()), DateField()),
+                line_category=only_within(F('category'), CharField()),
+                line_payment_method=only_within(F('payment_method'), CharField()),
+            )
+            .values(
+                'business_id', 'transfer_to_business_id', 'position', 'bucket', 'transaction_type',
+                'line_category', 'line_payment_method',
+            )
+            .annotate(total=Sum('amount_ngn'))
+            .order_by()
+        )
+
+    def build(self):
+        ids = {business.pk for business in self.businesses}
+        statements = {business.pk: Statement(self.buckets) for business in self.businesses}
+        consolidated = Statement(self.buckets)
+
+        for row in self.rows():
+            amount = _money(row['total'])
+            business_id, counterpart = row['business_id'], row['transfer_to_business_id']
+            position, bucket = row['position'], row['bucket']
+            if row['transaction_type'] != 'transfer':
+                line = (row['transaction_type'], row['line_category'], row['line_payment_method'])
+                statements[business_id].add(position, bucket, *line, amount)
+                consolidated.add(position, bucket, *line, amount)
+                continue
+            if business_id in ids:
+                statements[business_id].transfer(position, bucket, 'out', amount)
+            if counterpart in ids:
+                statements[counterpart].transfer(position, bucket, 'in', amount)
+            # Transfers between reported businesses net out when consolidated
+            if business_id in ids and counterpart not in ids:
+                consolidated.transfer(position, bucket, 'out', amount)
+            elif counterpart in ids and business_id not in ids:
+                consolidated.transfer(position, bucket, 'in', amount)
+
+        current_total = ZERO
+        for business in self.businesses:
+            statements[business.pk].current_balance = Decimal(business.current_balance)
+            current_total += Decimal(business.current_balance)
+        consolidated.current_balance = current_total
+
+        return {
+            'date_from': self.date_from.isoformat(),
+            'date_to': self.date_to.isoformat(),
+            'interval': self.interval,
+            'currency': 'NGN',
+            'consolidated': consolidated.data(),
+            'businesses': [
+                {
+                    'business_id': str(business.pk),
+                    'name': business.name,
+                    'opening_balance_date': (
+                        business.opening_balance_date.isoformat() if business.opening_balance_date else None
+                    ),
+                    **statements[business.pk].data(),
+                }
+                for business in self.businesses
+            ],
+        }
+
+
+class Statement:
+    """Flows of one statement (a business's or the consolidated one)."""
+
+    def __init__(self, bucket_list):
+        self.buckets = bucket_list
+        self.current_balance = ZERO
+        # Income less expense from the start of the range on
+        self.net_from_start = ZERO
+        # {bucket: {'inflows'|'outflows'|'transfers_in'|'transfers_out': Decimal}}
+        self.periods = defaultdict(lambda: defaultdict(Decimal))
+        # {'inflows'|'outflows': {'category'|'payment_method': {name: Decimal}}}
+        self.breakdown = {
+            side: {'category': defaultdict(Decimal), 'payment_method': defaultdict(Decimal)}
+            for side in ('inflows', 'outflows')
+        }
+
+    def add(self, position, bucket, transaction_type, category, payment_method, amount):
+        sign = 1 if transaction_type == 'income' else -1
+        self.net_from_start += sign * amount
+        if position != WITHIN:
+            return
+        side = 'inflows' if sign > 0 else 'outflows'
+        self.periods[bucket][side] += amount
+        self.breakdown[side]['category'][category] += amount
+        self.breakdown[side]['payment_method'][payment_method or 'unspecified'] += amount
+
+    def transfer(self, position, bucket, direction, amount):
+        if position == WITHIN:
+            self.periods[bucket][f'transfers_{direction}'] += amount
+
+    def data(self):
+        opening = self.current_balance - self.net_from_start
+        balance = opening
+        periods = []
+        totals = defaultdict(Decimal)
+        for key, start, end in self.buckets:
+            flows = self.periods.get(key, {})
+            period = {name: flows.get(name, ZERO) for name in ('inflows', 'outflows', 'transfers_in', 'transfers_out')}
+            # Transfers are reported beside the balance, not in it
+            net = period['inflows'] - period['outflows']
+            for name, amount in period.items():
+                totals[name] += amount
+            periods.append({
+                'start': start.isoformat(),
+                'end': end.isoformat(),
+                'opening_balance': float(balance),
+                **{name: float(amount) for name, amount in period.items()},
+                'net_change': float(net),
+                'closing_balance': float(balance + net),
+            })
+            balance += net
+
+        return {
+            'opening_balance': float(opening),
+            'inflows': self.side('inflows', totals['inflows']),
+            'outflows': self.side('outflows', totals['outflows']),
+            'transfers': {
+                'in': float(totals['transfers_in']),
+                'out': float(totals['transfers_out']),
+                'net': float(totals['transfers_in'] - totals['transfers_out']),
+            },
+            'net_change': float(balance - opening),
+            'closing_balance': float(balance),
+            'periods': periods,
+        }
+
+    def side(self, name, total):
+        breakdown = self.breakdown[name]
+        return {
+            'total': float(total),
+            'by_category': _ranked(breakdown['category'], 'category'),
+            'by_payment_method': _ranked(breakdown['payment_method'], 'payment_method'),
+        }
+
+
+def _ranked(amounts, label):
+    return [
+        {label: name, 'total': float(amount)}
+        for name, amount in sorted(amounts.items(), key=lambda item: -item[1])
+    ]
+
+
+def _money(value):
+    # SQLite returns decimal sums as floats
+    return Decimal(str(value or 0)).quantize(Decimal('0.01'))
@@ -0,0 +1,146 @@
+"""
+Dashboard Data
+
+Everything the dashboard shows, split into independent sections so the
+async view can run their queries concurrently. Each section is a plain
+synchronous function of the access scope; figures come from the daily
+rollups and the cached business balances, never from scanning
+transactions, except for the short list of recent transactions.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from alerts.models import Alert
+from businesses.serializers import BusinessSummarySerializer
+from transactions.models import TransactionDailyRollup
+from transactions.serializers import TransactionListSerializer
+
+
+RECENT_TRANSACTIONS = 10
+TREND_DAYS = 30
+
+
+class Dashboard:
+    """Dashboard sections for one access scope, as of ``today``."""
+
+    def __init__(self, scope, today=None):
+        self.scope = scope
+        self.today = today or timezone.localdate()
+
+    def sections(self):
+        """Section name -> zero-argument callable returning its data."""
+        return {
+            'businesses': self.businesses,
+            'periods': self.periods,
+            'recent_transactions': self.recent_transactions,
+            'unread_alerts': self.unread_alerts,
+            'trend': self.trend,
+        }
+
+    def build(self):
+        """Run every section in turn (the sequential path)."""
+        return self.assemble({name: section() for name, section in self.sections().items()})
+
+    def assemble(self, results):
+        businesses = results['businesses']
+        total_balance = sum((Decimal(b['current_balance'] or 0) for b in businesses), Decimal('0'))
+        return {
+            'as_of': self.today.isoformat(),
+            'currency': 'NGN',
+            'balance': {
+                'total': float(total_balance),
+                'business_count': len(businesses),
+            },
+            'businesses': businesses,
+            **results['periods'],
+            'recent_transactions': results['recent_transactions'],
+            'unread_alerts': results['unread_alerts'],
+            'trend': results['trend'],
+        }
+
+    # Sections
+
+    def businesses(self):
+        queryset = self.scope.businesses().with_stats(today=self.today).order_by('name')
+        return BusinessSummarySerializer(queryset, many=True, context={'include': {'stats'}}).data
+
+    def periods(self):
+        """Month-to-date and year-to-date income and expense in one aggregate."""
+        month = Q(date__gte=self.today.replace(day=1))
+        income = Q(transaction_type='income')
+        expense = Q(transaction_type='expense')
+
+        totals = self.rollups(self.today.replace(month=1, day=1)).aggregate(
+            mtd_income=Sum('total_amount_ngn', filter=month & income),
+            mtd_expense=Sum('total_amount_ngn', filter=month & expense),
+            ytd_income=Sum('total_amount_ngn', filter=income),
+            ytd_expense=Sum('total_amount_ngn', filter=expense),
+        )
+        return {
+            period: _period(totals[f'{prefix}_income'], totals[f'{prefix}_expense'])
+            for period, prefix in [('month_to_date', 'mtd'), ('year_to_date', 'ytd')]
+        }
+
+    def recent_transactions(self):
+        queryset = self.scope.transactions().filter(
+            status__in=['pending', 'confirmed', 'reconciled']
+        ).select_related('business').order_by('-transaction_date', '-created_at')[:RECENT_TRANSACTIONS]
+        return TransactionListSerializer(queryset, many=True).data
+
+    def unread_alerts(self):
+        return Alert.objects.filter(
+            Q(business__isnull=True) | Q(business_id__in=self.scope.businesses().values('id')),
+            organization_id__in=self.scope.organization_ids,
+            status='unread'
+        ).filter(
+            Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now())
+        ).count()
+
+    def trend(self):
+        """Daily income and expense over the last TREND_DAYS days, zero-filled."""
+        start = self.today - timedelta(days=TREND_DAYS - 1)
+        rows = self.rollups(start).values('date').annotate(
+            income=Sum('total_amount_ngn', filter=Q(transaction_type='income')),
+            expense=Sum('total_amount_ngn', filter=Q(transaction_type='expense')),
+        ).order_by()
+        by_date = {row['date']: row for row in rows}
+
+        trend = []
+        for offset in range(TREND_DAYS):
+            day = start + timedelta(days=offset)
+            row = by_date.get(day, {})
+            trend.append({
+                'date': day.isoformat(),
+                'income': float(_money(row.get('income'))),
+                'expense': float(_money(row.get('expense'))),
+            })
+        return trend
+
+    def rollups(self, start):
+        """Confirmed rollup rows of the scope's businesses from ``start`` to today."""
+        if not self.scope.memberships:
+            return TransactionDailyRollup.objects.none()
+        return TransactionDailyRollup.objects.filter(
+            organization_id__in=self.scope.organization_ids,
+            business_id__in=self.scope.businesses().values('id'),
+            status='confirmed',
+            date__gte=start,
+            date__lte=self.today,
+        )
+
+
+def _period(income, expense):
+    income, expense = _money(income), _money(expense)
+    return {
+        'income': float(income),
+        'expense': float(expense),
+        'net': float(income - expense),
+    }
+
+
+def _money(value):
+    # SQLite returns decimal sums as floats
+    return Decimal(str(value or 0)).quantize(Decimal('0.01'))
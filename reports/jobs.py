@@ -0,0 +1,171 @@
+"""
+Report Jobs
+
+Generates a ReportJob's file in a Celery worker. The job's stored query
+is validated again, the report is produced as rows, and the rows are
+written to a file under MEDIA_ROOT/reports/ chunk by chunk, recording
+progress (a percentage and the rows written) on the job as they go. The
+file is written under a temporary name and moved into place once
+complete, so a job only ever points at a whole file.
+
+The ledger is read through the transaction exporter's ``.iterator()``
+queryset, so it streams from the database to the file with flat memory.
+P&L and cash-flow statements are built in one go (see ``pnl`` and
+``cashflow``) and then written out; as JSON they are the API's payload.
+"""
+import json
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from businesses.models import Business
+from transactions.exporters import EXPORT_FIELDS, TransactionExporter
+from transactions.models import Transaction
+from .cashflow import CashFlowStatement
+from .files import WRITERS
+from .models import ReportJob
+from .pnl import ProfitAndLoss
+from .serializers import CashFlowQuerySerializer, LedgerQuerySerializer, ProfitAndLossQuerySerializer
+
+logger = logging.getLogger(__name__)
+
+
+QUERY_SERIALIZERS = {
+    'profit_and_loss': ProfitAndLossQuerySerializer,
+    'cash_flow': CashFlowQuerySerializer,
+    'ledger': LedgerQuerySerializer,
+}
+
+# Progress once a statement is built, before its rows are written
+BUILT_PROGRESS = 80
+
+
+def run(job_id):
+    """Generate the file of a queued job; a job already claimed is left alone."""
+    claimed = ReportJob.objects.filter(pk=job_id, status='queued').update(
+        status='running', started_at=timezone.now()
+    )
+    if not claimed:
+        return
+    job = ReportJob.objects.get(pk=job_id)
+
+    name = f'reports/{job.pk}.{job.file_format}'
+    path = default_storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f'{path}.part'
+    try:
+        query = QUERY_SERIALIZERS[job.report](data=job.params)
+        query.is_valid(raise_exception=True)
+        generate(job, query, partial)
+        os.replace(partial, path)
+    except Exception as exc:
+        logger.exception('Report job %s failed', job.pk)
+        if os.path.exists(partial):
+            os.remove(partial)
+        ReportJob.objects.filter(pk=job.pk).update(status='failed', error=str(exc), finished_at=timezone.now())
+        return
+
+    ReportJob.objects.filter(pk=job.pk).update(
+        status='completed', progress=100, file=name, file_size=os.path.getsize(path), finished_at=timezone.now()
+    )
+
+
+def generate(job, query, path):
+    if job.report == 'ledger':
+        write_ledger(job, query.validated_data, path)
+        return
+
+    businesses = list(Business.objects.filter(pk__in=query.validated_data['business']).order_by('name'))
+    if job.report == 'profit_and_loss':
+        data = ProfitAndLoss(businesses, **query.period_options()).build()
+        header, rows = pnl_rows(data)
+    else:
+        data = CashFlowStatement(businesses, **query.statement_options()).build()
+        header, rows = cash_flow_rows(data)
+    job.set_progress(BUILT_PROGRESS)
+
+    if job.file_format == 'json':
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, cls=DjangoJSONEncoder)
+        return
+    write_rows(job, path, header, rows, len(rows), start=BUILT_PROGRESS)
+
+
+def write_ledger(job, params, path):
+    queryset = Transaction.objects.filter(business_id__in=params['business'])
+    if params.get('date_from'):
+        queryset = queryset.filter(transaction_date__gte=params['date_from'])
+    if params.get('date_to'):
+        queryset = queryset.filter(transaction_date__lte=params['date_to'])
+    if params.get('status'):
+        queryset = queryset.filter(status=params['status'])
+    queryset = queryset.order_by('transaction_date', 'created_at')
+
+    tags_index = [name for name, _ in EXPORT_FIELDS].index('tags')
+
+    def rows():
+        for row in TransactionExporter(queryset).rows():
+            row = list(row)
+            row[tags_index] = ';'.join(row[tags_index] or [])
+            yield row
+
+    write_rows(job, path, [name for name, _ in EXPORT_FIELDS], rows(), queryset.count())
+
+
+def write_rows(job, path, header, rows, total, start=0):
+    """Write ``header`` and ``rows`` in chunks, moving progress from ``start`` towards 100."""
+    chunk_size = settings.TRANSACTION_EXPORT_CHUNK_SIZE
+    writer = WRITERS[job.file_format](path, sheet_name=job.get_report_display())
+    try:
+        writer.write_rows([header])
+        written, chunk = 0, []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                writer.write_rows(chunk)
+                written += len(chunk)
+                chunk = []
+                # 100 is only recorded once the file is in place
+                job.set_progress(start + (99 - start) * written / max(total, 1), rows_written=written)
+        writer.write_rows(chunk)
+        written += len(chunk)
+    finally:
+        writer.close()
+    job.set_progress(99, rows_written=written)
+
+
+def pnl_rows(data):
+    """A P&L's lines: one per subcategory, plus section totals and net income."""
+    compare = data['compare'] is not None
+    header = ['business', 'section', 'category', 'subcategory', *(c['label'] for c in data['columns']), 'total']
+    if compare:
+        header += ['previous', 'change']
+
+    def values(line):
+        return [*line['columns'], line['total'], *([line['previous'], line['change']] if compare else [])]
+
+    rows = []
+    for name, section in [('Consolidated', data['consolidated'])] + [(b['name'], b) for b in data['businesses']]:
+        for section_name in ('income', 'expense'):
+            for category in section[section_name]['categories']:
+                for line in category['subcategories']:
+                    rows.append([name, section_name, category['category'], line['subcategory'], *values(line)])
+            rows.append([name, section_name, 'Total', None, *values(section[section_name])])
+        rows.append([name, 'net_income', None, None, *values(section['net_income'])])
+    return header, rows
+
+
+def cash_flow_rows(data):
+    """A cash-flow statement's periods, consolidated first."""
+    fields = [
+        'opening_balance', 'inflows', 'outflows', 'transfers_in', 'transfers_out', 'net_change', 'closing_balance',
+    ]
+    rows = []
+    for name, statement in [('Consolidated', data['consolidated'])] + [(b['name'], b) for b in data['businesses']]:
+        for period in statement['periods']:
+            rows.append([name, period['start'], period['end'], *(period[field] for field in fields)])
+    return ['business', 'start', 'end', *fields], rows
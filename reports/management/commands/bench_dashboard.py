@@ -0,0 +1,120 @@
+"""
+Benchmark the consolidated dashboard endpoint.
+
+Seeds one organization with synthetic businesses and transactions (reused
+on later runs, so point this at a scratch database), then calls the async
+dashboard view repeatedly and reports latency percentiles with the
+sections run concurrently and one after another:
+
+    python manage.py bench_dashboard --businesses 50 --transactions 1000000
+"""
+import asyncio
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+from django.test import AsyncRequestFactory, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from businesses.models import Business
+from organizations.models import Organization, TeamMember
+from reports.views import dashboard
+from transactions import rollups
+from transactions.models import Transaction
+
+
+BENCH_EMAIL = 'dashboard-bench@example.com'
+
+
+class Command(BaseCommand):
+    help = 'Measure dashboard endpoint latency (p50/p95/p99) on a seeded organization.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--businesses', type=int, default=50)
+        parser.add_argument('--transactions', type=int, default=1000000)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--days', type=int, default=730, help='Spread transactions over this many days.')
+
+    def handle(self, *args, **options):
+        user, org = self.seed(options['businesses'], options['transactions'], options['days'])
+        token = RefreshToken.for_user(user).access_token
+        factory = AsyncRequestFactory()
+
+        self.stdout.write(f"{'mode':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for mode, parallel in [('parallel', True), ('sequential', False)]:
+            with override_settings(DASHBOARD_PARALLEL_QUERIES=parallel):
+                timings = asyncio.run(self.measure(factory, token, org, options['requests']))
+            quantiles = statistics.quantiles(timings, n=100)
+            self.stdout.write(
+                f'{mode:>10} {statistics.median(timings):>8.1f} {quantiles[94]:>8.1f} '
+                f'{quantiles[98]:>8.1f} {max(timings):>8.1f}'
+            )
+
+    async def measure(self, factory, token, org, count):
+        timings = []
+        for i in range(count + 5):
+            request = factory.get(
+                '/api/v1/dashboard', {'organization_id': str(org.id)},
+                headers={'Authorization': f'Bearer {token}'}
+            )
+            started = time.perf_counter()
+            response = await dashboard(request)
+            elapsed = (time.perf_counter() - started) * 1000
+            if response.status_code != 200:
+                raise RuntimeError(f'Dashboard returned {response.status_code}')
+            # The first few requests warm caches and connections
+            if i >= 5:
+                timings.append(elapsed)
+        return timings
+
+    def seed(self, business_count, transaction_count, days):
+        User = get_user_model()
+        user = User.objects.filter(email=BENCH_EMAIL).first()
+        if user is None:
+            user = User.objects.create_user(email=BENCH_EMAIL, password='Bench-pass-123')
+        org = Organization.objects.filter(owner=user).first()
+        if org is None:
+            org = Organization.objects.create(owner=user, name='Dashboard Benchmark')
+            TeamMember.objects.create(organization=org, user=user, role='owner', status='active')
+
+        businesses = list(Business.objects.filter(organization=org))
+        for i in range(len(businesses), business_count):
+            businesses.append(Business.objects.create(organization=org, name=f'Bench Business {i:03}'))
+
+        existing = Transaction.objects.filter(organization=org).count()
+        missing = transaction_count - existing
+        if missing > 0:
+            self.stdout.write(f'Seeding {missing} transactions...')
+            self.insert_transactions(org, businesses, missing, days)
+            rollups.rebuild(org.id)
+            for business in businesses:
+                business.recalculate_balance()
+        return user, org
+
+    def insert_transactions(self, org, businesses, count, days, batch_size=10000):
+        rng = random.Random(count)
+        today = timezone.localdate()
+        batch = []
+        with db_transaction.atomic():
+            for i in range(count):
+                amount = Decimal(rng.randint(100, 10 ** 7)) / 100
+                batch.append(Transaction(
+                    organization=org,
+                    business=rng.choice(businesses),
+                    transaction_date=today - timedelta(days=rng.randint(0, days)),
+                    transaction_type=rng.choice(['income', 'expense']),
+                    amount=amount,
+                    amount_ngn=amount,
+                    category=rng.choice(['sales', 'rent', 'salaries', 'utilities', 'inventory']),
+                    description=f'Benchmark transaction {i}',
+                ))
+                if len(batch) == batch_size:
+                    Transaction.objects.bulk_create(batch)
+                    batch = []
+            Transaction.objects.bulk_create(batch)
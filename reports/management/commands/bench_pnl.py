@@ -0,0 +1,101 @@
+"""
+Benchmark the P&L report.
+
+Seeds one organization with synthetic daily rollup rows, as many as an
+organization with ``--transactions`` transactions over ``--days`` days
+would have (reused on later runs, so point this at a scratch database),
+then builds fiscal-year P&Ls with month columns and a comparison and
+reports latency percentiles:
+
+    python manage.py bench_pnl --businesses 50 --transactions 10000000
+"""
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from businesses.models import Business
+from organizations.models import Organization
+from reports.pnl import ProfitAndLoss
+from transactions.models import TransactionDailyRollup
+
+
+BENCH_EMAIL = 'pnl-bench@example.com'
+
+LINES = [
+    ('income', 'sales', 'retail'), ('income', 'sales', 'wholesale'), ('income', 'services', ''),
+    ('expense', 'inventory', ''), ('expense', 'rent', ''), ('expense', 'salaries', 'staff'),
+    ('expense', 'salaries', 'contract'), ('expense', 'utilities', 'power'), ('expense', 'utilities', 'internet'),
+    ('expense', 'transport', ''),
+]
+
+
+class Command(BaseCommand):
+    help = 'Measure P&L report latency (p50/p95/max) on a seeded organization.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--businesses', type=int, default=50)
+        parser.add_argument('--transactions', type=int, default=10000000)
+        parser.add_argument('--days', type=int, default=730)
+        parser.add_argument('--requests', type=int, default=50)
+
+    def handle(self, *args, **options):
+        org = self.seed(options['businesses'], options['transactions'], options['days'])
+        businesses = list(Business.objects.filter(organization=org).order_by('name'))
+        rows = TransactionDailyRollup.objects.filter(organization=org).count()
+        self.stdout.write(f'{len(businesses)} businesses, {rows} rollup rows')
+
+        self.stdout.write(f"{'layout':>16} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+        for layout, compare in [('total', None), ('month', None), ('month', 'previous_year')]:
+            timings = []
+            for _ in range(options['requests']):
+                started = time.perf_counter()
+                ProfitAndLoss(businesses, layout=layout, compare=compare).build()
+                timings.append((time.perf_counter() - started) * 1000)
+            label = layout + (f'+{compare}' if compare else '')
+            self.stdout.write(
+                f'{label:>16} {statistics.median(timings):>8.1f} '
+                f'{statistics.quantiles(timings, n=20)[18]:>8.1f} {max(timings):>8.1f}'
+            )
+
+    def seed(self, business_count, transaction_count, days):
+        User = get_user_model()
+        user = User.objects.filter(email=BENCH_EMAIL).first() or User.objects.create_user(
+            email=BENCH_EMAIL, password='Bench-pass-123'
+        )
+        org = Organization.objects.filter(owner=user).first() or Organization.objects.create(
+            owner=user, name='P&L Benchmark'
+        )
+        if TransactionDailyRollup.objects.filter(organization=org).exists():
+            return org
+
+        self.stdout.write('Seeding rollups...')
+        rng = random.Random(1)
+        today = timezone.localdate()
+        per_row = max(1, transaction_count // (business_count * days * len(LINES)))
+        with db_transaction.atomic():
+            businesses = [
+                Business.objects.create(organization=org, name=f'Bench Business {i:03}') for i in range(business_count)
+            ]
+            batch = []
+            for business in businesses:
+                for offset in range(days):
+                    day = today - timedelta(days=offset)
+                    for transaction_type, category, subcategory in LINES:
+                        amount = Decimal(rng.randint(100, 10 ** 6) * per_row) / 100
+                        batch.append(TransactionDailyRollup(
+                            organization=org, business=business, date=day, transaction_type=transaction_type,
+                            category=category, subcategory=subcategory, currency='NGN', status='confirmed',
+                            total_amount=amount, total_amount_ngn=amount, transaction_count=per_row,
+                        ))
+                if len(batch) >= 10000:
+                    TransactionDailyRollup.objects.bulk_create(batch)
+                    batch = []
+            TransactionDailyRollup.objects.bulk_create(batch)
+        return org
@@ -1,3 +1,73 @@
+"""
+Report Models
+"""
+import uuid
+
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class ReportJob(models.Model):
+    """
+    A report generated in the background to a downloadable file.
+    """
+    
+    REPORTS = [
+        ('profit_and_loss', 'Profit & Loss'),
+        ('cash_flow', 'Cash Flow'),
+        ('ledger', 'Ledger'),
+    ]
+    
+    FORMATS = [
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel Workbook'),
+        ('json', 'JSON'),
+    ]
+    
+    STATUS = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='report_jobs'
+    )
+    
+    report = models.CharField(max_length=50, choices=REPORTS)
+    file_format = models.CharField(max_length=10, choices=FORMATS)
+    # Validated query of the report, business ids resolved at request time
+    params = models.JSONField(default=dict)
+    
+    status = models.CharField(max_length=20, choices=STATUS, default='queued')
+    progress = models.PositiveSmallIntegerField(default=0)  # percent
+    rows_written = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to='reports/', blank=True)
+    file_size = models.PositiveBigIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True, null=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'report_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['requested_by', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_report_display()} ({self.file_format}) - {self.status}"
+    
+    def set_progress(self, progress, rows_written=None):
+        """Record progress without touching the rest of the row."""
+        self.progress = min(100, max(0, int(progress)))
+        fields = {'progress': self.progress}
+        if rows_written is not None:
+            self.rows_written = fields['rows_written'] = rows_written
+        ReportJob.objects.filter(pk=self.pk).update(**fields)
@@ -0,0 +1,300 @@
+"""
+Profit & Loss
+
+Income and expense by category and subcategory, per business and
+consolidated, from the confirmed daily rollups in one grouped query.
+
+Each business reports over its own window. Fiscal periods start on the
+business's ``fiscal_year_start`` (1 January without one), so a consolidated
+fiscal year adds up every business's own fiscal year; fiscal years are
+named after the calendar year they start in. A window is split into month
+columns counted from its start, and an optional comparison window (the
+previous period, or the same period a year earlier) is added as one more
+column. The query labels each rollup row with its column through a CASE
+over (business, date range), and separately with whether it falls in the
+comparison window, since a custom range longer than the comparison offset
+overlaps it and its shared days count in both. The database returns at
+most one row per business, column, comparison flag, type, category and
+subcategory however many transactions the organization has.
+"""
+import calendar
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db.models import Case, IntegerField, Q, Sum, Value, When
+from django.utils import timezone
+
+from transactions.models import TransactionDailyRollup
+
+
+PERIODS = ('fiscal_year', 'fiscal_quarter', 'custom')
+LAYOUTS = ('total', 'month')
+COMPARISONS = ('previous_period', 'previous_year')
+
+TYPES = ('income', 'expense')
+
+# Column number of the comparison window
+COMPARISON = -1
+
+
+def add_months(day, months, day_of_month=None):
+    """``day`` moved by ``months`` months, on ``day_of_month`` clamped to the month's length."""
+    year, month = divmod(day.year * 12 + day.month - 1 + months, 12)
+    month += 1
+    return date(year, month, min(day_of_month or day.day, calendar.monthrange(year, month)[1]))
+
+
+def fiscal_year_start(business, year):
+    start = business.fiscal_year_start
+    month, day = (start.month, start.day) if start else (1, 1)
+    return date(year, month, min(day, calendar.monthrange(year, month)[1]))
+
+
+class Window:
+    """A business's reporting dates: [start, end] split into month columns."""
+
+    def __init__(self, start, end, months=None):
+        self.start = start
+        self.end = end
+        # Length in whole months for fiscal periods, None for custom ranges
+        self.months = months
+
+    def __eq__(self, other):
+        return (self.start, self.end) == (other.start, other.end)
+
+    def columns(self, layout):
+        if layout == 'total':
+            return [(self.start, self.end)]
+        columns = []
+        k = 0
+        while True:
+            start = add_months(self.start, k, self.start.day)
+            if start > self.end:
+                return columns
+            end = min(add_months(self.start, k + 1, self.start.day) - timedelta(days=1), self.end)
+            columns.append((start, end))
+            k += 1
+
+    def comparison(self, kind):
+        if kind == 'previous_year':
+            return Window(add_months(self.start, -12), add_months(self.end + timedelta(days=1), -12) - timedelta(days=1))
+        if self.months:
+            return Window(add_months(self.start, -self.months), self.start - timedelta(days=1), self.months)
+        return Window(self.start - (self.end - self.start) - timedelta(days=1), self.start - timedelta(days=1))
+
+
+def window_for(business, period, year=None, quarter=None, date_from=None, date_to=None, today=None):
+    """The business's Window for a period spec; the current fiscal year/quarter by default."""
+    if period == 'custom':
+        return Window(date_from, date_to)
+
+    today = today or timezone.localdate()
+    if year is None:
+        year = today.year if fiscal_year_start(business, today.year) <= today else today.year - 1
+        if period == 'fiscal_quarter' and quarter is None:
+            first = fiscal_year_start(business, year)
+            quarter = max(q for q in range(1, 5) if add_months(first, 3 * (q - 1)) <= today)
+    start = fiscal_year_start(business, year)
+    months = 12
+    if period == 'fiscal_quarter':
+        start = add_months(start, 3 * ((quarter or 1) - 1))
+        months = 3
+    end = add_months(start, months, start.day) - timedelta(days=1)
+    return Window(start, end, months)
+
+
+class ProfitAndLoss:
+    """
+    P&L of ``businesses`` for a period spec (see ``window_for``), laid out
+    as one total column or month columns, optionally with a comparison.
+    """
+
+    def __init__(self, businesses, period='fiscal_year', layout='total', compare=None, today=None, **period_options):
+        self.businesses = list(businesses)
+        self.layout = layout
+        self.compare = compare
+        self.windows = {
+            business.pk: window_for(business, period, today=today, **period_options)
+            for business in self.businesses
+        }
+        self.period = period
+
+    def column_count(self):
+        return max((len(w.columns(self.layout)) for w in self.windows.values()), default=0)
+
+    def column_case(self):
+        """CASE giving a rollup row's column, NULL outside every window."""
+        ranges = {}
+        for business_id, window in self.windows.items():
+            for k, (start, end) in enumerate(window.columns(self.layout)):
+                ranges.setdefault((start, end, k), []).append(business_id)
+        return _range_case(ranges)
+
+    def comparison_case(self):
+        """CASE giving COMPARISON for a rollup row in its comparison window, NULL otherwise."""
+        ranges = {}
+        for business_id, window in self.windows.items():
+            other = window.comparison(self.compare)
+            ranges.setdefault((other.start, other.end, COMPARISON), []).append(business_id)
+        return _range_case(ranges)
+
+    def rows(self):
+        """One grouped query: totals per business, column, type, category and subcategory."""
+        if not self.windows:
+            return []
+        windows = list(self.windows.values())
+        if self.compare:
+            windows += [w.comparison(self.compare) for w in self.windows.values()]
+        comparison = self.comparison_case() if self.compare else Value(None, output_field=IntegerField())
+        return (
+            TransactionDailyRollup.objects.filter(
+                business_id__in=list(self.windows),
+                status='confirmed',
+                transaction_type__in=TYPES,
+                date__gte=min(w.start for w in windows),
+                date__lte=max(w.end for w in windows),
+            )
+            .annotate(column=self.column_case(), comparison=comparison)
+            .filter(Q(column__isnull=False) | Q(comparison__isnull=False))
+            .values('business_id', 'column', 'comparison', 'transaction_type', 'category', 'subcategory')
+            .annotate(total=Sum('total_amount_ngn'))
+            .order_by()
+        )
+
+    def build(self):
+        count = self.column_count()
+        consolidated = Section(count)
+        sections = {business.pk: Section(count) for business in self.businesses}
+        for row in self.rows():
+            amount = _money(row['total'])
+            # A day in both the window and its comparison counts in both
+            for column in (row['column'], row['comparison']):
+                if column is None:
+                    continue
+                key = (column, row['transaction_type'], row['category'], row['subcategory'])
+                sections[row['business_id']].add(*key, amount)
+                consolidated.add(*key, amount)
+
+        compare = self.compare is not None
+        return {
+            'period': self.period,
+            'layout': self.layout,
+            'compare': self.compare,
+            'currency': 'NGN',
+            'columns': self.column_headers(),
+            'consolidated': consolidated.data(compare),
+            'businesses': [
+                {
+                    'business_id': str(business.pk),
+                    'name': business.name,
+                    **self.window_data(self.windows[business.pk]),
+                    **sections[business.pk].data(compare),
+                }
+                for business in self.businesses
+            ],
+        }
+
+    def window_data(self, window):
+        data = {'start': window.start.isoformat(), 'end': window.end.isoformat()}
+        if self.compare:
+            other = window.comparison(self.compare)
+            data['comparison'] = {'start': other.start.isoformat(), 'end': other.end.isoformat()}
+        return data
+
+    def column_headers(self):
+        windows = list(self.windows.values())
+        # Dates only when every business shares the window
+        shared = windows[0] if windows and all(w == windows[0] for w in windows) else None
+        if self.layout == 'total':
+            header = {'key': 0, 'label': 'Total'}
+            if shared:
+                header.update(start=shared.start.isoformat(), end=shared.end.isoformat())
+            return [header]
+
+        headers = []
+        for k in range(self.column_count()):
+            header = {'key': k, 'label': f'Month {k + 1}'}
+            if shared:
+                start, end = shared.columns('month')[k]
+                if start.day == 1 and end == add_months(start, 1) - timedelta(days=1):
+                    header['label'] = start.strftime('%b %Y')
+                header.update(start=start.isoformat(), end=end.isoformat())
+            headers.append(header)
+        return headers
+
+
+class Section:
+    """Amounts of one P&L (a business's or the consolidated one) by column."""
+
+    def __init__(self, column_count):
+        self.column_count = column_count
+        # {type: {category: {subcategory: {column: Decimal}}}}
+        self.amounts = {transaction_type: {} for transaction_type in TYPES}
+
+    def add(self, column, transaction_type, category, subcategory, amount):
+        cells = self.amounts[transaction_type].setdefault(category, {}).setdefault(subcategory, {})
+        cells[column] = cells.get(column, Decimal('0')) + amount
+
+    def data(self, compare):
+        income = self.group('income', compare)
+        expense = self.group('expense', compare)
+        net = {
+            column: income['_cells'].get(column, Decimal('0')) - expense['_cells'].get(column, Decimal('0'))
+            for column in set(income['_cells']) | set(expense['_cells'])
+        }
+        del income['_cells'], expense['_cells']
+        return {
+            'income': income,
+            'expense': expense,
+            'net_income': _line(net, self.column_count, compare),
+        }
+
+    def group(self, transaction_type, compare):
+        total_cells = {}
+        categories = []
+        for category, subcategories in self.amounts[transaction_type].items():
+            category_cells = {}
+            lines = []
+            for subcategory, cells in subcategories.items():
+                _accumulate(category_cells, cells)
+                lines.append({'subcategory': subcategory or None, **_line(cells, self.column_count, compare)})
+            _accumulate(total_cells, category_cells)
+            lines.sort(key=lambda line: -line['total'])
+            categories.append({
+                'category': category,
+                **_line(category_cells, self.column_count, compare),
+                'subcategories': lines,
+            })
+        categories.sort(key=lambda line: -line['total'])
+        return {**_line(total_cells, self.column_count, compare), 'categories': categories, '_cells': total_cells}
+
+
+def _range_case(ranges):
+    # One WHEN per distinct date range, shared by every business it applies to
+    whens = [
+        When(Q(business_id__in=business_ids, date__gte=start, date__lte=end), then=Value(k))
+        for (start, end, k), business_ids in ranges.items()
+    ]
+    return Case(*whens, default=None, output_field=IntegerField())
+
+
+def _accumulate(into, cells):
+    for column, amount in cells.items():
+        into[column] = into.get(column, Decimal('0')) + amount
+
+
+def _line(cells, column_count, compare):
+    columns = [cells.get(k, Decimal('0')) for k in range(column_count)]
+    total = sum(columns, Decimal('0'))
+    line = {'total': float(total), 'columns': [float(amount) for amount in columns]}
+    if compare:
+        previous = cells.get(COMPARISON, Decimal('0'))
+        line['previous'] = float(previous)
+        line['change'] = float(total - previous)
+        line['change_pct'] = round(float((total - previous) / abs(previous) * 100), 1) if previous else None
+    return line
+
+
+def _money(value):
+    # SQLite returns decimal sums as floats
+    return Decimal(str(value or 0)).quantize(Decimal('0.01'))
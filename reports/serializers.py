@@ -0,0 +1,126 @@
+"""
+Report Serializers
+"""
+from rest_framework import serializers
+
+from transactions.models import Transaction
+from . import cashflow, pnl
+from .models import ReportJob
+
+
+class ProfitAndLossQuerySerializer(serializers.Serializer):
+    """Query parameters of the P&L report."""
+    
+    # Custom ranges longer than this are refused, month columns above all
+    MAX_CUSTOM_DAYS = 5 * 366
+    
+    business = serializers.ListField(child=serializers.UUIDField(), required=False)
+    period = serializers.ChoiceField(choices=pnl.PERIODS, default='fiscal_year')
+    year = serializers.IntegerField(min_value=1900, max_value=2999, required=False)
+    quarter = serializers.IntegerField(min_value=1, max_value=4, required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    layout = serializers.ChoiceField(choices=pnl.LAYOUTS, default='total')
+    compare = serializers.ChoiceField(choices=pnl.COMPARISONS, required=False)
+    
+    def validate(self, attrs):
+        if attrs['period'] == 'custom':
+            date_from, date_to = attrs.get('date_from'), attrs.get('date_to')
+            if not (date_from and date_to):
+                raise serializers.ValidationError({'date_from': 'date_from and date_to are required for a custom period'})
+            if date_from > date_to:
+                raise serializers.ValidationError({'date_to': 'date_to must not be before date_from'})
+            if (date_to - date_from).days >= self.MAX_CUSTOM_DAYS:
+                raise serializers.ValidationError({'date_to': 'Custom periods are limited to five years'})
+        elif attrs.get('date_from') or attrs.get('date_to'):
+            raise serializers.ValidationError({'period': 'date_from and date_to need period=custom'})
+        if attrs.get('quarter') and attrs['period'] != 'fiscal_quarter':
+            raise serializers.ValidationError({'quarter': 'quarter needs period=fiscal_quarter'})
+        return attrs
+    
+    def period_options(self):
+        """Keyword arguments of pnl.ProfitAndLoss for the validated query."""
+        data = dict(self.validated_data)
+        data.pop('business', None)
+        return data
+
+
+class CashFlowQuerySerializer(serializers.Serializer):
+    """Query parameters of the cash-flow statement."""
+    
+    # Longest range per interval, to bound the number of buckets
+    MAX_DAYS = {'day': 366, 'week': 3 * 366, 'month': 5 * 366}
+    
+    business = serializers.ListField(child=serializers.UUIDField(), required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    interval = serializers.ChoiceField(choices=cashflow.INTERVALS, default='month')
+    
+    def validate(self, attrs):
+        default_from, default_to = cashflow.default_range()
+        date_from = attrs.setdefault('date_from', default_from)
+        date_to = attrs.setdefault('date_to', default_to)
+        if date_from > date_to:
+            raise serializers.ValidationError({'date_to': 'date_to must not be before date_from'})
+        if (date_to - date_from).days >= self.MAX_DAYS[attrs['interval']]:
+            raise serializers.ValidationError({'date_to': f"Range too long for interval={attrs['interval']}"})
+        return attrs
+    
+    def statement_options(self):
+        """Keyword arguments of cashflow.CashFlowStatement for the validated query."""
+        data = dict(self.validated_data)
+        data.pop('business', None)
+        return data
+
+
+class LedgerQuerySerializer(serializers.Serializer):
+    """Query parameters of the ledger export."""
+    
+    business = serializers.ListField(child=serializers.UUIDField(), required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    status = serializers.ChoiceField(choices=Transaction.STATUS, required=False)
+    
+    def validate(self, attrs):
+        if attrs.get('date_from') and attrs.get('date_to') and attrs['date_from'] > attrs['date_to']:
+            raise serializers.ValidationError({'date_to': 'date_to must not be before date_from'})
+        return attrs
+
+
+class ReportJobRequestSerializer(serializers.Serializer):
+    """Which report to generate; its query is validated by the report's own serializer."""
+    
+    # Formats each report can be generated in
+    REPORT_FORMATS = {
+        'profit_and_loss': ('csv', 'xlsx', 'json'),
+        'cash_flow': ('csv', 'xlsx', 'json'),
+        'ledger': ('csv', 'xlsx'),
+    }
+    
+    report = serializers.ChoiceField(choices=ReportJob.REPORTS)
+    file_format = serializers.ChoiceField(choices=ReportJob.FORMATS, default='csv')
+    
+    def validate(self, attrs):
+        formats = self.REPORT_FORMATS[attrs['report']]
+        if attrs['file_format'] not in formats:
+            raise serializers.ValidationError({'file_format': f"{attrs['report']} is available as {', '.join(formats)}"})
+        return attrs
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    """Serializer for report jobs."""
+    
+    download_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ReportJob
+        fields = [
+            'id', 'report', 'file_format', 'params', 'status', 'progress', 'rows_written',
+            'file_size', 'error', 'download_url', 'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+    
+    def get_download_url(self, obj):
+        if obj.status != 'completed':
+            return None
+        return f'/api/v1/reports/jobs/{obj.pk}/download/'
@@ -0,0 +1,12 @@
+"""
+Report Tasks
+"""
+from celery import shared_task
+
+from . import jobs
+
+
+@shared_task(ignore_result=True)
+def generate_report(job_id):
+    """Generate a queued ReportJob's file (see ``reports.jobs``)."""
+    jobs.run(job_id)
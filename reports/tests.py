@@ -1,3 +1,501 @@
-from django.test import TestCase
+"""
+Report Tests
+"""
+import csv
+import io
+import json
+import shutil
+import tempfile
+import threading
+import uuid
+import zipfile
+from datetime import date, timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from alerts.models import Alert
+from businesses.balances import balance_as_of
+from businesses.models import Business
+from organizations.models import Organization, TeamMember
+from config.celery import app as celery_app
+from reports import cache as report_cache, jobs
+from reports.models import ReportJob
+from transactions.models import Transaction
+
+User = get_user_model()
+
+
+class DashboardFixtureMixin:
+
+    def make_fixtures(self):
+        cache.clear()
+        self.today = timezone.localdate()
+        self.owner = User.objects.create_user(email='owner@example.com', password='Str0ng-pass!')
+        self.org = Organization.objects.create(owner=self.owner, name='Adebayo Holdings')
+        TeamMember.objects.create(organization=self.org, user=self.owner, role='owner', status='active')
+
+        self.shop = Business.objects.create(organization=self.org, name='Shop', opening_balance=1000)
+        self.farm = Business.objects.create(organization=self.org, name='Farm', opening_balance=500)
+
+        for business, transaction_type, amount, days_ago in [
+            (self.shop, 'income', '300.00', 0),
+            (self.shop, 'expense', '120.00', 1),
+            (self.farm, 'income', '80.00', 2),
+            (self.farm, 'expense', '40.00', 45),
+        ]:
+            Transaction.objects.create(
+                organization=self.org, business=business, transaction_type=transaction_type,
+                transaction_date=self.today - timedelta(days=days_ago),
+                amount=amount, category='sales', description=f'{transaction_type} entry'
+            )
+
+        Alert.objects.create(organization=self.org, business=self.shop, alert_type='low_cash', title='Low', message='Low')
+        Alert.objects.create(organization=self.org, alert_type='digest', title='Read', message='Read', status='read')
+
+    def get_dashboard(self, user, **params):
+        token = RefreshToken.for_user(user).access_token
+        return self.client.get('/api/v1/dashboard', params, HTTP_AUTHORIZATION=f'Bearer {token}')
+
+
+@override_settings(DASHBOARD_PARALLEL_QUERIES=False)
+class DashboardTests(DashboardFixtureMixin, TestCase):
+
+    def setUp(self):
+        self.make_fixtures()
+
+    def test_returns_every_section(self):
+        response = self.get_dashboard(self.owner)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+
+        self.assertEqual(data['balance'], {'total': 1720.0, 'business_count': 2})
+        self.assertEqual([b['name'] for b in data['businesses']], ['Farm', 'Shop'])
+        self.assertEqual(data['businesses'][1]['transaction_count'], 2)
+        self.assertEqual(len(data['recent_transactions']), 4)
+        self.assertEqual(data['unread_alerts'], 1)
+
+        self.assertEqual(len(data['trend']), 30)
+        self.assertEqual(data['trend'][-1], {'date': self.today.isoformat(), 'income': 300.0, 'expense': 0.0})
+        self.assertEqual(sum(day['expense'] for day in data['trend']), 120.0)
+
+        # Only rows in the current month/year count towards the period totals
+        month_start = self.today.replace(day=1)
+        expected_mtd_income = sum(
+            amount for amount, days_ago in [(300.0, 0), (80.0, 2)]
+            if self.today - timedelta(days=days_ago) >= month_start
+        )
+        self.assertEqual(data['month_to_date']['income'], expected_mtd_income)
+
+    def test_scope_limits_what_is_shown(self):
+        manager = User.objects.create_user(email='manager@example.com', password='Str0ng-pass!')
+        TeamMember.objects.create(
+            organization=self.org, user=manager, role='manager', status='active',
+            business_access=[str(self.farm.id)]
+        )
+
+        data = self.get_dashboard(manager).json()['data']
+
+        self.assertEqual([b['name'] for b in data['businesses']], ['Farm'])
+        self.assertEqual({t['business_name'] for t in data['recent_transactions']}, {'Farm'})
+        self.assertEqual(data['unread_alerts'], 0)
+
+        other = self.get_dashboard(manager, organization_id=str(Organization.objects.create(
+            owner=self.owner, name='Elsewhere').id)).json()['data']
+        self.assertEqual(other['businesses'], [])
+        self.assertEqual(other['year_to_date']['income'], 0.0)
+
+    def test_requires_authentication(self):
+        response = self.client.get('/api/v1/dashboard')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['error']['code'], 'NOT_AUTHENTICATED')
+
+
+@override_settings(ALERTS_ASYNC=False)
+class ParallelDashboardTests(DashboardFixtureMixin, TransactionTestCase):
+    """The concurrent path, where sections run on their own connections."""
+
+    def test_parallel_sections_match_sequential(self):
+        self.make_fixtures()
+
+        with override_settings(DASHBOARD_PARALLEL_QUERIES=True):
+            parallel = self.get_dashboard(self.owner).json()['data']
+        with override_settings(DASHBOARD_PARALLEL_QUERIES=False):
+            sequential = self.get_dashboard(self.owner).json()['data']
+
+        self.assertEqual(parallel, sequential)
+
+
+class ProfitAndLossTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(email='owner@example.com', password='Str0ng-pass!')
+        cls.org = Organization.objects.create(owner=cls.owner, name='Adebayo Holdings')
+        TeamMember.objects.create(organization=cls.org, user=cls.owner, role='owner', status='active')
+        cls.shop = Business.objects.create(organization=cls.org, name='Shop')
+        # Fiscal year from 1 April
+        cls.farm = Business.objects.create(organization=cls.org, name='Farm', fiscal_year_start=date(2000, 4, 1))
+
+        for business, day, transaction_type, amount, category, subcategory, status in [
+            (cls.shop, date(2026, 1, 15), 'income', '1000.00', 'sales', 'retail', 'confirmed'),
+            (cls.shop, date(2026, 2, 10), 'income', '500.00', 'sales', 'wholesale', 'confirmed'),
+            (cls.shop, date(2026, 2, 11), 'expense', '300.00', 'rent', None, 'confirmed'),
+            (cls.shop, date(2026, 2, 12), 'expense', '999.00', 'rent', None, 'pending'),
+            (cls.shop, date(2025, 1, 20), 'income', '800.00', 'sales', 'retail', 'confirmed'),
+            (cls.farm, date(2026, 3, 31), 'income', '200.00', 'produce', None, 'confirmed'),
+            (cls.farm, date(2026, 4, 1), 'income', '700.00', 'produce', None, 'confirmed'),
+            (cls.farm, date(2026, 5, 1), 'expense', '100.00', 'feed', None, 'confirmed'),
+        ]:
+            Transaction.objects.create(
+                organization=cls.org, business=business, transaction_date=day, transaction_type=transaction_type,
+                amount=amount, category=category, subcategory=subcategory, status=status, description='Entry'
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def get_report(self, **params):
+        return self.client.get('/api/v1/reports/profit-and-loss', params)
+
+    def test_consolidates_each_business_fiscal_year(self):
+        data = self.get_report(year=2026).json()['data']
+
+        self.assertEqual(data['consolidated']['income']['total'], 2200.0)
+        self.assertEqual(data['consolidated']['expense']['total'], 400.0)
+        self.assertEqual(data['consolidated']['net_income']['total'], 1800.0)
+
+        farm, shop = data['businesses']
+        self.assertEqual((farm['start'], farm['end']), ('2026-04-01', '2027-03-31'))
+        self.assertEqual(farm['income']['total'], 700.0)
+        sales, = shop['income']['categories']
+        self.assertEqual(
+            [(line['subcategory'], line['total']) for line in sales['subcategories']],
+            [('retail', 1000.0), ('wholesale', 500.0)]
+        )
+        self.assertNotIn('previous', sales)
+
+    def test_month_columns_and_comparison(self):
+        data = self.get_report(business=str(self.shop.id), layout='month', year=2026, compare='previous_year').json()['data']
+
+        self.assertEqual([column['label'] for column in data['columns']][:3], ['Jan 2026', 'Feb 2026', 'Mar 2026'])
+        income = data['consolidated']['income']
+        self.assertEqual(income['columns'][:3], [1000.0, 500.0, 0.0])
+        self.assertEqual((income['previous'], income['change'], income['change_pct']), (800.0, 700.0, 87.5))
+        self.assertEqual(data['consolidated']['expense']['columns'][1], 300.0)
+
+    def test_comparison_overlapping_the_window_counts_shared_days_in_both(self):
+        data = self.get_report(
+            business=str(self.shop.id), period='custom', date_from='2025-01-01', date_to='2026-12-31',
+            compare='previous_year'
+        ).json()['data']
+
+        income = data['consolidated']['income']
+        self.assertEqual((income['total'], income['previous']), (2300.0, 800.0))
+
+    def test_reads_one_grouped_rollup_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.get_report(layout='month', compare='previous_period', year=2026)
+        sql = [q['sql'] for q in ctx.captured_queries]
+        self.assertEqual(len([q for q in sql if 'transaction_daily_rollups' in q]), 1)
+        self.assertFalse(any('FROM "transactions"' in q for q in sql))
+
+    def test_validation_and_permissions(self):
+        self.assertEqual(self.get_report(period='custom', date_from='2026-01-01').status_code, 400)
+        self.assertEqual(self.get_report(business=str(uuid.uuid4())).status_code, 404)
+
+        custom = self.get_report(period='custom', date_from='2026-02-01', date_to='2026-02-28').json()['data']
+        self.assertEqual(custom['consolidated']['income']['total'], 500.0)
+
+        stranger = User.objects.create_user(email='stranger@example.com', password='Str0ng-pass!')
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.get_report().status_code, 403)
+
+
+class CashFlowTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(email='owner@example.com', password='Str0ng-pass!')
+        cls.org = Organization.objects.create(owner=cls.owner, name='Adebayo Holdings')
+        TeamMember.objects.create(organization=cls.org, user=cls.owner, role='owner', status='active')
+        cls.shop = Business.objects.create(
+            organization=cls.org, name='Shop', opening_balance=1000, opening_balance_date=date(2025, 1, 1)
+        )
+        cls.farm = Business.objects.create(organization=cls.org, name='Farm', opening_balance=500)
+
+        def record(business, day, transaction_type, amount, category, payment_method=None, **fields):
+            return Transaction.objects.create(
+                organization=cls.org, business=business, transaction_date=day, transaction_type=transaction_type,
+                amount=amount, category=category, payment_method=payment_method, description='Entry', **fields
+            )
+
+        record(cls.shop, date(2025, 12, 5), 'income', '50.00', 'sales', 'cash')
+        record(cls.shop, date(2025, 12, 20), 'transfer', '100.00', 'transfer', transfer_to_business=cls.farm)
+        record(cls.shop, date(2026, 1, 10), 'income', '300.00', 'sales', 'cash')
+        record(cls.shop, date(2026, 1, 20), 'expense', '100.00', 'rent', 'pos')
+        sent = record(cls.shop, date(2026, 2, 3), 'transfer', '200.00', 'transfer', transfer_to_business=cls.farm)
+        # Receiving leg of the same transfer
+        record(cls.farm, date(2026, 2, 3), 'transfer', '200.00', 'transfer', transfer_pair=sent)
+        record(cls.farm, date(2026, 2, 15), 'expense', '80.00', 'feed', 'bank_transfer')
+        record(cls.farm, date(2026, 4, 1), 'income', '40.00', 'produce', 'cash')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def get_report(self, **params):
+        return self.client.get('/api/v1/reports/cash-flow', {'date_from': '2026-01-01', 'date_to': '2026-02-28', **params})
+
+    def test_running_balances_per_business(self):
+        data = self.get_report().json()['data']
+        farm, shop = data['businesses']
+
+        self.assertEqual(shop['opening_balance_date'], '2025-01-01')
+        self.assertEqual(
+            [(p['start'], p['opening_balance'], p['closing_balance']) for p in shop['periods']],
+            [('2026-01-01', 1050.0, 1250.0), ('2026-02-01', 1250.0, 1250.0)]
+        )
+        self.assertEqual(shop['transfers'], {'in': 0.0, 'out': 200.0, 'net': -200.0})
+        self.assertEqual(shop['periods'][1]['transfers_out'], 200.0)
+        self.assertEqual(shop['inflows']['by_payment_method'], [{'payment_method': 'cash', 'total': 300.0}])
+        self.assertEqual(shop['outflows']['by_category'], [{'category': 'rent', 'total': 100.0}])
+        self.assertEqual((farm['opening_balance'], farm['closing_balance']), (500.0, 420.0))
+        self.assertEqual(farm['transfers']['in'], 200.0)
+
+    def test_closing_balance_is_the_ledger_balance_on_the_last_day(self):
+        for date_to in ('2026-01-31', '2026-02-28', '2026-04-30'):
+            data = self.get_report(date_to=date_to).json()['data']
+            for line in data['businesses']:
+                business = Business.objects.get(pk=line['business_id'])
+                self.assertEqual(line['closing_balance'], float(balance_as_of(business, date.fromisoformat(date_to))))
+        self.assertEqual(line['closing_balance'], float(business.current_balance))
+
+    def test_consolidated_nets_out_internal_transfers(self):
+        consolidated = self.get_report().json()['data']['consolidated']
+        self.assertEqual((consolidated['opening_balance'], consolidated['closing_balance']), (1550.0, 1670.0))
+        self.assertEqual(consolidated['transfers'], {'in': 0.0, 'out': 0.0, 'net': 0.0})
+
+        # Seen alone, the shop's transfers to the farm leave the statement
+        shop_only = self.get_report(business=str(self.shop.id)).json()['data']['consolidated']
+        self.assertEqual(shop_only['transfers']['out'], 200.0)
+        self.assertEqual(shop_only['closing_balance'], 1250.0)
+
+    def test_weekly_buckets_from_one_transaction_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            data = self.get_report(interval='week').json()['data']
+        self.assertEqual(len([q for q in ctx.captured_queries if 'FROM "transactions"' in q['sql']]), 1)
+
+        periods = data['consolidated']['periods']
+        # 1 January 2026 is a Thursday: the first week is clamped to the range
+        self.assertEqual((periods[0]['start'], periods[0]['end']), ('2026-01-01', '2026-01-04'))
+        self.assertEqual(periods[-1]['closing_balance'], 1670.0)
+
+    def test_validation(self):
+        self.assertEqual(self.get_report(date_from='2026-03-01').status_code, 400)
+        self.assertEqual(self.get_report(interval='day', date_from='2024-01-01').status_code, 400)
+
+
+class ReportCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(email='owner@example.com', password='Str0ng-pass!')
+        cls.org = Organization.objects.create(owner=cls.owner, name='Adebayo Holdings')
+        TeamMember.objects.create(organization=cls.org, user=cls.owner, role='owner', status='active')
+        cls.shop = Business.objects.create(organization=cls.org, name='Shop')
+        Transaction.objects.create(
+            organization=cls.org, business=cls.shop, transaction_date=date(2026, 1, 15), transaction_type='income',
+            amount='1000.00', category='sales', description='Entry'
+        )
+
+    def setUp(self):
+        cache.clear()
+        report_cache.reset_cache_stats()
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def get_report(self):
+        return self.client.get('/api/v1/reports/profit-and-loss', {'year': 2026})
+
+    def test_serves_repeats_from_cache_until_data_changes(self):
+        first = self.get_report().json()['data']
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.get_report().json()['data']
+        self.assertEqual(first, second)
+        self.assertFalse(any('transaction_daily_rollups' in q['sql'] for q in ctx.captured_queries))
+
+        Transaction.objects.create(
+            organization=self.org, business=self.shop, transaction_date=date(2026, 2, 1), transaction_type='income',
+            amount='500.00', category='sales', description='Entry'
+        )
+        self.assertEqual(self.get_report().json()['data']['consolidated']['income']['total'], 1500.0)
+
+        stats = report_cache.cache_stats()['profit_and_loss']
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 2, 0.3333))
+
+    def test_key_ignores_parameter_order(self):
+        versions = [(self.org.pk, 1)]
+        self.assertEqual(
+            report_cache.cache_key('cash_flow', versions, {'business': ['b', 'a'], 'interval': 'month'}),
+            report_cache.cache_key('cash_flow', versions, {'interval': 'month', 'business': ['a', 'b'], 'x': None}),
+        )
+        self.assertNotEqual(
+            report_cache.cache_key('cash_flow', versions, {'interval': 'month'}),
+            report_cache.cache_key('cash_flow', [(self.org.pk, 2)], {'interval': 'month'}),
+        )
+
+    def test_concurrent_requests_compute_once(self):
+        computing, release = threading.Event(), threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            computing.set()
+            release.wait(5)
+            return {'total': 1.0}
+
+        results = []
+
+        def request():
+            results.append(report_cache.get_or_compute('test', [(self.org.pk, 1)], {}, compute))
+
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        threads[0].start()
+        computing.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'total': 1.0}] * 5)
+        stats = report_cache.cache_stats()['test']
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'] + stats['coalesced'], 4)
+
+    def test_lock_is_only_released_by_its_holder(self):
+        versions = [(self.org.pk, 1)]
+        lock_key = report_cache.cache_key('test', versions, {}) + ':lock'
+
+        def compute():
+            # Our lock expired mid-computation and another process took it
+            cache.set(lock_key, 'other')
+            return {'total': 1.0}
+
+        report_cache.get_or_compute('test', versions, {}, compute)
+        self.assertEqual(cache.get(lock_key), 'other')
+
+        report_cache.get_or_compute('test', [(self.org.pk, 2)], {}, lambda: {'total': 2.0})
+        self.assertIsNone(cache.get(report_cache.cache_key('test', [(self.org.pk, 2)], {}) + ':lock'))
+
+    def test_stats_are_staff_only(self):
+        self.assertEqual(self.client.get('/api/v1/reports/cache-stats').status_code, 403)
+        staff = User.objects.create_user(email='staff@example.com', password='Str0ng-pass!', is_staff=True)
+        self.client.force_authenticate(staff)
+        self.assertEqual(self.client.get('/api/v1/reports/cache-stats').status_code, 200)
+
+
+class ReportJobTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(email='owner@example.com', password='Str0ng-pass!')
+        cls.org = Organization.objects.create(owner=cls.owner, name='Adebayo Holdings')
+        TeamMember.objects.create(organization=cls.org, user=cls.owner, role='owner', status='active')
+        cls.shop = Business.objects.create(organization=cls.org, name='Shop')
+        for day, transaction_type, amount, category in [
+            (date(2026, 1, 5), 'income', '1000.00', 'sales'),
+            (date(2026, 1, 9), 'expense', '250.00', 'rent'),
+            (date(2026, 2, 2), 'income', '400.00', 'sales'),
+            (date(2026, 2, 20), 'expense', '75.50', 'utilities'),
+            (date(2026, 3, 1), 'income', '120.00', 'services'),
+        ]:
+            Transaction.objects.create(
+                organization=cls.org, business=cls.shop, transaction_date=day, transaction_type=transaction_type,
+                amount=amount, category=category, description=f'{category} & more <entry>'
+            )
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root, TRANSACTION_EXPORT_CHUNK_SIZE=2)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        # Run tasks inline, no broker; the app's settings carry the CELERY_ namespace
+        eager = celery_app.conf.CELERY_TASK_ALWAYS_EAGER
+        celery_app.conf.CELERY_TASK_ALWAYS_EAGER = True
+        self.addCleanup(setattr, celery_app.conf, 'CELERY_TASK_ALWAYS_EAGER', eager)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def enqueue(self, **body):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/v1/reports/jobs/', body, format='json')
+        self.assertEqual(response.status_code, 202, response.content)
+        return self.client.get(f"/api/v1/reports/jobs/{response.json()['data']['id']}/").json()['data']
+
+    def download(self, job):
+        response = self.client.get(job['download_url'])
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_ledger_streams_to_xlsx(self):
+        job = self.enqueue(report='ledger', file_format='xlsx', date_from='2026-01-01', date_to='2026-02-28')
+        self.assertEqual((job['status'], job['progress'], job['rows_written']), ('completed', 100, 4))
+
+        with zipfile.ZipFile(io.BytesIO(self.download(job))) as workbook:
+            self.assertIn('xl/workbook.xml', workbook.namelist())
+            sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row>'), 5)
+        self.assertIn('rent &amp; more &lt;entry&gt;', sheet)
+
+    def test_pnl_file_matches_the_report(self):
+        job = self.enqueue(report='profit_and_loss', file_format='json', year=2026)
+        report = self.client.get('/api/v1/reports/profit-and-loss', {'year': 2026}).json()['data']
+        self.assertEqual(json.loads(self.download(job)), report)
+
+        job = self.enqueue(report='profit_and_loss', file_format='csv', year=2026, layout='month')
+        rows = list(csv.reader(io.StringIO(self.download(job).decode())))
+        self.assertEqual(rows[0][:5], ['business', 'section', 'category', 'subcategory', 'Jan 2026'])
+        net = next(row for row in rows if row[0] == 'Consolidated' and row[1] == 'net_income')
+        self.assertEqual(float(net[-1]), 1194.5)
+
+    def test_jobs_are_private_and_validated(self):
+        self.assertEqual(
+            self.client.post('/api/v1/reports/jobs/', {'report': 'ledger', 'file_format': 'json'}, format='json').status_code,
+            400
+        )
+        queued = self.client.post('/api/v1/reports/jobs/', {'report': 'cash_flow'}, format='json').json()['data']
+        self.assertEqual(queued['status'], 'queued')
+        self.assertEqual(self.client.get(f"/api/v1/reports/jobs/{queued['id']}/download/").status_code, 409)
+
+        stranger = User.objects.create_user(email='stranger@example.com', password='Str0ng-pass!')
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.client.get(f"/api/v1/reports/jobs/{queued['id']}/").status_code, 404)
+        self.assertEqual(
+            self.client.post('/api/v1/reports/jobs/', {'report': 'ledger'}, format='json').status_code, 403
+        )
+
+    def test_failure_is_recorded(self):
+        job = ReportJob.objects.create(
+            requested_by=self.owner, report='cash_flow', file_format='csv', params={'date_from': 'soon'}
+        )
+        jobs.run(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('date_from', job.error)
+        self.assertFalse(job.file)
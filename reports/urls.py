@@ -0,0 +1,17 @@
+"""
+Report URL Configuration
+"""
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from . import views
+
+router = DefaultRouter()
+router.register('reports/jobs', views.ReportJobViewSet, basename='report-jobs')
+
+urlpatterns = [
+    path('dashboard', views.dashboard, name='dashboard'),
+    path('reports/profit-and-loss', views.ProfitAndLossView.as_view(), name='profit-and-loss'),
+    path('reports/cash-flow', views.CashFlowView.as_view(), name='cash-flow'),
+    path('reports/cache-stats', views.ReportCacheStatsView.as_view(), name='report-cache-stats'),
+    path('', include(router.urls)),
+]
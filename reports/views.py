@@ -1,3 +1,281 @@
-from django.shortcuts import render
+"""
+Report Views
+"""
+import asyncio
+import json
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.http import FileResponse, HttpResponseNotAllowed, HttpResponseNotModified, JsonResponse
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from config.etags import etag_matches, make_etag, organization_versions
+from organizations.access import AccessScope, AccessScopeMixin
+from organizations.models import Organization
+from . import cache as report_cache
+from .cashflow import CashFlowStatement
+from .dashboard import Dashboard
+from .files import CONTENT_TYPES
+from .jobs import QUERY_SERIALIZERS
+from .models import ReportJob
+from .pnl import ProfitAndLoss
+from .serializers import (
+    CashFlowQuerySerializer, ProfitAndLossQuerySerializer, ReportJobRequestSerializer, ReportJobSerializer
+)
+from .tasks import generate_report
+
+
+async def dashboard(request):
+    """
+    Everything the dashboard page shows, in one response.
+
+    A plain async view rather than a DRF one: under ASGI its sections run
+    concurrently, each on its own worker thread and database connection.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    user = await authenticate(request)
+    if user is None:
+        return JsonResponse({
+            'success': False,
+            'error': {'code': 'NOT_AUTHENTICATED', 'message': 'Authentication credentials were not provided.'}
+        }, status=401)
+
+    scope = await sync_to_async(AccessScope.for_user)(user)
+    org_id = request.GET.get('organization_id')
+    if org_id:
+        scope = scope.restrict(org_id)
+
+    versions = await sync_to_async(organization_versions)(user, scope)
+    etag = make_etag(request, user, scope, versions)
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    board = Dashboard(scope)
+    sections = board.sections()
+    results = await asyncio.gather(*(run_section(section) for section in sections.values()))
+
+    response = JsonResponse({
+        'success': True,
+        'data': board.assemble(dict(zip(sections, results)))
+    }, encoder=DjangoJSONEncoder)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+async def authenticate(request):
+    """The user of the request's JWT bearer token, or None."""
+    try:
+        result = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return result[0] if result else None
+
+
+def run_section(section):
+    """
+    Awaitable running one synchronous section.
+
+    With DASHBOARD_PARALLEL_QUERIES on, each section gets a thread of its own
+    (and so its own connection); otherwise they share the request's thread,
+    which tests need to see data inside their transaction.
+    """
+    if not settings.DASHBOARD_PARALLEL_QUERIES:
+        return sync_to_async(section)()
+
+    def isolated():
+        close_old_connections()
+        try:
+            return section()
+        finally:
+            close_old_connections()
+
+    return sync_to_async(isolated, thread_sensitive=False)()
+
+
+class ReportAccessMixin(AccessScopeMixin):
+    """The businesses a report may cover."""
+
+    FORBIDDEN_MESSAGES = {
+        'view_reports': 'No permission to view reports',
+        'export': 'No permission to export transactions',
+    }
+
+    def report_businesses(self, business_ids=None, permission='view_reports'):
+        """
+        Accessible businesses of organizations where the user has
+        ``permission`` (?organization_id= narrows), or a Response on failure.
+        """
+        scope = self.get_scope()
+        organization_ids = scope.organizations_with_permission(permission)
+        if not organization_ids:
+            return Response({
+                'success': False,
+                'error': {'code': 'FORBIDDEN', 'message': self.FORBIDDEN_MESSAGES[permission]}
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        businesses = scope.businesses().filter(organization_id__in=organization_ids).only(
+            'id', 'name', 'organization_id', 'fiscal_year_start',
+            'opening_balance', 'opening_balance_date', 'current_balance'
+        ).order_by('name')
+        if business_ids:
+            businesses = list(businesses.filter(pk__in=business_ids))
+            if len(businesses) != len(set(business_ids)):
+                return Response({
+                    'success': False,
+                    'error': {'code': 'NOT_FOUND', 'message': 'Business not found'}
+                }, status=status.HTTP_404_NOT_FOUND)
+        return list(businesses)
+
+
+class ReportView(ReportAccessMixin, APIView):
+    """Base of the report endpoints."""
+    permission_classes = [IsAuthenticated]
+
+    def cached_report(self, report, businesses, params, compute):
+        """``compute()``'s result, shared through the report cache."""
+        versions = Organization.objects.filter(
+            pk__in={business.organization_id for business in businesses}
+        ).values_list('pk', 'data_version')
+        params = {**params, 'business': [business.pk for business in businesses]}
+        return report_cache.get_or_compute(report, list(versions), params, compute)
+
+
+class ProfitAndLossView(ReportView):
+    """
+    Profit & loss by category and subcategory, per business and
+    consolidated (?period=fiscal_year|fiscal_quarter|custom, ?year=,
+    ?quarter=, ?date_from=, ?date_to=, ?layout=total|month,
+    ?compare=previous_period|previous_year, ?business= repeatable).
+    """
+
+    def get(self, request):
+        query = ProfitAndLossQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        businesses = self.report_businesses(query.validated_data.get('business'))
+        if isinstance(businesses, Response):
+            return businesses
+
+        # Default periods depend on the date
+        options = {**query.period_options(), 'today': timezone.localdate()}
+        data = self.cached_report(
+            'profit_and_loss', businesses, options, lambda: ProfitAndLoss(businesses, **options).build()
+        )
+        return Response({'success': True, 'data': data})
+
+
+class CashFlowView(ReportView):
+    """
+    Cash-flow statement with running balances, per business and
+    consolidated (?date_from=, ?date_to=, ?interval=day|week|month,
+    ?business= repeatable).
+    """
+
+    def get(self, request):
+        query = CashFlowQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        businesses = self.report_businesses(query.validated_data.get('business'))
+        if isinstance(businesses, Response):
+            return businesses
+
+        options = query.statement_options()
+        data = self.cached_report(
+            'cash_flow', businesses, options, lambda: CashFlowStatement(businesses, **options).build()
+        )
+        return Response({'success': True, 'data': data})
+
+
+class ReportCacheStatsView(APIView):
+    """Report cache hit rates and compute times of this process (staff only)."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({'success': True, 'data': report_cache.cache_stats()})
+
+
+class ReportJobViewSet(ReportAccessMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Reports generated in the background to files: POST a report, its
+    file_format and the report's query to enqueue one, then poll it for
+    progress and download the file once completed. Users see their own
+    jobs.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = ReportJobSerializer
+
+    def get_queryset(self):
+        return ReportJob.objects.filter(requested_by=self.request.user).order_by('-created_at')
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page if page is not None else queryset, many=True)
+        data = {'jobs': serializer.data}
+        if page is not None:
+            data['pagination'] = {
+                'count': self.paginator.page.paginator.count,
+                'next': self.paginator.get_next_link(),
+                'previous': self.paginator.get_previous_link()
+            }
+        return Response({'success': True, 'data': data})
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response({
+            'success': True,
+            'data': self.get_serializer(self.get_object()).data
+        })
+
+    def create(self, request, *args, **kwargs):
+        job_request = ReportJobRequestSerializer(data=request.data)
+        job_request.is_valid(raise_exception=True)
+        report = job_request.validated_data['report']
+        query = QUERY_SERIALIZERS[report](data=request.data)
+        query.is_valid(raise_exception=True)
+
+        permission = 'export' if report == 'ledger' else 'view_reports'
+        businesses = self.report_businesses(query.validated_data.get('business'), permission)
+        if isinstance(businesses, Response):
+            return businesses
+
+        # Stored as JSON and validated again by the worker
+        params = json.loads(json.dumps(query.validated_data, cls=DjangoJSONEncoder))
+        params['business'] = [str(business.pk) for business in businesses]
+        job = ReportJob.objects.create(
+            requested_by=request.user,
+            report=report,
+            file_format=job_request.validated_data['file_format'],
+            params=params,
+        )
+        transaction.on_commit(lambda: generate_report.delay(str(job.pk)))
+        return Response({
+            'success': True,
+            'data': self.get_serializer(job).data
+        }, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != 'completed':
+            return Response({
+                'success': False,
+                'error': {'code': 'NOT_READY', 'message': f'Report is {job.status}'}
+            }, status=status.HTTP_409_CONFLICT)
+
+        filename = f'{job.report}-{job.created_at:%Y%m%d-%H%M%S}.{job.file_format}'
+        return FileResponse(
+            job.file.open('rb'), as_attachment=True, filename=filename, content_type=CONTENT_TYPES[job.file_format]
+        )
@@ -0,0 +1,278 @@
+"""
+Transaction Auto-Categorization
+
+Predicts a transaction's category from its description and bank narration
+with a multinomial Naive Bayes model per organization. Words are hashed
+into a fixed number of feature buckets, so a model is a dense
+(categories x buckets) count matrix whatever the vocabulary, and
+predicting a batch is one gather and one segmented sum in NumPy.
+
+A model learns from its organization's confirmed transactions that a user
+categorized: rows entered by hand, and machine-categorized rows a user
+corrected. It is trained in full on first use, then refreshed with rows
+updated since its (updated_at, id) watermark, so a row edited again is
+counted again; that only shifts weight toward recent labels. Refreshes of
+one model don't overlap: a refresh that finds another under way leaves
+the rows to it. Models are kept in process memory, least recently used
+evicted first.
+
+Predictions fill ``ai_suggested_category`` and ``ai_confidence``; rows
+still ``uncategorized`` take the suggestion as their category when the
+confidence reaches CATEGORIZER_AUTO_APPLY_CONFIDENCE.
+"""
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from decimal import Decimal
+from itertools import chain
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Transaction
+
+
+UNCATEGORIZED = 'uncategorized'
+
+N_FEATURES = 2 ** 14
+
+# Additive smoothing of the per-category word counts
+ALPHA = 0.1
+
+# Rows per NumPy pass when predicting or learning, bounding temporary arrays
+CHUNK_SIZE = 4096
+
+TRAINING_FIELDS = ['description', 'bank_narration', 'category', 'updated_at', 'id']
+
+_TOKEN_RE = re.compile(r'[a-z]{2,}')
+
+_buckets = {}
+_MAX_MEMOIZED_TOKENS = 200000
+
+
+def text_for(description, narration):
+    if narration and narration != description:
+        return f'{description or ""} {narration}'
+    return description or ''
+
+
+def features(text):
+    """Hashed bucket indices of the distinct words in ``text``."""
+    found = set()
+    for token in _TOKEN_RE.findall(text.lower()):
+        bucket = _buckets.get(token)
+        if bucket is None:
+            if len(_buckets) >= _MAX_MEMOIZED_TOKENS:
+                _buckets.clear()
+            # crc32 rather than hash(): buckets must agree across processes
+            bucket = _buckets[token] = zlib.crc32(token.encode()) & (N_FEATURES - 1)
+        found.add(bucket)
+    return found
+
+
+def _flatten(rows):
+    lengths = np.fromiter(map(len, rows), dtype=np.intp, count=len(rows))
+    flat = np.fromiter(chain.from_iterable(rows), dtype=np.intp, count=int(lengths.sum()))
+    return lengths, flat
+
+
+class CategoryModel:
+    """Hashed-feature Naive Bayes over one organization's categories."""
+
+    def __init__(self):
+        self.classes = []
+        self.class_index = {}
+        self.class_counts = np.zeros(0, dtype=np.float64)
+        self.feature_counts = np.zeros((0, N_FEATURES), dtype=np.float32)
+        self.rows = 0
+        # (updated_at, id) of the latest row learned
+        self.trained_until = None
+        self.refreshed_at = 0.0
+
+        self._lock = threading.Lock()
+        # Held for a whole refresh, watermark included
+        self._training = threading.Lock()
+        # (classes, log priors, log probabilities as buckets x categories)
+        self._params = None
+
+    @property
+    def nbytes(self):
+        return self.feature_counts.nbytes + self.class_counts.nbytes
+
+    def learn(self, texts, labels):
+        """Add labelled examples to the counts."""
+        with self._lock:
+            for start in range(0, len(texts), CHUNK_SIZE):
+                self._learn_chunk(texts[start:start + CHUNK_SIZE], labels[start:start + CHUNK_SIZE])
+            self._params = None
+
+    def _learn_chunk(self, texts, labels):
+        new = [label for label in dict.fromkeys(labels) if label not in self.class_index]
+        if new:
+            for label in new:
+                self.class_index[label] = len(self.classes)
+                self.classes.append(label)
+            self.class_counts = np.concatenate([self.class_counts, np.zeros(len(new))])
+            self.feature_counts = np.vstack([
+                self.feature_counts, np.zeros((len(new), N_FEATURES), dtype=np.float32)
+            ])
+
+        n_classes = len(self.classes)
+        label_ids = np.fromiter((self.class_index[label] for label in labels), dtype=np.intp, count=len(labels))
+        lengths, flat = _flatten([features(text) for text in texts])
+        cells = np.repeat(label_ids, lengths) * N_FEATURES + flat
+        self.feature_counts += np.bincount(cells, minlength=n_classes * N_FEATURES).reshape(n_classes, N_FEATURES)
+        self.class_counts += np.bincount(label_ids, minlength=n_classes)
+        self.rows += len(labels)
+
+    def _compile(self):
+        with self._lock:
+            if self._params is None:
+                counts = self.feature_counts + ALPHA
+                log_probs = np.log(counts) - np.log(counts.sum(axis=1, keepdims=True))
+                log_prior = np.log(self.class_counts / self.class_counts.sum())
+                self._params = (
+                    list(self.classes),
+                    log_prior.astype(np.float32),
+                    np.ascontiguousarray(log_probs.T, dtype=np.float32),
+                )
+            return self._params
+
+    def predict(self, texts):
+        """(category, confidence) for each text; an untrained model returns Nones."""
+        if not self.classes:
+            return [(None, 0.0)] * len(texts)
+        classes, log_prior, log_probs = self._params or self._compile()
+
+        results = []
+        for start in range(0, len(texts), CHUNK_SIZE):
+            chunk = texts[start:start + CHUNK_SIZE]
+            lengths, flat = _flatten([features(text) for text in chunk])
+
+            scores = np.tile(log_prior, (len(chunk), 1))
+            present = lengths > 0
+            if flat.size:
+                starts = (np.cumsum(lengths) - lengths)[present]
+                scores[present] += np.add.reduceat(log_probs[flat], starts, axis=0)
+
+            best = scores.argmax(axis=1)
+            scores -= scores[np.arange(len(chunk)), best][:, None]
+            confidence = 1.0 / np.exp(scores).sum(axis=1)
+            results.extend((classes[i], float(p)) for i, p in zip(best, confidence))
+        return results
+
+
+# Training
+
+def training_rows(organization_id, since=None):
+    """An organization's user-categorized, confirmed transactions."""
+    queryset = Transaction.objects.filter(
+        Q(ai_categorized=False) | Q(user_corrected=True),
+        organization_id=organization_id,
+        status__in=['confirmed', 'reconciled'],
+    ).exclude(category=UNCATEGORIZED)
+    if since is not None:
+        # Rows sharing the watermark's timestamp are told apart by id
+        updated_at, pk = since
+        queryset = queryset.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk))
+    return queryset.values_list(*TRAINING_FIELDS).order_by().iterator(chunk_size=5000)
+
+
+def train(model, organization_id):
+    """
+    Teach ``model`` the rows updated since its watermark, unless another
+    thread is already refreshing it.
+    """
+    if not model._training.acquire(blocking=False):
+        return model
+    try:
+        texts, labels = [], []
+        latest = model.trained_until
+        for description, narration, category, updated_at, pk in training_rows(organization_id, latest):
+            texts.append(text_for(description, narration))
+            labels.append(category)
+            if latest is None or (updated_at, pk) > latest:
+                latest = (updated_at, pk)
+            if len(texts) >= CHUNK_SIZE * 4:
+                model.learn(texts, labels)
+                texts, labels = [], []
+        if texts:
+            model.learn(texts, labels)
+        model.trained_until = latest
+        model.refreshed_at = time.monotonic()
+    finally:
+        model._training.release()
+    return model
+
+
+# Model cache
+
+_models = OrderedDict()
+_models_lock = threading.Lock()
+
+
+def get_model(organization_id):
+    """The organization's model, trained or refreshed as needed."""
+    with _models_lock:
+        model = _models.get(organization_id)
+        if model is not None:
+            _models.move_to_end(organization_id)
+
+    if model is None:
+        model = train(CategoryModel(), organization_id)
+        with _models_lock:
+            _models[organization_id] = model
+            while len(_models) > settings.CATEGORIZER_CACHE_SIZE:
+                _models.popitem(last=False)
+    elif time.monotonic() - model.refreshed_at >= settings.CATEGORIZER_REFRESH_SECONDS:
+        train(model, organization_id)
+    return model
+
+
+def evict(organization_id):
+    with _models_lock:
+        _models.pop(organization_id, None)
+
+
+def clear_cache():
+    with _models_lock:
+        _models.clear()
+
+
+def cached_organizations():
+    with _models_lock:
+        return list(_models)
+
+
+# Batch prediction
+
+def categorize(transactions):
+    """
+    Predict categories for unsaved ``uncategorized`` transactions in place.
+
+    Call before their ledger states are taken, since the category is part
+    of the rollup key. Returns how many took the suggested category.
+    """
+    by_org = {}
+    for txn in transactions:
+        if txn.category == UNCATEGORIZED:
+            by_org.setdefault(txn.organization_id, []).append(txn)
+
+    applied = 0
+    threshold = settings.CATEGORIZER_AUTO_APPLY_CONFIDENCE
+    for organization_id, txns in by_org.items():
+        model = get_model(organization_id)
+        if model.rows < settings.CATEGORIZER_MIN_TRAINING_ROWS:
+            continue
+        predictions = model.predict([text_for(t.description, t.bank_narration) for t in txns])
+        for txn, (category, confidence) in zip(txns, predictions):
+            txn.ai_suggested_category = category
+            txn.ai_confidence = Decimal(f'{confidence:.2f}')
+            if confidence >= threshold:
+                txn.category = category
+                txn.ai_categorized = True
+                applied += 1
+    return applied
@@ -0,0 +1,103 @@
+"""
+Streaming Transaction Export
+
+Serializes a transaction queryset to CSV or JSON Lines as a generator of
+text chunks. Rows are read as ``.values_list()`` tuples through ``.iterator()``
+(a server-side cursor on PostgreSQL), so memory stays flat regardless of
+how many rows are exported.
+"""
+import csv
+import io
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+EXPORT_FIELDS = [
+    ('id', 'id'),
+    ('transaction_date', 'transaction_date'),
+    ('business', 'business__name'),
+    ('transaction_type', 'transaction_type'),
+    ('amount', 'amount'),
+    ('currency', 'currency'),
+    ('exchange_rate', 'exchange_rate'),
+    ('amount_ngn', 'amount_ngn'),
+    ('category', 'category'),
+    ('subcategory', 'subcategory'),
+    ('description', 'description'),
+    ('notes', 'notes'),
+    ('reference_number', 'reference_number'),
+    ('payment_method', 'payment_method'),
+    ('payment_reference', 'payment_reference'),
+    ('status', 'status'),
+    ('tags', 'tags'),
+    ('created_at', 'created_at'),
+]
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+class TransactionExporter:
+    """Streams a transaction queryset as CSV or JSONL text chunks."""
+
+    # Rows buffered into one yielded chunk
+    rows_per_chunk = 500
+
+    def __init__(self, queryset, file_format='csv', chunk_size=None):
+        if file_format not in CONTENT_TYPES:
+            raise ValueError(f'Unsupported export format: {file_format}')
+        self.queryset = queryset
+        self.file_format = file_format
+        self.chunk_size = chunk_size or settings.TRANSACTION_EXPORT_CHUNK_SIZE
+        self.rows_exported = 0
+
+    @property
+    def content_type(self):
+        return CONTENT_TYPES[self.file_format]
+
+    def rows(self):
+        lookups = [lookup for _, lookup in EXPORT_FIELDS]
+        for row in self.queryset.values_list(*lookups).iterator(chunk_size=self.chunk_size):
+            self.rows_exported += 1
+            yield row
+
+    def stream(self):
+        if self.file_format == 'csv':
+            return self._stream_csv()
+        return self._stream_jsonl()
+
+    def _stream_csv(self):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([name for name, _ in EXPORT_FIELDS])
+
+        tags_index = [name for name, _ in EXPORT_FIELDS].index('tags')
+        for i, row in enumerate(self.rows(), start=1):
+            row = list(row)
+            row[tags_index] = ';'.join(row[tags_index] or [])
+            writer.writerow(row)
+            if i % self.rows_per_chunk == 0:
+                yield self._drain(buffer)
+        yield self._drain(buffer)
+
+    def _stream_jsonl(self):
+        names = [name for name, _ in EXPORT_FIELDS]
+        encoder = DjangoJSONEncoder(separators=(',', ':'))
+        lines = []
+        for row in self.rows():
+            lines.append(encoder.encode(dict(zip(names, row))))
+            if len(lines) == self.rows_per_chunk:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _drain(buffer):
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
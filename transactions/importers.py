@@ -0,0 +1,141 @@
+"""
+Bulk Transaction Import
+
+Streams a CSV upload row by row, validates each row with the same rules as
+the create endpoint and inserts valid rows with ``bulk_create`` in batches.
+Rows without a category go through the organization's category rules,
+then the auto-categorizer, a batch at a time before the insert. Balances
+are updated once per affected business at the end of the import.
+"""
+import csv
+import io
+import time
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+
+from . import categorizer, ledger, rules
+from .models import Transaction
+from .serializers import TransactionImportSerializer
+
+
+class TransactionImporter:
+    """Imports transactions from a CSV file for one user."""
+
+    # Columns holding list values, separated by ';' in the CSV
+    LIST_COLUMNS = ['tags']
+
+    def __init__(self, user, scope, batch_size=None):
+        self.user = user
+        self.scope = scope
+        self.batch_size = batch_size or settings.TRANSACTION_IMPORT_BATCH_SIZE
+        self.max_errors = settings.TRANSACTION_IMPORT_MAX_ERRORS
+
+        self._business_cache = {}
+        self._pending = []
+        self._changes = ledger.ChangeSet()
+
+        self.total_rows = 0
+        self.imported = 0
+        self.failed = 0
+        self.rule_categorized = 0
+        self.categorized = 0
+        self.errors = []
+
+    def run(self, upload):
+        """Import an uploaded CSV file and return the report."""
+        started = time.perf_counter()
+        stream = io.TextIOWrapper(upload, encoding='utf-8-sig', newline='')
+
+        try:
+            reader = csv.DictReader(stream)
+            with db_transaction.atomic():
+                for row in reader:
+                    self.total_rows += 1
+                    self._import_row(reader.line_num, row)
+                    if len(self._pending) >= self.batch_size:
+                        self._flush()
+                self._flush()
+                self._changes.apply()
+        finally:
+            stream.detach()
+
+        return self.report(time.perf_counter() - started)
+
+    def report(self, duration):
+        return {
+            'total_rows': self.total_rows,
+            'imported': self.imported,
+            'failed': self.failed,
+            'rule_categorized': self.rule_categorized,
+            'auto_categorized': self.categorized,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+            'batch_size': self.batch_size,
+            'duration_seconds': round(duration, 3),
+            'rows_per_second': round(self.total_rows / duration, 1) if duration > 0 else None,
+        }
+
+    def _import_row(self, line_num, row):
+        data = self._clean_row(row)
+        serializer = TransactionImportSerializer(
+            data=data,
+            context={'business_cache': self._business_cache}
+        )
+
+        if not serializer.is_valid():
+            self._reject(line_num, {
+                field: [str(msg) for msg in messages]
+                for field, messages in serializer.errors.items()
+            })
+            return
+
+        validated = serializer.validated_data
+        business = validated['business']
+        if not self._can_add_to(business):
+            self._reject(line_num, {'business': ['No permission to add transactions']})
+            return
+
+        txn = Transaction(
+            organization_id=business.organization_id,
+            created_by=self.user,
+            **validated
+        )
+        txn.amount_ngn = txn.compute_amount_ngn()
+        self._pending.append(txn)
+
+    def _clean_row(self, row):
+        data = {}
+        for key, value in row.items():
+            # Skip unnamed overflow columns and blank cells so field defaults apply
+            if key is None or value is None:
+                continue
+            key = key.strip()
+            value = value.strip()
+            if not value:
+                continue
+            if key in self.LIST_COLUMNS:
+                value = [item.strip() for item in value.split(';') if item.strip()]
+            data[key] = value
+        return data
+
+    def _can_add_to(self, business):
+        return (
+            self.scope.can_access_business(business)
+            and self.scope.has_permission(business.organization_id, 'add_transactions')
+        )
+
+    def _reject(self, line_num, errors):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': line_num, 'errors': errors})
+
+    def _flush(self):
+        if not self._pending:
+            return
+        self.rule_categorized += rules.apply(self._pending)
+        self.categorized += categorizer.categorize(self._pending)
+        Transaction.objects.bulk_create(self._pending, batch_size=self.batch_size)
+        self._changes.extend((None, txn.ledger_state()) for txn in self._pending)
+        self.imported += len(self._pending)
+        self._pending = []
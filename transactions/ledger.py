@@ -0,0 +1,148 @@
+"""
+Ledger Write Effects
+
+Every write to a transaction is described as a (before, after) pair of
+``LedgerState`` snapshots. Cached figures derived from transactions are kept
+up to date by applying the difference between the two snapshots, instead of
+re-aggregating a business's whole history on every write.
+
+Every applied ChangeSet sends ``ledger_changed`` with the transactions it
+posted, the balance deltas it wrote and the balances they left, for
+listeners such as the alert engine.
+"""
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from django.dispatch import Signal
+
+
+LedgerState = namedtuple('LedgerState', [
+    'business_id', 'organization_id', 'transaction_date', 'transaction_type',
+    'category', 'subcategory', 'currency', 'status', 'amount', 'amount_ngn',
+])
+
+# Fields a LedgerState is built from
+LEDGER_FIELDS = LedgerState._fields
+
+# Sent by ChangeSet.apply() inside the writing transaction, with
+# ``posted`` (LedgerStates that became confirmed or changed amount while
+# confirmed), ``balance_deltas`` ({business_id: Decimal}) and ``balances``
+# ({business_id: Decimal}, each balance right after its delta).
+ledger_changed = Signal()
+
+
+def balance_effect(state):
+    """Signed contribution of a transaction state to its business balance."""
+    if state is None or state.status != 'confirmed' or state.amount_ngn is None:
+        return Decimal('0')
+    if state.transaction_type == 'income':
+        return Decimal(state.amount_ngn)
+    if state.transaction_type == 'expense':
+        return -Decimal(state.amount_ngn)
+    return Decimal('0')
+
+
+def rollup_key(state):
+    """Daily rollup row a transaction state is counted in."""
+    return (
+        state.organization_id, state.business_id, state.transaction_date,
+        state.transaction_type, state.category, state.subcategory or '', state.currency, state.status,
+    )
+
+
+class ChangeSet:
+    """
+    Accumulates (before, after) transaction changes and applies their net
+    effect to the cached figures in one go.
+    
+    ``before`` is None for inserts and ``after`` is None for deletes.
+    """
+    
+    def __init__(self):
+        self.balance_deltas = defaultdict(Decimal)
+        # Balance effect by (business_id, transaction_date), for the snapshots
+        self.dated_deltas = defaultdict(Decimal)
+        self.rollup_deltas = {}
+        # (organization_id, business_id) pairs whose data version must move
+        self.touched = set()
+        self.posted = []
+    
+    def add(self, before, after):
+        if before is not None:
+            self.balance_deltas[before.business_id] -= balance_effect(before)
+            self.dated_deltas[(before.business_id, before.transaction_date)] -= balance_effect(before)
+            self._add_rollup(before, -1)
+            self.touched.add((before.organization_id, before.business_id))
+        if after is not None:
+            self.balance_deltas[after.business_id] += balance_effect(after)
+            self.dated_deltas[(after.business_id, after.transaction_date)] += balance_effect(after)
+            self._add_rollup(after, 1)
+            self.touched.add((after.organization_id, after.business_id))
+            if _posts(before, after):
+                # Unsaved instances may still hold the amounts as given, e.g. strings
+                self.posted.append(after._replace(
+                    amount=Decimal(after.amount), amount_ngn=Decimal(after.amount_ngn)
+                ))
+    
+    def _add_rollup(self, state, sign):
+        key = rollup_key(state)
+        amount, amount_ngn, count = self.rollup_deltas.get(key, (Decimal('0'), Decimal('0'), 0))
+        self.rollup_deltas[key] = (
+            amount + sign * Decimal(state.amount or 0),
+            amount_ngn + sign * Decimal(state.amount_ngn or 0),
+            count + sign
+        )
+    
+    def extend(self, changes):
+        for before, after in changes:
+            self.add(before, after)
+    
+    def apply(self):
+        """Write the accumulated deltas. Call inside the writing DB transaction."""
+        from businesses.balances import apply_snapshot_deltas
+        from businesses.models import Business
+        
+        from .rollups import apply_rollup_deltas
+        
+        moved, balances = {}, {}
+        for business_id, delta in self.balance_deltas.items():
+            if delta:
+                # Also bumps the business's data version
+                balances[business_id] = Business.apply_balance_delta(business_id, delta)
+                moved[business_id] = delta
+        apply_rollup_deltas(self.rollup_deltas)
+        
+        # Any write changes what lists show, even without a balance effect
+        if self.touched:
+            Business.bump_data_version(
+                {business_id for _, business_id in self.touched} - set(moved),
+                {organization_id for organization_id, _ in self.touched}
+            )
+        # After the business rows above, which serialize with snapshot creation
+        apply_snapshot_deltas(self.dated_deltas)
+        
+        if self.posted or moved:
+            ledger_changed.send(sender=ChangeSet, posted=self.posted, balance_deltas=moved, balances=balances)
+        
+        self.balance_deltas.clear()
+        self.dated_deltas.clear()
+        self.rollup_deltas.clear()
+        self.touched.clear()
+        self.posted = []
+
+
+def _posts(before, after):
+    """Whether a change posts money: a new confirmed amount, or a changed one."""
+    if after.status != 'confirmed' or after.amount_ngn is None:
+        return False
+    return (
+        before is None or before.status != 'confirmed' or before.amount_ngn is None
+        or Decimal(before.amount_ngn) != Decimal(after.amount_ngn)
+    )
+
+
+def apply_changes(changes):
+    """Apply a batch of (before, after) transaction changes to the cached figures."""
+    change_set = ChangeSet()
+    change_set.extend(changes)
+    change_set.apply()
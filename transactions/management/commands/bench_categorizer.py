@@ -0,0 +1,70 @@
+"""
+Benchmark the auto-categorizer.
+
+Trains a model on synthetic labelled narrations, then times batch
+prediction on fresh ones, reporting rows per second and accuracy. Runs
+entirely in memory:
+
+    python manage.py bench_categorizer --train 50000 --predict 200000
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from transactions.categorizer import CategoryModel
+
+
+VOCABULARY = {
+    'utilities': ['dstv', 'gotv', 'ikeja', 'electric', 'ekedc', 'prepaid', 'meter', 'water', 'subscription'],
+    'fuel': ['fuel', 'diesel', 'petrol', 'total', 'energies', 'oando', 'station', 'generator'],
+    'salaries': ['salary', 'staff', 'payroll', 'wages', 'bonus', 'allowance'],
+    'rent': ['rent', 'landlord', 'lease', 'shop', 'office', 'quarterly'],
+    'airtime': ['mtn', 'airtel', 'glo', 'airtime', 'data', 'bundle', 'recharge'],
+    'transport': ['bolt', 'uber', 'logistics', 'delivery', 'dispatch', 'gig', 'waybill'],
+    'supplies': ['stationery', 'printing', 'packaging', 'cartons', 'nylon', 'market'],
+    'sales': ['pos', 'settlement', 'customer', 'invoice', 'walk', 'order', 'payment'],
+}
+NOISE = ['nip', 'trf', 'from', 'to', 'ref', 'lagos', 'abuja', 'ltd', 'enterprises', 'ng']
+
+
+class Command(BaseCommand):
+    help = 'Measure auto-categorization throughput on synthetic narrations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--train', type=int, default=50000, help='Labelled rows to train on.')
+        parser.add_argument('--predict', type=int, default=200000, help='Rows to predict.')
+
+    def handle(self, *args, **options):
+        rng = random.Random(3)
+        texts, labels = self.make_rows(rng, options['train'])
+        model = CategoryModel()
+        started = time.perf_counter()
+        model.learn(texts, labels)
+        self.stdout.write(
+            f"trained on {model.rows} rows in {time.perf_counter() - started:.3f}s "
+            f"({len(model.classes)} categories, {model.nbytes / 1024:.0f} KiB)"
+        )
+
+        texts, labels = self.make_rows(rng, options['predict'])
+        model.predict(texts[:100])  # compile outside the timing
+        started = time.perf_counter()
+        predictions = model.predict(texts)
+        elapsed = time.perf_counter() - started
+
+        correct = sum(1 for (category, _), label in zip(predictions, labels) if category == label)
+        self.stdout.write(
+            f"predicted {len(texts)} rows in {elapsed:.3f}s ({len(texts) / elapsed:,.0f} rows/s), "
+            f"accuracy {correct / len(texts):.1%}"
+        )
+
+    def make_rows(self, rng, count):
+        categories = list(VOCABULARY)
+        texts, labels = [], []
+        for _ in range(count):
+            category = rng.choice(categories)
+            words = rng.sample(VOCABULARY[category], 2) + rng.sample(NOISE, 3)
+            rng.shuffle(words)
+            texts.append(' '.join(words).upper() + f' {rng.randint(10 ** 7, 10 ** 8)}')
+            labels.append(category)
+        return texts, labels
@@ -0,0 +1,120 @@
+"""
+Benchmark the reconciliation matcher.
+
+Builds synthetic books: ``--size`` manual entries and as many bank lines,
+most of which settle an entry a few days later with a related narration,
+drawn from a limited set of amounts so buckets collide the way round
+figures do. Times the in-memory matcher, then (unless --skip-db) the full
+run through the database inside a transaction that is rolled back:
+
+    python manage.py bench_reconciliation --size 50000
+"""
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+
+from businesses.models import BankAccount, Business
+from organizations.models import Organization
+from transactions.models import Transaction
+from transactions.reconciliation import Matcher, make_entry, reconcile_business
+
+
+COUNTERPARTIES = [
+    'Chidi Stores', 'Mama Put', 'Dangote Cement', 'Ikeja Electric', 'Konga', 'Jumia', 'Bolt',
+    'Shoprite', 'Total Energies', 'MTN', 'Airtel', 'Glo', 'Landlord', 'Staff Salary', 'Ade Logistics',
+]
+
+
+class Command(BaseCommand):
+    help = 'Measure reconciliation matching time on synthetic manual entries and bank lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=50000, help='Manual entries (and bank lines).')
+        parser.add_argument('--matched', type=float, default=0.8, help='Share of entries with a settling bank line.')
+        parser.add_argument('--amounts', type=int, default=5000, help='Distinct amounts to draw from.')
+        parser.add_argument('--skip-db', action='store_true')
+
+    def handle(self, *args, **options):
+        rng = random.Random(11)
+        manual, bank = self.make_books(rng, options['size'], options['matched'], options['amounts'])
+
+        entries = [make_entry(*row) for row in manual]
+        lines = [make_entry(*row) for row in bank]
+        started = time.perf_counter()
+        matches = Matcher().match(entries, lines)
+        elapsed = time.perf_counter() - started
+
+        correct = sum(1 for m in matches if m.transaction_id == m.bank_transaction_id.replace('b', 'm', 1))
+        auto = sum(1 for m in matches if m.auto)
+        self.stdout.write(
+            f"in memory: {len(entries)} x {len(lines)} -> {len(matches)} matches "
+            f"({auto} auto, {correct} correct) in {elapsed:.3f}s"
+        )
+
+        if not options['skip_db']:
+            self.run_db(manual, bank)
+
+    def make_books(self, rng, size, matched, amount_count):
+        amounts = [Decimal(rng.randint(1, 5000) * 50) for _ in range(amount_count)]
+        start = date(2026, 1, 1)
+        manual, bank = [], []
+        for i in range(size):
+            transaction_type = rng.choice(['income', 'expense'])
+            amount = rng.choice(amounts)
+            day = start + timedelta(days=rng.randint(0, 364))
+            party = rng.choice(COUNTERPARTIES)
+            ref = f'INV{rng.randint(10 ** 5, 10 ** 6)}' if rng.random() < 0.4 else ''
+            manual.append((f'm{i}', transaction_type, 'NGN', amount, day, f'{party} {ref}'))
+
+            if rng.random() < matched:
+                posted = day + timedelta(days=rng.randint(0, 2))
+                narration = f'NIP TRF {party.upper()} {ref}'
+            else:
+                transaction_type = rng.choice(['income', 'expense'])
+                amount = rng.choice(amounts)
+                posted = start + timedelta(days=rng.randint(0, 364))
+                narration = f'POS {rng.choice(COUNTERPARTIES).upper()}'
+            bank.append((f'b{i}', transaction_type, 'NGN', amount, posted, narration))
+        return manual, bank
+
+    def run_db(self, manual, bank):
+        with db_transaction.atomic():
+            business, account = self.create_business()
+            started = time.perf_counter()
+            rows = [
+                Transaction(
+                    organization_id=business.organization_id, business=business,
+                    transaction_type=transaction_type, currency=currency, amount=amount, amount_ngn=amount,
+                    transaction_date=day, category='uncategorized', description=text,
+                    bank_account=account if pk.startswith('b') else None,
+                    bank_transaction_id=pk if pk.startswith('b') else None,
+                    bank_narration=text if pk.startswith('b') else None,
+                )
+                for pk, transaction_type, currency, amount, day, text in manual + bank
+            ]
+            Transaction.objects.bulk_create(rows, batch_size=2000)
+            self.stdout.write(f'seeded {len(rows)} transactions in {time.perf_counter() - started:.1f}s')
+
+            report = reconcile_business(business)
+            self.stdout.write(
+                f"database: {report['manual_transactions']} x {report['bank_transactions']} -> "
+                f"{report['auto_confirmed']} auto-confirmed, {report['suggested']} suggested; "
+                f"matching {report['match_seconds']}s, total {report['duration_seconds']}s"
+            )
+            db_transaction.set_rollback(True)
+
+    def create_business(self):
+        user = get_user_model().objects.create_user(
+            email=f'reconcile-bench-{time.time_ns()}@example.com', password='Bench-pass-123'
+        )
+        org = Organization.objects.create(owner=user, name='Reconciliation Benchmark')
+        business = Business.objects.create(organization=org, name='Reconciled Business')
+        account = BankAccount.objects.create(
+            business=business, organization=org, bank_name='Fake Bank', account_number='0000000000'
+        )
+        return business, account
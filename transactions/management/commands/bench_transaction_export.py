@@ -0,0 +1,87 @@
+"""
+Benchmark the streaming transaction export.
+
+Inserts synthetic transactions inside a transaction that is rolled back at
+the end, streams them through TransactionExporter and reports throughput and
+peak memory for each row count:
+
+    python manage.py bench_transaction_export --rows 1000 10000 100000
+"""
+import random
+import resource
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+
+from organizations.models import Organization
+from businesses.models import Business
+from transactions.exporters import TransactionExporter
+from transactions.models import Transaction
+
+
+class Command(BaseCommand):
+    help = 'Measure peak memory and throughput of the streaming transaction export against row count.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--format', dest='file_format', choices=['csv', 'jsonl'], default='csv')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'rows':>10} {'seconds':>9} {'rows/s':>10} {'py peak MiB':>12} {'max RSS MiB':>12}")
+
+        with db_transaction.atomic():
+            business = self.create_business()
+            inserted = 0
+            for target in sorted(options['rows']):
+                self.insert_rows(business, target - inserted)
+                inserted = target
+
+                queryset = Transaction.objects.filter(business=business).order_by('-transaction_date', '-created_at')
+                exporter = TransactionExporter(queryset, options['file_format'])
+
+                tracemalloc.start()
+                started = time.perf_counter()
+                size = sum(len(chunk) for chunk in exporter.stream())
+                elapsed = time.perf_counter() - started
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+                self.stdout.write(
+                    f'{exporter.rows_exported:>10} {elapsed:>9.2f} {exporter.rows_exported / elapsed:>10.0f} '
+                    f'{peak / 2 ** 20:>12.2f} {max_rss:>12.1f}  ({size / 2 ** 20:.1f} MiB written)'
+                )
+
+            db_transaction.set_rollback(True)
+
+    def create_business(self):
+        user = get_user_model().objects.create(email=f'bench-{time.time_ns()}@example.com')
+        org = Organization.objects.create(owner=user, name='Export Benchmark')
+        return Business.objects.create(organization=org, name='Benchmark Business')
+
+    def insert_rows(self, business, count, batch_size=5000):
+        rng = random.Random(count)
+        start = date(2020, 1, 1)
+        batch = []
+        for i in range(count):
+            amount = Decimal(rng.randint(100, 10 ** 8)) / 100
+            batch.append(Transaction(
+                organization_id=business.organization_id,
+                business=business,
+                transaction_date=start + timedelta(days=rng.randint(0, 2000)),
+                transaction_type=rng.choice(['income', 'expense']),
+                amount=amount,
+                amount_ngn=amount,
+                category=rng.choice(['sales', 'rent', 'salaries', 'utilities', 'inventory']),
+                description=f'Benchmark transaction {i}',
+                tags=['bench'],
+            ))
+            if len(batch) == batch_size:
+                Transaction.objects.bulk_create(batch)
+                batch = []
+        Transaction.objects.bulk_create(batch)
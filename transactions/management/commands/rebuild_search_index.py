@@ -0,0 +1,21 @@
+"""
+Restore the SQLite full-text index of transactions: re-create its triggers
+and re-read every row, e.g. after VACUUM renumbered rowids.
+
+    python manage.py rebuild_search_index
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from transactions.search import install_sqlite_index
+
+
+class Command(BaseCommand):
+    help = 'Re-create the SQLite full-text index triggers and rebuild the index from the transactions table.'
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write('Nothing to do: the PostgreSQL search vector is a generated column')
+            return
+        install_sqlite_index(connection)
+        self.stdout.write(self.style.SUCCESS('Rebuilt the transaction search index'))
@@ -0,0 +1,32 @@
+"""
+Rebuild or verify the daily transaction rollups.
+
+    python manage.py transaction_rollups rebuild [--organization ID]
+    python manage.py transaction_rollups verify [--organization ID]
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions import rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily transaction rollups from scratch or verify them against transactions.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['rebuild', 'verify'])
+        parser.add_argument('--organization', help='Limit to one organization ID')
+
+    def handle(self, *args, **options):
+        organization_id = options['organization']
+
+        if options['action'] == 'rebuild':
+            count = rollups.rebuild(organization_id)
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} rollup rows'))
+            return
+
+        mismatches = rollups.verify(organization_id)
+        for key, expected, actual in mismatches[:50]:
+            self.stdout.write(f'{key}: expected {expected}, found {actual}')
+        if mismatches:
+            raise CommandError(f'{len(mismatches)} rollup rows out of sync; run "transaction_rollups rebuild"')
+        self.stdout.write(self.style.SUCCESS('Rollups match transactions'))
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.27 on 2026-10-18 11:17
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+
+
+def build_rollups(apps, schema_editor):
+    Transaction = apps.get_model('transactions', 'Transaction')
+    TransactionDailyRollup = apps.get_model('transactions', 'TransactionDailyRollup')
+
+    rows = Transaction.objects.values(
+        'organization_id', 'business_id', 'transaction_date', 'transaction_type',
+        'category', 'currency', 'status'
+    ).annotate(
+        amount=Sum('amount'), amount_ngn=Sum('amount_ngn'), count=Count('id')
+    ).order_by()
+
+    TransactionDailyRollup.objects.bulk_create([
+        TransactionDailyRollup(
+            organization_id=row['organization_id'],
+            business_id=row['business_id'],
+            date=row['transaction_date'],
+            transaction_type=row['transaction_type'],
+            category=row['category'],
+            currency=row['currency'],
+            status=row['status'],
+            total_amount=row['amount'] or 0,
+            total_amount_ngn=row['amount_ngn'] or 0,
+            transaction_count=row['count'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0001_initial'),
+        ('organizations', '0001_initial'),
+        ('transactions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('transaction_type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense'), ('transfer', 'Transfer')], max_length=20)),
+                ('category', models.CharField(max_length=100)),
+                ('currency', models.CharField(max_length=3)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('reconciled', 'Reconciled'), ('voided', 'Voided')], max_length=50)),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('total_amount_ngn', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_rollups', to='businesses.business')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transaction_rollups', to='organizations.organization')),
+            ],
+            options={
+                'db_table': 'transaction_daily_rollups',
+                'indexes': [models.Index(fields=['organization', 'date'], name='transaction_organiz_a6a815_idx'), models.Index(fields=['business', 'date'], name='transaction_busines_4c42d8_idx')],
+                'unique_together': {('business', 'date', 'transaction_type', 'category', 'currency', 'status')},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,95 @@
+# Full-text search index for transactions.
+#
+# PostgreSQL: a generated tsvector column with a GIN index.
+# SQLite: an external-content FTS5 table kept in sync by triggers.
+#
+# The SQL is spelled out here rather than imported from transactions.search,
+# so later edits there don't change what this migration does.
+
+from django.db import migrations
+
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE transactions ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(description, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(reference_number, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(category, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(notes, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX transactions_search_vector_gin ON transactions USING gin (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS transactions_search_vector_gin",
+    "ALTER TABLE transactions DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE transactions_fts USING fts5(
+        description, notes, category, reference_number,
+        content='transactions',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER transactions_fts_insert AFTER INSERT ON transactions BEGIN
+        INSERT INTO transactions_fts(rowid, description, notes, category, reference_number)
+        VALUES (new.rowid, new.description, new.notes, new.category, new.reference_number);
+    END
+    """,
+    """
+    CREATE TRIGGER transactions_fts_delete AFTER DELETE ON transactions BEGIN
+        INSERT INTO transactions_fts(transactions_fts, rowid, description, notes, category, reference_number)
+        VALUES ('delete', old.rowid, old.description, old.notes, old.category, old.reference_number);
+    END
+    """,
+    """
+    CREATE TRIGGER transactions_fts_update
+    AFTER UPDATE OF description, notes, category, reference_number ON transactions BEGIN
+        INSERT INTO transactions_fts(transactions_fts, rowid, description, notes, category, reference_number)
+        VALUES ('delete', old.rowid, old.description, old.notes, old.category, old.reference_number);
+        INSERT INTO transactions_fts(rowid, description, notes, category, reference_number)
+        VALUES (new.rowid, new.description, new.notes, new.category, new.reference_number);
+    END
+    """,
+    "INSERT INTO transactions_fts(transactions_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS transactions_fts_update",
+    "DROP TRIGGER IF EXISTS transactions_fts_delete",
+    "DROP TRIGGER IF EXISTS transactions_fts_insert",
+    "DROP TABLE IF EXISTS transactions_fts",
+]
+
+STATEMENTS = {
+    'postgresql': (POSTGRES_FORWARD, POSTGRES_REVERSE),
+    'sqlite': (SQLITE_FORWARD, SQLITE_REVERSE),
+}
+
+
+def run_statements(direction):
+    def run(apps, schema_editor):
+        statements = STATEMENTS.get(schema_editor.connection.vendor)
+        if statements is None:
+            # Other backends fall back to icontains search
+            return
+        for sql in statements[direction]:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0002_transaction_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_statements(0), run_statements(1)),
+    ]
@@ -0,0 +1,86 @@
+# Unique (bank_account, bank_transaction_id), so re-delivered bank lines can
+# be upserted instead of duplicated.
+#
+# SQLite adds the constraint by rebuilding the table, which drops the FTS
+# triggers from 0003; they are re-created (and the index rebuilt, as rowids
+# may change) after the rebuild in either direction. The trigger SQL is a
+# copy of 0003's, frozen here like any migration's.
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+SQLITE_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS transactions_fts_insert",
+    "DROP TRIGGER IF EXISTS transactions_fts_delete",
+    "DROP TRIGGER IF EXISTS transactions_fts_update",
+    """
+    CREATE TRIGGER transactions_fts_insert AFTER INSERT ON transactions BEGIN
+        INSERT INTO transactions_fts(rowid, description, notes, category, reference_number)
+        VALUES (new.rowid, new.description, new.notes, new.category, new.reference_number);
+    END
+    """,
+    """
+    CREATE TRIGGER transactions_fts_delete AFTER DELETE ON transactions BEGIN
+        INSERT INTO transactions_fts(transactions_fts, rowid, description, notes, category, reference_number)
+        VALUES ('delete', old.rowid, old.description, old.notes, old.category, old.reference_number);
+    END
+    """,
+    """
+    CREATE TRIGGER transactions_fts_update
+    AFTER UPDATE OF description, notes, category, reference_number ON transactions BEGIN
+        INSERT INTO transactions_fts(transactions_fts, rowid, description, notes, category, reference_number)
+        VALUES ('delete', old.rowid, old.description, old.notes, old.category, old.reference_number);
+        INSERT INTO transactions_fts(rowid, description, notes, category, reference_number)
+        VALUES (new.rowid, new.description, new.notes, new.category, new.reference_number);
+    END
+    """,
+    "INSERT INTO transactions_fts(transactions_fts) VALUES ('rebuild')",
+]
+
+
+def restore_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in SQLITE_TRIGGERS:
+        schema_editor.execute(sql)
+
+
+def release_duplicate_bank_ids(apps, schema_editor):
+    """Keep the bank ID on the first copy of a duplicated line and clear it on the rest."""
+    Transaction = apps.get_model('transactions', 'Transaction')
+
+    duplicates = Transaction.objects.filter(
+        bank_account__isnull=False, bank_transaction_id__isnull=False
+    ).values('bank_account_id', 'bank_transaction_id').annotate(
+        copies=Count('id')
+    ).filter(copies__gt=1).order_by()
+
+    for row in duplicates:
+        copies = Transaction.objects.filter(
+            bank_account_id=row['bank_account_id'],
+            bank_transaction_id=row['bank_transaction_id']
+        ).order_by('created_at', 'id')
+        keep = copies.values_list('id', flat=True)[:1]
+        copies.exclude(id__in=list(keep)).update(bank_transaction_id=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0003_transaction_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(release_duplicate_bank_ids, migrations.RunPython.noop),
+        # Reversing removes the constraint with another rebuild
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(
+                fields=('bank_account', 'bank_transaction_id'),
+                name='unique_bank_transaction_per_account'
+            ),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.27 on 2026-10-18 11:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0003_bankaccount_sync_failures'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('organizations', '0002_organization_data_version'),
+        ('transactions', '0004_unique_bank_transaction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReconciliationMatch',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('score', models.DecimalField(decimal_places=4, max_digits=5)),
+                ('status', models.CharField(choices=[('suggested', 'Suggested'), ('confirmed', 'Confirmed'), ('rejected', 'Rejected')], default='suggested', max_length=20)),
+                ('auto_confirmed', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('decided_at', models.DateTimeField(blank=True, null=True)),
+                ('bank_transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bank_reconciliation_matches', to='transactions.transaction')),
+                ('business', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reconciliation_matches', to='businesses.business')),
+                ('decided_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reconciliation_decisions', to=settings.AUTH_USER_MODEL)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reconciliation_matches', to='organizations.organization')),
+                ('transaction', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reconciliation_matches', to='transactions.transaction')),
+            ],
+            options={
+                'db_table': 'reconciliation_matches',
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['business', 'status'], name='reconciliat_busines_2367ac_idx')],
+                'unique_together': {('transaction', 'bank_transaction')},
+            },
+        ),
+    ]
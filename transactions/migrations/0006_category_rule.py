@@ -0,0 +1,46 @@
+# Generated by Django 4.2.27 on 2026-10-18 13:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0003_bankaccount_sync_failures'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('organizations', '0002_organization_data_version'),
+        ('transactions', '0005_reconciliation_match'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryRule',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('priority', models.PositiveIntegerField(default=100)),
+                ('is_active', models.BooleanField(default=True)),
+                ('text_contains', models.CharField(blank=True, max_length=255, null=True)),
+                ('match_field', models.CharField(choices=[('any', 'Description or bank narration'), ('description', 'Description'), ('bank_narration', 'Bank narration')], default='any', max_length=20)),
+                ('transaction_type', models.CharField(blank=True, choices=[('income', 'Income'), ('expense', 'Expense'), ('transfer', 'Transfer')], max_length=20, null=True)),
+                ('payment_method', models.CharField(blank=True, choices=[('cash', 'Cash'), ('bank_transfer', 'Bank Transfer'), ('pos', 'POS'), ('cheque', 'Cheque'), ('mobile_money', 'Mobile Money'), ('online', 'Online Payment')], max_length=50, null=True)),
+                ('min_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True)),
+                ('max_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True)),
+                ('category', models.CharField(max_length=100)),
+                ('subcategory', models.CharField(blank=True, max_length=100, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('business', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='category_rules', to='businesses.business')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_category_rules', to=settings.AUTH_USER_MODEL)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_rules', to='organizations.organization')),
+            ],
+            options={
+                'db_table': 'category_rules',
+                'ordering': ['priority', 'created_at'],
+                'indexes': [models.Index(fields=['organization', 'is_active'], name='category_ru_organiz_13aadf_idx')],
+            },
+        ),
+    ]
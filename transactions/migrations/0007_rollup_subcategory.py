@@ -0,0 +1,31 @@
+# Generated by Django 4.2.27 on 2026-10-18 14:05
+#
+# Rollups gain the subcategory in their key, so P&L reports can break
+# categories down without scanning transactions. 0008 then rebuilds the
+# existing rows per subcategory.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('businesses', '0003_bankaccount_sync_failures'),
+        ('transactions', '0006_category_rule'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='transactiondailyrollup',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='transactiondailyrollup',
+            name='subcategory',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AlterUniqueTogether(
+            name='transactiondailyrollup',
+            unique_together={('business', 'date', 'transaction_type', 'category', 'subcategory', 'currency', 'status')},
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Rebuild the rollups per subcategory (merged back when migrating
+# backwards). Kept apart from the schema change in 0007 so the inserts and
+# the ALTER TABLEs never share a transaction on PostgreSQL.
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def rebuild_rollups(apps, by_subcategory):
+    Transaction = apps.get_model('transactions', 'Transaction')
+    TransactionDailyRollup = apps.get_model('transactions', 'TransactionDailyRollup')
+
+    fields = ['organization_id', 'business_id', 'transaction_date', 'transaction_type', 'category', 'currency', 'status']
+    if by_subcategory:
+        fields.append('subcategory')
+    rows = Transaction.objects.values(*fields).annotate(
+        amount=Sum('amount'), amount_ngn=Sum('amount_ngn'), count=Count('id')
+    ).order_by()
+
+    TransactionDailyRollup.objects.all().delete()
+    TransactionDailyRollup.objects.bulk_create([
+        TransactionDailyRollup(
+            organization_id=row['organization_id'],
+            business_id=row['business_id'],
+            date=row['transaction_date'],
+            transaction_type=row['transaction_type'],
+            category=row['category'],
+            subcategory=row.get('subcategory') or '',
+            currency=row['currency'],
+            status=row['status'],
+            total_amount=row['amount'] or 0,
+            total_amount_ngn=row['amount_ngn'] or 0,
+            transaction_count=row['count'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+def split_by_subcategory(apps, schema_editor):
+    rebuild_rollups(apps, by_subcategory=True)
+
+
+def merge_subcategories(apps, schema_editor):
+    rebuild_rollups(apps, by_subcategory=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0007_rollup_subcategory'),
+    ]
+
+    operations = [
+        migrations.RunPython(split_by_subcategory, merge_subcategories),
+    ]
@@ -3,10 +3,11 @@ Transaction and Category Models
 """
 import uuid
 from decimal import Decimal
-from django.db import models
+from django.db import models, transaction as db_transaction
 from django.conf import settings
 from organizations.models import Organization
 from businesses.models import Business, BankAccount
+from . import ledger
 
 
 class Category(models.Model):
@@ -222,21 +223,228 @@ class Transaction(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['bank_transaction_id']),
         ]
+        constraints = [
+            # Bank feeds re-deliver lines; a line is stored once per account
+            models.UniqueConstraint(
+                fields=['bank_account', 'bank_transaction_id'],
+                name='unique_bank_transaction_per_account'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.transaction_type}: {self.currency} {self.amount} - {self.description[:50]}"
     
+    def compute_amount_ngn(self):
+        """Amount converted to NGN at the transaction's exchange rate."""
+        if self.currency == 'NGN':
+            return self.amount
+        return (Decimal(str(self.amount)) * Decimal(str(self.exchange_rate))).quantize(Decimal('0.01'))
+    
+    def ledger_state(self):
+        """Snapshot of the fields that feed cached balances."""
+        return ledger.LedgerState(**{name: getattr(self, name) for name in ledger.LEDGER_FIELDS})
+    
+    def _persisted_ledger_state(self):
+        # Locked and read inside the write's transaction: an in-memory copy
+        # may be stale, and its delta would be applied on top of another's
+        if self._state.adding:
+            return None
+        row = Transaction.objects.select_for_update().filter(pk=self.pk).values(*ledger.LEDGER_FIELDS).first()
+        return ledger.LedgerState(**row) if row else None
+    
     def save(self, *args, **kwargs):
         # Calculate NGN amount
-        if self.currency == 'NGN':
-            self.amount_ngn = self.amount
-        else:
-            self.amount_ngn = self.amount * Decimal(str(self.exchange_rate))
+        self.amount_ngn = self.compute_amount_ngn()
         
-        super().save(*args, **kwargs)
+        with db_transaction.atomic():
+            before = self._persisted_ledger_state()
+            super().save(*args, **kwargs)
+            # Apply the balance delta instead of re-aggregating history
+            ledger.apply_changes([(before, self.ledger_state())])
+    
+    def delete(self, *args, **kwargs):
+        with db_transaction.atomic():
+            before = self._persisted_ledger_state()
+            result = super().delete(*args, **kwargs)
+            if result[1].get(self._meta.label):
+                ledger.apply_changes([(before, None)])
         
-        # Update business balance
-        self.business.recalculate_balance()
+        return result
+
+
+class TransactionDailyRollup(models.Model):
+    """
+    Per-day totals of transactions, maintained on every transaction write.
+    
+    One row per (business, date, type, category, subcategory, currency,
+    status), subcategory '' when there is none; the list summaries,
+    dashboards and reports read these instead of scanning transactions.
+    """
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name='transaction_rollups'
+    )
+    business = models.ForeignKey(
+        Business,
+        on_delete=models.CASCADE,
+        related_name='transaction_rollups'
+    )
+    
+    date = models.DateField()
+    transaction_type = models.CharField(max_length=20, choices=Transaction.TRANSACTION_TYPES)
+    category = models.CharField(max_length=100)
+    subcategory = models.CharField(max_length=100, blank=True, default='')
+    currency = models.CharField(max_length=3)
+    status = models.CharField(max_length=50, choices=Transaction.STATUS)
+    
+    total_amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    total_amount_ngn = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    transaction_count = models.IntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'transaction_daily_rollups'
+        unique_together = [['business', 'date', 'transaction_type', 'category', 'subcategory', 'currency', 'status']]
+        indexes = [
+            models.Index(fields=['organization', 'date']),
+            models.Index(fields=['business', 'date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.transaction_type}/{self.category}: {self.currency} {self.total_amount}"
+
+
+class ReconciliationMatch(models.Model):
+    """
+    A manually entered transaction paired with the bank line that settles it.
+    
+    The matching engine (``reconciliation.py``) stores its pairings as
+    suggestions; confirming one (by a user, or automatically for confident,
+    unambiguous pairs) marks both transactions reconciled.
+    """
+    
+    STATUS = [
+        ('suggested', 'Suggested'),
+        ('confirmed', 'Confirmed'),
+        ('rejected', 'Rejected'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name='reconciliation_matches'
+    )
+    business = models.ForeignKey(
+        Business,
+        on_delete=models.CASCADE,
+        related_name='reconciliation_matches'
+    )
+    transaction = models.ForeignKey(
+        Transaction,
+        on_delete=models.CASCADE,
+        related_name='reconciliation_matches'
+    )
+    bank_transaction = models.ForeignKey(
+        Transaction,
+        on_delete=models.CASCADE,
+        related_name='bank_reconciliation_matches'
+    )
+    
+    score = models.DecimalField(max_digits=5, decimal_places=4)
+    status = models.CharField(max_length=20, choices=STATUS, default='suggested')
+    auto_confirmed = models.BooleanField(default=False)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    decided_at = models.DateTimeField(null=True, blank=True)
+    decided_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reconciliation_decisions'
+    )
+    
+    class Meta:
+        db_table = 'reconciliation_matches'
+        ordering = ['-score']
+        unique_together = [['transaction', 'bank_transaction']]
+        indexes = [
+            models.Index(fields=['business', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"{self.transaction_id} <-> {self.bank_transaction_id} ({self.status}, {self.score})"
+
+
+class CategoryRule(models.Model):
+    """
+    A user-defined categorization rule, e.g. narration contains "DSTV" ->
+    utilities, or amount above 1M paid by POS -> equipment.
+
+    Every condition that is set must hold. Rules without a business apply
+    to all businesses of the organization; the lowest priority wins when
+    several match. ``rules.py`` compiles an organization's active rules
+    into one matcher.
+    """
+
+    MATCH_FIELDS = [
+        ('any', 'Description or bank narration'),
+        ('description', 'Description'),
+        ('bank_narration', 'Bank narration'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name='category_rules'
+    )
+    business = models.ForeignKey(
+        Business,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='category_rules'
+    )  # NULL = all businesses
+
+    name = models.CharField(max_length=100)
+    priority = models.PositiveIntegerField(default=100)
+    is_active = models.BooleanField(default=True)
+
+    # Conditions
+    text_contains = models.CharField(max_length=255, blank=True, null=True)
+    match_field = models.CharField(max_length=20, choices=MATCH_FIELDS, default='any')
+    transaction_type = models.CharField(max_length=20, choices=Transaction.TRANSACTION_TYPES, blank=True, null=True)
+    payment_method = models.CharField(max_length=50, choices=Transaction.PAYMENT_METHODS, blank=True, null=True)
+    min_amount = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
+    max_amount = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
+
+    # Outcome
+    category = models.CharField(max_length=100)
+    subcategory = models.CharField(max_length=100, blank=True, null=True)
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='created_category_rules'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'category_rules'
+        ordering = ['priority', 'created_at']
+        indexes = [
+            models.Index(fields=['organization', 'is_active']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} -> {self.category}"
 
 
 class Receipt(models.Model):
@@ -0,0 +1,145 @@
+"""
+Keyset (cursor) Pagination
+
+Pages through a queryset by seeking past the last row seen on a composite,
+unique sort key instead of using OFFSET, so deep pages cost the same as the
+first one and no COUNT(*) is needed.
+"""
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over ``ordering``, whose last field must be unique.
+
+    The cursor encodes the sort key of the boundary row and the direction,
+    so both next and previous pages are a single indexed range scan.
+    """
+    ordering = None
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    count_query_param = 'include_count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.position, self.reverse = self.decode_cursor(request, queryset.model)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() == 'true':
+            self.count = queryset.count()
+
+        ordering = self.reversed_ordering() if self.reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self.seek_filter(ordering, self.position))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if self.reverse:
+            rows.reverse()
+            self.has_next = self.position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.position is not None
+
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def reversed_ordering(self):
+        return tuple(f[1:] if f.startswith('-') else f'-{f}' for f in self.ordering)
+
+    @staticmethod
+    def seek_filter(ordering, position):
+        """
+        Rows strictly after ``position`` in ``ordering``.
+
+        Expands the row-value comparison into ORed prefix-equality terms and
+        adds a redundant bound on the leading field so the index range can be
+        used for the seek.
+        """
+        fields = [(f.lstrip('-'), f.startswith('-')) for f in ordering]
+        terms = []
+        for i, (name, descending) in enumerate(fields):
+            equal = {prefix: position[j] for j, (prefix, _) in enumerate(fields[:i])}
+            lookup = 'lt' if descending else 'gt'
+            terms.append(Q(**equal, **{f'{name}__{lookup}': position[i]}))
+
+        lead, descending = fields[0]
+        bound = Q(**{f'{lead}__{"lte" if descending else "gte"}': position[0]})
+        return bound & reduce(or_, terms)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            values = payload['v']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = tuple(
+                model._meta.get_field(f.lstrip('-')).to_python(value)
+                for f, value in zip(self.ordering, values)
+            )
+            return position, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError) as e:
+            raise NotFound('Invalid cursor') from e
+
+    def encode_cursor(self, row, reverse):
+        values = []
+        for f in self.ordering:
+            value = getattr(row, f.lstrip('-'))
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else str(value))
+        payload = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        encoded = base64.urlsafe_b64encode(payload.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_pagination_info(self):
+        return {
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'page_size': self.page_size,
+        }
+
+
+class TransactionKeysetPagination(KeysetPagination):
+    """Keyset pagination on the transaction list's default ordering."""
+    ordering = ('-transaction_date', '-created_at', 'id')
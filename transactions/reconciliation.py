@@ -0,0 +1,278 @@
+"""
+Bank Reconciliation
+
+Pairs manually entered transactions with the bank-synced lines that settle
+them. Two transactions can only match when their type, currency and amount
+are equal, so bank lines are hashed into buckets on that key and each
+bucket is sorted by date. A manual entry then looks up its bucket and
+bisects to the lines inside the date window; it never scans other amounts.
+Candidates are scored on date distance and narration similarity, and the
+best pairs are assigned greedily, one bank line per entry.
+
+A pair is confirmed automatically when its score reaches
+RECONCILIATION_AUTO_CONFIRM_SCORE and neither side has a close runner-up;
+everything else above RECONCILIATION_SUGGEST_SCORE is stored as a
+suggestion for a user to confirm or reject.
+"""
+import re
+import time
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import ledger
+from .models import ReconciliationMatch, Transaction
+
+
+# One side of a potential match, reduced to what scoring needs. ``day`` is a
+# date ordinal and ``key`` is (transaction_type, currency, amount in kobo).
+Entry = namedtuple('Entry', ['id', 'key', 'day', 'words', 'refs'])
+
+# An assigned pair
+Match = namedtuple('Match', ['transaction_id', 'bank_transaction_id', 'score', 'auto'])
+
+DATE_WEIGHT = 0.6
+TEXT_WEIGHT = 0.4
+
+# A runner-up this close to the best score makes a pair ambiguous
+AMBIGUITY_MARGIN = 0.1
+
+STOPWORDS = frozenset([
+    'and', 'for', 'from', 'the', 'trf', 'transfer', 'payment', 'ref', 'nip', 'via', 'with',
+])
+
+_WORD_RE = re.compile(r'[a-z]{3,}')
+_REF_RE = re.compile(r'[a-z0-9]*\d[a-z0-9]*')
+
+
+def make_entry(pk, transaction_type, currency, amount, transaction_date, *texts):
+    text = ' '.join(t for t in texts if t).lower()
+    return Entry(
+        id=pk,
+        key=(transaction_type, currency, int(Decimal(amount) * 100)),
+        day=transaction_date.toordinal(),
+        words=frozenset(_WORD_RE.findall(text)) - STOPWORDS,
+        refs=frozenset(ref for ref in _REF_RE.findall(text) if len(ref) >= 6),
+    )
+
+
+def text_similarity(a, b):
+    """1.0 on a shared reference number, else Jaccard similarity of the words."""
+    if a.refs & b.refs:
+        return 1.0
+    if not a.words or not b.words:
+        return 0.0
+    return len(a.words & b.words) / len(a.words | b.words)
+
+
+class Matcher:
+    """Matches manual entries to bank lines; see the module docstring."""
+
+    def __init__(self, window_days=None, suggest_score=None, auto_confirm_score=None):
+        self.window_days = settings.RECONCILIATION_DATE_WINDOW_DAYS if window_days is None else window_days
+        self.suggest_score = suggest_score or settings.RECONCILIATION_SUGGEST_SCORE
+        self.auto_confirm_score = auto_confirm_score or settings.RECONCILIATION_AUTO_CONFIRM_SCORE
+
+    def match(self, manual, bank, excluded=frozenset()):
+        """
+        Assign bank lines to manual entries.
+
+        ``excluded`` holds (manual ID, bank ID) pairs a user already rejected.
+        """
+        buckets = self.index(bank)
+
+        pairs = []
+        best = {}
+        for entry in manual:
+            bucket = buckets.get(entry.key)
+            if bucket is None:
+                continue
+            days, lines = bucket
+            lo = bisect_left(days, entry.day - self.window_days)
+            hi = bisect_right(days, entry.day + self.window_days)
+            for line in lines[lo:hi]:
+                if (entry.id, line.id) in excluded:
+                    continue
+                score = self.score(entry, line)
+                if score < self.suggest_score:
+                    continue
+                pairs.append((score, entry.id, line.id))
+                _keep_top_two(best, entry.id, score)
+                _keep_top_two(best, line.id, score)
+
+        # Greedy assignment, best pairs first
+        pairs.sort(key=lambda pair: pair[0], reverse=True)
+        used = set()
+        matches = []
+        for score, manual_id, bank_id in pairs:
+            if manual_id in used or bank_id in used:
+                continue
+            used.add(manual_id)
+            used.add(bank_id)
+            auto = (
+                score >= self.auto_confirm_score
+                and not _has_close_runner_up(best[manual_id])
+                and not _has_close_runner_up(best[bank_id])
+            )
+            matches.append(Match(manual_id, bank_id, round(score, 4), auto))
+        return matches
+
+    def index(self, entries):
+        """Bucket entries by key, each bucket as parallel lists sorted by day."""
+        grouped = {}
+        for entry in entries:
+            grouped.setdefault(entry.key, []).append(entry)
+        buckets = {}
+        for key, items in grouped.items():
+            items.sort(key=lambda e: e.day)
+            buckets[key] = ([e.day for e in items], items)
+        return buckets
+
+    def score(self, entry, line):
+        date_score = 1 - abs(entry.day - line.day) / (self.window_days + 1)
+        return DATE_WEIGHT * date_score + TEXT_WEIGHT * text_similarity(entry, line)
+
+
+def _keep_top_two(best, key, score):
+    top = best.setdefault(key, [0.0, 0.0])
+    if score > top[0]:
+        top[0], top[1] = score, top[0]
+    elif score > top[1]:
+        top[1] = score
+
+
+def _has_close_runner_up(top):
+    return top[1] > 0 and top[0] - top[1] < AMBIGUITY_MARGIN
+
+
+# Database
+
+# Matches confirmed per round of UPDATEs, keeping IN lists short
+CONFIRM_CHUNK_SIZE = 500
+
+ENTRY_FIELDS = [
+    'id', 'transaction_type', 'currency', 'amount', 'transaction_date',
+    'description', 'reference_number', 'bank_narration',
+]
+
+
+def unreconciled(business, bank_lines, date_from=None, date_to=None):
+    """Confirmed, unreconciled transactions of one side of a business's books."""
+    queryset = Transaction.objects.filter(
+        business=business,
+        status='confirmed',
+        is_reconciled=False,
+        bank_account__isnull=not bank_lines,
+    )
+    if date_from:
+        queryset = queryset.filter(transaction_date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(transaction_date__lte=date_to)
+    return queryset
+
+
+def load_entries(queryset):
+    return [
+        make_entry(*row)
+        for row in queryset.values_list(*ENTRY_FIELDS).order_by().iterator(chunk_size=5000)
+    ]
+
+
+def reconcile_business(business, user=None, date_from=None, date_to=None, auto_confirm=True, matcher=None):
+    """
+    Run the matcher over a business's unreconciled transactions.
+
+    Replaces the business's open suggestions with fresh ones, confirms the
+    confident ones when ``auto_confirm`` is set, and returns a report.
+    """
+    matcher = matcher or Matcher()
+    started = time.perf_counter()
+
+    # Bank lines may post a few days either side of the entries in range
+    window = timedelta(days=matcher.window_days)
+    manual = load_entries(unreconciled(business, False, date_from, date_to))
+    bank = load_entries(unreconciled(
+        business, True,
+        date_from and date_from - window,
+        date_to and date_to + window,
+    ))
+    rejected = set(ReconciliationMatch.objects.filter(
+        business=business, status='rejected'
+    ).values_list('transaction_id', 'bank_transaction_id'))
+    loaded = time.perf_counter()
+
+    matches = matcher.match(manual, bank, excluded=rejected)
+    matched = time.perf_counter()
+
+    with db_transaction.atomic():
+        ReconciliationMatch.objects.filter(business=business, status='suggested').delete()
+        created = ReconciliationMatch.objects.bulk_create([
+            ReconciliationMatch(
+                organization_id=business.organization_id,
+                business=business,
+                transaction_id=m.transaction_id,
+                bank_transaction_id=m.bank_transaction_id,
+                score=Decimal(str(m.score)),
+            )
+            for m in matches
+        ], batch_size=1000)
+        auto = [row for row, m in zip(created, matches) if m.auto] if auto_confirm else []
+        confirm_matches(auto, user, auto=True)
+
+    return {
+        'manual_transactions': len(manual),
+        'bank_transactions': len(bank),
+        'suggested': len(matches) - len(auto),
+        'auto_confirmed': len(auto),
+        'match_seconds': round(matched - loaded, 3),
+        'duration_seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def confirm_matches(matches, user=None, auto=False):
+    """
+    Confirm matches and reconcile their transactions.
+
+    The manual entry stays confirmed and is flagged reconciled. The bank
+    line moves to the ``reconciled`` status, so the money is counted once in
+    balances and rollups, through the entry that carries the category.
+    Other open suggestions involving either transaction are dropped.
+    """
+    now = timezone.now()
+    changes = ledger.ChangeSet()
+
+    with db_transaction.atomic():
+        for start in range(0, len(matches), CONFIRM_CHUNK_SIZE):
+            chunk = matches[start:start + CONFIRM_CHUNK_SIZE]
+            match_ids = [m.pk for m in chunk]
+            manual_ids = [m.transaction_id for m in chunk]
+            bank_ids = [m.bank_transaction_id for m in chunk]
+
+            # Status is checked here rather than in SQL, where it can steer
+            # the planner onto the status index instead of the primary key
+            for row in Transaction.objects.filter(pk__in=bank_ids).values(*ledger.LEDGER_FIELDS):
+                before = ledger.LedgerState(**row)
+                if before.status == 'confirmed':
+                    changes.add(before, before._replace(status='reconciled'))
+
+            Transaction.objects.filter(pk__in=bank_ids).update(
+                status='reconciled', is_reconciled=True, reconciled_at=now, reconciled_by=user, updated_at=now
+            )
+            Transaction.objects.filter(pk__in=manual_ids).update(
+                is_reconciled=True, reconciled_at=now, reconciled_by=user, updated_at=now
+            )
+            ReconciliationMatch.objects.filter(pk__in=match_ids).update(
+                status='confirmed', auto_confirmed=auto, decided_at=now, decided_by=user
+            )
+            ReconciliationMatch.objects.filter(
+                Q(transaction_id__in=manual_ids + bank_ids) | Q(bank_transaction_id__in=manual_ids + bank_ids),
+                status='suggested'
+            ).exclude(pk__in=match_ids).delete()
+
+        changes.apply()
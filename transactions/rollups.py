@@ -0,0 +1,169 @@
+"""
+Daily Transaction Rollups
+
+Maintenance, rebuild and verification of ``TransactionDailyRollup`` rows, and
+the summary queries served from them.
+"""
+from decimal import Decimal
+
+from django.db import transaction as db_transaction
+from django.db.models import Sum, Count, Case, When, F, DecimalField
+
+from businesses.models import BalanceSnapshot
+from .models import Transaction, TransactionDailyRollup
+
+
+KEY_FIELDS = (
+    'organization_id', 'business_id', 'date', 'transaction_type', 'category', 'subcategory', 'currency', 'status'
+)
+
+# Transaction list filters that map onto rollup columns
+FILTER_LOOKUPS = {
+    'business': 'business_id',
+    'transaction_type': 'transaction_type',
+    'category': 'category',
+    'status': 'status',
+    'date_from': 'date__gte',
+    'date_to': 'date__lte',
+}
+
+
+def apply_rollup_deltas(deltas):
+    """Add {key: (amount, amount_ngn, count)} deltas to the rollup rows."""
+    for key, (amount, amount_ngn, count) in deltas.items():
+        if not (amount or amount_ngn or count):
+            continue
+        lookup = dict(zip(KEY_FIELDS, key))
+        changes = {
+            'total_amount': F('total_amount') + amount,
+            'total_amount_ngn': F('total_amount_ngn') + amount_ngn,
+            'transaction_count': F('transaction_count') + count,
+        }
+        if TransactionDailyRollup.objects.filter(**lookup).update(**changes):
+            continue
+        rollup, created = TransactionDailyRollup.objects.get_or_create(
+            **lookup,
+            defaults={'total_amount': amount, 'total_amount_ngn': amount_ngn, 'transaction_count': count}
+        )
+        if not created:
+            TransactionDailyRollup.objects.filter(pk=rollup.pk).update(**changes)
+
+
+def summarize(business_ids, filters):
+    """
+    Income/expense summary over rollups for the given businesses.
+
+    ``filters`` holds cleaned TransactionFilter values. Voided rows are
+    never included, like the transaction list.
+    """
+    qs = TransactionDailyRollup.objects.filter(business_id__in=business_ids).exclude(status='voided')
+    for name, lookup in FILTER_LOOKUPS.items():
+        value = filters.get(name)
+        if value not in (None, ''):
+            qs = qs.filter(**{lookup: value})
+
+    totals = qs.aggregate(
+        total_income=Sum(
+            Case(
+                When(transaction_type='income', then=F('total_amount_ngn')),
+                default=0,
+                output_field=DecimalField()
+            )
+        ),
+        total_expense=Sum(
+            Case(
+                When(transaction_type='expense', then=F('total_amount_ngn')),
+                default=0,
+                output_field=DecimalField()
+            )
+        ),
+        count=Sum('transaction_count')
+    )
+
+    return {
+        'total_income': float(totals['total_income'] or 0),
+        'total_expense': float(totals['total_expense'] or 0),
+        'net': float((totals['total_income'] or 0) - (totals['total_expense'] or 0)),
+        'count': totals['count'] or 0
+    }
+
+
+def aggregate_transactions(organization_id=None):
+    """Rollup rows computed from scratch, as {key: (amount, amount_ngn, count)}."""
+    qs = Transaction.objects.all()
+    if organization_id:
+        qs = qs.filter(organization_id=organization_id)
+
+    rows = qs.values(
+        'organization_id', 'business_id', 'transaction_date', 'transaction_type',
+        'category', 'subcategory', 'currency', 'status'
+    ).annotate(
+        amount=Sum('amount'),
+        amount_ngn=Sum('amount_ngn'),
+        count=Count('id')
+    ).order_by()
+
+    return {
+        (
+            row['organization_id'], row['business_id'], row['transaction_date'],
+            row['transaction_type'], row['category'], row['subcategory'] or '', row['currency'], row['status']
+        ): (_money(row['amount']), _money(row['amount_ngn']), row['count'])
+        for row in rows
+    }
+
+
+def rebuild(organization_id=None, batch_size=1000):
+    """Replace the rollup rows with ones aggregated from transactions."""
+    with db_transaction.atomic():
+        existing = TransactionDailyRollup.objects.all()
+        if organization_id:
+            existing = existing.filter(organization_id=organization_id)
+        existing.delete()
+        # Balance snapshots are built from rollups; they are rebuilt on demand
+        snapshots = BalanceSnapshot.objects.all()
+        if organization_id:
+            snapshots = snapshots.filter(business__organization_id=organization_id)
+        snapshots.delete()
+
+        rollups = [
+            TransactionDailyRollup(
+                **dict(zip(KEY_FIELDS, key)),
+                total_amount=amount,
+                total_amount_ngn=amount_ngn,
+                transaction_count=count
+            )
+            for key, (amount, amount_ngn, count) in aggregate_transactions(organization_id).items()
+        ]
+        TransactionDailyRollup.objects.bulk_create(rollups, batch_size=batch_size)
+
+    return len(rollups)
+
+
+def verify(organization_id=None):
+    """
+    Compare the rollups against transactions.
+
+    Returns a list of (key, expected, actual) mismatches; empty rollup rows
+    left behind by edits count as absent.
+    """
+    expected = aggregate_transactions(organization_id)
+
+    qs = TransactionDailyRollup.objects.all()
+    if organization_id:
+        qs = qs.filter(organization_id=organization_id)
+    actual = {}
+    for row in qs.values(*KEY_FIELDS, 'total_amount', 'total_amount_ngn', 'transaction_count'):
+        values = (_money(row['total_amount']), _money(row['total_amount_ngn']), row['transaction_count'])
+        if any(values):
+            actual[tuple(row[f] for f in KEY_FIELDS)] = values
+
+    return [
+        (key, expected.get(key), actual.get(key))
+        for key in expected.keys() | actual.keys()
+        if expected.get(key) != actual.get(key)
+    ]
+
+
+def _money(value):
+    # SQLite returns decimal sums as floats
+    return Decimal(str(value or 0)).quantize(Decimal('0.01'))
@@ -0,0 +1,272 @@
+"""
+Category Rules
+
+Compiles an organization's active CategoryRule rows into one RuleSet that
+categorizes a transaction without looping over every rule:
+
+- the distinct ``text_contains`` literals go into a single regex, a
+  zero-width lookahead alternation tried longest-first at every position
+  of the text, so one C-level scan finds every literal present. A literal
+  contained in a longer one found at the same position is implied by it
+  (worked out once, at compile time);
+- only rules whose literal was found, plus the rules with no text
+  condition, are candidates, and only those are checked for type, payment
+  method, business and the amount interval. The candidate with the lowest
+  (priority, created_at) wins.
+
+Compiled sets are cached in process memory per organization alongside a
+fingerprint of the rules (count and latest ``updated_at``), which is
+checked on every use, so any edit through ``save()`` rebuilds the set.
+
+Rules run before the statistical categorizer, on imports and bank sync,
+and can be applied to a business's history in bulk.
+"""
+import re
+import threading
+import time
+from collections import namedtuple
+
+from django.db import transaction as db_transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from . import ledger
+from .models import CategoryRule, Transaction
+
+
+UNCATEGORIZED = 'uncategorized'
+
+# A compiled rule. ``order`` is its rank by (priority, created_at).
+Rule = namedtuple('Rule', [
+    'id', 'order', 'business_id', 'field', 'literal', 'transaction_type', 'payment_method',
+    'min_amount', 'max_amount', 'category', 'subcategory',
+])
+
+# Transactions per round of UPDATEs when applying rules to history
+APPLY_CHUNK_SIZE = 2000
+
+HISTORY_FIELDS = ['id', 'description', 'bank_narration', 'payment_method', *ledger.LEDGER_FIELDS]
+
+
+class RuleSet:
+    """An organization's active rules, compiled; see the module docstring."""
+
+    def __init__(self, rules):
+        self.rules = [
+            Rule(
+                id=rule.pk,
+                order=order,
+                business_id=rule.business_id,
+                field=rule.match_field,
+                literal=(rule.text_contains or '').strip().lower() or None,
+                transaction_type=rule.transaction_type or None,
+                payment_method=rule.payment_method or None,
+                min_amount=rule.min_amount,
+                max_amount=rule.max_amount,
+                category=rule.category,
+                subcategory=rule.subcategory or None,
+            )
+            for order, rule in enumerate(rules)
+        ]
+
+        self.by_literal = {}
+        self.unconditional = []
+        for rule in self.rules:
+            if rule.literal is None:
+                self.unconditional.append(rule)
+            else:
+                self.by_literal.setdefault(rule.literal, []).append(rule)
+
+        literals = sorted(self.by_literal, key=len, reverse=True)
+        self.pattern = None
+        if literals:
+            self.pattern = re.compile('(?=(' + '|'.join(map(re.escape, literals)) + '))')
+        self.implied = {
+            literal: [other for other in literals if other in literal]
+            for literal in literals
+        }
+
+    def __len__(self):
+        return len(self.rules)
+
+    def find(self, text):
+        """Literals occurring in ``text``."""
+        if not text or self.pattern is None:
+            return ()
+        longest = {m.group(1) for m in self.pattern.finditer(text.lower())}
+        if len(longest) == 1:
+            return self.implied[longest.pop()]
+        found = set()
+        for literal in longest:
+            found.update(self.implied[literal])
+        return found
+
+    def match(self, business_id, transaction_type, payment_method, amount, description, narration):
+        """The winning Rule for a transaction, or None."""
+        best = None
+        for rule in self.unconditional:
+            if self._applies(rule, business_id, transaction_type, payment_method, amount):
+                best = rule
+                break
+
+        in_description = self.find(description)
+        in_narration = self.find(narration)
+        for field, literals in (('description', in_description), ('bank_narration', in_narration)):
+            for literal in literals:
+                for rule in self.by_literal[literal]:
+                    if best is not None and rule.order >= best.order:
+                        break
+                    if rule.field not in ('any', field):
+                        continue
+                    if self._applies(rule, business_id, transaction_type, payment_method, amount):
+                        best = rule
+                        break
+        return best
+
+    @staticmethod
+    def _applies(rule, business_id, transaction_type, payment_method, amount):
+        return (
+            (rule.business_id is None or rule.business_id == business_id)
+            and (rule.transaction_type is None or rule.transaction_type == transaction_type)
+            and (rule.payment_method is None or rule.payment_method == payment_method)
+            and (rule.min_amount is None or (amount is not None and amount >= rule.min_amount))
+            and (rule.max_amount is None or (amount is not None and amount <= rule.max_amount))
+        )
+
+
+# Cache
+
+_rule_sets = {}
+_rule_sets_lock = threading.Lock()
+
+
+def fingerprint(organization_id):
+    summary = CategoryRule.objects.filter(organization_id=organization_id).aggregate(
+        count=Count('id'), latest=Max('updated_at')
+    )
+    return summary['count'], summary['latest']
+
+
+def rules_for(organization_id):
+    """The organization's compiled RuleSet, rebuilt if its rules changed."""
+    current = fingerprint(organization_id)
+    with _rule_sets_lock:
+        cached = _rule_sets.get(organization_id)
+    if cached is not None and cached[0] == current:
+        return cached[1]
+
+    rule_set = RuleSet(CategoryRule.objects.filter(
+        organization_id=organization_id, is_active=True
+    ).order_by('priority', 'created_at', 'id'))
+    with _rule_sets_lock:
+        _rule_sets[organization_id] = (current, rule_set)
+    return rule_set
+
+
+def clear_cache():
+    with _rule_sets_lock:
+        _rule_sets.clear()
+
+
+# Applying rules
+
+def apply(transactions):
+    """
+    Categorize unsaved ``uncategorized`` transactions in place.
+
+    Call before their ledger states are taken, since the category is part
+    of the rollup key. Returns how many a rule categorized.
+    """
+    by_org = {}
+    for txn in transactions:
+        if txn.category == UNCATEGORIZED:
+            by_org.setdefault(txn.organization_id, []).append(txn)
+
+    applied = 0
+    for organization_id, txns in by_org.items():
+        rule_set = rules_for(organization_id)
+        if not rule_set:
+            continue
+        for txn in txns:
+            rule = rule_set.match(
+                txn.business_id, txn.transaction_type, txn.payment_method, txn.amount_ngn,
+                txn.description, txn.bank_narration
+            )
+            if rule is not None:
+                txn.category = rule.category
+                txn.subcategory = rule.subcategory
+                applied += 1
+    return applied
+
+
+def apply_to_history(organization_id, business_ids=None, date_from=None, date_to=None, overwrite=False):
+    """
+    Apply an organization's rules to its stored transactions.
+
+    Only ``uncategorized`` rows are considered unless ``overwrite`` is set;
+    rows a user corrected by hand are never changed. Returns a report.
+    """
+    started = time.perf_counter()
+    rule_set = rules_for(organization_id)
+
+    queryset = Transaction.objects.filter(
+        organization_id=organization_id,
+        status__in=['pending', 'confirmed', 'reconciled'],
+        user_corrected=False,
+    )
+    if business_ids is not None:
+        queryset = queryset.filter(business_id__in=business_ids)
+    if date_from:
+        queryset = queryset.filter(transaction_date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(transaction_date__lte=date_to)
+    if not overwrite:
+        queryset = queryset.filter(category=UNCATEGORIZED)
+
+    scanned = 0
+    by_rule = {}
+    if rule_set:
+        changes = ledger.ChangeSet()
+        pending = []
+        with db_transaction.atomic():
+            for row in queryset.values(*HISTORY_FIELDS).order_by().iterator(chunk_size=APPLY_CHUNK_SIZE):
+                scanned += 1
+                rule = rule_set.match(
+                    row['business_id'], row['transaction_type'], row['payment_method'], row['amount_ngn'],
+                    row['description'], row['bank_narration']
+                )
+                if rule is None or (rule.category, rule.subcategory) == (row['category'], row['subcategory']):
+                    continue
+                pending.append((row, rule))
+                by_rule[str(rule.id)] = by_rule.get(str(rule.id), 0) + 1
+                if len(pending) >= APPLY_CHUNK_SIZE:
+                    _write(pending, changes)
+                    pending = []
+            _write(pending, changes)
+            changes.apply()
+    else:
+        scanned = queryset.count()
+
+    duration = time.perf_counter() - started
+    return {
+        'rules': len(rule_set),
+        'scanned': scanned,
+        'categorized': sum(by_rule.values()),
+        'by_rule': by_rule,
+        'duration_seconds': round(duration, 3),
+        'rows_per_second': round(scanned / duration, 1) if duration > 0 else None,
+    }
+
+
+def _write(pending, changes):
+    """One UPDATE per distinct outcome in the chunk."""
+    now = timezone.now()
+    outcomes = {}
+    for row, rule in pending:
+        outcomes.setdefault((rule.category, rule.subcategory), []).append(row['id'])
+        before = ledger.LedgerState(**{name: row[name] for name in ledger.LEDGER_FIELDS})
+        changes.add(before, before._replace(category=rule.category, subcategory=rule.subcategory))
+    for (category, subcategory), ids in outcomes.items():
+        Transaction.objects.filter(pk__in=ids).update(
+            category=category, subcategory=subcategory, ai_categorized=False, updated_at=now
+        )
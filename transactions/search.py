@@ -0,0 +1,143 @@
+"""
+Transaction Full-Text Search
+
+Search backend for the transaction list. Uses the ``search_vector`` GIN
+index on PostgreSQL and the ``transactions_fts`` FTS5 table on SQLite (see
+migration 0003), with prefix matching on every term for search-as-you-type
+and results ranked by relevance. Other backends fall back to DRF's
+``icontains`` search.
+
+The FTS5 table is an external-content index keyed on the implicit rowid
+of ``transactions``, whose primary key is a UUID. A table rebuild
+(SQLite's ALTER via copy) drops the triggers that keep it in sync, and
+VACUUM may renumber rowids. Every migration that rebuilds the table
+therefore ends by re-creating the triggers and rebuilding the index, with
+its own copy of the SQL (migrations don't import this module, so editing
+it never changes them). After a VACUUM, run
+``manage.py rebuild_search_index``, which uses ``install_sqlite_index()``.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Longest query we send to the index; longer input is truncated
+MAX_TERMS = 8
+
+
+def search_terms(text):
+    """Split user input into index terms, dropping query syntax characters."""
+    return TOKEN_RE.findall(text.lower())[:MAX_TERMS]
+
+
+def postgres_match(terms):
+    query = ' & '.join(f'{term}:*' for term in terms)
+    match = RawSQL(
+        "transactions.search_vector @@ to_tsquery('simple', %s)",
+        (query,), output_field=BooleanField()
+    )
+    rank = RawSQL(
+        "ts_rank(transactions.search_vector, to_tsquery('simple', %s))",
+        (query,), output_field=FloatField()
+    )
+    return match, rank
+
+
+def sqlite_match(terms):
+    query = ' '.join(f'"{term}"*' for term in terms)
+    match = RawSQL(
+        "transactions.rowid IN (SELECT rowid FROM transactions_fts WHERE transactions_fts MATCH %s)",
+        (query,), output_field=BooleanField()
+    )
+    # bm25() is lower for better matches; weights follow the column order
+    rank = RawSQL(
+        "(SELECT -bm25(transactions_fts, 4.0, 1.0, 2.0, 4.0) FROM transactions_fts "
+        "WHERE transactions_fts MATCH %s AND transactions_fts.rowid = transactions.rowid)",
+        (query,), output_field=FloatField()
+    )
+    return match, rank
+
+
+SQLITE_INDEX = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+        description, notes, category, reference_number,
+        content='transactions',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    "DROP TRIGGER IF EXISTS transactions_fts_insert",
+    "DROP TRIGGER IF EXISTS transactions_fts_delete",
+    "DROP TRIGGER IF EXISTS transactions_fts_update",
+    """
+    CREATE TRIGGER transactions_fts_insert AFTER INSERT ON transactions BEGIN
+        INSERT INTO transactions_fts(rowid, description, notes, category, reference_number)
+        VALUES (new.rowid, new.description, new.notes, new.category, new.reference_number);
+    END
+    """,
+    """
+    CREATE TRIGGER transactions_fts_delete AFTER DELETE ON transactions BEGIN
+        INSERT INTO transactions_fts(transactions_fts, rowid, description, notes, category, reference_number)
+        VALUES ('delete', old.rowid, old.description, old.notes, old.category, old.reference_number);
+    END
+    """,
+    """
+    CREATE TRIGGER transactions_fts_update
+    AFTER UPDATE OF description, notes, category, reference_number ON transactions BEGIN
+        INSERT INTO transactions_fts(transactions_fts, rowid, description, notes, category, reference_number)
+        VALUES ('delete', old.rowid, old.description, old.notes, old.category, old.reference_number);
+        INSERT INTO transactions_fts(rowid, description, notes, category, reference_number)
+        VALUES (new.rowid, new.description, new.notes, new.category, new.reference_number);
+    END
+    """,
+]
+
+
+def install_sqlite_index(connection):
+    """Create the FTS5 table if missing, (re)create its triggers and rebuild it from the table."""
+    with connection.cursor() as cursor:
+        for sql in SQLITE_INDEX:
+            cursor.execute(sql)
+    rebuild_sqlite_index(connection)
+
+
+def rebuild_sqlite_index(connection):
+    """Re-read every row into the FTS5 table, e.g. after VACUUM renumbered rowids."""
+    with connection.cursor() as cursor:
+        cursor.execute("INSERT INTO transactions_fts(transactions_fts) VALUES ('rebuild')")
+
+
+BACKENDS = {
+    'postgresql': postgres_match,
+    'sqlite': sqlite_match,
+}
+
+
+class TransactionSearchFilter(SearchFilter):
+    """
+    Ranked full-text search over description, notes, category and reference
+    number. Results are ordered by rank unless ?ordering= is given.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '')
+        terms = search_terms(text)
+        if not terms:
+            return queryset
+
+        backend = BACKENDS.get(connections[queryset.db].vendor)
+        if backend is None:
+            return super().filter_queryset(request, queryset, view)
+
+        match, rank = backend(terms)
+        queryset = queryset.annotate(search_rank=rank).filter(match)
+
+        if not request.query_params.get('ordering'):
+            queryset = queryset.order_by('-search_rank', '-transaction_date', '-created_at')
+        return queryset
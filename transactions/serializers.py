@@ -2,7 +2,8 @@
 Transaction Serializers
 """
 from rest_framework import serializers
-from .models import Transaction, Category, Receipt
+from businesses.models import Business
+from .models import Transaction, Category, CategoryRule, Receipt, ReconciliationMatch
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -101,3 +102,104 @@ class TransactionCreateSerializer(serializers.ModelSerializer):
     def validate_business(self, value):
         # Will be validated in view
         return value
+
+
+class CachedBusinessField(serializers.PrimaryKeyRelatedField):
+    """Business lookup that reuses results from ``context['business_cache']``."""
+    
+    def to_internal_value(self, data):
+        cache = self.context['business_cache']
+        key = str(data)
+        if key not in cache:
+            try:
+                cache[key] = super().to_internal_value(data)
+            except serializers.ValidationError as exc:
+                cache[key] = exc
+        result = cache[key]
+        if isinstance(result, serializers.ValidationError):
+            raise result
+        return result
+
+
+class TransactionImportSerializer(TransactionCreateSerializer):
+    """Row serializer for bulk CSV imports."""
+    
+    business = CachedBusinessField(queryset=Business.objects.all())
+    # Rows left blank are auto-categorized
+    category = serializers.CharField(max_length=100, default='uncategorized')
+
+
+class BankLineSerializer(serializers.ModelSerializer):
+    """A transaction as it appears in reconciliation: both sides, with the bank narration."""
+    
+    class Meta:
+        model = Transaction
+        fields = [
+            'id', 'transaction_date', 'transaction_type', 'amount', 'currency',
+            'description', 'reference_number', 'bank_narration', 'category', 'status'
+        ]
+
+
+class ReconciliationMatchSerializer(serializers.ModelSerializer):
+    """A suggested or decided reconciliation pair."""
+    
+    transaction = BankLineSerializer(read_only=True)
+    bank_transaction = BankLineSerializer(read_only=True)
+    
+    class Meta:
+        model = ReconciliationMatch
+        fields = [
+            'id', 'business', 'transaction', 'bank_transaction', 'score',
+            'status', 'auto_confirmed', 'created_at', 'decided_at'
+        ]
+
+
+class ReconcileSerializer(serializers.Serializer):
+    """Parameters of a reconciliation run."""
+    
+    business = serializers.PrimaryKeyRelatedField(queryset=Business.objects.all())
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    auto_confirm = serializers.BooleanField(default=True)
+
+
+class CategoryRuleSerializer(serializers.ModelSerializer):
+    """Serializer for categorization rules."""
+    
+    CONDITION_FIELDS = ['text_contains', 'transaction_type', 'payment_method', 'min_amount', 'max_amount']
+    
+    class Meta:
+        model = CategoryRule
+        fields = [
+            'id', 'organization', 'business', 'name', 'priority', 'is_active',
+            'text_contains', 'match_field', 'transaction_type', 'payment_method',
+            'min_amount', 'max_amount', 'category', 'subcategory',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at']
+    
+    def validate(self, attrs):
+        def value(name):
+            return attrs.get(name, getattr(self.instance, name, None))
+        
+        if not any(value(name) not in (None, '') for name in self.CONDITION_FIELDS):
+            raise serializers.ValidationError('A rule needs at least one condition')
+        
+        min_amount, max_amount = value('min_amount'), value('max_amount')
+        if min_amount is not None and max_amount is not None and min_amount > max_amount:
+            raise serializers.ValidationError({'max_amount': 'Must not be below min_amount'})
+        
+        business = value('business')
+        if business is not None and business.organization_id != value('organization').pk:
+            raise serializers.ValidationError({'business': 'Business belongs to another organization'})
+        return attrs
+
+
+class ApplyCategoryRulesSerializer(serializers.Serializer):
+    """Parameters of applying rules to stored transactions."""
+    
+    organization = serializers.UUIDField()
+    business = serializers.PrimaryKeyRelatedField(queryset=Business.objects.all(), required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    overwrite = serializers.BooleanField(default=False)
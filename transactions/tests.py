@@ -1,3 +1,711 @@
-from django.test import TestCase
+"""
+Transaction Tests
+"""
+import random
+import uuid
+from io import StringIO
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import skipUnless
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from organizations.models import Organization, TeamMember
+from businesses.models import BankAccount, Business
+from . import categorizer, reconciliation, rollups, rules
+from .models import CategoryRule, Transaction, TransactionDailyRollup
+
+User = get_user_model()
+
+
+class LedgerTestMixin:
+    """Shared fixtures: one owner, one organization, a few businesses."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', password='Str0ng-pass!')
+        cls.org = Organization.objects.create(owner=cls.user, name='Ada Holdings')
+        TeamMember.objects.create(organization=cls.org, user=cls.user, role='owner', status='active')
+        cls.businesses = [
+            Business.objects.create(organization=cls.org, name=name, opening_balance=opening)
+            for name, opening in [('Restaurant', Decimal('1000.00')), ('Pharmacy', Decimal('0')), ('Logistics', Decimal('250.50'))]
+        ]
+
+    def make_transaction(self, business, **overrides):
+        fields = {
+            'organization': self.org,
+            'business': business,
+            'transaction_date': date(2026, 1, 1),
+            'transaction_type': 'income',
+            'amount': Decimal('100.00'),
+            'category': 'sales',
+            'description': 'Test transaction',
+        }
+        fields.update(overrides)
+        return Transaction.objects.create(**fields)
+
+
+class BalanceDeltaTests(LedgerTestMixin, TestCase):
+    """The delta-maintained balance must always equal the full aggregate."""
+
+    def assertBalancesConsistent(self):
+        for business in Business.objects.all():
+            self.assertEqual(business.current_balance, business.compute_balance(), business.name)
+
+    def test_new_business_starts_at_opening_balance(self):
+        self.assertEqual(Business.objects.get(pk=self.businesses[0].pk).current_balance, Decimal('1000.00'))
+
+    def test_random_edit_sequences_match_full_aggregate(self):
+        rng = random.Random(20260118)
+        live = []
+
+        for step in range(300):
+            op = rng.choice(['create', 'create', 'amount', 'type', 'status', 'move', 'currency', 'void', 'delete', 'reload'])
+
+            if op == 'create' or not live:
+                live.append(self.make_transaction(
+                    rng.choice(self.businesses),
+                    transaction_type=rng.choice(['income', 'expense', 'transfer']),
+                    amount=Decimal(rng.randint(1, 10 ** 7)) / 100,
+                    status=rng.choice(['pending', 'confirmed', 'confirmed', 'reconciled']),
+                    transaction_date=date(2026, 1, 1) + timedelta(days=rng.randint(0, 90)),
+                ))
+            else:
+                txn = rng.choice(live)
+                if op == 'amount':
+                    txn.amount = Decimal(rng.randint(1, 10 ** 7)) / 100
+                elif op == 'type':
+                    txn.transaction_type = rng.choice(['income', 'expense', 'transfer'])
+                elif op == 'status':
+                    txn.status = rng.choice(['pending', 'confirmed', 'reconciled', 'voided'])
+                elif op == 'move':
+                    txn.business = rng.choice(self.businesses)
+                elif op == 'currency':
+                    txn.currency = rng.choice(['NGN', 'USD'])
+                    txn.exchange_rate = Decimal(rng.randint(1000, 1600))
+                elif op == 'void':
+                    txn.status = 'voided'
+
+                if op == 'delete':
+                    live.remove(txn)
+                    txn.delete()
+                elif op == 'reload':
+                    # Reloaded copies must write the same deltas as the ones they replace
+                    live[live.index(txn)] = Transaction.objects.get(pk=txn.pk)
+                else:
+                    txn.save()
+
+            self.assertBalancesConsistent()
+
+        self.assertEqual(rollups.verify(), [])
+
+    def test_opening_balance_change_is_applied_as_delta(self):
+        business = Business.objects.get(pk=self.businesses[1].pk)
+        self.make_transaction(business, amount=Decimal('40.00'))
+
+        business = Business.objects.get(pk=business.pk)
+        business.opening_balance = Decimal('500.00')
+        business.save()
+
+        self.assertEqual(Business.objects.get(pk=business.pk).current_balance, Decimal('540.00'))
+
+    def test_full_save_does_not_overwrite_concurrent_delta(self):
+        stale = Business.objects.get(pk=self.businesses[2].pk)
+        self.make_transaction(self.businesses[2], amount=Decimal('10.00'))
+
+        stale.name = 'Logistics Ltd'
+        stale.save()
+
+        self.assertBalancesConsistent()
+
+    def test_stale_copies_apply_deltas_against_the_stored_row(self):
+        txn = self.make_transaction(self.businesses[1])
+        first, second = Transaction.objects.get(pk=txn.pk), Transaction.objects.get(pk=txn.pk)
+
+        first.amount = Decimal('300.00')
+        first.save()
+        second.status = 'voided'
+        second.save()
+        self.assertBalancesConsistent()
+
+        first.delete()
+        second.delete()
+        self.assertBalancesConsistent()
+        self.assertEqual(Business.objects.get(pk=self.businesses[1].pk).current_balance, Decimal('0'))
+
+    def test_recalculate_balance_repairs_drift(self):
+        business = self.businesses[0]
+        self.make_transaction(business, amount=Decimal('75.00'))
+        Transaction.objects.filter(business=business).update(amount_ngn=Decimal('80.00'))
+
+        self.assertEqual(business.recalculate_balance(), Decimal('1080.00'))
+        self.assertBalancesConsistent()
+
+
+class TransactionImportTests(LedgerTestMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content, **params):
+        upload = SimpleUploadedFile('history.csv', content.encode('utf-8'), content_type='text/csv')
+        return self.client.post('/api/v1/transactions/import/?' + urlencode(params), {'file': upload}, format='multipart')
+
+    def test_imports_valid_rows_and_reports_row_errors(self):
+        business = self.businesses[1]
+        content = (
+            'business,transaction_date,transaction_type,amount,category,description,tags\n'
+            f'{business.id},2025-03-01,income,5000.00,sales,Opening week,launch;promo\n'
+            f'{business.id},2025-03-02,expense,1200.50,rent,Shop rent,\n'
+            f'{business.id},not-a-date,expense,10,rent,Bad date,\n'
+            f'{business.id},2025-03-03,income,300,sales,Walk-in,\n'
+        )
+
+        response = self.upload(content, batch_size=2)
+
+        self.assertEqual(response.status_code, 201)
+        report = response.data['data']
+        self.assertEqual((report['total_rows'], report['imported'], report['failed']), (4, 3, 1))
+        self.assertEqual(report['errors'][0]['row'], 4)
+        self.assertIn('transaction_date', report['errors'][0]['errors'])
+        self.assertIsNotNone(report['rows_per_second'])
+
+        business.refresh_from_db()
+        self.assertEqual(business.current_balance, Decimal('4099.50'))
+        self.assertEqual(business.current_balance, business.compute_balance())
+        self.assertEqual(Transaction.objects.get(description='Opening week').tags, ['launch', 'promo'])
+
+    def test_rejects_rows_for_businesses_without_access(self):
+        other_owner = User.objects.create_user(email='other@example.com', password='Str0ng-pass!')
+        other_org = Organization.objects.create(owner=other_owner, name='Other')
+        foreign = Business.objects.create(organization=other_org, name='Foreign')
+
+        response = self.upload(
+            'business,transaction_date,transaction_type,amount,category,description\n'
+            f'{foreign.id},2025-03-01,income,10,sales,Sneaky\n'
+        )
+
+        self.assertEqual(response.data['data']['failed'], 1)
+        self.assertFalse(Transaction.objects.filter(business=foreign).exists())
+
+
+class KeysetPaginationTests(LedgerTestMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Several rows per day so pages split ties on transaction_date
+        for i in range(23):
+            self.make_transaction(self.businesses[i % 3], transaction_date=date(2026, 1, 1 + i // 5))
+        self.expected = [
+            str(pk) for pk in Transaction.objects.order_by('-transaction_date', '-created_at', 'id').values_list('id', flat=True)
+        ]
+
+    def test_walks_forward_and_backward_without_gaps(self):
+        url = '/api/v1/transactions/?pagination=cursor&page_size=4'
+        seen, pages = [], []
+        while url:
+            data = self.client.get(url).data['data']
+            pages.append(data)
+            seen.extend(t['id'] for t in data['transactions'])
+            url = data['pagination']['next']
+
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(pages[0]['summary']['count'], 23)
+        self.assertNotIn('summary', pages[1])
+        self.assertIsNone(pages[0]['pagination']['count'])
+
+        url = pages[-1]['pagination']['previous']
+        backwards = []
+        while url:
+            data = self.client.get(url).data['data']
+            backwards = [t['id'] for t in data['transactions']] + backwards
+            url = data['pagination']['previous']
+        self.assertEqual(backwards, self.expected[:len(backwards)])
+        self.assertEqual(len(backwards), 20)
+
+    def test_unsupported_ordering_is_rejected(self):
+        url = '/api/v1/transactions/'
+        self.assertEqual(self.client.get(url, {'pagination': 'cursor', 'ordering': 'amount_ngn'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'pagination': 'cursor', 'search': 'sale'}).status_code, 400)
+
+        response = self.client.get(url, {'pagination': 'cursor', 'ordering': '-transaction_date', 'page_size': 4})
+        self.assertEqual([t['id'] for t in response.data['data']['transactions']], self.expected[:4])
+        response = self.client.get(url, {'pagination': 'cursor', 'search': 'sale', 'ordering': '-transaction_date'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get('/api/v1/transactions/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class RollupSummaryTests(LedgerTestMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        rng = random.Random(4)
+        for i in range(40):
+            self.make_transaction(
+                self.businesses[i % 3],
+                transaction_type=rng.choice(['income', 'expense', 'transfer']),
+                category=rng.choice(['sales', 'rent', 'salaries']),
+                amount=Decimal(rng.randint(100, 100000)) / 100,
+                status=rng.choice(['pending', 'confirmed', 'voided']),
+                transaction_date=date(2026, 2, 1) + timedelta(days=i % 20),
+            )
+
+    def raw_summary(self, params):
+        # A search term that matches everything forces the raw aggregate
+        response = self.client.get('/api/v1/transactions/', {**params, 'search': 'Test'})
+        return response.data['data']['summary']
+
+    def test_rollup_summary_matches_raw_aggregate(self):
+        cases = [
+            {},
+            {'business': str(self.businesses[1].id)},
+            {'transaction_type': 'expense', 'category': 'rent'},
+            {'date_from': '2026-02-05', 'date_to': '2026-02-12'},
+            {'status': 'pending'},
+            {'status': 'voided'},
+        ]
+        for params in cases:
+            with self.subTest(params=params):
+                summary = self.client.get('/api/v1/transactions/', params).data['data']['summary']
+                raw = self.raw_summary(params)
+                self.assertEqual(summary['count'], raw['count'])
+                self.assertAlmostEqual(summary['total_income'], raw['total_income'], places=2)
+                self.assertAlmostEqual(summary['total_expense'], raw['total_expense'], places=2)
+
+    def test_summary_reads_rollups_not_transactions(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/v1/transactions/', {'page_size': 1})
+        summary_sql = [q['sql'] for q in ctx.captured_queries if 'SUM(' in q['sql'].upper()]
+        self.assertEqual(len(summary_sql), 1)
+        self.assertIn('transaction_daily_rollups', summary_sql[0])
+
+    def test_rebuild_and_verify_command(self):
+        TransactionDailyRollup.objects.filter(business=self.businesses[0]).delete()
+        with self.assertRaises(CommandError):
+            call_command('transaction_rollups', 'verify', stdout=StringIO())
+
+        call_command('transaction_rollups', 'rebuild', stdout=StringIO())
+        call_command('transaction_rollups', 'verify', stdout=StringIO())
+        self.assertEqual(rollups.verify(), [])
+
+
+class TransactionSearchTests(LedgerTestMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.dstv = self.make_transaction(self.businesses[0], description='DSTV subscription renewal', category='utilities')
+        self.rent = self.make_transaction(self.businesses[0], description='Shop rent', notes='Paid to DSTV building landlord')
+        self.make_transaction(self.businesses[1], description='Diesel for generator', reference_number='INV-20931')
+
+    def search(self, text, **params):
+        response = self.client.get('/api/v1/transactions/', {'search': text, **params})
+        return [t['id'] for t in response.data['data']['transactions']]
+
+    def test_prefix_match_ranks_description_above_notes(self):
+        self.assertEqual(self.search('dst'), [str(self.dstv.id), str(self.rent.id)])
+
+    def test_matches_reference_numbers_and_all_terms(self):
+        self.assertEqual(len(self.search('inv 2093')), 1)
+        self.assertEqual(self.search('dstv renew'), [str(self.dstv.id)])
+
+    def test_index_follows_edits_and_respects_business_scope(self):
+        self.dstv.description = 'Cable TV'
+        self.dstv.save()
+        self.assertEqual(self.search('dstv'), [str(self.rent.id)])
+
+        outsider = User.objects.create_user(email='viewer@example.com', password='Str0ng-pass!')
+        TeamMember.objects.create(
+            organization=self.org, user=outsider, role='viewer', status='active',
+            business_access=[str(self.businesses[1].id)]
+        )
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.search('shop'), [])
+        self.assertEqual(len(self.search('diesel')), 1)
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 index')
+    def test_rebuild_restores_triggers_and_renumbered_rowids(self):
+        with connection.cursor() as cursor:
+            # What a table rebuild or VACUUM can leave behind
+            cursor.execute('DROP TRIGGER transactions_fts_update')
+            cursor.execute('UPDATE transactions SET rowid = rowid + 1000')
+        self.assertEqual(self.search('dstv renew'), [])
+
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.search('dstv renew'), [str(self.dstv.id)])
+        self.dstv.description = 'Cable TV'
+        self.dstv.save()
+        self.assertEqual(self.search('dstv'), [str(self.rent.id)])
+
+
+class TransactionExportTests(LedgerTestMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.make_transaction(self.businesses[0], description='Lunch sales', tags=['pos', 'lunch'])
+        self.make_transaction(self.businesses[1], transaction_type='expense', description='Drug restock')
+
+    def test_streams_filtered_csv(self):
+        response = self.client.get('/api/v1/transactions/export/', {'business': str(self.businesses[0].id)})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('id,transaction_date,business'))
+        self.assertIn('Lunch sales', lines[1])
+        self.assertIn('pos;lunch', lines[1])
+
+    def test_streams_jsonl(self):
+        response = self.client.get('/api/v1/transactions/export/', {'file_format': 'jsonl'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('"business":"Pharmacy"', lines[0] + lines[1])
+
+    def test_requires_export_permission(self):
+        viewer = User.objects.create_user(email='viewer@example.com', password='Str0ng-pass!')
+        TeamMember.objects.create(organization=self.org, user=viewer, role='viewer', status='active')
+        self.client.force_authenticate(viewer)
+
+        self.assertEqual(self.client.get('/api/v1/transactions/export/').status_code, 403)
+
+
+class ReconciliationMatcherTests(TestCase):
+    """The in-memory matcher, independent of the database."""
+
+    def entry(self, pk, amount, day, text='', transaction_type='income'):
+        return reconciliation.make_entry(pk, transaction_type, 'NGN', Decimal(amount), date(2026, 3, day), text)
+
+    def test_matches_within_window_on_equal_amounts_only(self):
+        matcher = reconciliation.Matcher(window_days=3, suggest_score=0.3, auto_confirm_score=0.85)
+        manual = [self.entry('m1', '500.00', 10), self.entry('m2', '75.00', 10)]
+        bank = [
+            self.entry('b1', '500.00', 12),
+            self.entry('b2', '75.00', 20),
+            self.entry('b3', '75.00', 10, transaction_type='expense'),
+        ]
+
+        matches = matcher.match(manual, bank)
+
+        self.assertEqual([(m.transaction_id, m.bank_transaction_id) for m in matches], [('m1', 'b1')])
+        self.assertAlmostEqual(matches[0].score, 0.6 * (1 - 2 / 4), places=4)
+
+    def test_reference_match_is_auto_confirmed_unless_ambiguous(self):
+        matcher = reconciliation.Matcher(window_days=3, suggest_score=0.3, auto_confirm_score=0.85)
+        manual = [
+            self.entry('m1', '1200.00', 5, 'Invoice INV20931 Chidi'),
+            self.entry('m2', '40.00', 5, 'Fuel'),
+        ]
+        bank = [
+            self.entry('b1', '1200.00', 6, 'TRF FROM CHIDI INV20931'),
+            self.entry('b2', '40.00', 5, 'FUEL STATION'),
+            self.entry('b3', '40.00', 5, 'FUEL STATION'),
+        ]
+
+        matches = {m.transaction_id: m for m in matcher.match(manual, bank)}
+
+        self.assertEqual(matches['m1'].bank_transaction_id, 'b1')
+        self.assertTrue(matches['m1'].auto)
+        # Two equally good bank lines: suggested, never auto-confirmed
+        self.assertIn(matches['m2'].bank_transaction_id, {'b2', 'b3'})
+        self.assertFalse(matches['m2'].auto)
+
+    def test_each_bank_line_is_used_once_and_rejections_are_respected(self):
+        matcher = reconciliation.Matcher(window_days=3, suggest_score=0.3, auto_confirm_score=0.85)
+        manual = [self.entry('m1', '10.00', 1), self.entry('m2', '10.00', 3)]
+        bank = [self.entry('b1', '10.00', 1)]
+
+        self.assertEqual([m.transaction_id for m in matcher.match(manual, bank)], ['m1'])
+        self.assertEqual(
+            [m.transaction_id for m in matcher.match(manual, bank, excluded={('m1', 'b1')})], ['m2']
+        )
+
+
+class ReconciliationTests(LedgerTestMixin, TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.business = self.businesses[1]
+        self.account = BankAccount.objects.create(
+            business=self.business, organization=self.org, bank_name='GTBank', account_number='0123456789'
+        )
+        self.manual = self.make_transaction(
+            self.business, amount=Decimal('250.00'), description='Supplier refund', reference_number='RF884512'
+        )
+        self.bank = self.make_transaction(
+            self.business, amount=Decimal('250.00'), transaction_date=date(2026, 1, 2), description='Bank line',
+            bank_account=self.account, bank_transaction_id='line-1', bank_narration='NIP TRF RF884512'
+        )
+        self.other_manual = self.make_transaction(self.business, amount=Decimal('60.00'), description='Cash sale')
+        self.other_bank = self.make_transaction(
+            self.business, amount=Decimal('60.00'), description='Bank line', bank_account=self.account,
+            bank_transaction_id='line-2', bank_narration='POS SETTLEMENT'
+        )
+
+    def reconcile(self, **params):
+        return self.client.post(
+            '/api/v1/transactions/reconcile/', {'business': str(self.business.id), **params}, format='json'
+        )
+
+    def test_reconcile_confirms_confident_pairs_and_counts_money_once(self):
+        self.business.refresh_from_db()
+        self.assertEqual(self.business.current_balance, Decimal('620.00'))
+
+        report = self.reconcile().json()['data']
+
+        self.assertEqual((report['manual_transactions'], report['bank_transactions']), (2, 2))
+        self.assertEqual((report['auto_confirmed'], report['suggested']), (1, 1))
+
+        self.bank.refresh_from_db()
+        self.manual.refresh_from_db()
+        self.assertEqual(self.bank.status, 'reconciled')
+        self.assertTrue(self.manual.is_reconciled)
+        self.assertEqual(self.manual.status, 'confirmed')
+
+        self.business.refresh_from_db()
+        self.assertEqual(self.business.current_balance, Decimal('370.00'))
+        self.assertEqual(self.business.current_balance, self.business.compute_balance())
+
+    def test_suggestions_can_be_confirmed_or_rejected(self):
+        self.reconcile(auto_confirm=False)
+        matches = self.client.get(
+            '/api/v1/reconciliation-matches/', {'status': 'suggested'}
+        ).json()['data']['matches']
+        self.assertEqual(len(matches), 2)
+        by_manual = {m['transaction']['id']: m for m in matches}
+
+        confirm = self.client.post(f"/api/v1/reconciliation-matches/{by_manual[str(self.manual.id)]['id']}/confirm/")
+        self.assertEqual(confirm.json()['data']['status'], 'confirmed')
+
+        rejected_id = by_manual[str(self.other_manual.id)]['id']
+        self.client.post(f'/api/v1/reconciliation-matches/{rejected_id}/reject/')
+        again = self.client.post(f'/api/v1/reconciliation-matches/{rejected_id}/confirm/')
+        self.assertEqual(again.status_code, 400)
+
+        # A rejected pair is not suggested again
+        report = self.reconcile().json()['data']
+        self.assertEqual((report['suggested'], report['auto_confirmed']), (0, 0))
+
+    def test_requires_edit_permission(self):
+        viewer = User.objects.create_user(email='viewer@example.com', password='Str0ng-pass!')
+        TeamMember.objects.create(organization=self.org, user=viewer, role='viewer', status='active')
+        self.client.force_authenticate(viewer)
+
+        self.assertEqual(self.reconcile().status_code, 403)
+
+
+class CategorizerTests(LedgerTestMixin, TestCase):
+
+    def setUp(self):
+        categorizer.clear_cache()
+        self.addCleanup(categorizer.clear_cache)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.business = self.businesses[0]
+        for i in range(12):
+            self.make_transaction(self.business, transaction_type='expense', category='utilities',
+                                  description=f'DSTV subscription {i}')
+            self.make_transaction(self.business, transaction_type='expense', category='fuel',
+                                  description='Fuel for generator')
+
+    def test_predicts_from_organization_history(self):
+        model = categorizer.get_model(self.org.id)
+
+        predictions = model.predict(['DSTV GOTV SUBSCRIPTION PAYMENT', 'Diesel fuel', ''])
+
+        self.assertEqual([category for category, _ in predictions[:2]], ['utilities', 'fuel'])
+        self.assertGreater(predictions[0][1], 0.9)
+        self.assertAlmostEqual(predictions[2][1], 0.5, places=3)
+
+    def test_trains_on_corrections_but_not_on_its_own_guesses(self):
+        model = categorizer.get_model(self.org.id)
+        self.make_transaction(self.business, category='sales', description='Catering order', ai_categorized=True)
+        self.make_transaction(self.business, category='sales', description='Hall booking',
+                              ai_categorized=True, user_corrected=True)
+
+        categorizer.train(model, self.org.id)
+
+        self.assertEqual(model.rows, 25)
+        self.assertEqual(model.predict(['hall booking'])[0][0], 'sales')
+
+    def test_rows_sharing_the_watermark_timestamp_are_learned_once(self):
+        model = categorizer.get_model(self.org.id)
+        updated_at, last_id = model.trained_until
+        later = self.make_transaction(self.business, id=uuid.UUID(int=last_id.int + 1), category='sales',
+                                      description='Hall booking')
+        Transaction.objects.filter(pk=later.pk).update(updated_at=updated_at)
+
+        categorizer.train(model, self.org.id)
+        categorizer.train(model, self.org.id)
+
+        self.assertEqual(model.rows, 25)
+        self.assertEqual(model.trained_until, (updated_at, later.pk))
+
+    def test_refresh_under_way_is_not_repeated(self):
+        model = categorizer.get_model(self.org.id)
+        self.make_transaction(self.business, category='sales', description='Hall booking')
+
+        with model._training:
+            categorizer.train(model, self.org.id)
+        self.assertEqual(model.rows, 24)
+
+        categorizer.train(model, self.org.id)
+        self.assertEqual(model.rows, 25)
+
+    @override_settings(CATEGORIZER_CACHE_SIZE=1)
+    def test_least_recently_used_model_is_evicted(self):
+        other = Organization.objects.create(owner=self.user, name='Other')
+
+        categorizer.get_model(self.org.id)
+        categorizer.get_model(other.id)
+
+        self.assertEqual(categorizer.cached_organizations(), [other.id])
+
+    @override_settings(CATEGORIZER_MIN_TRAINING_ROWS=10)
+    def test_import_categorizes_rows_without_a_category(self):
+        content = (
+            'business,transaction_date,transaction_type,amount,category,description\n'
+            f'{self.business.id},2025-03-01,expense,9000.00,,DStv Compact subscription\n'
+            f'{self.business.id},2025-03-02,expense,100.00,,Something new\n'
+        )
+        upload = SimpleUploadedFile('history.csv', content.encode('utf-8'), content_type='text/csv')
+
+        report = self.client.post('/api/v1/transactions/import/', {'file': upload}, format='multipart').data['data']
+
+        self.assertEqual((report['imported'], report['auto_categorized']), (2, 1))
+        dstv = Transaction.objects.get(description='DStv Compact subscription')
+        self.assertEqual((dstv.category, dstv.ai_categorized), ('utilities', True))
+        unknown = Transaction.objects.get(description='Something new')
+        self.assertEqual(unknown.category, 'uncategorized')
+        self.assertIsNotNone(unknown.ai_suggested_category)
+        self.assertEqual(
+            TransactionDailyRollup.objects.get(date=date(2025, 3, 1)).category, 'utilities'
+        )
+
+    def test_changing_a_machine_category_marks_the_row_corrected(self):
+        txn = self.make_transaction(self.business, category='utilities', description='Generator service',
+                                    ai_categorized=True, ai_suggested_category='utilities')
+
+        self.client.patch(f'/api/v1/transactions/{txn.id}/', {'category': 'repairs'}, format='json')
+
+        txn.refresh_from_db()
+        self.assertEqual(txn.category, 'repairs')
+        self.assertTrue(txn.user_corrected)
+
+
+class CategoryRuleTests(LedgerTestMixin, TestCase):
+
+    def setUp(self):
+        rules.clear_cache()
+        self.addCleanup(rules.clear_cache)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.business = self.businesses[0]
+
+    def rule(self, **fields):
+        return CategoryRule.objects.create(organization=self.org, name=fields.get('category', 'Rule'), **fields)
+
+    def match(self, description, narration=None, amount='100.00', payment_method=None, business=None):
+        rule = rules.rules_for(self.org.id).match(
+            (business or self.business).id, 'expense', payment_method, Decimal(amount), description, narration
+        )
+        return rule and rule.category
+
+    def test_matches_overlapping_literals_by_priority(self):
+        self.rule(text_contains='DSTV', category='utilities', priority=50)
+        self.rule(text_contains='dstv compact', category='entertainment', priority=10)
+        self.rule(text_contains='tv', category='electronics', priority=90)
+
+        self.assertEqual(self.match('Paid DStv Compact renewal'), 'entertainment')
+        self.assertEqual(self.match('DSTV premium'), 'utilities')
+        self.assertEqual(self.match('New TV set'), 'electronics')
+        self.assertIsNone(self.match('Office rent'))
+
+    def test_checks_fields_amount_method_and_business(self):
+        self.rule(text_contains='pos', match_field='bank_narration', category='card-sales')
+        self.rule(min_amount=Decimal('1000000'), payment_method='pos', category='equipment', priority=1)
+        self.rule(text_contains='fuel', business=self.businesses[1], category='fuel')
+
+        self.assertIsNone(self.match('pos purchase'))
+        self.assertEqual(self.match('Purchase', narration='POS 1234'), 'card-sales')
+        self.assertEqual(self.match('Oven', amount='2500000.00', payment_method='pos'), 'equipment')
+        self.assertIsNone(self.match('Oven', amount='2500000.00', payment_method='cash'))
+        self.assertIsNone(self.match('Diesel fuel'))
+        self.assertEqual(self.match('Diesel fuel', business=self.businesses[1]), 'fuel')
+
+    def test_compiled_rules_are_rebuilt_when_rules_change(self):
+        rule = self.rule(text_contains='dstv', category='utilities')
+        self.assertEqual(self.match('dstv'), 'utilities')
+
+        rule.category = 'subscriptions'
+        rule.save()
+        self.assertEqual(self.match('dstv'), 'subscriptions')
+
+        rule.delete()
+        self.assertIsNone(self.match('dstv'))
+
+    def test_apply_to_history_recategorizes_and_keeps_rollups_consistent(self):
+        self.rule(text_contains='dstv', category='utilities')
+        dstv = self.make_transaction(self.business, category='uncategorized', description='DSTV sub')
+        other = self.make_transaction(self.business, category='uncategorized', description='Misc')
+        kept = self.make_transaction(self.business, category='sales', description='DSTV resale')
+
+        response = self.client.post(
+            '/api/v1/category-rules/apply/', {'organization': str(self.org.id)}, format='json'
+        )
+
+        report = response.json()['data']
+        self.assertEqual((report['scanned'], report['categorized']), (2, 1))
+        self.assertIsNotNone(report['rows_per_second'])
+        for txn, category in [(dstv, 'utilities'), (other, 'uncategorized'), (kept, 'sales')]:
+            txn.refresh_from_db()
+            self.assertEqual(txn.category, category)
+        self.assertEqual(
+            list(TransactionDailyRollup.objects.filter(business=self.business).order_by('category').values_list(
+                'category', 'transaction_count'
+            )),
+            [('sales', 1), ('uncategorized', 1), ('utilities', 1)]
+        )
+
+    def test_import_applies_rules_before_the_categorizer(self):
+        self.rule(text_contains='ikeja electric', category='utilities')
+        content = (
+            'business,transaction_date,transaction_type,amount,category,description\n'
+            f'{self.business.id},2025-03-01,expense,9000.00,,Ikeja Electric prepaid\n'
+        )
+        upload = SimpleUploadedFile('history.csv', content.encode('utf-8'), content_type='text/csv')
+
+        report = self.client.post('/api/v1/transactions/import/', {'file': upload}, format='multipart').data['data']
+
+        self.assertEqual(report['rule_categorized'], 1)
+        self.assertEqual(Transaction.objects.get(description='Ikeja Electric prepaid').category, 'utilities')
+
+    def test_rules_need_a_condition_and_edit_permission(self):
+        response = self.client.post('/api/v1/category-rules/', {
+            'organization': str(self.org.id), 'name': 'Everything', 'category': 'misc'
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        viewer = User.objects.create_user(email='viewer@example.com', password='Str0ng-pass!')
+        TeamMember.objects.create(organization=self.org, user=viewer, role='viewer', status='active')
+        self.client.force_authenticate(viewer)
+        response = self.client.post('/api/v1/category-rules/', {
+            'organization': str(self.org.id), 'name': 'DSTV', 'text_contains': 'dstv', 'category': 'utilities'
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
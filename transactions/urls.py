@@ -3,11 +3,13 @@ Transaction URL Configuration
 """
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TransactionViewSet, CategoryViewSet
+from .views import TransactionViewSet, CategoryViewSet, CategoryRuleViewSet, ReconciliationMatchViewSet
 
 router = DefaultRouter()
 router.register('transactions', TransactionViewSet, basename='transactions')
 router.register('categories', CategoryViewSet, basename='categories')
+router.register('category-rules', CategoryRuleViewSet, basename='category-rules')
+router.register('reconciliation-matches', ReconciliationMatchViewSet, basename='reconciliation-matches')
 
 urlpatterns = [
     path('', include(router.urls)),
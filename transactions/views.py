@@ -1,19 +1,32 @@
 """
 Transaction Views
 """
-from django.db.models import Sum, Case, When, F, DecimalField
+import csv
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.db.models import Sum, Count, Case, When, F, Q, DecimalField
 from django_filters import rest_framework as filters
 from rest_framework import viewsets, status
+from rest_framework.filters import OrderingFilter
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
-from organizations.models import TeamMember
-from businesses.models import Business
-from .models import Transaction, Category, Receipt
+from config.etags import DataVersionETagMixin
+from organizations.access import AccessScope, AccessScopeMixin
+from .models import Transaction, Category, CategoryRule, Receipt, ReconciliationMatch
+from . import reconciliation, rollups, rules
+from .exporters import CONTENT_TYPES, TransactionExporter
+from .importers import TransactionImporter
+from .pagination import TransactionKeysetPagination
+from .search import TransactionSearchFilter, search_terms
 from .serializers import (
     TransactionSerializer, TransactionListSerializer, TransactionCreateSerializer,
-    CategorySerializer, ReceiptSerializer
+    CategorySerializer, ReceiptSerializer, ReconciliationMatchSerializer, ReconcileSerializer,
+    CategoryRuleSerializer, ApplyCategoryRulesSerializer
 )
 
 
@@ -34,11 +47,12 @@ class TransactionFilter(filters.FilterSet):
         fields = ['business', 'transaction_type', 'category', 'status']
 
 
-class TransactionViewSet(viewsets.ModelViewSet):
+class TransactionViewSet(DataVersionETagMixin, AccessScopeMixin, viewsets.ModelViewSet):
     """
     ViewSet for Transaction CRUD operations.
     """
     permission_classes = [IsAuthenticated]
+    filter_backends = [filters.DjangoFilterBackend, OrderingFilter, TransactionSearchFilter]
     filterset_class = TransactionFilter
     search_fields = ['description', 'notes', 'category', 'reference_number']
     ordering_fields = ['transaction_date', 'amount_ngn', 'created_at']
@@ -52,39 +66,31 @@ class TransactionViewSet(viewsets.ModelViewSet):
         return TransactionSerializer
     
     def get_queryset(self):
-        user = self.request.user
-        org_id = self.request.query_params.get('organization_id')
-        
-        # Get accessible business IDs
-        memberships = TeamMember.objects.filter(
-            user=user,
-            status='active'
-        )
-        
-        if org_id:
-            memberships = memberships.filter(organization_id=org_id)
-        
-        accessible_businesses = []
-        for m in memberships:
-            if m.role in ['owner', 'admin']:
-                # Can access all businesses in org
-                business_ids = Business.objects.filter(
-                    organization=m.organization,
-                    archived_at__isnull=True
-                ).values_list('id', flat=True)
-                accessible_businesses.extend(business_ids)
-            elif m.business_access:
-                accessible_businesses.extend(m.business_access)
-        
-        return Transaction.objects.filter(
-            business_id__in=accessible_businesses,
+        return self.get_scope().transactions().filter(
             status__in=['pending', 'confirmed', 'reconciled']
         ).select_related('business')
     
-    def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
+    def get_rollup_filters(self):
+        """
+        Cleaned list filters if the summary can be answered from daily rollups,
+        otherwise None (search and amount ranges need the raw rows).
+        """
+        params = self.request.query_params
+        unsupported = (set(TransactionFilter.base_filters) - set(rollups.FILTER_LOOKUPS)) | {'search'}
+        if any(params.get(name) for name in unsupported):
+            return None
+        
+        filterset = TransactionFilter(params, queryset=Transaction.objects.none())
+        if not filterset.is_valid():
+            return None
+        return filterset.form.cleaned_data
+    
+    def get_summary(self, queryset):
+        """Income, expense and count for the filtered queryset."""
+        filters = self.get_rollup_filters()
+        if filters is not None:
+            return rollups.summarize(self.get_scope().businesses().values('id'), filters)
         
-        # Calculate summary
         summary = queryset.aggregate(
             total_income=Sum(
                 Case(
@@ -99,9 +105,48 @@ class TransactionViewSet(viewsets.ModelViewSet):
                     default=0,
                     output_field=DecimalField()
                 )
-            )
+            ),
+            count=Count('id')
         )
         
+        return {
+            'total_income': float(summary['total_income'] or 0),
+            'total_expense': float(summary['total_expense'] or 0),
+            'net': float((summary['total_income'] or 0) - (summary['total_expense'] or 0)),
+            'count': summary['count']
+        }
+    
+    def use_keyset_pagination(self):
+        params = self.request.query_params
+        return params.get('pagination') == 'cursor' or 'cursor' in params
+    
+    def check_keyset_ordering(self):
+        """
+        Reject orderings the keyset can't page in: anything but a prefix of
+        its own, and search ranking, which needs an explicit date ordering.
+        """
+        params = self.request.query_params
+        keyset = TransactionKeysetPagination.ordering
+        requested = [f.strip() for f in params.get('ordering', '').split(',') if f.strip()]
+        if requested and tuple(requested) != keyset[:len(requested)]:
+            raise ValidationError({
+                'ordering': f"Cursor pagination only supports ordering={','.join(keyset[:2])}"
+            })
+        if not requested and search_terms(params.get('search', '')):
+            raise ValidationError({
+                'ordering': 'Ranked search results are paged by page number; '
+                            f'pass ordering={keyset[0]} to page them by cursor in date order'
+            })
+    
+    def list(self, request, *args, **kwargs):
+        if self.use_keyset_pagination():
+            self.check_keyset_ordering()
+            return self.list_by_cursor(self.filter_queryset(self.get_queryset()))
+        
+        queryset = self.filter_queryset(self.get_queryset())
+        
+        summary = self.get_summary(queryset)
+        
         page = self.paginate_queryset(queryset)
         if page is not None:
             serializer = self.get_serializer(page, many=True)
@@ -110,12 +155,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
                 'success': True,
                 'data': {
                     'transactions': response.data['results'],
-                    'summary': {
-                        'total_income': float(summary['total_income'] or 0),
-                        'total_expense': float(summary['total_expense'] or 0),
-                        'net': float((summary['total_income'] or 0) - (summary['total_expense'] or 0)),
-                        'count': queryset.count()
-                    },
+                    'summary': summary,
                     'pagination': {
                         'count': response.data['count'],
                         'next': response.data['next'],
@@ -130,15 +170,34 @@ class TransactionViewSet(viewsets.ModelViewSet):
             'success': True,
             'data': {
                 'transactions': serializer.data,
-                'summary': {
-                    'total_income': float(summary['total_income'] or 0),
-                    'total_expense': float(summary['total_expense'] or 0),
-                    'net': float((summary['total_income'] or 0) - (summary['total_expense'] or 0)),
-                    'count': queryset.count()
-                }
+                'summary': summary
             }
         })
     
+    def list_by_cursor(self, queryset):
+        """
+        Keyset-paginated list (?pagination=cursor).
+        
+        Later pages seek past the cursor instead of counting and offsetting;
+        the summary is only computed for the first page and the total count
+        only with ?include_count=true.
+        """
+        paginator = TransactionKeysetPagination()
+        page = paginator.paginate_queryset(queryset, self.request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        
+        data = {
+            'transactions': serializer.data,
+            'pagination': paginator.get_pagination_info()
+        }
+        if paginator.position is None:
+            data['summary'] = self.get_summary(queryset)
+        
+        return Response({
+            'success': True,
+            'data': data
+        })
+    
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         serializer = self.get_serializer(instance)
@@ -153,13 +212,9 @@ class TransactionViewSet(viewsets.ModelViewSet):
         
         # Verify business access
         business = serializer.validated_data['business']
-        membership = TeamMember.objects.filter(
-            organization=business.organization,
-            user=request.user,
-            status='active'
-        ).first()
+        scope = AccessScope.for_request(request)
         
-        if not membership or not membership.has_permission('add_transactions'):
+        if not scope.can_access_business(business) or not scope.has_permission(business.organization_id, 'add_transactions'):
             return Response({
                 'success': False,
                 'error': {'code': 'FORBIDDEN', 'message': 'No permission to add transactions'}
@@ -190,13 +245,108 @@ class TransactionViewSet(viewsets.ModelViewSet):
                 'error': {'code': 'VOIDED', 'message': 'Cannot edit voided transactions'}
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        serializer.save(updated_by=request.user)
-        
+        # Overriding a machine suggestion makes the row training data
+        extra = {}
+        category = serializer.validated_data.get('category', instance.category)
+        if category != instance.category and (instance.ai_categorized or instance.ai_suggested_category):
+            extra['user_corrected'] = True
+
+        serializer.save(updated_by=request.user, **extra)
+
         return Response({
             'success': True,
             'data': TransactionSerializer(instance).data
         })
     
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_transactions(self, request):
+        """Bulk import transactions from an uploaded CSV file."""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({
+                'success': False,
+                'error': {'code': 'MISSING_FILE', 'message': 'A CSV file is required'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            batch_size = int(request.query_params.get('batch_size', settings.TRANSACTION_IMPORT_BATCH_SIZE))
+        except ValueError:
+            batch_size = settings.TRANSACTION_IMPORT_BATCH_SIZE
+        batch_size = max(1, min(batch_size, settings.TRANSACTION_IMPORT_MAX_BATCH_SIZE))
+        
+        importer = TransactionImporter(request.user, AccessScope.for_request(request), batch_size=batch_size)
+        try:
+            report = importer.run(upload.file)
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response({
+                'success': False,
+                'error': {'code': 'INVALID_FILE', 'message': f'Could not read CSV file: {e}'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'data': report
+        }, status=status.HTTP_201_CREATED if report['imported'] else status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream the filtered transactions as CSV or JSON Lines
+        (?file_format=csv|jsonl). Requires the export permission.
+        """
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in CONTENT_TYPES:
+            return Response({
+                'success': False,
+                'error': {'code': 'INVALID_FORMAT', 'message': 'file_format must be csv or jsonl'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        export_org_ids = self.get_scope().organizations_with_permission('export')
+        if not export_org_ids:
+            return Response({
+                'success': False,
+                'error': {'code': 'FORBIDDEN', 'message': 'No permission to export transactions'}
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        queryset = self.filter_queryset(self.get_queryset()).filter(organization_id__in=export_org_ids)
+        exporter = TransactionExporter(queryset, file_format)
+        
+        response = StreamingHttpResponse(exporter.stream(), content_type=exporter.content_type)
+        filename = f"transactions-{timezone.now():%Y%m%d-%H%M%S}.{file_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    @action(detail=False, methods=['post'])
+    def reconcile(self, request):
+        """
+        Match a business's manual entries to its bank lines. Stores the
+        pairs as suggestions and confirms the confident ones unless
+        auto_confirm is false.
+        """
+        serializer = ReconcileSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        business = data['business']
+        
+        scope = AccessScope.for_request(request)
+        if not scope.can_access_business(business) or not scope.has_permission(business.organization_id, 'edit_transactions'):
+            return Response({
+                'success': False,
+                'error': {'code': 'FORBIDDEN', 'message': 'No permission to reconcile transactions'}
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        report = reconciliation.reconcile_business(
+            business,
+            user=request.user,
+            date_from=data.get('date_from'),
+            date_to=data.get('date_to'),
+            auto_confirm=data['auto_confirm']
+        )
+        return Response({
+            'success': True,
+            'data': report
+        })
+    
     @action(detail=True, methods=['post'])
     def void(self, request, pk=None):
         """Void a transaction."""
@@ -215,9 +365,6 @@ class TransactionViewSet(viewsets.ModelViewSet):
         transaction.void_reason = request.data.get('reason', '')
         transaction.save()
         
-        # Recalculate business balance
-        transaction.business.recalculate_balance()
-        
         return Response({
             'success': True,
             'data': TransactionSerializer(transaction).data
@@ -235,7 +382,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
         # Get system categories + organization custom categories
         qs = Category.objects.filter(is_active=True, parent__isnull=True)
         
-        if org_id:
+        if org_id and AccessScope.for_request(self.request).membership(org_id):
             qs = qs.filter(organization_id__in=[None, org_id])
         else:
             qs = qs.filter(organization__isnull=True)
@@ -256,3 +403,213 @@ class CategoryViewSet(viewsets.ModelViewSet):
                 'expense': expense
             }
         })
+
+
+class CategoryRuleViewSet(AccessScopeMixin, viewsets.ModelViewSet):
+    """
+    Categorization rules of the user's organizations (?business=). Changing
+    rules needs edit_transactions; apply/ runs them over stored transactions.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = CategoryRuleSerializer
+    
+    def get_queryset(self):
+        scope = self.get_scope()
+        queryset = CategoryRule.objects.filter(
+            Q(business__isnull=True) | Q(business_id__in=scope.businesses().values('id')),
+            organization_id__in=scope.organization_ids
+        )
+        if self.request.query_params.get('business'):
+            queryset = queryset.filter(business_id=self.request.query_params['business'])
+        return queryset.order_by('priority', 'created_at')
+    
+    def can_edit(self, organization_id, business=None):
+        scope = self.get_scope()
+        if not scope.has_permission(organization_id, 'edit_transactions'):
+            return False
+        return business is None or scope.can_access_business(business)
+    
+    def forbidden(self):
+        return Response({
+            'success': False,
+            'error': {'code': 'FORBIDDEN', 'message': 'No permission to manage category rules'}
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page if page is not None else queryset, many=True)
+        data = {'rules': serializer.data}
+        if page is not None:
+            data['pagination'] = {
+                'count': self.paginator.page.paginator.count,
+                'next': self.paginator.get_next_link(),
+                'previous': self.paginator.get_previous_link()
+            }
+        return Response({
+            'success': True,
+            'data': data
+        })
+    
+    def retrieve(self, request, *args, **kwargs):
+        return Response({
+            'success': True,
+            'data': self.get_serializer(self.get_object()).data
+        })
+    
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if not self.can_edit(data['organization'].pk, data.get('business')):
+            return self.forbidden()
+        
+        serializer.save(created_by=request.user)
+        return Response({
+            'success': True,
+            'data': serializer.data
+        }, status=status.HTTP_201_CREATED)
+    
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', True)
+        instance = self.get_object()
+        
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        organization = data.get('organization', instance.organization)
+        if not self.can_edit(instance.organization_id) or not self.can_edit(organization.pk, data.get('business', instance.business)):
+            return self.forbidden()
+        
+        serializer.save()
+        return Response({
+            'success': True,
+            'data': serializer.data
+        })
+    
+    def destroy(self, request, *args, **kwargs):
+        instance = self.get_object()
+        if not self.can_edit(instance.organization_id):
+            return self.forbidden()
+        
+        instance.delete()
+        return Response({
+            'success': True,
+            'data': {'message': f'Rule {instance.name} has been deleted'}
+        })
+    
+    @action(detail=False, methods=['post'])
+    def apply(self, request):
+        """
+        Apply an organization's rules to its stored transactions, optionally
+        one business and a date range. Only uncategorized rows are changed
+        unless overwrite is true.
+        """
+        serializer = ApplyCategoryRulesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        organization_id = data['organization']
+        business = data.get('business')
+        
+        if business is not None and business.organization_id != organization_id:
+            return self.forbidden()
+        if not self.can_edit(organization_id, business):
+            return self.forbidden()
+        
+        scope = self.get_scope()
+        report = rules.apply_to_history(
+            organization_id,
+            business_ids=[business.pk] if business else scope.businesses().filter(organization_id=organization_id).values('id'),
+            date_from=data.get('date_from'),
+            date_to=data.get('date_to'),
+            overwrite=data['overwrite']
+        )
+        return Response({
+            'success': True,
+            'data': report
+        })
+
+
+class ReconciliationMatchViewSet(AccessScopeMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Reconciliation pairs of the accessible businesses (?business=, ?status=),
+    with confirm and reject actions for suggestions.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = ReconciliationMatchSerializer
+    
+    def get_queryset(self):
+        queryset = ReconciliationMatch.objects.filter(
+            organization_id__in=self.get_scope().organization_ids,
+            business_id__in=self.get_scope().businesses().values('id')
+        ).select_related('transaction', 'bank_transaction')
+        
+        params = self.request.query_params
+        if params.get('business'):
+            queryset = queryset.filter(business_id=params['business'])
+        if params.get('status'):
+            queryset = queryset.filter(status=params['status'])
+        return queryset.order_by('-score', 'created_at')
+    
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page if page is not None else queryset, many=True)
+        data = {'matches': serializer.data}
+        if page is not None:
+            data['pagination'] = {
+                'count': self.paginator.page.paginator.count,
+                'next': self.paginator.get_next_link(),
+                'previous': self.paginator.get_previous_link()
+            }
+        return Response({
+            'success': True,
+            'data': data
+        })
+    
+    def retrieve(self, request, *args, **kwargs):
+        return Response({
+            'success': True,
+            'data': self.get_serializer(self.get_object()).data
+        })
+    
+    @action(detail=True, methods=['post'])
+    def confirm(self, request, pk=None):
+        match = self.get_decidable_match()
+        if isinstance(match, Response):
+            return match
+        reconciliation.confirm_matches([match], user=request.user)
+        match.refresh_from_db()
+        return Response({
+            'success': True,
+            'data': self.get_serializer(match).data
+        })
+    
+    @action(detail=True, methods=['post'])
+    def reject(self, request, pk=None):
+        match = self.get_decidable_match()
+        if isinstance(match, Response):
+            return match
+        match.status = 'rejected'
+        match.decided_at = timezone.now()
+        match.decided_by = request.user
+        match.save(update_fields=['status', 'decided_at', 'decided_by'])
+        return Response({
+            'success': True,
+            'data': self.get_serializer(match).data
+        })
+    
+    def get_decidable_match(self):
+        """The match from the URL if the user may decide it, else an error Response."""
+        match = self.get_object()
+        if not self.get_scope().has_permission(match.organization_id, 'edit_transactions'):
+            return Response({
+                'success': False,
+                'error': {'code': 'FORBIDDEN', 'message': 'No permission to reconcile transactions'}
+            }, status=status.HTTP_403_FORBIDDEN)
+        if match.status != 'suggested':
+            return Response({
+                'success': False,
+                'error': {'code': 'ALREADY_DECIDED', 'message': f'Match is already {match.status}'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return match